@@ -12,8 +12,24 @@ a = Analysis(
         'pymongo',
         'src.mongodb',
         'src.omniboard',
+        'src.docker_exec',
         'src.gui',
         'src.prefs',
+        'src.filelock',
+        'src.ports',
+        'src.netprobe',
+        'src.mirror',
+        'src.mongoproxy',
+        'src.httpcache',
+        'src.runtimes',
+        'src.scheduler',
+        'src.logstream',
+        'src.shared',
+        'src.artifacts',
+        'src.analyzer',
+        'src.srvcache',
+        'src.tracing',
+        'src.widgets',
         # Optional but recommended to ensure bundling when present
         'keyring',
         'dns',  # dnspython for mongodb+srv
@@ -0,0 +1,125 @@
+"""Benchmark the Omniboard launch pipeline against a fake docker CLI.
+
+Puts benchmarks/fake_docker.py first on PATH as ``docker`` so only our own
+orchestration overhead (plus the configured per-command delays) is timed::
+
+    python -m benchmarks.bench_launch --delay-ms 20 --crowded 50 --containers 50
+
+Each operation reports its latency and the number of docker subprocess
+calls it made.
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.common import Timings, print_summary, write_results
+from benchmarks import fake_docker
+from src.omniboard import OmniboardManager
+from src.netprobe import NetworkProbe
+from src.ports import PortLeaseRegistry
+
+DB_NAME = "bench_db"
+
+
+class ShimSession:
+    """Installs the fake docker shim and counts calls per operation."""
+
+    def __init__(self, directory: Path, config: dict):
+        self.env = fake_docker.install_shim(directory, config)
+        self.config_path = Path(self.env[fake_docker.CONFIG_ENV])
+        self.log_path = self.env[fake_docker.LOG_ENV]
+        self._saved = {}
+
+    def __enter__(self):
+        for key, value in self.env.items():
+            self._saved[key] = os.environ.get(key)
+            os.environ[key] = value
+        OmniboardManager.executor.reset()
+        return self
+
+    def __exit__(self, *exc):
+        for key, value in self._saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        OmniboardManager.executor.reset()
+
+    def calls(self) -> int:
+        return len(fake_docker.read_calls(self.log_path))
+
+    def update(self, **changes):
+        import json
+        config = json.loads(self.config_path.read_text(encoding="utf-8"))
+        config.update(changes)
+        self.config_path.write_text(json.dumps(config), encoding="utf-8")
+
+    def wait_for_call(self, sub: str, already: int, timeout: float = 10.0):
+        """Wait until a detached (Popen) call to ``sub`` has been logged."""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            new = fake_docker.read_calls(self.log_path)[already:]
+            if any(c["sub"] == sub for c in new):
+                return
+            time.sleep(0.01)
+
+
+def run_operation(session: ShimSession, timings: Timings, name: str, func, detached_sub=None):
+    before = session.calls()
+    with timings.measure(name):
+        result = func()
+    if detached_sub:
+        session.wait_for_call(detached_sub, before)
+    timings.annotate(name, docker_calls=session.calls() - before)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--delay-ms", type=float, default=20.0,
+                        help="latency of every fake docker command")
+    parser.add_argument("--crowded", type=int, default=20,
+                        help="ports occupied by containers from the preferred port on")
+    parser.add_argument("--containers", type=int, default=20,
+                        help="existing omniboard_* containers for list/clear")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="result file (default: benchmarks/results/...)")
+    args = parser.parse_args(argv)
+
+    preferred = OmniboardManager.generate_port_for_database(DB_NAME)
+    config = {
+        "delays": {"*": args.delay_ms / 1000.0},
+        "occupied_ports": list(range(preferred, preferred + args.crowded)),
+        "containers": [],
+    }
+    timings = Timings()
+
+    with tempfile.TemporaryDirectory() as tmp, ShimSession(Path(tmp), config) as session:
+        manager = OmniboardManager(
+            port_registry=PortLeaseRegistry(Path(tmp) / "ports.json"),
+            network_probe=NetworkProbe(OmniboardManager.executor.run, OmniboardManager.IMAGE,
+                                       Path(tmp) / "netprobe.json"),
+        )
+        for _ in range(args.repeat):
+            run_operation(session, timings, "is_docker_running", manager.is_docker_running)
+            run_operation(session, timings, f"find_available_port(crowded={args.crowded})",
+                          lambda: manager.find_available_port(preferred))
+            run_operation(session, timings, "launch",
+                          lambda: manager.launch(DB_NAME, "localhost", 27017), detached_sub="run")
+
+            session.update(containers=[f"omniboard_{i:08x}" for i in range(args.containers)])
+            run_operation(session, timings, f"list_containers(n={args.containers})",
+                          manager.list_containers)
+            run_operation(session, timings, f"clear_all_containers(n={args.containers})",
+                          manager.clear_all_containers)
+
+    print_summary(timings)
+    print("\nExecutor metrics:\n" + OmniboardManager.executor.format_metrics())
+    params = dict(vars(args), executor_metrics=OmniboardManager.executor.metrics())
+    print(f"Results written to {write_results('launch', params, timings, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
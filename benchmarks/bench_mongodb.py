@@ -0,0 +1,110 @@
+"""Benchmark MongoDBClient and Omniboard against synthetic Sacred databases.
+
+Requires a local mongod (and Docker for the Omniboard part). Example::
+
+    python -m benchmarks.bench_mongodb --uri mongodb://localhost:27017 \\
+        --databases 20 --runs 500 --metric-length 2000 --omniboard
+
+Results are written as JSON (see benchmarks/common.py) so they can be
+compared across versions with ``python -m benchmarks.compare``.
+"""
+import argparse
+import time
+import urllib.request
+
+from pymongo import MongoClient
+
+from benchmarks.common import Timings, print_summary, write_results
+from benchmarks.sacred_data import Scale, populate
+from src.mongodb import MongoDBClient
+from src.omniboard import OmniboardManager
+
+DB_PREFIX = "altarbench_"
+
+
+def wait_for_http(port: int, timeout: float = 120.0) -> float:
+    """Poll Omniboard until it answers over HTTP; return the elapsed seconds."""
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=2) as resp:
+                if resp.status < 500:
+                    return time.perf_counter() - started
+        except Exception:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"Omniboard on port {port} not ready after {timeout:.0f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--uri", default="mongodb://localhost:27017/")
+    parser.add_argument("--databases", type=int, default=5)
+    parser.add_argument("--runs", type=int, default=100)
+    parser.add_argument("--metrics-per-run", type=int, default=3)
+    parser.add_argument("--metric-length", type=int, default=1000)
+    parser.add_argument("--artifacts-per-run", type=int, default=0)
+    parser.add_argument("--artifact-bytes", type=int, default=64 * 1024)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--omniboard", action="store_true",
+                        help="also measure Omniboard time-to-ready (needs Docker)")
+    parser.add_argument("--skip-populate", action="store_true",
+                        help="reuse databases from a previous run")
+    parser.add_argument("--keep", action="store_true", help="do not drop the databases afterwards")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/...)")
+    args = parser.parse_args(argv)
+
+    scale = Scale(args.runs, args.metrics_per_run, args.metric_length,
+                  args.artifacts_per_run, args.artifact_bytes)
+    db_names = [f"{DB_PREFIX}{i:03d}" for i in range(args.databases)]
+    timings = Timings()
+    admin = MongoClient(args.uri, serverSelectionTimeoutMS=3000)
+
+    if not args.skip_populate:
+        for i, db_name in enumerate(db_names):
+            with timings.measure("populate_database"):
+                counts = populate(admin, db_name, scale, seed=i)
+        timings.annotate("populate_database", **counts)
+
+    for _ in range(args.repeat):
+        client = MongoDBClient()
+        with timings.measure("connect_and_list"):
+            dbs = client.connect_by_url(args.uri)
+        timings.annotate("connect_and_list", databases=len(dbs))
+        with timings.measure("list_database_names"):
+            client.client.list_database_names()
+        with timings.measure("database_statistics"):
+            for db_name in db_names:
+                db = client.client[db_name]
+                db.command("dbstats")
+                db.runs.estimated_document_count()
+        client.close()
+
+    if args.omniboard:
+        manager = OmniboardManager()
+        target = MongoDBClient()
+        target.uri = args.uri
+        host, port, _ = target.parse_connection_url()
+        launched = []
+        for db_name in db_names[: min(3, len(db_names))]:
+            with timings.measure("omniboard_time_to_ready"):
+                name, host_port = manager.launch(db_name, host, port)
+                launched.append(name)
+                wait_for_http(host_port)
+        # Only remove our own containers, not the user's dashboards
+        for name in launched:
+            OmniboardManager.executor.run(["rm", "-f", name], timeout=30)
+
+    if not args.keep:
+        for db_name in db_names:
+            admin.drop_database(db_name)
+    admin.close()
+
+    print_summary(timings)
+    params = vars(args)
+    params["uri"] = "<redacted>" if "@" in args.uri else args.uri
+    print(f"Results written to {write_results('mongodb', params, timings, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
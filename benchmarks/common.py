@@ -0,0 +1,98 @@
+"""Shared helpers for the benchmark suites: timing and result files."""
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+class Timings:
+    """Collects repeated wall-clock samples per operation name."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self.extra: Dict[str, dict] = {}
+
+    @contextmanager
+    def measure(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def add(self, name: str, seconds: float):
+        self.samples.setdefault(name, []).append(seconds)
+
+    def annotate(self, name: str, **values):
+        """Attach extra per-operation values (counts, sizes, ...)."""
+        self.extra.setdefault(name, {}).update(values)
+
+    def summary(self) -> Dict[str, dict]:
+        out = {}
+        for name, values in self.samples.items():
+            ordered = sorted(values)
+            out[name] = {
+                "n": len(values),
+                "min_s": ordered[0],
+                "median_s": statistics.median(ordered),
+                "p95_s": ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))],
+                "max_s": ordered[-1],
+                **self.extra.get(name, {}),
+            }
+        return out
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, timeout=5,
+            cwd=Path(__file__).parent,
+        )
+        return result.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def write_results(suite: str, params: dict, timings: Timings, output: Optional[str] = None) -> Path:
+    """Write a machine-readable JSON result file and return its path.
+
+    Args:
+        suite: Benchmark suite name
+        params: Parameters the suite was run with
+        timings: Collected timings
+        output: Explicit output path (default: benchmarks/results/<suite>-<timestamp>.json)
+    """
+    now = datetime.now(timezone.utc)
+    if output:
+        path = Path(output)
+    else:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        path = RESULTS_DIR / f"{suite}-{now.strftime('%Y%m%dT%H%M%SZ')}.json"
+    payload = {
+        "suite": suite,
+        "timestamp": now.isoformat(),
+        "git_revision": _git_revision(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "params": params,
+        "results": timings.summary(),
+    }
+    path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    return path
+
+
+def print_summary(timings: Timings):
+    for name, stats in timings.summary().items():
+        extra = {k: v for k, v in stats.items() if not k.endswith("_s") and k != "n"}
+        extra_text = "  " + " ".join(f"{k}={v}" for k, v in extra.items()) if extra else ""
+        print(f"{name:40s} n={stats['n']:<4d} median={stats['median_s'] * 1000:9.2f} ms"
+              f"  p95={stats['p95_s'] * 1000:9.2f} ms{extra_text}")
@@ -0,0 +1,46 @@
+"""Compare two benchmark result files and flag regressions.
+
+    python -m benchmarks.compare old.json new.json [--threshold 0.10]
+
+Exits with status 1 if any operation's median got slower than the threshold.
+"""
+import argparse
+import json
+import sys
+
+
+def compare(old: dict, new: dict, threshold: float) -> list:
+    """Return (name, old median, new median, relative change) for shared operations."""
+    rows = []
+    for name, stats in new.get("results", {}).items():
+        before = old.get("results", {}).get(name)
+        if not before or not before.get("median_s"):
+            continue
+        change = stats["median_s"] / before["median_s"] - 1.0
+        rows.append((name, before["median_s"], stats["median_s"], change, change > threshold))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="relative slowdown reported as a regression (default: 0.10)")
+    args = parser.parse_args(argv)
+
+    with open(args.old, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+
+    regressed = False
+    for name, before, after, change, slower in compare(old, new, args.threshold):
+        flag = "  REGRESSION" if slower else ""
+        regressed = regressed or slower
+        print(f"{name:40s} {before * 1000:9.2f} ms -> {after * 1000:9.2f} ms  {change:+7.1%}{flag}")
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,292 @@
+"""A scriptable fake ``docker`` CLI for benchmarking the orchestration code.
+
+``install_shim`` writes a ``docker`` executable into a directory that, when
+put first on PATH, runs this module instead of the real Docker CLI. Its
+behaviour is driven by a JSON config file (``FAKE_DOCKER_CONFIG``):
+
+- ``delays``: seconds to sleep per subcommand (``{"ps": 0.05, "*": 0.01}``)
+- ``occupied_ports``: host ports reported as published by a container
+- ``daemon_running``: False makes ``version``/``info`` fail
+- ``containers``: names of existing ``omniboard_*`` containers
+- ``created``: names of containers created but never started
+- ``fail``: subcommands that exit with status 1
+- ``bridge_gateway``: address reported by ``network inspect bridge``
+- ``reachable``: ``{probe target name: rtt_ms}`` answered by the network
+  probe container (``run --entrypoint node``); other targets are unreachable
+- ``meta``: per-container ``{"port": int, "labels": {...}}``, filled in by
+  ``run``/``create`` and reported by ``ps``/``stats`` with ``{{json .}}``
+- ``logs``: ``{container name: [lines]}`` printed by ``logs``
+- ``ncpu``, ``mem_total``: reported by ``info --format "{{json .}}"``
+- ``engines``: ``{context or -H endpoint: config}``, the state of further
+  engines (same keys as above); other engines fail to connect
+
+Every invocation is appended as one JSON line to ``FAKE_DOCKER_LOG`` so
+callers can count subprocess calls per operation.
+"""
+import contextlib
+import hashlib
+import json
+import os
+import stat
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+CONFIG_ENV = "FAKE_DOCKER_CONFIG"
+LOG_ENV = "FAKE_DOCKER_LOG"
+
+
+def _subcommand(argv: List[str]) -> str:
+    # Skip global options such as --context NAME / -H HOST
+    i = 0
+    while i < len(argv) and argv[i].startswith("-"):
+        i += 2 if argv[i] in ("--context", "-c", "-H", "--host") else 1
+    return argv[i] if i < len(argv) else ""
+
+
+def _engine(argv: List[str]) -> Optional[str]:
+    """Return the --context / -H value selecting another engine, if any."""
+    i = 0
+    while i < len(argv) and argv[i].startswith("-"):
+        if argv[i] in ("--context", "-c", "-H", "--host") and i + 1 < len(argv):
+            return argv[i + 1]
+        i += 1
+    return None
+
+
+def _filter_value(argv: List[str], key: str) -> Optional[str]:
+    for i, arg in enumerate(argv[:-1]):
+        if arg == "--filter" and argv[i + 1].startswith(f"{key}="):
+            return argv[i + 1].split("=", 1)[1]
+    return None
+
+
+def _option_values(argv: List[str], option: str) -> List[str]:
+    return [argv[i + 1] for i, arg in enumerate(argv[:-1]) if arg == option]
+
+
+def _label_matches(labels: dict, label_filter: str) -> bool:
+    key, eq, value = label_filter.partition("=")
+    return key in labels and (not eq or labels[key] == value)
+
+
+def _container_id(name: str) -> str:
+    return hashlib.sha1(name.encode()).hexdigest()[:12]
+
+
+def _describe(name: str, config: dict) -> dict:
+    meta = config.get("meta", {}).get(name, {})
+    created = name in config.get("created", [])
+    port = meta.get("port")
+    labels = meta.get("labels", {})
+    return {
+        "ID": _container_id(name),
+        "Names": name,
+        "State": "created" if created else "running",
+        "Status": "Created" if created else "Up 2 minutes",
+        "Ports": f"127.0.0.1:{port}->9000/tcp" if port and not created else "",
+        "Labels": ",".join(f"{k}={v}" for k, v in labels.items()),
+    }
+
+
+def main(argv: List[str]) -> int:
+    started = time.time()
+    try:
+        return _execute(argv)
+    finally:
+        # Logged last, so a logged call has finished updating the state
+        log_path = os.environ.get(LOG_ENV)
+        if log_path:
+            with open(log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"t": started, "sub": _subcommand(argv), "argv": argv}) + "\n")
+
+
+def _engine_state(config: dict, argv: List[str]) -> Optional[dict]:
+    # Other engines (-H / --context) have their own state
+    engine = _engine(argv)
+    if engine is None:
+        return config
+    return config.get("engines", {}).get(engine)
+
+
+@contextlib.contextmanager
+def _locked(config_path: Path):
+    """Serialize state updates of concurrent invocations (e.g. one per engine)."""
+    if fcntl is None:
+        yield
+        return
+    with open(f"{config_path}.lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+
+def _save(config_path: Path, config: dict):
+    tmp = config_path.with_name(f"{config_path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(config), encoding="utf-8")
+    os.replace(tmp, config_path)
+
+
+def _execute(argv: List[str]) -> int:
+    config_path = Path(os.environ[CONFIG_ENV])
+    sub = _subcommand(argv)
+    state = _engine_state(json.loads(config_path.read_text(encoding="utf-8")), argv)
+    if state is None:
+        print(f"Cannot connect to the Docker daemon at {_engine(argv)}", file=sys.stderr)
+        return 1
+    # Delays are spent outside the lock, so concurrent calls overlap
+    delays = state.get("delays", {})
+    time.sleep(delays.get(sub, delays.get("*", 0.0)))
+    with _locked(config_path):
+        config = json.loads(config_path.read_text(encoding="utf-8"))
+        return _handle(argv, sub, config_path, config, _engine_state(config, argv))
+
+
+def _handle(argv: List[str], sub: str, config_path: Path, config: dict, state: dict) -> int:
+    running = state.get("daemon_running", True)
+    containers = state.setdefault("containers", [])
+
+    if sub in ("version", "info"):
+        if not running:
+            print("Cannot connect to the Docker daemon", file=sys.stderr)
+            return 1
+        if "json" in " ".join(_option_values(argv, "--format")):
+            print(json.dumps({
+                "ServerVersion": state.get("server_version", "25.0.3"),
+                "NCPU": state.get("ncpu", 8),
+                "MemTotal": state.get("mem_total", 8 * 1024 ** 3),
+                "ContainersRunning": len(containers) - len(state.get("created", [])),
+            }))
+        else:
+            print(state.get("server_version", "25.0.3"))
+        return 0
+    if not running or sub in state.get("fail", []):
+        return 1
+    created = state.setdefault("created", [])
+    if sub == "ps":
+        publish = _filter_value(argv, "publish")
+        if publish is not None:
+            if int(publish) in state.get("occupied_ports", []):
+                print(f"c{int(publish):011d}")
+            return 0
+        name = _filter_value(argv, "name") or ""
+        status = _filter_value(argv, "status")
+        label_filters = [f.split("=", 1)[1] for f in _option_values(argv, "--filter")
+                         if f.startswith("label=")]
+        as_json = "json" in " ".join(_option_values(argv, "--format"))
+        for container in containers:
+            info = _describe(container, state)
+            if status and info["State"] != status:
+                continue
+            labels = state.get("meta", {}).get(container, {}).get("labels", {})
+            if not all(_label_matches(labels, f) for f in label_filters):
+                continue
+            if container.startswith(name):
+                print(json.dumps(info) if as_json else container)
+        return 0
+    if sub == "stats":
+        wanted = [a for a in argv[argv.index("stats") + 1:] if not a.startswith("-")
+                  and a not in _option_values(argv, "--format")]
+        for container in containers:
+            info = _describe(container, state)
+            if info["State"] != "running" or (wanted and info["ID"] not in wanted
+                                               and container not in wanted):
+                continue
+            print(json.dumps({"ID": info["ID"], "Name": container, "CPUPerc": "0.50%",
+                              "MemUsage": "48.2MiB / 7.6GiB", "MemPerc": "0.62%"}))
+        return 0
+    if sub == "logs":
+        for line in state.get("logs", {}).get(argv[-1], []):
+            print(line)
+        return 0
+    if sub == "network":
+        print(state.get("bridge_gateway", "172.17.0.1"))
+        return 0
+    if sub == "run" and "--entrypoint" in argv:
+        reachable = state.get("reachable", {"bridge": 0.3})
+        targets = json.loads(argv[-1])
+        print(json.dumps({name: reachable.get(name) for name, _, _ in targets}))
+        return 0
+    if sub in ("run", "create"):
+        name = argv[argv.index("--name") + 1] if "--name" in argv else f"omniboard_{len(containers)}"
+        containers.append(name)
+        if sub == "create":
+            created.append(name)
+        published = _option_values(argv, "-p")
+        state.setdefault("meta", {})[name] = {
+            "port": int(published[0].split(":")[-2]) if published else None,
+            "labels": dict(v.split("=", 1) for v in _option_values(argv, "--label")),
+        }
+        _save(config_path, config)
+        print(name)
+        return 0
+    if sub == "start":
+        target = argv[-1]
+        if target not in containers:
+            print(f"Error: No such container: {target}", file=sys.stderr)
+            return 1
+        if target in created:
+            created.remove(target)
+        _save(config_path, config)
+        print(target)
+        return 0
+    if sub in ("rm", "stop"):
+        # Omniboard containers run with --rm: stopping removes them
+        by_id = {_container_id(c): c for c in containers}
+        for target in [a for a in argv[argv.index(sub) + 1:] if not a.startswith("-")]:
+            target = by_id.get(target, target)
+            if target in containers:
+                containers.remove(target)
+            if target in created:
+                created.remove(target)
+        _save(config_path, config)
+        return 0
+    return 0
+
+
+def install_shim(directory: Path, config: dict) -> dict:
+    """Create the fake ``docker`` executable and its config in ``directory``.
+
+    Args:
+        directory: Directory to put first on PATH
+        config: Initial behaviour config (see module docstring)
+
+    Returns:
+        Environment variables to apply (PATH, FAKE_DOCKER_CONFIG, FAKE_DOCKER_LOG)
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    config_path = directory / "fake_docker.json"
+    log_path = directory / "fake_docker.log"
+    _save(config_path, config)
+    log_path.write_text("", encoding="utf-8")
+    script = Path(__file__).resolve()
+
+    if sys.platform.startswith("win"):
+        shim = directory / "docker.bat"
+        shim.write_text(f'@"{sys.executable}" "{script}" %*\r\n', encoding="utf-8")
+    else:
+        shim = directory / "docker"
+        shim.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{script}" "$@"\n', encoding="utf-8")
+        shim.chmod(shim.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+    return {
+        "PATH": f"{directory}{os.pathsep}{os.environ.get('PATH', '')}",
+        CONFIG_ENV: str(config_path),
+        LOG_ENV: str(log_path),
+    }
+
+
+def read_calls(log_path: str) -> List[dict]:
+    """Return every recorded invocation, oldest first."""
+    with open(log_path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
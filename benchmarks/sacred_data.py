@@ -0,0 +1,145 @@
+"""Synthetic Sacred databases for benchmarking.
+
+Produces documents shaped like those written by Sacred's MongoObserver
+(``runs``, ``metrics`` and GridFS artifacts) at a configurable scale.
+"""
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, List, Tuple
+
+from bson import ObjectId
+
+
+@dataclass
+class Scale:
+    """Size of one synthetic Sacred database."""
+
+    runs: int = 100
+    metrics_per_run: int = 3
+    metric_length: int = 1000
+    artifacts_per_run: int = 0
+    artifact_bytes: int = 64 * 1024
+
+
+def make_metrics(run_id: int, scale: Scale, rng: random.Random) -> List[dict]:
+    """Build the ``metrics`` documents of one run."""
+    docs = []
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(hours=run_id)
+    for m in range(scale.metrics_per_run):
+        value = rng.random()
+        values = []
+        for _ in range(scale.metric_length):
+            value += rng.uniform(-0.05, 0.05)
+            values.append(value)
+        docs.append({
+            "_id": ObjectId(),
+            "name": f"metric_{m}",
+            "run_id": run_id,
+            "steps": list(range(scale.metric_length)),
+            "timestamps": [start + timedelta(seconds=s) for s in range(scale.metric_length)],
+            "values": values,
+        })
+    return docs
+
+
+def make_run(run_id: int, metrics: List[dict], artifacts: List[Tuple[str, ObjectId]],
+             rng: random.Random) -> dict:
+    """Build one ``runs`` document referencing its metrics and artifacts."""
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(hours=run_id)
+    return {
+        "_id": run_id,
+        "experiment": {
+            "name": "synthetic_experiment",
+            "base_dir": "/experiments",
+            "sources": [],
+            "dependencies": ["numpy==1.26.4", "sacred==0.8.5"],
+            "repositories": [],
+            "mainfile": "train.py",
+        },
+        "format": "MongoObserver-0.7.0",
+        "command": "main",
+        "host": {
+            "hostname": "bench-host",
+            "os": ["Linux", "Linux-6.1-x86_64"],
+            "python_version": "3.11.7",
+            "cpu": "Synthetic CPU",
+        },
+        "start_time": start,
+        "stop_time": start + timedelta(minutes=rng.randint(1, 120)),
+        "heartbeat": start + timedelta(minutes=rng.randint(1, 120)),
+        "config": {
+            "seed": rng.randint(0, 2**31),
+            "lr": rng.choice([1e-2, 1e-3, 1e-4]),
+            "batch_size": rng.choice([16, 32, 64, 128]),
+            "model": {"layers": rng.randint(2, 12), "hidden": rng.choice([128, 256, 512])},
+        },
+        "meta": {"command": "main", "options": {}},
+        "status": rng.choice(["COMPLETED", "COMPLETED", "COMPLETED", "FAILED", "INTERRUPTED"]),
+        "result": rng.random(),
+        "resources": [],
+        "artifacts": [{"name": name, "file_id": file_id} for name, file_id in artifacts],
+        "captured_out": "epoch done\n" * 20,
+        "info": {"metrics": [{"id": str(m["_id"]), "name": m["name"]} for m in metrics]},
+    }
+
+
+def iter_runs(scale: Scale, seed: int = 0) -> Iterator[Tuple[dict, List[dict], List[Tuple[str, bytes]]]]:
+    """Yield (run, metrics, artifact payloads) for every run at this scale.
+
+    Artifact payloads are ``(filename, data)``; the run's ``artifacts`` list
+    is filled in by ``populate`` once the files are stored in GridFS.
+    """
+    rng = random.Random(seed)
+    for run_id in range(1, scale.runs + 1):
+        metrics = make_metrics(run_id, scale, rng)
+        payloads = [
+            (f"artifact_{a}.bin", rng.randbytes(scale.artifact_bytes))
+            for a in range(scale.artifacts_per_run)
+        ]
+        yield make_run(run_id, metrics, [], rng), metrics, payloads
+
+
+def populate(client, db_name: str, scale: Scale, seed: int = 0, batch_size: int = 500) -> dict:
+    """Fill ``db_name`` with a synthetic Sacred database.
+
+    Args:
+        client: Connected pymongo MongoClient
+        db_name: Database to (re)create
+        scale: Size of the database
+        seed: Random seed, for reproducible data
+        batch_size: Documents per insert_many call
+
+    Returns:
+        Counts of inserted runs, metrics and artifacts
+    """
+    import gridfs
+
+    client.drop_database(db_name)
+    db = client[db_name]
+    fs = gridfs.GridFS(db)
+    runs, metrics = [], []
+    counts = {"runs": 0, "metrics": 0, "artifacts": 0}
+
+    def flush():
+        if runs:
+            db.runs.insert_many(runs, ordered=False)
+            counts["runs"] += len(runs)
+            runs.clear()
+        if metrics:
+            db.metrics.insert_many(metrics, ordered=False)
+            counts["metrics"] += len(metrics)
+            metrics.clear()
+
+    for run, run_metrics, payloads in iter_runs(scale, seed):
+        for filename, data in payloads:
+            file_id = fs.put(data, filename=filename, metadata={"run_id": run["_id"]})
+            run["artifacts"].append({"name": filename, "file_id": file_id})
+            counts["artifacts"] += 1
+        runs.append(run)
+        metrics.extend(run_metrics)
+        if len(runs) + len(metrics) >= batch_size:
+            flush()
+    flush()
+    db.metrics.create_index([("run_id", 1), ("name", 1)])
+    return counts
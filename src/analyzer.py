@@ -0,0 +1,433 @@
+"""Finding and removing data left behind by deleted or crashed Sacred runs.
+
+Deleting a run from ``runs`` leaves its ``metrics`` documents behind, and an
+interrupted GridFS upload leaves ``fs.chunks`` without an ``fs.files``
+document. Artifacts and sources no run refers to any more keep their files
+and chunks. Observers with a ``collection_prefix`` write their runs to
+``<prefix>_runs`` but share the ``fs`` bucket, so file references are
+collected from every runs collection of the database; when those cannot be
+listed, files are left alone. ``OrphanAnalyzer`` finds all three with streaming merge joins:
+each side is read as a cursor sorted by the joined key (``_id`` or the
+owner field, with small projections and server-side document sizes), so
+memory does not grow with the database.
+
+Cleanup deletes by ``_id`` in small batches, re-checking each batch against
+the current data, waiting for majority acknowledgement and pacing itself so
+a production server keeps serving Omniboard meanwhile.
+"""
+import datetime
+import heapq
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from pymongo.errors import OperationFailure
+from pymongo.write_concern import WriteConcern
+
+try:
+    from .tracing import span
+except ImportError:
+    from tracing import span
+
+# Documents per cursor batch of the scans
+SCAN_BATCH = 1000
+# Orphans listed by the report, per kind
+EXAMPLES = 10
+
+METRICS = "metrics"
+CHUNKS = "chunks"
+FILES = "files"
+
+# BSON sort order of the types a Sacred database uses as keys
+_TYPE_RANK = ((type(None), 0), (bool, 8), ((int, float), 1), (str, 2), (dict, 3),
+              (list, 4), (bytes, 5), (datetime.datetime, 9))
+_END = object()
+
+
+def bson_order(value) -> tuple:
+    """Return a key ordering Python values the way MongoDB sorts them."""
+    for types, rank in _TYPE_RANK:
+        if isinstance(value, types):
+            return rank, value
+    # ObjectId sorts after binary data, and compares by its bytes
+    return 7, value
+
+
+def missing_from(items: Iterable[dict], key: str, references: Iterable) -> Iterator[dict]:
+    """Yield the items whose ``key`` is not among ``references``.
+
+    Both must be sorted ascending (by ``bson_order``), so they are walked once
+    side by side.
+    """
+    references = iter(references)
+    current = next(references, _END)
+    for item in items:
+        value = bson_order(item.get(key))
+        while current is not _END and current < value:
+            current = next(references, _END)
+        if current is _END or current != value:
+            yield item
+
+
+def run_file_ids(run: dict) -> List:
+    """Return the GridFS file IDs a run document refers to (artifacts,
+    sources and resources)."""
+    ids = [a.get("file_id") for a in run.get("artifacts") or [] if isinstance(a, dict)]
+    for pairs in ((run.get("experiment") or {}).get("sources"), run.get("resources")):
+        ids.extend(p[1] for p in pairs or [] if isinstance(p, (list, tuple)) and len(p) > 1)
+    return [i for i in ids if i is not None]
+
+
+def _batches(items: Iterable, size: int) -> Iterator[list]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class BatchDeleter:
+    """Deletes documents by ``_id`` in batches at a bounded rate."""
+
+    def __init__(
+        self,
+        batch_size: int = 500,
+        max_docs_per_second: float = 2000.0,
+        max_batch_seconds: float = 0.5,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize the deleter.
+
+        Args:
+            batch_size: Documents deleted per ``delete_many``
+            max_docs_per_second: Deletion rate not exceeded on average
+            max_batch_seconds: A batch taking longer means the server is
+                busy; the deleter then pauses as long again before the next
+            sleep: Waits the given seconds (injectable for tests)
+            clock: Monotonic time source
+        """
+        self.batch_size = batch_size
+        self.max_docs_per_second = max_docs_per_second
+        self.max_batch_seconds = max_batch_seconds
+        self.sleep = sleep
+        self.clock = clock
+        self.batches = 0
+        self.paused_seconds = 0.0
+
+    def delete(self, collection, ids: list) -> int:
+        """Delete the documents with these IDs; returns the number deleted."""
+        started = self.clock()
+        result = collection.delete_many({"_id": {"$in": ids}})
+        elapsed = self.clock() - started
+        self.batches += 1
+        wait = len(ids) / self.max_docs_per_second - elapsed
+        if elapsed > self.max_batch_seconds:
+            wait = max(wait, elapsed)
+        if wait > 0:
+            self.paused_seconds += wait
+            self.sleep(wait)
+        return result.deleted_count
+
+
+class OrphanAnalyzer:
+    """Finds orphaned metrics, chunks and files of one Sacred database."""
+
+    def __init__(
+        self,
+        db,
+        runs_collection: str = "runs",
+        metrics_collection: str = METRICS,
+        bucket: str = "fs",
+        grace_seconds: float = 3600.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        """Initialize the analyzer.
+
+        Args:
+            db: pymongo ``Database``
+            runs_collection: Collection Sacred stores the runs in (its
+                metrics belong to them); files are checked against it and
+                every ``*_runs`` collection
+            metrics_collection: Collection of the metrics
+            bucket: GridFS bucket name
+            grace_seconds: Files and chunks written more recently are left
+                alone (an upload may still be in progress)
+            clock: Wall-clock time source
+        """
+        self.db = db
+        self.runs = db[runs_collection]
+        self.metrics = db[metrics_collection]
+        self.files = db[f"{bucket}.files"]
+        self.chunks = db[f"{bucket}.chunks"]
+        self.grace_seconds = grace_seconds
+        self.clock = clock
+        self.cancelled = threading.Event()
+        self._runs_collections: Optional[List[str]] = None
+
+    def cancel(self):
+        """Stop a running cleanup after the current batch."""
+        self.cancelled.set()
+
+    # -- scans ------------------------------------------------------------------
+    def _scan(self, collection, sort: Dict[str, int], fields: Iterable[str] = ()) -> Iterator[dict]:
+        """Stream ``collection`` sorted by ``sort`` with only ``fields``, ``_id``
+        and the document's BSON ``size``."""
+        projection = {field: 1 for field in (*sort, *fields)}
+        pipeline = [{"$sort": sort}, {"$project": {**projection, "size": {"$bsonSize": "$$ROOT"}}}]
+        try:
+            # The first batch, and thus an unknown operator, is run right away
+            cursor = collection.aggregate(pipeline, allowDiskUse=True, batchSize=SCAN_BATCH)
+        except OperationFailure:
+            cursor = None
+        if cursor is not None:
+            yield from cursor
+            return
+        # MongoDB before 4.4 has no $bsonSize: use the average document size
+        try:
+            size = self.db.command("collStats", collection.name).get("avgObjSize", 0)
+        except OperationFailure:
+            size = 0
+        cursor = collection.find({}, projection).sort(list(sort.items())).batch_size(SCAN_BATCH)
+        for doc in cursor:
+            doc["size"] = size
+            yield doc
+
+    def _ids(self, collection) -> Iterator[tuple]:
+        for doc in collection.find({}, {"_id": 1}).sort("_id", 1).batch_size(SCAN_BATCH):
+            yield bson_order(doc["_id"])
+
+    def runs_collections(self) -> Optional[List[str]]:
+        """Names of the collections holding runs (``runs`` and ``<prefix>_runs``).
+
+        Returns None if the database does not let them be listed, or has
+        none: file references cannot be established then.
+        """
+        if self._runs_collections is None:
+            try:
+                names = self.db.list_collection_names()
+            except OperationFailure:
+                return None
+            found = sorted(n for n in names if n == self.runs.name or n.endswith("_runs"))
+            if not found:
+                return None
+            self._runs_collections = found
+        return list(self._runs_collections)
+
+    def _referenced_files(self, names: List[str]) -> Iterator[tuple]:
+        """Stream the file IDs referenced by the runs of ``names``, sorted."""
+        return heapq.merge(*(self._referenced_in(self.db[name]) for name in names))
+
+    def _referenced_in(self, runs) -> Iterator[tuple]:
+        """Stream the distinct file IDs referenced by one runs collection, sorted."""
+        def second(field):
+            return {"$map": {"input": {"$ifNull": [field, []]}, "in": {"$arrayElemAt": ["$$this", 1]}}}
+
+        pipeline = [
+            {"$project": {"ids": {"$concatArrays": [
+                {"$ifNull": ["$artifacts.file_id", []]},
+                second("$experiment.sources"),
+                second("$resources"),
+            ]}}},
+            {"$unwind": "$ids"},
+            {"$group": {"_id": "$ids"}},
+            {"$sort": {"_id": 1}},
+        ]
+        for doc in runs.aggregate(pipeline, allowDiskUse=True, batchSize=SCAN_BATCH):
+            if doc["_id"] is not None:
+                yield bson_order(doc["_id"])
+
+    def _is_recent(self, when) -> bool:
+        if when is None:
+            return False
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=datetime.timezone.utc)
+        return self.clock() - when.timestamp() < self.grace_seconds
+
+    def orphan_metrics(self) -> Iterator[dict]:
+        """Yield ``metrics`` documents (``_id``, ``run_id``, ``size``) of runs
+        that do not exist."""
+        return missing_from(self._scan(self.metrics, {"run_id": 1}), "run_id", self._ids(self.runs))
+
+    def orphan_chunks(self) -> Iterator[dict]:
+        """Yield chunks (``_id``, ``files_id``, ``size``) of files that do not exist."""
+        chunks = self._scan(self.chunks, {"files_id": 1, "n": 1})
+        for chunk in missing_from(chunks, "files_id", self._ids(self.files)):
+            # GridFS writes the chunks before the file document
+            if not self._is_recent(getattr(chunk["_id"], "generation_time", None)):
+                yield chunk
+
+    def unreferenced_files(self) -> Iterator[dict]:
+        """Yield files (``_id``, ``filename``, ``length``, ``size``) no run refers to.
+
+        Yields nothing if the runs collections cannot be listed.
+        """
+        names = self.runs_collections()
+        if names is None:
+            return
+        files = self._scan(self.files, {"_id": 1}, ("filename", "length", "uploadDate"))
+        for doc in missing_from(files, "_id", self._referenced_files(names)):
+            # Sacred records an artifact in its run after uploading it
+            if not self._is_recent(doc.get("uploadDate")):
+                yield doc
+
+    # -- report -----------------------------------------------------------------
+    def analyze(self) -> Dict[str, dict]:
+        """Measure what a cleanup would remove, without changing anything.
+
+        Returns:
+            ``{"metrics": ..., "chunks": ..., "files": ..., "total_bytes": int,
+            "runs_collections": [...]}``; each kind has ``documents``, ``bytes``
+            (reclaimable), ``owners`` (distinct missing runs or files) and up
+            to ``EXAMPLES`` ``examples`` of them. Files count their data
+            (``length``) as reclaimable too, and are ``skipped`` if
+            ``runs_collections`` (those checked for references) is None.
+        """
+        with span("analyzer.analyze"):
+            report = {
+                METRICS: self._summarize(self.orphan_metrics(), "run_id"),
+                CHUNKS: self._summarize(self.orphan_chunks(), "files_id"),
+                FILES: self._summarize(self.unreferenced_files(), "_id"),
+            }
+        return self._finish(report)
+
+    def _finish(self, report: Dict[str, dict]) -> Dict[str, dict]:
+        names = self.runs_collections()
+        report[FILES]["skipped"] = names is None
+        report["runs_collections"] = names
+        report["total_bytes"] = sum(report[kind]["bytes"] for kind in (METRICS, CHUNKS, FILES))
+        return report
+
+    @staticmethod
+    def _summarize(items: Iterator[dict], owner_key: str) -> dict:
+        summary = {"documents": 0, "bytes": 0, "owners": 0, "examples": []}
+        last = _END
+        for item in items:
+            summary["documents"] += 1
+            summary["bytes"] += item.get("size", 0) + item.get("length", 0)
+            owner = item.get(owner_key)
+            # Sorted by owner: a new owner starts a new group
+            if last is _END or owner != last:
+                summary["owners"] += 1
+                if len(summary["examples"]) < EXAMPLES:
+                    summary["examples"].append(owner)
+                last = owner
+        return summary
+
+    # -- cleanup ----------------------------------------------------------------
+    def clean(
+        self,
+        dry_run: bool = True,
+        deleter: Optional[BatchDeleter] = None,
+        progress: Optional[Callable[[str, int, int], None]] = None,
+    ) -> Dict[str, dict]:
+        """Delete the orphans (or, with ``dry_run``, only report them).
+
+        Unreferenced files go first, each batch followed by its chunks;
+        then the orphaned chunks and metrics.
+
+        Args:
+            dry_run: Only return ``analyze()``
+            deleter: Batching and pacing of the deletes (defaults if None)
+            progress: Called with (kind, documents deleted, bytes reclaimed)
+                after each batch
+
+        Returns:
+            The report of what was deleted (as ``analyze``); ``cancelled``
+            is True if ``cancel`` stopped it early
+        """
+        if dry_run:
+            return self.analyze()
+        deleter = deleter or BatchDeleter()
+        self.cancelled.clear()
+        report: Dict[str, dict] = {}
+        with span("analyzer.clean"):
+            report[FILES] = self._delete(FILES, self.files, self.unreferenced_files(), "_id",
+                                         self._unreferenced, deleter, progress,
+                                         on_deleted=lambda ids: self._delete_chunks_of(ids, deleter))
+            report[CHUNKS] = self._delete(CHUNKS, self.chunks, self.orphan_chunks(), "files_id",
+                                          lambda ids: self._absent(self.files, ids), deleter, progress)
+            report[METRICS] = self._delete(METRICS, self.metrics, self.orphan_metrics(), "run_id",
+                                           lambda ids: self._absent(self.runs, ids), deleter, progress)
+        report["cancelled"] = self.cancelled.is_set()
+        return self._finish(report)
+
+    def _delete(self, kind, collection, items, owner_key, still_orphaned, deleter, progress,
+                on_deleted=None) -> dict:
+        summary = {"documents": 0, "bytes": 0, "owners": 0, "examples": []}
+        owners = set()
+        # Replica set members must keep up with the deletes
+        collection = collection.with_options(write_concern=WriteConcern(w="majority"))
+        for batch in _batches(items, deleter.batch_size):
+            if self.cancelled.is_set():
+                break
+            # The data may have changed since the scan read it
+            keep = still_orphaned(list({bson_order(i.get(owner_key)): i.get(owner_key)
+                                        for i in batch}.values()))
+            batch = [i for i in batch if bson_order(i.get(owner_key)) in keep]
+            if not batch:
+                continue
+            deleted = deleter.delete(collection, [i["_id"] for i in batch])
+            if on_deleted is not None:
+                on_deleted([i["_id"] for i in batch])
+            summary["documents"] += deleted
+            summary["bytes"] += sum(i.get("size", 0) + i.get("length", 0) for i in batch)
+            for item in batch:
+                owner = item.get(owner_key)
+                if bson_order(owner) not in owners:
+                    owners.add(bson_order(owner))
+                    if len(summary["examples"]) < EXAMPLES:
+                        summary["examples"].append(owner)
+            if progress is not None:
+                progress(kind, summary["documents"], summary["bytes"])
+        summary["owners"] = len(owners)
+        return summary
+
+    def _delete_chunks_of(self, file_ids: list, deleter: BatchDeleter):
+        """Delete the chunks of deleted files (their data, counted with the files)."""
+        chunks = self.chunks.with_options(write_concern=WriteConcern(w="majority"))
+        cursor = self.chunks.find({"files_id": {"$in": file_ids}}, {"_id": 1}).batch_size(SCAN_BATCH)
+        for batch in _batches((doc["_id"] for doc in cursor), deleter.batch_size):
+            deleter.delete(chunks, batch)
+
+    def _absent(self, collection, ids: list) -> set:
+        """Return (as ``bson_order`` keys) those of ``ids`` not in ``collection``."""
+        present = {bson_order(d["_id"]) for d in collection.find({"_id": {"$in": ids}}, {"_id": 1})}
+        return {bson_order(i) for i in ids} - present
+
+    def _unreferenced(self, ids: list) -> set:
+        """Return those of the file ``ids`` that no run (of any runs collection) refers to now."""
+        names = self.runs_collections()
+        if names is None:
+            return set()
+        query = {"$or": [
+            {"artifacts.file_id": {"$in": ids}},
+            {"experiment.sources": {"$elemMatch": {"$elemMatch": {"$in": ids}}}},
+            {"resources": {"$elemMatch": {"$elemMatch": {"$in": ids}}}},
+        ]}
+        projection = {"artifacts.file_id": 1, "experiment.sources": 1, "resources": 1}
+        referenced = {bson_order(i) for name in names
+                      for run in self.db[name].find(query, projection) for i in run_file_ids(run)}
+        return {bson_order(i) for i in ids} - referenced
+
+
+def report_text(report: Dict[str, dict]) -> str:
+    """Human-readable summary of an ``analyze``/``clean`` report for the GUI."""
+    mb = 1024 * 1024
+    metrics, chunks, files = report[METRICS], report[CHUNKS], report[FILES]
+    if files.get("skipped"):
+        files_line = "Files: not checked (the runs collections could not be listed)"
+    else:
+        files_line = (f"Files no run refers to: {files['documents']}, {files['bytes'] / mb:.1f} MB "
+                      f"(references checked in: {', '.join(report.get('runs_collections') or [])})")
+    return "\n".join([
+        f"Metrics of {metrics['owners']} deleted run(s): {metrics['documents']} documents, "
+        f"{metrics['bytes'] / mb:.1f} MB",
+        f"Chunks of {chunks['owners']} missing file(s): {chunks['documents']} documents, "
+        f"{chunks['bytes'] / mb:.1f} MB",
+        files_line,
+        f"Total: {report['total_bytes'] / mb:.1f} MB",
+    ])
@@ -0,0 +1,278 @@
+"""Listing and downloading of Sacred artifacts stored in GridFS.
+
+Sacred's MongoObserver saves each artifact as a GridFS file named
+``artifact://<runs collection>/<run id>/<name>``, split into ``fs.chunks``
+documents of ``chunkSize`` bytes. Listing reads ``fs.files`` through the
+filename index with a projection, so no chunk is touched. A download splits
+the chunk numbers into ranges fetched in parallel, each with its own cursor,
+and writes every chunk at its offset in a preallocated ``.part`` file; the
+ranges already on disk are recorded next to it, so an interrupted download
+resumes where it stopped. At most a small cursor batch per worker is held
+in memory, whatever the artifact size.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+try:
+    from .filelock import atomic_write_text
+    from .tracing import span
+except ImportError:
+    from filelock import atomic_write_text
+    from tracing import span
+
+ARTIFACT_PREFIX = "artifact://"
+# Fields read from fs.files; never the chunks
+FILE_FIELDS = {"filename": 1, "length": 1, "chunkSize": 1, "uploadDate": 1, "md5": 1}
+# Chunks fetched per range (about 16 MB with GridFS's default 255 KB chunks)
+RANGE_CHUNKS = 64
+# Chunks per cursor batch: bounds the memory of each worker
+CURSOR_BATCH = 4
+PART_SUFFIX = ".part"
+STATE_SUFFIX = ".part.json"
+
+
+def parse_artifact_name(filename: str) -> Optional[tuple]:
+    """Split a Sacred artifact filename into ``(runs collection, run id, name)``.
+
+    Numeric run IDs are returned as ints, like Sacred's ``_id``; None if
+    ``filename`` is not an artifact.
+    """
+    if not filename or not filename.startswith(ARTIFACT_PREFIX):
+        return None
+    parts = filename[len(ARTIFACT_PREFIX):].split("/", 2)
+    if len(parts) != 3:
+        return None
+    collection, run_id, name = parts
+    return collection, int(run_id) if run_id.isdigit() else run_id, name
+
+
+def list_artifacts(db, run_id=None, runs_collection: str = "runs", bucket: str = "fs") -> List[dict]:
+    """List the artifacts of one run, or of all runs, from ``<bucket>.files``.
+
+    Args:
+        db: pymongo ``Database``
+        run_id: Only this run's artifacts (all runs if None)
+        runs_collection: Collection Sacred stores the runs in
+        bucket: GridFS bucket name
+
+    Returns:
+        Dicts with ``run_id``, ``name``, ``file_id``, ``length``,
+        ``chunk_size`` and ``upload_date``, by run and name
+    """
+    prefix = f"{ARTIFACT_PREFIX}{runs_collection}/"
+    if run_id is not None:
+        prefix += f"{run_id}/"
+    # An anchored prefix regex is answered from the filename index
+    query = {"filename": {"$regex": "^" + re.escape(prefix)}}
+    artifacts = []
+    with span("artifacts.list", run=str(run_id)):
+        for doc in db[f"{bucket}.files"].find(query, FILE_FIELDS):
+            parsed = parse_artifact_name(doc.get("filename", ""))
+            if parsed is None:
+                continue
+            artifacts.append({
+                "run_id": parsed[1],
+                "name": parsed[2],
+                "file_id": doc["_id"],
+                "length": doc.get("length", 0),
+                "chunk_size": doc.get("chunkSize"),
+                "upload_date": doc.get("uploadDate"),
+            })
+    artifacts.sort(key=lambda a: (str(a["run_id"]).zfill(12), a["name"]))
+    return artifacts
+
+
+def artifacts_by_run(artifacts: List[dict]) -> Dict[object, List[dict]]:
+    """Group ``list_artifacts`` results by run ID."""
+    runs: Dict[object, List[dict]] = {}
+    for artifact in artifacts:
+        runs.setdefault(artifact["run_id"], []).append(artifact)
+    return runs
+
+
+class ArtifactDownload:
+    """Resumable, parallel download of one GridFS file to disk."""
+
+    def __init__(
+        self,
+        db,
+        file_id,
+        dest: Path,
+        workers: int = 4,
+        range_chunks: int = RANGE_CHUNKS,
+        bucket: str = "fs",
+        progress: Optional[Callable[[int, int], None]] = None,
+    ):
+        """Initialize the download.
+
+        Args:
+            db: pymongo ``Database`` holding the bucket
+            file_id: ``_id`` of the file in ``<bucket>.files``
+            dest: Path of the downloaded file
+            workers: Ranges fetched at the same time
+            range_chunks: Chunks per range (the unit of resumption)
+            bucket: GridFS bucket name
+            progress: Called with (bytes done, total bytes) after each range
+        """
+        self.files = db[f"{bucket}.files"]
+        self.chunks = db[f"{bucket}.chunks"]
+        self.file_id = file_id
+        self.dest = Path(dest)
+        self.part = self.dest.with_name(self.dest.name + PART_SUFFIX)
+        self.state_path = self.dest.with_name(self.dest.name + STATE_SUFFIX)
+        self.workers = max(1, workers)
+        self.range_chunks = max(1, range_chunks)
+        self.progress = progress
+        self.cancelled = threading.Event()
+        # Ranges fetched by this run (not those resumed from disk)
+        self.fetched_ranges = 0
+
+    def cancel(self):
+        """Stop after the chunks being written; the download can be resumed."""
+        self.cancelled.set()
+
+    def _identity(self, meta: dict) -> dict:
+        # A re-uploaded file with the same _id must not be patched together
+        upload = meta.get("uploadDate")
+        return {
+            "file_id": str(self.file_id),
+            "length": meta["length"],
+            "chunk_size": meta["chunkSize"],
+            "upload_date": upload.isoformat() if hasattr(upload, "isoformat") else str(upload),
+            "range_chunks": self.range_chunks,
+        }
+
+    def _load_done(self, identity: dict) -> set:
+        try:
+            state = json.loads(self.state_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return set()
+        if not isinstance(state, dict) or state.get("identity") != identity or not self.part.exists():
+            return set()
+        return set(state.get("done", []))
+
+    def _save_done(self, identity: dict, done: set):
+        atomic_write_text(self.state_path, json.dumps({"identity": identity, "done": sorted(done)}))
+
+    def run(self) -> Path:
+        """Download (or finish downloading) the file.
+
+        Returns:
+            ``dest``
+
+        Raises:
+            FileNotFoundError: If the file is not in the bucket
+            RuntimeError: If chunks are missing, have the wrong size, or
+                the MD5 recorded in ``fs.files`` does not match
+            InterruptedError: If ``cancel`` was called
+        """
+        meta = self.files.find_one({"_id": self.file_id}, FILE_FIELDS)
+        if meta is None:
+            raise FileNotFoundError(f"No GridFS file with _id {self.file_id!r}")
+        length, chunk_size = meta["length"], meta["chunkSize"]
+        chunk_count = -(-length // chunk_size) if length else 0
+        ranges = [(start, min(start + self.range_chunks, chunk_count))
+                  for start in range(0, chunk_count, self.range_chunks)]
+        identity = self._identity(meta)
+        done = self._load_done(identity)
+        self.dest.parent.mkdir(parents=True, exist_ok=True)
+        if not done:
+            # Sparse where the file system allows it
+            with open(self.part, "wb") as f:
+                f.truncate(length)
+            self._save_done(identity, done)
+
+        def range_bytes(index):
+            start, end = ranges[index]
+            return min(end * chunk_size, length) - start * chunk_size
+
+        total_done = sum(range_bytes(i) for i in done)
+        if self.progress is not None:
+            self.progress(total_done, length)
+        pending = [i for i in range(len(ranges)) if i not in done]
+        error = None
+        with span("artifacts.download", bytes=length, ranges=len(pending)), \
+                ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="artifact") as pool:
+            futures = {pool.submit(self._fetch_range, *ranges[i], chunk_size, length): i
+                       for i in pending}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except BaseException as e:
+                    # Let the other workers stop at their next chunk
+                    self.cancelled.set()
+                    error = error or e
+                    continue
+                index = futures[future]
+                done.add(index)
+                self.fetched_ranges += 1
+                self._save_done(identity, done)
+                total_done += range_bytes(index)
+                if self.progress is not None:
+                    self.progress(total_done, length)
+        if error is not None:
+            raise error
+        self._verify(meta)
+        os.replace(self.part, self.dest)
+        try:
+            self.state_path.unlink()
+        except OSError:
+            pass
+        return self.dest
+
+    def _fetch_range(self, start: int, end: int, chunk_size: int, length: int):
+        """Write chunks ``start <= n < end`` at their offsets in the part file."""
+        if self.cancelled.is_set():
+            raise InterruptedError("Download cancelled")
+        cursor = self.chunks.find(
+            {"files_id": self.file_id, "n": {"$gte": start, "$lt": end}},
+            {"_id": 0, "n": 1, "data": 1},
+        ).sort("n", 1).batch_size(CURSOR_BATCH)
+        expected = start
+        try:
+            with open(self.part, "r+b") as out:
+                for chunk in cursor:
+                    if self.cancelled.is_set():
+                        raise InterruptedError("Download cancelled")
+                    n, data = chunk["n"], chunk["data"]
+                    if n != expected:
+                        raise RuntimeError(f"GridFS chunk {expected} of {self.file_id!r} is missing")
+                    size = min(chunk_size, length - n * chunk_size)
+                    if len(data) != size:
+                        raise RuntimeError(
+                            f"GridFS chunk {n} of {self.file_id!r} has {len(data)} bytes, expected {size}"
+                        )
+                    out.seek(n * chunk_size)
+                    out.write(data)
+                    expected += 1
+                if expected != end:
+                    raise RuntimeError(f"GridFS chunk {expected} of {self.file_id!r} is missing")
+                # Only ranges on disk are recorded as done
+                out.flush()
+                os.fsync(out.fileno())
+        finally:
+            cursor.close()
+
+    def _verify(self, meta: dict):
+        """Check the MD5 that older GridFS drivers stored, reading the file back."""
+        expected = meta.get("md5")
+        if not expected:
+            return
+        digest = hashlib.md5(usedforsecurity=False)
+        with open(self.part, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        if digest.hexdigest() != expected:
+            # Start over next time rather than resume a corrupt file
+            for path in (self.part, self.state_path):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            raise RuntimeError(f"MD5 mismatch for {self.dest.name}; the download was discarded")
@@ -0,0 +1,217 @@
+"""Single entry point for Docker CLI invocations, with metrics.
+
+Every Docker subprocess goes through ``DockerExecutor`` so the CLI binary is
+resolved once, timeouts and retries are applied consistently, and each
+subcommand's call count and latency histogram can be inspected (by the GUI,
+the benchmarks and the tests).
+"""
+import subprocess
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+
+# Per-subcommand timeouts (seconds); anything else uses the default
+DEFAULT_TIMEOUTS = {"version": 8.0, "info": 8.0}
+
+# Read-only subcommands that are safe to retry after a timeout
+RETRYABLE = frozenset({"ps", "inspect", "stats", "network", "context", "logs"})
+
+
+class _CommandStats:
+    __slots__ = ("calls", "failures", "timeouts", "retries", "total_seconds", "max_seconds", "buckets")
+
+    def __init__(self):
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.retries = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+
+    def observe(self, seconds: float):
+        self.calls += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "retries": self.retries,
+            "total_seconds": self.total_seconds,
+            "mean_seconds": self.total_seconds / self.calls if self.calls else 0.0,
+            "max_seconds": self.max_seconds,
+            "histogram": {
+                ("+Inf" if bound == float("inf") else f"{bound:g}"): count
+                for bound, count in zip(LATENCY_BUCKETS, self.buckets)
+            },
+        }
+
+
+def subcommand_of(args: List[str]) -> str:
+    """Return the Docker subcommand of an argument list (skipping global options)."""
+    i = 0
+    while i < len(args) and args[i].startswith("-"):
+        i += 2 if args[i] in ("--context", "-c", "-H", "--host", "--config") else 1
+    return args[i] if i < len(args) else ""
+
+
+class DockerExecutor:
+    """Runs Docker CLI commands with a cached binary, timeouts, retries and metrics."""
+
+    def __init__(
+        self,
+        resolver: Callable[[], List[str]],
+        default_timeout: float = 10.0,
+        retries: int = 1,
+        retry_delay: float = 0.2,
+        global_args: Optional[List[str]] = None,
+    ):
+        """Initialize the executor.
+
+        Args:
+            resolver: Returns the base command (e.g. ``["/usr/bin/docker"]``);
+                called once and cached until ``reset``
+            default_timeout: Timeout for subcommands without a specific one
+            retries: Extra attempts after a timeout, for read-only subcommands
+            retry_delay: Pause before each retry
+            global_args: Options placed before the subcommand
+                (e.g. ``["--context", "remote"]``)
+        """
+        self.resolver = resolver
+        self.default_timeout = default_timeout
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.global_args = list(global_args or [])
+        self._base: Optional[List[str]] = None
+        self._stats: Dict[str, _CommandStats] = {}
+        self._lock = threading.Lock()
+
+    def base(self) -> List[str]:
+        """Return the cached base command, resolving it on first use."""
+        if self._base is None:
+            self._base = list(self.resolver()) + self.global_args
+        return list(self._base)
+
+    def reset(self):
+        """Forget the resolved binary (e.g. after PATH changed)."""
+        self._base = None
+
+    def _stats_for(self, sub: str) -> _CommandStats:
+        with self._lock:
+            if sub not in self._stats:
+                self._stats[sub] = _CommandStats()
+            return self._stats[sub]
+
+    def _observe(self, stats: _CommandStats, seconds: float, *counters: str):
+        """Record a call of ``seconds`` in ``stats`` and count it in ``counters``.
+
+        Commands run concurrently, so every update is made under the lock.
+        """
+        with self._lock:
+            stats.observe(seconds)
+            for counter in counters:
+                setattr(stats, counter, getattr(stats, counter) + 1)
+
+    def _inc(self, stats: _CommandStats, counter: str):
+        """Add one to the ``counter`` field of ``stats`` under the lock."""
+        with self._lock:
+            setattr(stats, counter, getattr(stats, counter) + 1)
+
+    def run(self, args: List[str], timeout: Optional[float] = None,
+            retries: Optional[int] = None) -> subprocess.CompletedProcess:
+        """Run a Docker command and capture its output.
+
+        Failures never raise: a timeout or a missing binary yields a result
+        with ``returncode`` -1 and the reason in ``stderr``.
+
+        Args:
+            args: Arguments after the Docker binary (e.g. ``["ps", "-a"]``)
+            timeout: Override of the per-subcommand timeout
+            retries: Override of the retry count (read-only subcommands only
+                are retried by default)
+
+        Returns:
+            The completed process
+        """
+        sub = subcommand_of(args)
+        stats = self._stats_for(sub)
+        if timeout is None:
+            timeout = DEFAULT_TIMEOUTS.get(sub, self.default_timeout)
+        if retries is None:
+            retries = self.retries if sub in RETRYABLE else 0
+
+        attempt = 0
+        while True:
+            cmd = self.base() + list(args)
+            started = time.perf_counter()
+            try:
+                result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+                self._observe(stats, time.perf_counter() - started,
+                              *(("failures",) if result.returncode != 0 else ()))
+                return result
+            except subprocess.TimeoutExpired:
+                self._observe(stats, time.perf_counter() - started, "timeouts")
+                error = f"docker {sub} timed out after {timeout:g}s"
+            except FileNotFoundError:
+                self._observe(stats, time.perf_counter() - started)
+                # The cached binary may have moved; resolve again next time
+                self.reset()
+                error = f"Docker CLI not found ({cmd[0]})"
+            if attempt >= retries:
+                self._inc(stats, "failures")
+                return subprocess.CompletedProcess(cmd, -1, "", error)
+            attempt += 1
+            self._inc(stats, "retries")
+            time.sleep(self.retry_delay)
+
+    def popen(self, args: List[str], **kwargs) -> Optional[subprocess.Popen]:
+        """Start a Docker command without waiting (spawn time is recorded).
+
+        Returns:
+            The process, or None if the Docker CLI could not be started
+        """
+        sub = subcommand_of(args)
+        stats = self._stats_for(sub)
+        started = time.perf_counter()
+        try:
+            proc = subprocess.Popen(self.base() + list(args), **kwargs)
+        except FileNotFoundError:
+            self.reset()
+            self._observe(stats, time.perf_counter() - started, "failures")
+            return None
+        self._observe(stats, time.perf_counter() - started)
+        return proc
+
+    def metrics(self) -> Dict[str, dict]:
+        """Return per-subcommand metrics (calls, failures, latency histogram)."""
+        with self._lock:
+            return {sub: s.as_dict() for sub, s in sorted(self._stats.items())}
+
+    def total_calls(self) -> int:
+        with self._lock:
+            return sum(s.calls for s in self._stats.values())
+
+    def reset_metrics(self):
+        with self._lock:
+            self._stats.clear()
+
+    def format_metrics(self) -> str:
+        """Human-readable metrics summary, one line per subcommand."""
+        lines = []
+        for sub, m in self.metrics().items():
+            lines.append(
+                f"{sub or '(none)':10s} calls={m['calls']:<4d} mean={m['mean_seconds'] * 1000:7.1f} ms "
+                f"max={m['max_seconds'] * 1000:7.1f} ms failures={m['failures']} "
+                f"timeouts={m['timeouts']} retries={m['retries']}"
+            )
+        return "\n".join(lines) if lines else "No Docker commands run yet."
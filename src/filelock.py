@@ -0,0 +1,115 @@
+"""Cross-process advisory file lock (fcntl on POSIX, msvcrt on Windows)."""
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+
+class FileLock:
+    """Exclusive lock on a sidecar lock file, usable as a context manager.
+
+    The lock is held across processes (e.g. two AltarViewer instances) and
+    is re-entrant within a thread.
+    """
+
+    def __init__(self, path: Path, timeout: float = 5.0, poll_interval: float = 0.02):
+        """Initialize the lock.
+
+        Args:
+            path: Lock file to create next to the protected file
+            timeout: Seconds to wait before giving up
+            poll_interval: Seconds between acquisition attempts
+        """
+        self.path = Path(path)
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._fd: Optional[int] = None
+        self._depth = 0
+        self._thread_lock = threading.RLock()
+
+    def _try_lock(self, fd: int) -> bool:
+        try:
+            if os.name == "nt":
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    def acquire(self):
+        """Acquire the lock.
+
+        Raises:
+            TimeoutError: If the lock is still held elsewhere after ``timeout``
+        """
+        if not self._thread_lock.acquire(timeout=self.timeout):
+            raise TimeoutError(f"Timed out waiting for lock {self.path}")
+        if self._depth:
+            self._depth += 1
+            return
+        fd = os.open(str(self.path), os.O_RDWR | os.O_CREAT, 0o600)
+        deadline = time.monotonic() + self.timeout
+        while not self._try_lock(fd):
+            if time.monotonic() >= deadline:
+                os.close(fd)
+                self._thread_lock.release()
+                raise TimeoutError(f"Timed out waiting for lock {self.path}")
+            time.sleep(self.poll_interval)
+        self._fd = fd
+        self._depth = 1
+
+    def release(self):
+        """Release the lock."""
+        self._depth -= 1
+        if self._depth == 0 and self._fd is not None:
+            try:
+                if os.name == "nt":
+                    os.lseek(self._fd, 0, os.SEEK_SET)
+                    msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+                else:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+            finally:
+                os.close(self._fd)
+                self._fd = None
+        self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def atomic_write_text(path: Path, text: str):
+    """Replace ``path`` with ``text`` atomically (temp file, fsync, rename).
+
+    Readers see either the old or the new content, never a partial file.
+    """
+    atomic_write_bytes(path, text.encode("utf-8"))
+
+
+def atomic_write_bytes(path: Path, data: bytes):
+    """Binary counterpart of ``atomic_write_text``."""
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(prefix=path.name, suffix=".tmp", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except Exception:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
@@ -1,19 +1,44 @@
 """Main application GUI using CustomTkinter."""
 import customtkinter as ctk
-from tkinter import messagebox
+from tkinter import filedialog, messagebox
 import webbrowser
 import threading
 import sys
+import time
+from urllib.parse import urlparse, urlunparse, quote_plus
+from typing import Optional
 
 # Support both package imports (tests, python -m) and direct script runs
 try:
+    from .analyzer import report_text
+    from .logstream import EXITED, FAILED, READY
+    from .httpcache import STATS_PATH, CachingFrontEnd, ResponseCache, cache_directory
+    from .mirror import MirrorManager, MirrorServer, lag_text
     from .mongodb import MongoDBClient
+    from .mongoproxy import MongoProxy, upstream_of, uri_uses_tls
     from .omniboard import OmniboardManager
-    from .prefs import Preferences
+    from .prefs import CONFIG_DIR, Preferences
+    from .runtimes import runtime_by_name
+    from .scheduler import EngineTarget, LaunchScheduler
+    from .shared import CONTAINER as SHARED_CONTAINER
+    from .shared import TARGET_PREFIX as SHARED_TARGET_PREFIX
+    from .tracing import span, traced, tracer
+    from .widgets import ArtifactPanel, ContainerPanel, LogView, VirtualList, format_size
 except ImportError:
+    from analyzer import report_text
+    from logstream import EXITED, FAILED, READY
+    from httpcache import STATS_PATH, CachingFrontEnd, ResponseCache, cache_directory
+    from mirror import MirrorManager, MirrorServer, lag_text
     from mongodb import MongoDBClient
+    from mongoproxy import MongoProxy, upstream_of, uri_uses_tls
     from omniboard import OmniboardManager
-    from prefs import Preferences
+    from prefs import CONFIG_DIR, Preferences
+    from runtimes import runtime_by_name
+    from scheduler import EngineTarget, LaunchScheduler
+    from shared import CONTAINER as SHARED_CONTAINER
+    from shared import TARGET_PREFIX as SHARED_TARGET_PREFIX
+    from tracing import span, traced, tracer
+    from widgets import ArtifactPanel, ContainerPanel, LogView, VirtualList, format_size
 
 # Set appearance mode and color theme
 ctk.set_appearance_mode("dark")
@@ -21,12 +46,33 @@ ctk.set_appearance_mode("dark")
 
 class MongoApp(ctk.CTk):
     """Main application window for MongoDB Database Selector (AltarViewer)."""
+
+    # Idle time after the last edit before connecting speculatively
+    SPECULATE_DELAY_MS = 600
+    # Delay coalescing writes of the cached database list
+    DB_CACHE_SAVE_MS = 2000
+    # Refresh period of the containers window
+    CONTAINER_REFRESH_MS = 3000
+    # Refresh period of the log windows
+    LOG_REFRESH_MS = 500
+    # Browser opening delay for servers whose log never reports readiness
+    BOOT_FALLBACK_MS = 20000
+    # Refresh period of the mirror lag label
+    MIRROR_STATUS_MS = 2000
+    # First port tried for caching proxies (leased per upstream server)
+    PROXY_BASE_PORT = 27217
+    # Port range of the HTTP caching front ends (one per database)
+    HTTP_CACHE_BASE_PORT = 30000
+    # Choices of the runtime menu and their ``runtimes`` names
+    RUNTIMES = {"Docker": "docker", "Podman": "podman", "Native": "native"}
+    # Choices of the scheduling menu and their ``LaunchScheduler`` policies
+    POLICIES = {"Most free capacity": "capacity", "Lowest Mongo latency": "latency"}
     
     def __init__(self):
         """Initialize the main application window."""
         super().__init__()
         self.title("MongoDB Database Selector")
-        self.geometry("550x700")
+        self.geometry("550x885")
         self.resizable(False, False)
         
         # Hide window initially to allow background loading
@@ -36,6 +82,9 @@ class MongoApp(ctk.CTk):
         self.mongo_client = MongoDBClient()
         self.omniboard_manager = OmniboardManager()
         self.preferences = Preferences()
+        self.mirrors = MirrorManager(MirrorServer(
+            lambda *a, **kw: OmniboardManager.executor.run(*a, **kw), self._allocate_mirror_port
+        ))
 
         # UI state variables
         self.port_var = ctk.StringVar(value="27017")
@@ -43,6 +92,25 @@ class MongoApp(ctk.CTk):
         self.connection_mode = ctk.StringVar(value="Port")
         self.db_list = []
         self.selected_db = ctk.StringVar()
+        # Bumped on every connect so stale background results are ignored
+        self._connect_generation = 0
+        self._connected_profile = None
+        self._revalidate_pending = False
+        self._speculate_after_id = None
+        self._db_cache_after_id = None
+        # Deployment events received since the last redraw of the list
+        self._deployment_events = []
+        self.containers_window = None
+        self._containers_refreshing = False
+        # Running artifact downloads by GridFS file id
+        self._downloads = {}
+        self._omniboard_urls = set()
+        self._mirrored_db = None
+        self._proxies = {}
+        self._proxies_lock = threading.Lock()
+        # HTTP caching front ends by Omniboard container port
+        self._front_ends = {}
+        self._front_ends_lock = threading.Lock()
 
         # Configure grid weight
         self.grid_columnconfigure(0, weight=1)
@@ -59,10 +127,54 @@ class MongoApp(ctk.CTk):
             pass
         # Track last mode to persist prefs on mode switches
         self._last_mode = self.connection_mode.get()
+        # Show the last known database list at once and refresh it behind
+        try:
+            self._show_cached_databases()
+        except Exception:
+            pass
         
+        # Pre-connect in the background once the connection inputs settle
+        self.port_var.trace_add("write", lambda *a: self._schedule_speculation())
+        self.mongo_url_var.trace_add("write", lambda *a: self._schedule_speculation())
+        for entry in (self.cred_uri_entry, self.cred_user_entry,
+                      self.cred_pass_entry, self.cred_authsrc_entry):
+            entry.bind("<KeyRelease>", lambda e: self._schedule_speculation(), add="+")
+        # Credentials are only tried once the user leaves the field
+        for entry in (self.url_entry, self.cred_user_entry, self.cred_pass_entry):
+            entry.bind("<FocusOut>", lambda e: self._schedule_speculation(credentials_final=True), add="+")
+        if self.mongo_client.uri is None:
+            # No cached list being revalidated: warm the saved target now
+            self._schedule_speculation(credentials_final=True)
+
+        # Re-adopt Omniboards left running by a previous session
+        self._reconcile_containers_async()
+
+        # Flush debounced preference writes and stop background work on exit
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
         # Show window after 2 second delay
         self.after(2000, self.deiconify)
 
+    def on_close(self):
+        """Persist pending state and close the window."""
+        try:
+            self.mongo_client.stop_watching()
+            self.mongo_client.cancel_speculation()
+            self.mirrors.stop_all()
+            self._stop_proxies()
+            self._stop_front_ends()
+            self.omniboard_manager.logs.stop_all()
+            for download in list(self._downloads.values()):
+                download.cancel()
+            if self._db_cache_after_id is not None:
+                self.after_cancel(self._db_cache_after_id)
+                self._write_database_cache()
+            if self.warm_start_chk.get():
+                threading.Thread(target=self.omniboard_manager.discard_warm, daemon=True).start()
+            self.preferences.flush()
+        finally:
+            self.destroy()
+
     def _create_title(self):
         """Create the title label."""
         title_label = ctk.CTkLabel(
@@ -192,17 +304,21 @@ class MongoApp(ctk.CTk):
             font=ctk.CTkFont(size=14, weight="bold")
         ).grid(row=0, column=0, padx=10, pady=(5, 2), sticky="w")
 
-        # Scrollable frame for databases
-        self.db_scrollable_frame = ctk.CTkScrollableFrame(
-            self.db_frame, 
-            height=300, 
-            fg_color=("gray95", "gray20")
+        # Virtualized list: only visible rows are drawn, so thousands of
+        # databases stay responsive; the entry above it filters as you type
+        self.db_listbox = VirtualList(
+            self.db_frame,
+            on_select=self.select_database,
+            label_func=self._db_label_text,
+            empty_text="No databases found",
+            filter_placeholder="Filter databases…",
+            height=300,
+            fg_color="transparent"
         )
-        self.db_scrollable_frame.grid(row=1, column=0, padx=10, pady=2, sticky="nsew")
+        self.db_listbox.grid(row=1, column=0, padx=10, pady=2, sticky="nsew")
         self.db_frame.grid_rowconfigure(1, weight=1)
-        
-        self.db_labels = []
-        self.selected_db_label = None
+
+        self.db_run_counts = {}
 
         # Selected database label
         self.selected_label = ctk.CTkLabel(
@@ -270,6 +386,146 @@ class MongoApp(ctk.CTk):
         self.omniboard_info_text.tag_bind("link", "<Leave>", 
                                           lambda e: self.omniboard_info_text.configure(cursor=""))
 
+        # Performance trace toggle (Chrome trace / Perfetto JSON export)
+        self.trace_chk = ctk.CTkCheckBox(
+            self.omniboard_frame,
+            text="Record performance trace",
+            command=self.on_trace_toggle,
+            font=ctk.CTkFont(size=11),
+        )
+        self.trace_chk.grid(row=4, column=0, padx=10, pady=(0, 5), sticky="w")
+        self.docker_metrics_btn = ctk.CTkButton(
+            self.omniboard_frame,
+            text="Docker metrics",
+            command=self.show_docker_metrics,
+            width=110,
+            height=22,
+            font=ctk.CTkFont(size=11),
+        )
+        self.docker_metrics_btn.grid(row=4, column=0, padx=10, pady=(0, 5), sticky="e")
+        if tracer.enabled:
+            self.trace_chk.select()
+
+        # Warm start: create the container on selection, start it on launch
+        self.warm_start_chk = ctk.CTkCheckBox(
+            self.omniboard_frame,
+            text="Warm start (prepare container on selection)",
+            command=self.on_warm_start_toggle,
+            font=ctk.CTkFont(size=11),
+        )
+        self.warm_start_chk.grid(row=5, column=0, padx=10, pady=(0, 5), sticky="w")
+        self.containers_btn = ctk.CTkButton(
+            self.omniboard_frame,
+            text="Containers",
+            command=self.show_containers,
+            width=110,
+            height=22,
+            font=ctk.CTkFont(size=11),
+        )
+        self.containers_btn.grid(row=5, column=0, padx=10, pady=(0, 5), sticky="e")
+
+        # Local mirror: serve Omniboard from a local copy of a remote database
+        self.mirror_chk = ctk.CTkCheckBox(
+            self.omniboard_frame,
+            text="Local mirror (for remote databases)",
+            command=self.on_mirror_toggle,
+            font=ctk.CTkFont(size=11),
+        )
+        self.mirror_chk.grid(row=6, column=0, padx=10, pady=(0, 5), sticky="w")
+        self.mirror_status_label = ctk.CTkLabel(
+            self.omniboard_frame,
+            text="",
+            font=ctk.CTkFont(size=11),
+            text_color="gray",
+        )
+        self.mirror_status_label.grid(row=6, column=0, padx=10, pady=(0, 5), sticky="e")
+
+        # Caching proxy: Omniboard queries go through a local caching proxy
+        self.proxy_chk = ctk.CTkCheckBox(
+            self.omniboard_frame,
+            text="Caching proxy (for remote databases)",
+            command=self.on_proxy_toggle,
+            font=ctk.CTkFont(size=11),
+        )
+        self.proxy_chk.grid(row=7, column=0, padx=10, pady=(0, 5), sticky="w")
+        self.artifacts_btn = ctk.CTkButton(
+            self.omniboard_frame,
+            text="Artifacts",
+            command=self.show_artifacts,
+            width=110,
+            height=22,
+            font=ctk.CTkFont(size=11),
+        )
+        self.artifacts_btn.grid(row=7, column=0, padx=10, pady=(0, 5), sticky="e")
+
+        # HTTP cache: the browser talks to a caching, compressing front end
+        self.http_cache_chk = ctk.CTkCheckBox(
+            self.omniboard_frame,
+            text="Cache and compress Omniboard responses",
+            command=self.on_http_cache_toggle,
+            font=ctk.CTkFont(size=11),
+        )
+        self.http_cache_chk.grid(row=8, column=0, padx=10, pady=(0, 5), sticky="w")
+        self.runtime_menu = ctk.CTkOptionMenu(
+            self.omniboard_frame,
+            values=list(self.RUNTIMES),
+            command=self.on_runtime_change,
+            width=110,
+            height=22,
+            font=ctk.CTkFont(size=11),
+        )
+        self.runtime_menu.grid(row=8, column=0, padx=10, pady=(0, 5), sticky="e")
+
+        # Further Docker engines: contexts or endpoints, comma-separated
+        self.engines_entry = ctk.CTkEntry(
+            self.omniboard_frame,
+            placeholder_text="More Docker contexts/endpoints (comma-separated)",
+            width=300,
+            height=24,
+            font=ctk.CTkFont(size=11),
+        )
+        self.engines_entry.grid(row=9, column=0, padx=10, pady=(0, 5), sticky="w")
+        self.engines_entry.bind("<Return>", lambda _: self.on_engines_change())
+        self.engines_entry.bind("<FocusOut>", lambda _: self.on_engines_change())
+        self.policy_menu = ctk.CTkOptionMenu(
+            self.omniboard_frame,
+            values=list(self.POLICIES),
+            command=lambda _: self.on_engines_change(),
+            width=150,
+            height=22,
+            font=ctk.CTkFont(size=11),
+        )
+        self.policy_menu.grid(row=9, column=0, padx=10, pady=(0, 5), sticky="e")
+
+        # Shared instance: one container serves every database launched with it
+        self.shared_chk = ctk.CTkCheckBox(
+            self.omniboard_frame,
+            text="Shared instance (one Omniboard for all databases)",
+            command=self.on_shared_toggle,
+            font=ctk.CTkFont(size=11),
+        )
+        self.shared_chk.grid(row=10, column=0, padx=10, pady=(0, 5), sticky="w")
+        self.unshare_btn = ctk.CTkButton(
+            self.omniboard_frame,
+            text="Remove from shared",
+            command=self.remove_from_shared,
+            width=110,
+            height=22,
+            font=ctk.CTkFont(size=11),
+        )
+        self.unshare_btn.grid(row=10, column=0, padx=10, pady=(0, 5), sticky="e")
+
+        # Orphaned metrics, chunks and files of deleted or crashed runs
+        self.cleanup_btn = ctk.CTkButton(
+            self.omniboard_frame,
+            text="Find orphaned data",
+            command=self.find_orphans,
+            width=110,
+            height=22,
+            font=ctk.CTkFont(size=11),
+        )
+        self.cleanup_btn.grid(row=11, column=0, padx=10, pady=(0, 5), sticky="e")
+
     def on_connection_mode_change(self, value):
         """Toggle between Port and Full URI input modes."""
         # If leaving Credential URI mode, persist current preferences (and keyring if opted-in)
@@ -340,61 +596,67 @@ class MongoApp(ctk.CTk):
                 pass
         # Update last mode
         self._last_mode = value
+        self._schedule_speculation(credentials_final=True)
+
+    def _schedule_speculation(self, credentials_final: bool = False):
+        """(Re)start the debounce timer for a speculative connect.
+
+        Args:
+            credentials_final: The inputs are complete (a field lost focus, a
+                password was loaded); otherwise targets carrying credentials
+                are not tried, so partly typed passwords never reach a login
+        """
+        if self._speculate_after_id is not None:
+            self.after_cancel(self._speculate_after_id)
+        self._speculate_after_id = self.after(
+            self.SPECULATE_DELAY_MS, lambda: self._speculate(credentials_final)
+        )
 
+    def _speculate(self, credentials_final: bool = False):
+        """Start connecting to the current inputs before Connect is clicked."""
+        self._speculate_after_id = None
+        mode = self.connection_mode.get()
+        try:
+            target = self._connection_target()
+        except ValueError:
+            self.mongo_client.cancel_speculation()
+            return
+        if mode == "Credential URI" and not self.cred_pass_entry.get():
+            # Avoid failed logins while the password is being typed or loaded
+            self.mongo_client.cancel_speculation()
+            return
+        uri = self.mongo_client.port_uri(target) if mode == "Port" else target
+        if not credentials_final and mode != "Port" and \
+                urlparse(self.mongo_client.normalize_url(uri)).password is not None:
+            # Still being typed: a failed login could lock the account out
+            self.mongo_client.cancel_speculation()
+            return
+        if self.mongo_client.client is not None and \
+                self.mongo_client.uri == self.mongo_client.normalize_url(uri):
+            return
+        self.mongo_client.speculate(uri)
+
+    @traced("action.connect")
     def connect(self):
         """Connect to MongoDB and list available databases."""
         # Clear previous database labels
-        for label in self.db_labels:
-            label.destroy()
-        self.db_labels.clear()
-        self.selected_db_label = None
+        self._connect_generation += 1
+        self._revalidate_pending = False
+        self._clear_db_list()
         
         self.selected_label.configure(text="Connecting...")
         
         try:
             # Connect based on mode
             mode = self.connection_mode.get()
-            if mode == "Port":
-                port = self.port_var.get() or "27017"
-                dbs = self.mongo_client.connect_by_port(port)
-            elif mode == "Full URI":
-                url = self.mongo_url_var.get().strip()
-                if not url:
-                    messagebox.showerror("Error", "Please provide a valid MongoDB URI.")
-                    self.selected_label.configure(text="Connection failed")
-                    return
-                dbs = self.mongo_client.connect_by_url(url)
-            else:  # Credential URI
-                base_uri = self.cred_uri_entry.get().strip()
-                user = self.cred_user_entry.get().strip()
-                pwd = self.cred_pass_entry.get()
-                auth_src = self.cred_authsrc_entry.get().strip()
-                if not base_uri:
-                    messagebox.showerror("Error", "Please provide a credential-less MongoDB URI.")
-                    self.selected_label.configure(text="Connection failed")
-                    return
-                # Ensure scheme
-                if not base_uri.startswith("mongodb://") and not base_uri.startswith("mongodb+srv://"):
-                    base_uri = "mongodb://" + base_uri
-                # Build a temporary URI for connecting (do not display it)
-                from urllib.parse import urlparse, urlunparse, quote_plus
-                parsed = urlparse(base_uri)
-                # Inject userinfo if provided
-                userinfo = ""
-                if user:
-                    userinfo += quote_plus(user)
-                    if pwd:
-                        userinfo += f":{quote_plus(pwd)}"
-                    userinfo += "@"
-                host = parsed.hostname or "localhost"
-                port = f":{parsed.port}" if parsed.port else ""
-                netloc = f"{userinfo}{host}{port}"
-                query = parsed.query
-                if auth_src and "authSource=" not in query:
-                    sep = "&" if query else "?"
-                    query = f"{query}{sep}authSource={auth_src}" if query else f"authSource={auth_src}"
-                temp_uri = urlunparse((parsed.scheme, netloc, parsed.path, "", query, ""))
-                dbs = self.mongo_client.connect_by_url(temp_uri)
+            try:
+                target = self._connection_target()
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
+                self.selected_label.configure(text="Connection failed")
+                return
+            dbs = self._connect_target(mode, target)
+            if mode == "Credential URI":
                 # Save preferences (including secure password via keyring if opted-in)
                 try:
                     self._save_prefs(remember_pwd=bool(self.remember_pwd_chk.get()))
@@ -408,36 +670,21 @@ class MongoApp(ctk.CTk):
                     pass
             
             self.db_list = dbs
+            self._connected_profile = self._profile_key()
+            self._save_database_cache()
             
             if not dbs:
                 self.selected_label.configure(text="No databases found")
-                no_db_label = ctk.CTkLabel(
-                    self.db_scrollable_frame,
-                    text="No databases found",
-                    text_color="gray60"
-                )
-                no_db_label.pack(pady=10)
-                self.db_labels.append(no_db_label)
+                self.db_listbox.set_items([])
             else:
-                for db in dbs:
-                    label = ctk.CTkLabel(
-                        self.db_scrollable_frame,
-                        text=db,
-                        height=22,
-                        font=ctk.CTkFont(size=13),
-                        cursor="hand2",
-                        anchor="w",
-                        padx=10,
-                        fg_color="transparent"
-                    )
-                    label.pack(pady=0, padx=5, fill="x")
-                    label.bind("<Button-1>", lambda e, d=db: self.select_database(d))
-                    label.bind("<Enter>", lambda e, l=label: l.configure(fg_color=("gray85", "gray30")))
-                    label.bind("<Leave>", lambda e, l=label: l.configure(fg_color="transparent") 
-                              if l != self.selected_db_label else None)
-                    self.db_labels.append(label)
-                
-                self.selected_label.configure(text="Please select a database")
+                self.db_listbox.set_items(dbs)
+                self.selected_label.configure(
+                    text=f"Please select a database{self._connect_timing_suffix()}"
+                )
+            # Keep the list and run counts live without reconnecting
+            self.mongo_client.watch_deployment(
+                list(dbs), lambda event: self.after(0, lambda: self._on_deployment_change(event))
+            )
         except Exception as e:
             error_msg = str(e)
             
@@ -474,6 +721,255 @@ class MongoApp(ctk.CTk):
             messagebox.showerror("MongoDB Connection Failed", friendly_msg)
             self.selected_label.configure(text="Connection failed")
 
+    def _clear_db_list(self):
+        """Remove every database label and stop live updates."""
+        self.mongo_client.stop_watching()
+        self.db_run_counts.clear()
+        self._deployment_events = []
+        self.db_listbox.set_items([])
+
+    def _profile_key(self):
+        """Identify the saved connection profile of the current inputs.
+
+        Full URI values are never persisted, so that mode has no profile.
+        """
+        mode = self.connection_mode.get()
+        if mode == "Port":
+            return f"port:{self.port_var.get().strip() or '27017'}"
+        if mode == "Credential URI":
+            base_uri = self.cred_uri_entry.get().strip()
+            if not base_uri:
+                return None
+            user = self.cred_user_entry.get().strip() or "default"
+            return f"cred:{user}@{base_uri}"
+        return None
+
+    def _save_database_cache(self):
+        """Persist the displayed database list soon, coalescing bursts of changes."""
+        if self._db_cache_after_id is None:
+            self._db_cache_after_id = self.after(self.DB_CACHE_SAVE_MS, self._write_database_cache)
+
+    def _write_database_cache(self):
+        """Persist the displayed database list for the connected profile."""
+        self._db_cache_after_id = None
+        if not self._connected_profile or not self.db_list:
+            return
+        self.preferences.save_database_cache(
+            self._connected_profile,
+            [{"name": db, "runs": self.db_run_counts.get(db)} for db in self.db_list],
+        )
+
+    def _show_cached_databases(self):
+        """Display the cached database list and start a background refresh."""
+        profile = self._profile_key()
+        cached = self.preferences.load_database_cache(profile) if profile else None
+        if not cached or not cached["databases"]:
+            return
+        self._clear_db_list()
+        self.db_list = []
+        for entry in cached["databases"]:
+            name = entry.get("name")
+            if not name:
+                continue
+            self.db_list.append(name)
+            self.db_run_counts[name] = entry.get("runs")
+        self.db_listbox.set_items(self.db_list)
+        self._connected_profile = profile
+        age = max(0, int(time.time() - cached.get("timestamp", time.time())))
+        age_text = f"{age // 60} min" if age >= 60 else f"{age} s"
+        self.selected_label.configure(text=f"Cached list from {age_text} ago, refreshing…")
+        try:
+            target = self._connection_target()
+        except ValueError:
+            return
+        # Allow launching for a cached database before the refresh completes
+        mode = self.connection_mode.get()
+        self.mongo_client.set_target(
+            self.mongo_client.port_uri(target) if mode == "Port" else target
+        )
+        if mode == "Credential URI" and not self.cred_pass_entry.get() \
+                and int(self.remember_pwd_chk.get()) == 1:
+            # The password is still being fetched from the keyring
+            self._revalidate_pending = True
+            return
+        self._revalidate_async(mode, target)
+
+    def _revalidate_async(self, mode: str, target: str):
+        """Reconnect in the background and merge the result into the list.
+
+        The refresh connects a separate client, so an explicit Connect in the
+        meantime never has its connection or watcher replaced; the refreshed
+        connection is only adopted if no Connect happened.
+        """
+        generation = self._connect_generation
+        probe = MongoDBClient(srv_cache=self.mongo_client.srv_cache)
+
+        def worker():
+            try:
+                dbs = self._connect_target(mode, target, client=probe)
+                self.after(0, lambda: self._merge_revalidated(dbs, generation, probe))
+            except Exception:
+                probe.close()
+                self.after(0, lambda: self._on_revalidate_failed(generation))
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _on_revalidate_failed(self, generation: int):
+        if generation == self._connect_generation:
+            self.selected_label.configure(text="Showing cached list (refresh failed; click Connect)")
+
+    def _merge_revalidated(self, dbs, generation: int, probe: MongoDBClient):
+        """Apply the difference between the cached and the live database list."""
+        if generation != self._connect_generation:
+            # The user connected explicitly in the meantime
+            probe.close()
+            return
+        self.mongo_client.adopt_connection(probe)
+        live = set(dbs)
+        self._apply_deployment_changes(
+            [{"type": "removed", "database": db} for db in self.db_list if db not in live]
+            + [{"type": "added", "database": db, "runs": None} for db in dbs if db not in self.db_listbox]
+        )
+        if not self.selected_db.get():
+            self.selected_label.configure(
+                text=f"Please select a database{self._connect_timing_suffix()}"
+            )
+        self._save_database_cache()
+        self.mongo_client.watch_deployment(
+            list(self.db_list), lambda event: self.after(0, lambda: self._on_deployment_change(event)),
+            selected=self.selected_db.get() or None,
+        )
+
+    def _connection_target(self) -> str:
+        """Return the port (Port mode) or URI to connect to from the inputs.
+
+        Raises:
+            ValueError: With a user-facing message if the inputs are incomplete
+        """
+        mode = self.connection_mode.get()
+        if mode == "Port":
+            return self.port_var.get() or "27017"
+        if mode == "Full URI":
+            url = self.mongo_url_var.get().strip()
+            if not url:
+                raise ValueError("Please provide a valid MongoDB URI.")
+            return url
+        # Credential URI
+        base_uri = self.cred_uri_entry.get().strip()
+        user = self.cred_user_entry.get().strip()
+        pwd = self.cred_pass_entry.get()
+        auth_src = self.cred_authsrc_entry.get().strip()
+        if not base_uri:
+            raise ValueError("Please provide a credential-less MongoDB URI.")
+        # Ensure scheme
+        if not base_uri.startswith("mongodb://") and not base_uri.startswith("mongodb+srv://"):
+            base_uri = "mongodb://" + base_uri
+        # Build a temporary URI for connecting (do not display it)
+        parsed = urlparse(base_uri)
+        # Inject userinfo if provided
+        userinfo = ""
+        if user:
+            userinfo += quote_plus(user)
+            if pwd:
+                userinfo += f":{quote_plus(pwd)}"
+            userinfo += "@"
+        host = parsed.hostname or "localhost"
+        port = f":{parsed.port}" if parsed.port else ""
+        netloc = f"{userinfo}{host}{port}"
+        query = parsed.query
+        if auth_src and "authSource=" not in query:
+            query = f"{query}&authSource={auth_src}" if query else f"authSource={auth_src}"
+        return urlunparse((parsed.scheme, netloc, parsed.path, "", query, ""))
+
+    def _connect_target(self, mode: str, target: str, client: Optional[MongoDBClient] = None):
+        """Connect a MongoDB client (the app's by default) to a target from ``_connection_target``."""
+        client = client or self.mongo_client
+        if mode == "Port":
+            return client.connect_by_port(target)
+        return client.connect_by_url(target)
+
+    def _db_label_text(self, db_name: str) -> str:
+        count = self.db_run_counts.get(db_name)
+        if count is None:
+            return db_name
+        return f"{db_name}  ({count} run{'s' if count != 1 else ''})"
+
+    def _on_deployment_change(self, event: dict):
+        """Queue one update from the deployment watcher (UI thread).
+
+        Events arriving together (e.g. many new databases) are applied in a
+        single batch once the event loop is idle.
+        """
+        if not self._is_current_watch(event):
+            return
+        self._deployment_events.append(event)
+        if len(self._deployment_events) == 1:
+            self.after_idle(self._flush_deployment_changes)
+
+    def _is_current_watch(self, event: dict) -> bool:
+        # A stopped watcher may still deliver a late event for an old list
+        watcher = self.mongo_client.watcher
+        return watcher is not None and event.get("generation") == watcher.generation
+
+    def _flush_deployment_changes(self):
+        events, self._deployment_events = self._deployment_events, []
+        self._apply_deployment_changes([e for e in events if self._is_current_watch(e)])
+
+    def _apply_deployment_changes(self, events: list):
+        """Apply incremental updates to the database list, redrawing once."""
+        # Names to append, in order (a dict for O(1) lookups)
+        added, removed, refreshed = {}, set(), []
+        for event in events:
+            db_name = event.get("database")
+            kind = event.get("type")
+            present = (db_name in self.db_listbox or db_name in added) and db_name not in removed
+            if kind == "added" and not present:
+                self.db_run_counts[db_name] = event.get("runs")
+                if db_name in removed:
+                    removed.discard(db_name)
+                else:
+                    added[db_name] = None
+            elif kind == "removed" and present:
+                self.db_run_counts.pop(db_name, None)
+                if db_name in added:
+                    del added[db_name]
+                else:
+                    removed.add(db_name)
+            elif kind == "runs" and present:
+                self.db_run_counts[db_name] = event.get("runs")
+                refreshed.append(db_name)
+        if not (added or removed or refreshed):
+            return
+        if removed:
+            self.db_list = [db for db in self.db_list if db not in removed]
+            self.db_listbox.remove_items(removed)
+            selected = self.selected_db.get()
+            if selected in removed:
+                self.selected_db.set("")
+                self.launch_btn.configure(state="disabled")
+                self.selected_label.configure(text=f"'{selected}' was dropped", text_color="gray70")
+        if added:
+            self.db_list.extend(added)
+            self.db_listbox.add_items(added)
+        if refreshed:
+            self.db_listbox.refresh_items(refreshed)
+        # Keep the cached list current (writes are debounced)
+        self._save_database_cache()
+
+    def _connect_timing_suffix(self) -> str:
+        """Describe how long the last connect took (cold vs warm SRV resolution)."""
+        stats = getattr(self.mongo_client, "last_connect_stats", None) or {}
+        if "seconds" not in stats:
+            return ""
+        text = f" (connected in {stats['seconds'] * 1000:.0f} ms"
+        if stats.get("speculative"):
+            text += ", pre-connected"
+        elif stats.get("srv_cache") == "hit":
+            text += ", warm SRV cache"
+        elif stats.get("srv_cache") == "miss":
+            text += ", cold SRV lookup"
+        return text + ")"
+
     def select_database(self, db_name):
         """Select a database and enable the launch button."""
         self.selected_db.set(db_name)
@@ -482,15 +978,47 @@ class MongoApp(ctk.CTk):
             text_color=("#1f6aa5", "#5fb4ff")
         )
         self.launch_btn.configure(state="normal")
-        
-        # Update label appearance to show selection
-        for label in self.db_labels:
-            if isinstance(label, ctk.CTkLabel) and label.cget("text") == db_name:
-                label.configure(fg_color=("#1f6aa5", "#1f6aa5"), text_color="white")
-                self.selected_db_label = label
-            elif isinstance(label, ctk.CTkLabel) and label.cget("text") != "No databases found":
-                label.configure(fg_color="transparent", text_color=("black", "white"))
+        self.db_listbox.set_selected(db_name)
+        if self.mongo_client.watcher is not None:
+            # Run counts are only kept live for the selected database
+            self.mongo_client.watcher.select(db_name)
+        if self.warm_start_chk.get():
+            self._warm_container_async(db_name)
+
+    def _omniboard_target(self):
+        """Return (mongo_host, mongo_port, mongo_uri) for launching Omniboard."""
+        mongo_host, mongo_port, _ = self.mongo_client.parse_connection_url()
+        mongo_uri = None
+        if self.connection_mode.get() in ("Full URI", "Credential URI"):
+            # Prefer the resolved seed list so Omniboard skips SRV lookups
+            mongo_uri = self.mongo_client.get_launch_uri()
+        return mongo_host, mongo_port, mongo_uri
+
+    def _warm_container_async(self, db_name: str):
+        """Create the container for ``db_name`` in the background."""
+        mongo_host, mongo_port, mongo_uri = self._omniboard_target()
+
+        def worker():
+            try:
+                self.omniboard_manager.warm(db_name, mongo_host, mongo_port, mongo_uri)
+            except Exception:
+                # Best effort: launch falls back to a regular docker run
+                pass
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def on_warm_start_toggle(self):
+        """Persist the warm start choice; drop any warm container when disabled."""
+        enabled = bool(self.warm_start_chk.get())
+        data = self.preferences.load()
+        data["warm_start"] = 1 if enabled else 0
+        self.preferences.save_without_password(data)
+        if not enabled:
+            threading.Thread(target=self.omniboard_manager.discard_warm, daemon=True).start()
+        elif self.selected_db.get():
+            self._warm_container_async(self.selected_db.get())
 
+    @traced("action.launch_omniboard")
     def launch_omniboard(self):
         """Launch Omniboard in a Docker container for the selected database."""
         db_name = self.selected_db.get()
@@ -498,23 +1026,27 @@ class MongoApp(ctk.CTk):
             messagebox.showerror("Error", "No database selected.")
             return
         # Gather connection details once on UI thread
-        mongo_host, mongo_port, _ = self.mongo_client.parse_connection_url()
-        mongo_uri = None
-        mode = self.connection_mode.get()
-        if mode == "Full URI":
-            if hasattr(self.mongo_client, "get_connection_uri"):
-                mongo_uri = self.mongo_client.get_connection_uri()
-        elif mode == "Credential URI":
-            if hasattr(self.mongo_client, "get_connection_uri"):
-                mongo_uri = self.mongo_client.get_connection_uri()
+        mongo_host, mongo_port, mongo_uri = self._omniboard_target()
 
         # Require Docker to be running; no auto-start
-        if not self.omniboard_manager.is_docker_running():
-            messagebox.showinfo(
-                "Docker not running",
-                "Docker Desktop is not running. Please launch Docker Desktop manually, "
-                "wait until it is ready, and then click 'Launch Omniboard' again.",
-            )
+        if not self.omniboard_manager.runtime_available():
+            runtime = self.omniboard_manager.runtime.name
+            if runtime == "native":
+                messagebox.showinfo(
+                    "Omniboard not installed",
+                    "The native runtime needs a local Omniboard. Install it with "
+                    "'npm install -g omniboard' or choose the Docker runtime.",
+                )
+            elif runtime == "podman":
+                messagebox.showinfo("Podman not available",
+                                    "Podman was not found or does not answer. Please install "
+                                    "or start it, then click 'Launch Omniboard' again.")
+            else:
+                messagebox.showinfo(
+                    "Docker not running",
+                    "Docker Desktop is not running. Please launch Docker Desktop manually, "
+                    "wait until it is ready, and then click 'Launch Omniboard' again.",
+                )
             return
 
         # Docker is already running; launch in background
@@ -522,27 +1054,363 @@ class MongoApp(ctk.CTk):
 
     def _launch_container_async(self, db_name: str, mongo_host: str, mongo_port: int, mongo_uri: str | None):
         """Run container launch in a worker thread and update UI on completion."""
+        trace_id = tracer.begin_async("action.launch_to_browser", database=db_name)
+        # Mirroring or proxying a database on this host would only add a hop
+        remote = mongo_uri is not None or mongo_host not in ("localhost", "127.0.0.1")
+        use_mirror = bool(self.mirror_chk.get()) and remote
+        use_proxy = bool(self.proxy_chk.get()) and remote and not use_mirror
+        use_http_cache = bool(self.http_cache_chk.get())
+        use_shared = bool(self.shared_chk.get())
+
         def worker():
             try:
-                container_name, host_port = self.omniboard_manager.launch(
-                    db_name=db_name,
-                    mongo_host=mongo_host,
-                    mongo_port=mongo_port,
-                    mongo_uri=mongo_uri,
-                )
-                url = f"http://localhost:{host_port}"
-                self.after(0, lambda: self._on_omniboard_launched(db_name, url))
+                with span("action.launch_worker", database=db_name):
+                    launch_uri, docker_network, proxy_port = mongo_uri, None, None
+                    if use_mirror:
+                        launch_uri, docker_network = self._mirror_database(db_name)
+                    elif use_proxy:
+                        proxy_port = self._ensure_proxy(mongo_host, mongo_port, mongo_uri)
+                    manager = self.omniboard_manager
+                    if use_shared:
+                        launch = manager.shared.add(
+                            db_name, mongo_host, mongo_port, launch_uri, docker_network, proxy_port
+                        )
+                    else:
+                        launch = manager.launch(
+                            db_name=db_name,
+                            mongo_host=mongo_host,
+                            mongo_port=mongo_port,
+                            mongo_uri=launch_uri,
+                            docker_network=docker_network,
+                            proxy_port=proxy_port,
+                        )
+                url = f"http://{launch.host}:{launch.port}{launch.path}"
+                if use_http_cache:
+                    front_port = self._ensure_front_end(db_name, launch.name, launch.port, launch.host)
+                    url = f"http://localhost:{front_port}{launch.path}"
+                self.after(0, lambda: self._on_omniboard_launched(db_name, url, trace_id, launch))
             except Exception as e:
+                tracer.end_async("action.launch_to_browser", trace_id, error=str(e))
                 self.after(0, lambda: messagebox.showerror("Launch Error", str(e)))
 
         self.selected_label.configure(text=f"Launching Omniboard for '{db_name}'…")
         self.launch_btn.configure(state="disabled")
         threading.Thread(target=worker, daemon=True).start()
 
-    def _on_omniboard_launched(self, db_name: str, url: str):
+    def _allocate_mirror_port(self) -> int:
+        manager = self.omniboard_manager
+        return manager.port_registry.lease(
+            MirrorServer.PORT_LEASE,
+            MirrorServer.PREFERRED_PORT,
+            is_free=manager.port_is_bindable,
+            find_free=manager.find_free_port,
+        )
+
+    @traced("mirror.prepare")
+    def _mirror_database(self, db_name: str):
+        """Copy ``db_name`` into the local mirror (worker thread).
+
+        Returns:
+            (mirror URI for Omniboard, Docker network to attach it to)
+
+        Raises:
+            RuntimeError: If not connected (e.g. the list comes from the cache)
+        """
+        client = self.mongo_client.client
+        if client is None:
+            raise RuntimeError(f"Connect to MongoDB first: mirroring copies '{db_name}' from the "
+                               "server, and the database list shown is only the cached one.")
+
+        def progress(collection, copied):
+            text = f"Mirroring '{db_name}': {collection} ({copied} documents)…"
+            self.after(0, lambda: self.selected_label.configure(text=text))
+
+        self.after(0, lambda: self.mirror_status_label.configure(text="starting mirror…"))
+        result = self.mirrors.mirror(db_name, client[db_name], progress,
+                                     from_host=self.omniboard_manager.runtime.native)
+        self.after(0, lambda: self._show_mirror_status(db_name))
+        return result
+
+    def _show_mirror_status(self, db_name: str):
+        """Show the mirror lag of ``db_name`` and keep it updated."""
+        first = self._mirrored_db is None
+        self._mirrored_db = db_name
+        if first:
+            self._refresh_mirror_status()
+
+    def _refresh_mirror_status(self):
+        status = self.mirrors.status(self._mirrored_db) if self._mirrored_db else None
+        if status is None:
+            self.mirror_status_label.configure(text="")
+            self._mirrored_db = None
+            return
+        self.mirror_status_label.configure(text=f"{self._mirrored_db}: {lag_text(status)}")
+        self.after(self.MIRROR_STATUS_MS, self._refresh_mirror_status)
+
+    def on_mirror_toggle(self):
+        """Persist the mirror choice; stop syncing when disabled."""
+        enabled = bool(self.mirror_chk.get())
+        data = self.preferences.load()
+        data["mirror"] = 1 if enabled else 0
+        self.preferences.save_without_password(data)
+        if not enabled:
+            threading.Thread(target=self.mirrors.stop_all, daemon=True).start()
+
+    @traced("proxy.ensure")
+    def _ensure_proxy(self, mongo_host: str, mongo_port: int, mongo_uri) -> int:
+        """Start (once per server) the caching proxy; returns its port (worker thread)."""
+        upstream = (mongo_host, mongo_port)
+        if mongo_uri:
+            upstream = upstream_of(self.mongo_client.client) or upstream
+        tls = bool(mongo_uri) and uri_uses_tls(mongo_uri)
+        with self._proxies_lock:
+            proxy = self._proxies.get((upstream, tls))
+            if proxy is not None:
+                return proxy.port
+            manager = self.omniboard_manager
+            port = manager.port_registry.lease(
+                f"__proxy__{upstream[0]}:{upstream[1]}",
+                self.PROXY_BASE_PORT,
+                is_free=manager.port_is_bindable,
+                find_free=manager.find_free_port,
+            )
+            listen = ["127.0.0.1"]
+            gateway = None
+            if sys.platform.startswith("linux") and not manager.runtime.native:
+                # Containers may reach the host through the bridge gateway;
+                # listen there only while probing, and after if bridge won
+                gateway = manager.network_probe.bridge_gateway()
+                if gateway:
+                    listen.append(gateway)
+            proxy = MongoProxy(upstream, listen=listen, port=port, tls=tls)
+            proxy.start()
+            if gateway and manager.network_probe.choose("127.0.0.1", proxy.port).mode != "bridge":
+                proxy.stop_listening(gateway)
+            self._proxies[(upstream, tls)] = proxy
+            return proxy.port
+
+    def _stop_proxies(self):
+        with self._proxies_lock:
+            proxies, self._proxies = list(self._proxies.values()), {}
+        for proxy in proxies:
+            proxy.stop()
+
+    def on_proxy_toggle(self):
+        """Persist the proxy choice; stop the proxies when disabled."""
+        enabled = bool(self.proxy_chk.get())
+        data = self.preferences.load()
+        data["proxy"] = 1 if enabled else 0
+        self.preferences.save_without_password(data)
+        if not enabled:
+            self._stop_proxies()
+
+    def _ensure_front_end(self, db_name: str, container_name: str, container_port: int,
+                          container_host: str = "localhost") -> int:
+        """Start (once per container and database) the HTTP caching front end; returns its port.
+
+        The shared container serves several databases, so each gets its own
+        front end and cache.
+        """
+        key = (container_name, db_name)
+        upstream_host = "127.0.0.1" if container_host == "localhost" else container_host
+        with self._front_ends_lock:
+            front = self._front_ends.get(key)
+            if front is not None and front.upstream == (upstream_host, container_port):
+                return front.port
+            if front is not None:
+                front.stop()
+            manager = self.omniboard_manager
+            lease = f"__http__{container_name}/{db_name}"
+            port = manager.port_registry.lease(
+                lease,
+                manager.generate_port_for_database(lease, base=self.HTTP_CACHE_BASE_PORT),
+                is_free=manager.port_is_bindable,
+                find_free=manager.find_free_port,
+            )
+            cache = ResponseCache(cache_directory(CONFIG_DIR / "httpcache", f"{container_name}-{db_name}"))
+            front = CachingFrontEnd(container_port, cache, listen_port=port, upstream_host=upstream_host)
+            front.start()
+            self._front_ends[key] = front
+            return front.port
+
+    def _stop_front_ends(self, container_name: Optional[str] = None, db_name: Optional[str] = None,
+                         clear: bool = False):
+        """Stop the front ends of a container (of one of its databases), or all.
+
+        Args:
+            container_name: Container whose front ends stop (all if None)
+            db_name: Only the front end of this database (all if None)
+            clear: Also delete the cached responses (the container is gone)
+        """
+        with self._front_ends_lock:
+            keys = [key for key in self._front_ends
+                    if container_name in (None, key[0]) and db_name in (None, key[1])]
+            fronts = [self._front_ends.pop(key) for key in keys]
+        for front in fronts:
+            front.stop()
+            if clear:
+                front.cache.clear()
+
+    def _set_runtime(self, name: str):
+        """Switch the runtime Omniboards are launched with."""
+        if self.omniboard_manager.runtime.name == name:
+            return
+        self._replace_manager(name)
+        label = next(k for k, v in self.RUNTIMES.items() if v == name)
+        self.runtime_menu.set(label)
+        # Show what already runs on the new runtime
+        self._reconcile_containers_async()
+
+    def _replace_manager(self, runtime: str):
+        """Create the manager for ``runtime`` and the configured engines."""
+        old = self.omniboard_manager
+        data = self.preferences.load()
+        specs = [s for s in data.get("engines", []) if s]
+        scheduler = None
+        if specs and runtime == "docker":
+            scheduler = LaunchScheduler(
+                [EngineTarget.from_spec(s, OmniboardManager._docker_cmd_base) for s in specs],
+                data.get("scheduling") if data.get("scheduling") in LaunchScheduler.POLICIES
+                else "capacity",
+                OmniboardManager.IMAGE,
+            )
+        self.omniboard_manager = OmniboardManager(runtime=runtime_by_name(
+            runtime, OmniboardManager.executor, CONFIG_DIR / "native.json", CONFIG_DIR / "native-logs"
+        ), scheduler=scheduler)
+        old.logs.stop_all()
+        threading.Thread(target=old.discard_warm, daemon=True).start()
+
+    def on_engines_change(self):
+        """Persist the extra engines and the scheduling policy and apply them."""
+        specs = [s.strip() for s in self.engines_entry.get().split(",") if s.strip()]
+        policy = self.POLICIES[self.policy_menu.get()]
+        data = self.preferences.load()
+        if data.get("engines", []) == specs and data.get("scheduling", "capacity") == policy:
+            return
+        data["engines"] = specs
+        data["scheduling"] = policy
+        self.preferences.save_without_password(data)
+        self._replace_manager(self.omniboard_manager.runtime.name)
+        self._reconcile_containers_async()
+
+    def on_runtime_change(self, label: str):
+        """Persist the runtime choice and switch to it."""
+        name = self.RUNTIMES[label]
+        data = self.preferences.load()
+        data["runtime"] = name
+        self.preferences.save_without_password(data)
+        self._set_runtime(name)
+
+    def on_http_cache_toggle(self):
+        """Persist the HTTP cache choice; stop the front ends when disabled."""
+        enabled = bool(self.http_cache_chk.get())
+        data = self.preferences.load()
+        data["http_cache"] = 1 if enabled else 0
+        self.preferences.save_without_password(data)
+        if not enabled:
+            threading.Thread(target=self._stop_front_ends, daemon=True).start()
+
+    def on_shared_toggle(self):
+        """Persist the shared instance choice."""
+        data = self.preferences.load()
+        data["shared"] = 1 if self.shared_chk.get() else 0
+        self.preferences.save_without_password(data)
+
+    def remove_from_shared(self):
+        """Stop serving the selected database from the shared instance."""
+        db_name = self.selected_db.get()
+        if not db_name:
+            messagebox.showwarning("No Database Selected", "Please select a database first.")
+            return
+
+        def worker():
+            try:
+                removed = self.omniboard_manager.shared.remove(db_name)
+            except Exception as e:
+                self.after(0, lambda: messagebox.showerror("Docker Error", str(e)))
+                return
+            self._stop_front_ends(SHARED_CONTAINER, db_name, clear=True)
+            if not removed:
+                self.after(0, lambda: messagebox.showinfo(
+                    "Shared instance", f"'{db_name}' is not served by the shared instance."))
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _on_omniboard_launched(self, db_name: str, url: str, trace_id=None, launch=None):
+        self._add_omniboard_link(db_name, url)
+        origin = "/".join(url.split("/")[:3])
+        if any(f"http://localhost:{f.port}" == origin for f in list(self._front_ends.values())):
+            self._add_omniboard_link(db_name, origin + STATS_PATH, label="  cache statistics: ")
+        self.launch_btn.configure(state="normal")
+        network = launch.network if launch is not None else None
+        if network is not None and not network.reachable:
+            messagebox.showwarning(
+                "MongoDB not reachable from Docker",
+                "No container network setup could reach MongoDB on this host, so "
+                "Omniboard will probably show an empty page.\n\n"
+                "Make sure mongod listens on an address containers can reach "
+                "(e.g. bindIp 0.0.0.0 or the Docker bridge address).",
+            )
+
+        if launch is not None and launch.kind == "reused":
+            # Already up and serving: no boot wait
+            with span("gui.browser_open", url=url):
+                webbrowser.open(url)
+            tracer.end_async("action.launch_to_browser", trace_id)
+            return
+
+        # Open the browser as soon as the server logs that it listens (after
+        # BOOT_FALLBACK_MS if it never does); report failures as they are logged
+        boot_id = tracer.begin_async("omniboard.container_boot_wait", url=url)
+        decided = []
+
+        def open_browser():
+            if decided:
+                return
+            decided.append(READY)
+            tracer.end_async("omniboard.container_boot_wait", boot_id)
+            with span("gui.browser_open", url=url):
+                webbrowser.open(url)
+            tracer.end_async("action.launch_to_browser", trace_id)
+
+        def failed(stream):
+            if decided:
+                return
+            decided.append(stream.state)
+            tracer.end_async("omniboard.container_boot_wait", boot_id, error=stream.reason)
+            tracer.end_async("action.launch_to_browser", trace_id, error=stream.reason)
+            self._on_omniboard_failed(db_name, stream)
+
+        def on_state(stream):
+            if stream.state == READY:
+                self.after(0, open_browser)
+            elif stream.state in (FAILED, EXITED):
+                self.after(0, lambda: failed(stream))
+
+        stream = self.omniboard_manager.logs.get(launch.name) if launch is not None else None
+        if stream is not None:
+            stream.add_listener(on_state)
+        self.after(self.BOOT_FALLBACK_MS, open_browser)
+
+    def _on_omniboard_failed(self, db_name: str, stream):
+        """Show why Omniboard did not start, with the end of its log."""
+        tail = "\n".join(stream.ring.tail(12)) or "(no output)"
+        if messagebox.askyesno(
+            "Omniboard failed to start",
+            f"Omniboard for '{db_name}' stopped or reported an error:\n\n"
+            f"{stream.reason or 'the container exited'}\n\nLast log lines:\n{tail}\n\n"
+            "Show the full log?",
+        ):
+            self._show_logs(stream)
+
+    def _add_omniboard_link(self, db_name: str, url: str, label: str | None = None):
+        """Append a clickable Omniboard link (once per URL)."""
+        if url in self._omniboard_urls:
+            return
+        self._omniboard_urls.add(url)
         # Update textbox with clickable link
         self.omniboard_info_text.configure(state="normal")
-        text_before = f"Omniboard for '{db_name}': "
+        text_before = label or f"Omniboard for '{db_name}': "
         self.omniboard_info_text.insert("end", text_before)
 
         # Insert URL as a clickable link
@@ -556,10 +1424,26 @@ class MongoApp(ctk.CTk):
 
         self.omniboard_info_text.insert("end", "\n")
         self.omniboard_info_text.configure(state="disabled")
-        self.launch_btn.configure(state="normal")
 
-        # Open in browser after a short delay to allow Omniboard to fully start
-        self.after(6000, lambda: webbrowser.open(url))
+    def _reconcile_containers_async(self):
+        """Restore the links of Omniboards still running from a previous session."""
+        def worker():
+            try:
+                containers = self.omniboard_manager.reconcile()
+            except Exception:
+                return
+            self.after(0, lambda: self._restore_omniboard_links(containers))
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _restore_omniboard_links(self, containers):
+        for container in containers:
+            url = f"http://{container.get('host') or 'localhost'}:{container['port']}"
+            if (container.get("target") or "").startswith(SHARED_TARGET_PREFIX):
+                for db_name, path in self.omniboard_manager.shared.databases().items():
+                    self._add_omniboard_link(db_name, url + path)
+                continue
+            self._add_omniboard_link(container["database"] or container["name"], url)
 
     def _auto_fill_credential_password_if_needed(self):
         """If remember is enabled and password field is empty, load from keyring."""
@@ -572,13 +1456,35 @@ class MongoApp(ctk.CTk):
         # Prefer current UI username, else stored one
         user = self.cred_user_entry.get().strip() or data.get("user") or "default"
         if not self.cred_pass_entry.get().strip():
-            pwd = self.preferences.load_password_if_any(user)
-            if pwd:
-                self.cred_pass_entry.delete(0, "end")
-                self.cred_pass_entry.insert(0, pwd)
-                # Ensure checkbox reflects remembered state
-                if int(self.remember_pwd_chk.get()) != 1:
-                    self.remember_pwd_chk.select()
+            self._fill_password_async(user)
+
+    def _fill_password_async(self, user: str):
+        """Fill the password field from the keyring without blocking the UI."""
+        def apply(pwd):
+            # Only fill if the user has not typed something meanwhile
+            if not pwd or self.cred_pass_entry.get().strip():
+                return
+            if (self.cred_user_entry.get().strip() or "default") != user:
+                return
+            self.cred_pass_entry.delete(0, "end")
+            self.cred_pass_entry.insert(0, pwd)
+            # Ensure checkbox reflects remembered state
+            if int(self.remember_pwd_chk.get()) != 1:
+                self.remember_pwd_chk.select()
+            if self._revalidate_pending:
+                self._revalidate_pending = False
+                try:
+                    self._revalidate_async("Credential URI", self._connection_target())
+                except ValueError:
+                    pass
+            else:
+                self._schedule_speculation(credentials_final=True)
+
+        found, pwd = self.preferences.get_cached_password(user)
+        if found:
+            apply(pwd)
+        else:
+            self.preferences.load_password_async(user, lambda p: self.after(0, lambda: apply(p)))
 
     def on_remember_toggle(self):
         """Handle toggling of the remember password checkbox."""
@@ -597,20 +1503,18 @@ class MongoApp(ctk.CTk):
             return
         # If enabling, immediately save current password (if any)
         if int(self.remember_pwd_chk.get()) == 1:
-            user = (self.cred_user_entry.get().strip() or "default")
-            pwd = self.cred_pass_entry.get()
+            # Persist non-secret prefs and the password (keyring, off-thread);
+            # if storing the password fails, uncheck the option again
+            def on_saved(ok):
+                if not ok:
+                    self.after(0, self.remember_pwd_chk.deselect)
             try:
-                self.preferences.save_password_if_allowed(True, user, pwd)
-                # Persist non-secret prefs too
-                self._save_prefs(remember_pwd=True)
+                self._save_prefs(remember_pwd=True, on_password_saved=on_saved)
             except Exception:
-                # If saving fails, uncheck it
                 self.remember_pwd_chk.deselect()
         else:
             # If disabling, remove stored password
-            user = (self.cred_user_entry.get().strip() or "default")
             try:
-                self.preferences.save_password_if_allowed(False, user, "")
                 self._save_prefs(remember_pwd=False)
             except Exception:
                 pass
@@ -620,6 +1524,29 @@ class MongoApp(ctk.CTk):
         data = self.preferences.load()
         if not isinstance(data, dict) or not data:
             return
+        if int(data.get("warm_start", 0)) == 1:
+            self.warm_start_chk.select()
+        if int(data.get("mirror", 0)) == 1:
+            self.mirror_chk.select()
+        if int(data.get("proxy", 0)) == 1:
+            self.proxy_chk.select()
+        if int(data.get("http_cache", 0)) == 1:
+            self.http_cache_chk.select()
+        if int(data.get("shared", 0)) == 1:
+            self.shared_chk.select()
+        if data.get("engines"):
+            self.engines_entry.insert(0, ", ".join(data["engines"]))
+        policy = data.get("scheduling", "capacity")
+        self.policy_menu.set(next((k for k, v in self.POLICIES.items() if v == policy),
+                                  next(iter(self.POLICIES))))
+        runtime = data.get("runtime", "docker")
+        if runtime != "docker" and runtime in self.RUNTIMES.values():
+            self._set_runtime(runtime)
+        elif data.get("engines"):
+            self._replace_manager("docker")
+        if int(data.get("remember_pwd", 0)) == 1:
+            # Start the (possibly slow) keyring lookup right away, off-thread
+            self.preferences.prefetch_password(data.get("user") or "default")
         mode = data.get("mode") or "Port"
         # Set mode and update UI
         self.connection_mode.set(mode)
@@ -637,15 +1564,18 @@ class MongoApp(ctk.CTk):
             self.cred_authsrc_entry.delete(0, "end"); self.cred_authsrc_entry.insert(0, data.get("auth_source", ""))
             if int(data.get("remember_pwd", 0)) == 1:
                 self.remember_pwd_chk.select()
-                pwd = self.preferences.load_password_if_any(data.get("user") or "default")
-                if pwd:
-                    self.cred_pass_entry.delete(0, "end")
-                    self.cred_pass_entry.insert(0, pwd)
+                self._fill_password_async(data.get("user") or "default")
+
+    def _save_prefs(self, remember_pwd: bool, on_password_saved=None):
+        """Save current preferences. Password stored in OS keyring if requested.
 
-    def _save_prefs(self, remember_pwd: bool):
-        """Save current preferences. Password stored in OS keyring if requested."""
+        The keyring is updated on a worker thread; ``on_password_saved``
+        receives True/False there once it is done.
+        """
         mode = self.connection_mode.get()
-        data = {"mode": mode}
+        # Other settings (and other instances' changes) are kept
+        data = self.preferences.load()
+        data["mode"] = mode
         if mode == "Port":
             data.update({"port": self.port_var.get().strip()})
         elif mode == "Full URI":
@@ -660,7 +1590,7 @@ class MongoApp(ctk.CTk):
                 "auth_source": self.cred_authsrc_entry.get().strip(),
                 "remember_pwd": 1 if remember_pwd else 0,
             })
-            self.preferences.save_password_if_allowed(remember_pwd, user, pwd)
+            self.preferences.save_password_async(remember_pwd, user, pwd, on_password_saved)
         self.preferences.save_without_password(data)
 
     def clear_omniboard_docker(self):
@@ -677,9 +1607,267 @@ class MongoApp(ctk.CTk):
             self.omniboard_info_text.configure(state="normal")
             self.omniboard_info_text.delete("1.0", "end")
             self.omniboard_info_text.configure(state="disabled")
+            self._omniboard_urls.clear()
+            self._stop_front_ends(clear=True)
         except Exception as e:
             messagebox.showerror("Docker Error", str(e))
 
+    def on_trace_toggle(self):
+        """Start recording a trace, or stop and export it."""
+        if int(self.trace_chk.get()) == 1:
+            tracer.start()
+            return
+        tracer.stop()
+        try:
+            path = tracer.export()
+            dropped = (f"Only the last {tracer.max_events} events were kept "
+                       f"({tracer.dropped} older ones dropped).\n\n" if tracer.dropped else "")
+            messagebox.showinfo(
+                "Trace saved",
+                f"Performance trace written to:\n{path}\n\n{dropped}"
+                "Open it in https://ui.perfetto.dev or chrome://tracing, "
+                "or attach it to a bug report.",
+            )
+        except Exception as e:
+            messagebox.showerror("Trace Error", str(e))
+
+    def show_containers(self):
+        """Open (or focus) the live list of Omniboard containers."""
+        if self.containers_window is not None and self.containers_window.winfo_exists():
+            self.containers_window.focus()
+            return
+        window = ctk.CTkToplevel(self)
+        window.title("Omniboard containers")
+        window.geometry("865x360")
+        window.grid_columnconfigure(0, weight=1)
+        window.grid_rowconfigure(0, weight=1)
+        self.container_panel = ContainerPanel(
+            window, on_open=self._open_container, on_stop=self._stop_container,
+            on_logs=self._show_container_logs,
+        )
+        self.container_panel.grid(row=0, column=0, padx=10, pady=10, sticky="nsew")
+        self.containers_window = window
+        self._refresh_containers(reschedule=True)
+
+    def _containers_window_open(self) -> bool:
+        if self.containers_window is not None and self.containers_window.winfo_exists():
+            return True
+        self.containers_window = None
+        return False
+
+    def _refresh_containers(self, reschedule: bool = False):
+        """Query all containers in one batch off the UI thread.
+
+        Args:
+            reschedule: Keep refreshing every ``CONTAINER_REFRESH_MS`` while
+                the window is open
+        """
+        if not self._containers_window_open():
+            return
+        if not self._containers_refreshing:
+            self._containers_refreshing = True
+
+            def worker():
+                try:
+                    containers = self.omniboard_manager.container_status()
+                except Exception:
+                    containers = None
+                self.after(0, lambda: self._apply_container_status(containers))
+
+            threading.Thread(target=worker, daemon=True).start()
+        if reschedule:
+            self.containers_window.after(
+                self.CONTAINER_REFRESH_MS, lambda: self._refresh_containers(reschedule=True)
+            )
+
+    def _apply_container_status(self, containers):
+        self._containers_refreshing = False
+        if containers is not None and self._containers_window_open():
+            self.container_panel.update_rows(containers)
+
+    def _open_container(self, container: dict):
+        if container.get("port"):
+            webbrowser.open(f"http://{container.get('host') or 'localhost'}:{container['port']}")
+
+    def _show_container_logs(self, container: dict):
+        """Open the log window of a container (attaching to its output off-thread)."""
+        def worker():
+            stream = self.omniboard_manager.log_stream(container)
+            self.after(0, lambda: self._show_logs(stream))
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _show_logs(self, stream):
+        """Open a window following the lines of ``stream``."""
+        window = ctk.CTkToplevel(self)
+        window.title(f"Logs – {stream.name}")
+        window.geometry("760x420")
+        window.grid_columnconfigure(0, weight=1)
+        window.grid_rowconfigure(0, weight=1)
+        view = LogView(window, stream.ring, max_lines=stream.ring.max_lines)
+        view.grid(row=0, column=0, padx=10, pady=(10, 5), sticky="nsew")
+        status = ctk.CTkLabel(window, text="", anchor="w", font=ctk.CTkFont(size=11), text_color="gray")
+        status.grid(row=1, column=0, padx=10, pady=(0, 8), sticky="ew")
+
+        def refresh():
+            if not window.winfo_exists():
+                return
+            view.refresh()
+            stats = stream.ring.stats()
+            dropped = f", {stats['dropped']} older lines dropped" if stats["dropped"] else ""
+            status.configure(text=f"{stream.state}{': ' + stream.reason if stream.reason else ''}"
+                                  f" — {stats['lines']} lines{dropped}")
+            self.after(self.LOG_REFRESH_MS, refresh)
+
+        refresh()
+
+    def show_artifacts(self):
+        """Open the GridFS artifacts of the selected database, a run (or all runs) at a time."""
+        db_name = self.selected_db.get()
+        if not db_name:
+            messagebox.showwarning("No Database Selected", "Please select a database first.")
+            return
+        window = ctk.CTkToplevel(self)
+        window.title(f"Artifacts – {db_name}")
+        window.geometry("700x400")
+        window.grid_columnconfigure(0, weight=1)
+        window.grid_rowconfigure(1, weight=1)
+        bar = ctk.CTkFrame(window, fg_color="transparent")
+        bar.grid(row=0, column=0, padx=10, pady=(10, 0), sticky="ew")
+        run_entry = ctk.CTkEntry(bar, width=180, placeholder_text="Run ID (empty: all runs)")
+        run_entry.grid(row=0, column=0, padx=(0, 5))
+        panel = ArtifactPanel(window, on_download=lambda a: self._download_artifact(db_name, a, panel))
+        panel.grid(row=1, column=0, padx=10, pady=10, sticky="nsew")
+        panel.empty_label.configure(text="Enter a run ID, or leave it empty to list the artifacts of all runs")
+
+        def show():
+            run_id = run_entry.get().strip() or None
+            panel.set_artifacts([], empty_text="Loading artifacts…")
+
+            def worker():
+                try:
+                    artifacts = self.mongo_client.list_artifacts(db_name, run_id)
+                except Exception as e:
+                    self.after(0, lambda: messagebox.showerror("Artifacts", str(e)))
+                    return
+                empty = f"No artifacts in run {run_id}" if run_id else "No artifacts in this database"
+                self.after(0, lambda: window.winfo_exists() and panel.set_artifacts(artifacts, empty))
+
+            threading.Thread(target=worker, daemon=True).start()
+
+        ctk.CTkButton(bar, text="Show", width=70, command=show).grid(row=0, column=1)
+        run_entry.bind("<Return>", lambda e: show())
+
+    def _download_artifact(self, db_name: str, artifact: dict, panel):
+        """Download an artifact to a chosen path (resuming an earlier attempt)."""
+        file_id = artifact["file_id"]
+        if file_id in self._downloads:
+            return
+        path = filedialog.asksaveasfilename(initialfile=artifact["name"].rsplit("/", 1)[-1])
+        if not path:
+            return
+
+        def show(text, busy):
+            if panel.winfo_exists():
+                panel.set_progress(file_id, text, busy)
+
+        def progress(done, total):
+            text = f"{done * 100 // total if total else 100}% of {format_size(total)}"
+            self.after(0, lambda: show(text, True))
+
+        download = self.mongo_client.artifact_download(db_name, file_id, path, progress=progress)
+        self._downloads[file_id] = download
+
+        def worker():
+            try:
+                download.run()
+                self.after(0, lambda: show("done", False))
+            except InterruptedError:
+                pass
+            except Exception as e:
+                self.after(0, lambda: show("failed", False))
+                self.after(0, lambda: messagebox.showerror("Download failed", str(e)))
+            finally:
+                self._downloads.pop(file_id, None)
+
+        show("starting…", True)
+        threading.Thread(target=worker, daemon=True).start()
+
+    def find_orphans(self):
+        """Report the orphaned data of the selected database and offer to delete it."""
+        db_name = self.selected_db.get()
+        if not db_name:
+            messagebox.showwarning("No Database Selected", "Please select a database first.")
+            return
+        try:
+            analyzer = self.mongo_client.orphan_analyzer(db_name)
+        except Exception as e:
+            messagebox.showerror("Orphaned data", str(e))
+            return
+        self.cleanup_btn.configure(state="disabled")
+        self.selected_label.configure(text=f"Analyzing '{db_name}'…")
+
+        def analyze():
+            try:
+                report = analyzer.analyze()
+            except Exception as e:
+                self.after(0, lambda: self._on_orphans_done(db_name, error=e))
+                return
+            self.after(0, lambda: self._confirm_cleanup(db_name, analyzer, report))
+
+        threading.Thread(target=analyze, daemon=True).start()
+
+    def _confirm_cleanup(self, db_name: str, analyzer, report):
+        if report["total_bytes"] == 0 and not report["files"]["documents"]:
+            self._on_orphans_done(db_name)
+            messagebox.showinfo("Orphaned data", f"'{db_name}' has no orphaned data.")
+            return
+        if not messagebox.askyesno(
+            "Orphaned data",
+            f"'{db_name}' holds data no run uses:\n\n{report_text(report)}\n\n"
+            "Delete it? Deletion runs in small, paced batches and can take a while "
+            "on large databases.",
+        ):
+            self._on_orphans_done(db_name)
+            return
+
+        def progress(kind, documents, size):
+            text = f"Cleaning '{db_name}': {documents} {kind} documents deleted…"
+            self.after(0, lambda: self.selected_label.configure(text=text))
+
+        def clean():
+            try:
+                result = analyzer.clean(dry_run=False, progress=progress)
+            except Exception as e:
+                self.after(0, lambda: self._on_orphans_done(db_name, error=e))
+                return
+            self.after(0, lambda: self._on_orphans_done(db_name, result))
+
+        threading.Thread(target=clean, daemon=True).start()
+
+    def _on_orphans_done(self, db_name: str, result=None, error=None):
+        self.cleanup_btn.configure(state="normal")
+        self.selected_label.configure(text=f"Selected: {db_name}")
+        if error is not None:
+            messagebox.showerror("Orphaned data", str(error))
+        elif result is not None:
+            messagebox.showinfo("Orphaned data", f"Deleted from '{db_name}':\n\n{report_text(result)}")
+
+    def _stop_container(self, container: dict):
+        """Stop a container in the background, then refresh the list."""
+        self.container_panel.mark_stopping(container["id"])
+
+        def worker():
+            self.omniboard_manager.stop_container(container["id"])
+            self._stop_front_ends(container["name"], clear=True)
+            self.after(0, self._refresh_containers)
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def show_docker_metrics(self):
+        """Show Docker CLI call counts and latencies per subcommand."""
+        messagebox.showinfo("Docker metrics", self.omniboard_manager.executor.format_metrics())
+
     def on_link_click(self, event):
         """Handle clicks on hyperlinks in the textbox."""
         try:
@@ -0,0 +1,525 @@
+"""Caching, compressing HTTP front end between the browser and Omniboard.
+
+Omniboard recomputes its ``/api/v1/*`` payloads (run lists, metric series)
+on every page load. ``CachingFrontEnd`` listens on the port the browser
+uses and forwards to the container, keeping successful ``GET`` responses in
+a per-database cache (bounded in memory, spilling to a bounded directory on
+disk). Cached responses are revalidated with the container after a short
+time (``If-None-Match``/``If-Modified-Since``) and the browser is given
+strong ETags and ``Last-Modified`` dates so its own reloads are cheap 304s.
+Large text responses are compressed with brotli (when installed) or gzip.
+Any write request clears the database's cache.
+
+Statistics are served at ``/_altarviewer/cache``.
+"""
+import email.utils
+import gzip
+import hashlib
+import http.client
+import json
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import brotli  # type: ignore
+except ImportError:  # brotli is optional; gzip is used without it
+    brotli = None
+
+try:
+    from .filelock import atomic_write_bytes
+except ImportError:
+    from filelock import atomic_write_bytes
+
+STATS_PATH = "/_altarviewer/cache"
+# Only responses under these paths are cached
+CACHED_PREFIXES = ("/api/v1/",)
+# Responses smaller than this are sent uncompressed
+COMPRESS_MIN_BYTES = 1024
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript")
+_HOP_BY_HOP = {"connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+               "te", "trailers", "transfer-encoding", "upgrade"}
+# Upstream headers replaced by the front end's own
+_REPLACED = _HOP_BY_HOP | {"content-length", "content-encoding", "etag", "last-modified",
+                           "cache-control", "vary", "date"}
+
+
+class CachedResponse:
+    """One cached upstream response and its compressed variants."""
+
+    def __init__(self, status: int, headers: List[Tuple[str, str]], body: bytes,
+                 upstream_etag: Optional[str], upstream_modified: Optional[str],
+                 modified: float, validated: float):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.upstream_etag = upstream_etag
+        self.upstream_modified = upstream_modified
+        self.etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+        # When the body last changed (the Last-Modified given to browsers)
+        self.modified = modified
+        # When the container last confirmed the body
+        self.validated = validated
+        self.encoded: Dict[str, bytes] = {}
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(v) for v in self.encoded.values())
+
+    def content_type(self) -> str:
+        for name, value in self.headers:
+            if name.lower() == "content-type":
+                return value
+        return ""
+
+    def to_bytes(self) -> bytes:
+        meta = json.dumps({
+            "status": self.status, "headers": self.headers,
+            "upstream_etag": self.upstream_etag, "upstream_modified": self.upstream_modified,
+            "modified": self.modified, "validated": self.validated,
+        }).encode("utf-8")
+        return len(meta).to_bytes(4, "big") + meta + self.body
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "CachedResponse":
+        size = int.from_bytes(data[:4], "big")
+        meta = json.loads(data[4:4 + size].decode("utf-8"))
+        return cls(meta["status"], [tuple(h) for h in meta["headers"]], data[4 + size:],
+                   meta["upstream_etag"], meta["upstream_modified"],
+                   meta["modified"], meta["validated"])
+
+
+class ResponseCache:
+    """Per-database response cache: an in-memory LRU over a disk directory."""
+
+    def __init__(self, directory: Optional[Path], max_memory_bytes: int = 32 * 1024 * 1024,
+                 max_disk_bytes: int = 256 * 1024 * 1024):
+        """Initialize the cache.
+
+        Args:
+            directory: Disk cache directory (memory only if None)
+            max_memory_bytes: Bound of the in-memory entries
+            max_disk_bytes: Bound of the disk directory
+        """
+        self.directory = Path(directory) if directory else None
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._memory_size = 0
+        # Bytes in the disk directory (counted on first write)
+        self._disk_size: Optional[int] = None
+        self._lock = threading.Lock()
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _file(self, key: str) -> Optional[Path]:
+        if self.directory is None:
+            return None
+        return self.directory / (hashlib.sha1(key.encode("utf-8")).hexdigest() + ".entry")
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry
+        path = self._file(key)
+        if path is None:
+            return None
+        try:
+            entry = CachedResponse.from_bytes(path.read_bytes())
+        except (OSError, ValueError, KeyError):
+            return None
+        self._remember(key, entry)
+        return entry
+
+    def put(self, key: str, entry: CachedResponse):
+        self._remember(key, entry)
+        path = self._file(key)
+        if path is None:
+            return
+        data = entry.to_bytes()
+        try:
+            previous = path.stat().st_size if path.exists() else 0
+            atomic_write_bytes(path, data)
+        except OSError:
+            return
+        with self._lock:
+            if self._disk_size is None:
+                self._disk_size = self._scan_disk()[0]
+            else:
+                self._disk_size += len(data) - previous
+            over = self._disk_size > self.max_disk_bytes
+        if over:
+            self._trim_disk()
+
+    def touch(self, key: str, entry: CachedResponse):
+        """Record a revalidation (persisted so a restart does not refetch)."""
+        self.put(key, entry)
+
+    def _remember(self, key: str, entry: CachedResponse):
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_size -= old.size
+            self._memory[key] = entry
+            self._memory_size += entry.size
+            while self._memory_size > self.max_memory_bytes and len(self._memory) > 1:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_size -= evicted.size
+
+    def add_encoding(self, key: str, entry: CachedResponse, encoding: str, data: bytes):
+        with self._lock:
+            if encoding not in entry.encoded:
+                entry.encoded[encoding] = data
+                if self._memory.get(key) is entry:
+                    self._memory_size += len(data)
+
+    def _scan_disk(self) -> Tuple[int, list]:
+        files = []
+        for path in self.directory.glob("*.entry"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        return sum(size for _, size, _ in files), files
+
+    def _trim_disk(self):
+        """Delete the oldest entry files until the directory fits its bound."""
+        total, files = self._scan_disk()
+        for _, size, path in sorted(files, key=lambda f: f[0]):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                path.unlink()
+                total -= size
+            except OSError:
+                pass
+        with self._lock:
+            self._disk_size = total
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_size = 0
+        if self.directory is not None:
+            for path in self.directory.glob("*.entry"):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            with self._lock:
+                self._disk_size = 0
+
+    def sizes(self) -> Tuple[int, int]:
+        """Return (entries in memory, bytes in memory)."""
+        with self._lock:
+            return len(self._memory), self._memory_size
+
+
+def _accepted_encodings(header: str) -> List[str]:
+    accepted = []
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if name and params.replace(" ", "").lower() not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            accepted.append(name.strip().lower())
+    return accepted
+
+
+class CachingFrontEnd:
+    """HTTP front end for one Omniboard container."""
+
+    # Seconds a cached response is served without asking the container
+    FRESH_SECONDS = 5.0
+
+    def __init__(
+        self,
+        upstream_port: int,
+        cache: ResponseCache,
+        listen_port: int = 0,
+        upstream_host: str = "127.0.0.1",
+        clock: Callable[[], float] = time.time,
+    ):
+        """Initialize the front end.
+
+        Args:
+            upstream_port: Host port of the Omniboard container
+            cache: Response cache of the container's database
+            listen_port: Port the browser connects to (0 picks one)
+            upstream_host: Host of the container port
+            clock: Time source, overridable for tests
+        """
+        self.upstream = (upstream_host, upstream_port)
+        self.cache = cache
+        self.listen_port = listen_port
+        self.clock = clock
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "not_modified": 0,
+                      "passthrough": 0, "bytes_from_cache": 0, "bytes_sent": 0,
+                      "bytes_uncompressed": 0}
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1] if self._server else self.listen_port
+
+    def start(self) -> int:
+        """Serve in a background thread; returns the listening port."""
+        front = self
+
+        class Handler(_Handler):
+            frontend = front
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", self.listen_port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, args=(0.2,),
+                         name="httpcache", daemon=True).start()
+        return self.port
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _count(self, **increments):
+        with self._stats_lock:
+            for name, value in increments.items():
+                self.stats[name] += value
+
+    def snapshot(self) -> dict:
+        """Return the statistics, including the cache size."""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats["entries"], stats["memory_bytes"] = self.cache.sizes()
+        lookups = stats["hits"] + stats["revalidated"] + stats["misses"]
+        stats["hit_ratio"] = (stats["hits"] + stats["revalidated"]) / lookups if lookups else 0.0
+        return stats
+
+    # -- upstream -------------------------------------------------------------
+    def _request(self, method: str, path: str, headers: Dict[str, str], body: Optional[bytes]):
+        """Send a request on this thread's keep-alive connection to the container.
+
+        A stale keep-alive connection is retried once on a new one, for GET
+        and HEAD only: a write may have reached Omniboard before failing.
+        """
+        conn = getattr(self._local, "conn", None)
+        attempts = 2 if method in ("GET", "HEAD") else 1
+        for attempt in range(attempts):
+            if conn is None:
+                conn = http.client.HTTPConnection(*self.upstream, timeout=60)
+                self._local.conn = conn
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                return response, response.read()
+            except (http.client.HTTPException, OSError):
+                conn.close()
+                conn = self._local.conn = None
+                if attempt == attempts - 1:
+                    raise
+
+    @staticmethod
+    def _forward_headers(handler: BaseHTTPRequestHandler) -> Dict[str, str]:
+        headers = {k: v for k, v in handler.headers.items()
+                   if k.lower() not in _HOP_BY_HOP and k.lower() not in (
+                       "accept-encoding", "if-none-match", "if-modified-since", "host")}
+        headers["Host"] = f"{handler.server.server_address[0]}:{handler.server.server_address[1]}"
+        return headers
+
+    def _fetch(self, handler, key: str, entry: Optional[CachedResponse]) -> Tuple[CachedResponse, str]:
+        """Return a current response for ``key`` and how it was obtained."""
+        now = self.clock()
+        if entry is not None and now - entry.validated < self.FRESH_SECONDS:
+            return entry, "hits"
+        headers = self._forward_headers(handler)
+        if entry is not None and entry.upstream_etag:
+            headers["If-None-Match"] = entry.upstream_etag
+        if entry is not None and entry.upstream_modified:
+            headers["If-Modified-Since"] = entry.upstream_modified
+        response, body = self._request("GET", handler.path, headers, None)
+        if entry is not None and response.status == 304:
+            entry.validated = now
+            self.cache.touch(key, entry)
+            return entry, "revalidated"
+        fresh = CachedResponse(
+            response.status,
+            [(k, v) for k, v in response.getheaders() if k.lower() not in _REPLACED],
+            body,
+            response.getheader("ETag"),
+            response.getheader("Last-Modified"),
+            modified=now,
+            validated=now,
+        )
+        if entry is not None and entry.etag == fresh.etag:
+            # Unchanged body without upstream validators
+            entry.validated = now
+            self.cache.touch(key, entry)
+            return entry, "revalidated"
+        if fresh.status == 200:
+            self.cache.put(key, fresh)
+        return fresh, "misses"
+
+    # -- request handling ---------------------------------------------------------
+    def handle_get(self, handler: BaseHTTPRequestHandler, head: bool = False):
+        if handler.path.split("?")[0] == STATS_PATH:
+            self._send_stats(handler)
+            return
+        if not handler.path.startswith(CACHED_PREFIXES):
+            self.handle_passthrough(handler, "HEAD" if head else "GET")
+            return
+        key = handler.path
+        response, outcome = self._fetch(handler, key, self.cache.get(key))
+        self._count(**{outcome: 1})
+        if response.status == 200 and self._not_modified(handler, response):
+            self._count(not_modified=1)
+            handler.send_response(304)
+            handler.send_header("ETag", response.etag)
+            handler.send_header("Cache-Control", "no-cache")
+            handler.send_header("Content-Length", "0")
+            handler.end_headers()
+            return
+        body, encoding = self._encode(handler, key, response)
+        if outcome != "misses":
+            self._count(bytes_from_cache=len(body))
+        self._count(bytes_sent=len(body), bytes_uncompressed=len(response.body))
+        handler.send_response(response.status)
+        for name, value in response.headers:
+            handler.send_header(name, value)
+        if response.status == 200:
+            handler.send_header("ETag", response.etag)
+            handler.send_header("Last-Modified", email.utils.formatdate(response.modified, usegmt=True))
+            # Browsers revalidate on every use; that costs a local 304 at most
+            handler.send_header("Cache-Control", "no-cache")
+            handler.send_header("Vary", "Accept-Encoding")
+        if encoding:
+            handler.send_header("Content-Encoding", encoding)
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        if not head:
+            handler.wfile.write(body)
+
+    @staticmethod
+    def _not_modified(handler, response: CachedResponse) -> bool:
+        if_none_match = handler.headers.get("If-None-Match")
+        if if_none_match is not None:
+            return response.etag in [t.strip() for t in if_none_match.split(",")] or if_none_match.strip() == "*"
+        since = handler.headers.get("If-Modified-Since")
+        if since:
+            try:
+                return int(response.modified) <= email.utils.parsedate_to_datetime(since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def _encode(self, handler, key: str, response: CachedResponse) -> Tuple[bytes, Optional[str]]:
+        if len(response.body) < COMPRESS_MIN_BYTES or not response.content_type().startswith(COMPRESSIBLE_TYPES):
+            return response.body, None
+        accepted = _accepted_encodings(handler.headers.get("Accept-Encoding", ""))
+        for encoding in ("br", "gzip"):
+            if encoding not in accepted or (encoding == "br" and brotli is None):
+                continue
+            data = response.encoded.get(encoding)
+            if data is None:
+                if encoding == "br":
+                    data = brotli.compress(response.body, quality=5)
+                else:
+                    data = gzip.compress(response.body, compresslevel=6)
+                if response.status == 200:
+                    self.cache.add_encoding(key, response, encoding, data)
+            return data, encoding
+        return response.body, None
+
+    def handle_passthrough(self, handler: BaseHTTPRequestHandler, method: str):
+        """Forward a request as is; writes clear the cache."""
+        length = int(handler.headers.get("Content-Length") or 0)
+        body = handler.rfile.read(length) if length else None
+        if method not in ("GET", "HEAD"):
+            self.cache.clear()
+        headers = self._forward_headers(handler)
+        for name in ("If-None-Match", "If-Modified-Since"):
+            if handler.headers.get(name):
+                headers[name] = handler.headers[name]
+        try:
+            response, data = self._request(method, handler.path, headers, body)
+        except (http.client.HTTPException, OSError) as exc:
+            handler.send_error(502, f"Omniboard unavailable: {exc}")
+            return
+        self._count(passthrough=1, bytes_sent=len(data), bytes_uncompressed=len(data))
+        handler.send_response(response.status)
+        for name, value in response.getheaders():
+            if name.lower() not in _HOP_BY_HOP and name.lower() != "content-length":
+                handler.send_header(name, value)
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        if method != "HEAD":
+            handler.wfile.write(data)
+
+    def _send_stats(self, handler: BaseHTTPRequestHandler):
+        stats = self.snapshot()
+        if "json" in handler.path or "application/json" in handler.headers.get("Accept", ""):
+            body = json.dumps(stats, indent=2).encode("utf-8")
+            content_type = "application/json"
+        else:
+            rows = "".join(f"<tr><td>{name}</td><td>{value:.2%}</td></tr>" if name == "hit_ratio"
+                           else f"<tr><td>{name}</td><td>{value}</td></tr>"
+                           for name, value in stats.items())
+            body = (
+                "<!doctype html><html><head><meta charset='utf-8'>"
+                "<meta http-equiv='refresh' content='2'><title>AltarViewer cache</title>"
+                "<style>body{font-family:sans-serif}td{padding:2px 12px}</style></head>"
+                f"<body><h3>Omniboard response cache</h3><table>{rows}</table></body></html>"
+            ).encode("utf-8")
+            content_type = "text/html; charset=utf-8"
+        handler.send_response(200)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Cache-Control", "no-store")
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    frontend: CachingFrontEnd
+
+    def do_GET(self):
+        self._guard(lambda: self.frontend.handle_get(self))
+
+    def do_HEAD(self):
+        self._guard(lambda: self.frontend.handle_get(self, head=True))
+
+    def do_POST(self):
+        self._guard(lambda: self.frontend.handle_passthrough(self, "POST"))
+
+    def do_PUT(self):
+        self._guard(lambda: self.frontend.handle_passthrough(self, "PUT"))
+
+    def do_PATCH(self):
+        self._guard(lambda: self.frontend.handle_passthrough(self, "PATCH"))
+
+    def do_DELETE(self):
+        self._guard(lambda: self.frontend.handle_passthrough(self, "DELETE"))
+
+    def _guard(self, action):
+        try:
+            action()
+        except (http.client.HTTPException, OSError) as exc:
+            try:
+                self.send_error(502, f"Omniboard unavailable: {exc}")
+            except OSError:
+                pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+def cache_directory(root: Path, db_name: str) -> Path:
+    """Return the disk cache directory of ``db_name`` under ``root``."""
+    safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in db_name)
+    return Path(root) / f"{safe}-{hashlib.sha1(db_name.encode('utf-8')).hexdigest()[:8]}"
@@ -0,0 +1,355 @@
+"""Streaming of Omniboard container logs into bounded ring buffers.
+
+Each launched container gets a ``LogStream`` that follows its output
+(``docker logs -f``, or the log file of a native process) on a background
+thread. Lines are kept in a ``LogRing`` bounded in lines and bytes, so a
+dashboard running for weeks holds at most its last few hundred kilobytes.
+Every line is matched as it arrives against the server's "listening" line
+and MongoDB error lines, so readiness and failures are known as soon as
+they are logged rather than after a fixed delay.
+"""
+import codecs
+import os
+import re
+import subprocess
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Pattern
+
+# Omniboard prints "Omniboard is listening on port 9000!" once it serves
+READY_PATTERN = re.compile(r"listening on port", re.IGNORECASE)
+# Connection, DNS, authentication and URI errors of the MongoDB driver
+FAILURE_PATTERN = re.compile(
+    r"Mongo\w*Error|connection error|Authentication failed|ECONNREFUSED|ENOTFOUND|EAI_AGAIN"
+    r"|ETIMEDOUT|Unhandled\s*(Promise\s*)?Rejection",
+    re.IGNORECASE,
+)
+
+STARTING = "starting"
+READY = "ready"
+FAILED = "failed"
+# The output ended (container stopped) before the server became ready
+EXITED = "exited"
+
+# Bytes read from a log file at a time
+READ_CHUNK = 64 * 1024
+
+
+def tail_offset(path: Path, lines: int, block: int = READ_CHUNK) -> int:
+    """Return the offset in ``path`` where its last ``lines`` lines start.
+
+    Reads backwards block by block, so only the tail is read.
+    """
+    with open(path, "rb") as f:
+        end = f.seek(0, os.SEEK_END)
+        position, newlines = end, 0
+        # A final newline ends the last line rather than starting another
+        f.seek(max(0, end - 1))
+        if f.read(1) == b"\n":
+            position -= 1
+        while position > 0:
+            start = max(0, position - block)
+            f.seek(start)
+            data = f.read(position - start)
+            index = len(data)
+            while True:
+                index = data.rfind(b"\n", 0, index)
+                if index < 0:
+                    break
+                newlines += 1
+                if newlines == lines:
+                    return start + index + 1
+            position = start
+        return 0
+
+
+class LogRing:
+    """The last lines of a log, bounded in line count and total bytes."""
+
+    def __init__(self, max_lines: int = 2000, max_bytes: int = 256 * 1024, max_line_bytes: int = 4096):
+        """Initialize the ring.
+
+        Args:
+            max_lines: Lines kept at most
+            max_bytes: Total size of the kept lines at most (in characters)
+            max_line_bytes: Longer lines are truncated to this many characters
+        """
+        self.max_lines = max_lines
+        self.max_bytes = max_bytes
+        self.max_line_bytes = max_line_bytes
+        self._lines: deque = deque()
+        self._bytes = 0
+        # Sequence number of the next line appended
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def append(self, line: str):
+        if len(line) > self.max_line_bytes:
+            line = line[:self.max_line_bytes] + "…"
+        with self._lock:
+            self._lines.append(line)
+            self._bytes += len(line)
+            self._next += 1
+            while self._lines and (len(self._lines) > self.max_lines or self._bytes > self.max_bytes):
+                self._bytes -= len(self._lines.popleft())
+
+    def since(self, seq: int) -> tuple:
+        """Return ``(lines appended from sequence number seq on, next seq)``.
+
+        Lines already dropped from the ring are skipped.
+        """
+        with self._lock:
+            first = self._next - len(self._lines)
+            start = max(seq, first) - first
+            return list(self._lines)[start:], self._next
+
+    def tail(self, count: int) -> List[str]:
+        with self._lock:
+            return list(self._lines)[-count:] if count > 0 else []
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"lines": len(self._lines), "bytes": self._bytes, "total": self._next,
+                    "dropped": self._next - len(self._lines)}
+
+
+class LogStream:
+    """Follows one container's output and tracks its readiness."""
+
+    def __init__(self, name: str, ring: Optional[LogRing] = None, ready: Pattern = READY_PATTERN,
+                 failure: Pattern = FAILURE_PATTERN):
+        """Initialize the stream.
+
+        Args:
+            name: Container (or native instance) name
+            ring: Buffer receiving the lines (a default-sized one if None)
+            ready: Pattern of the line announcing that the server is up
+            failure: Pattern of lines reporting that it cannot serve
+        """
+        self.name = name
+        self.ring = ring if ring is not None else LogRing()
+        self.ready = ready
+        self.failure = failure
+        self.state = STARTING
+        # The line that caused the last state change
+        self.reason: Optional[str] = None
+        self._changed = threading.Condition()
+        self._listeners: List[Callable[["LogStream"], None]] = []
+        self._proc: Optional[subprocess.Popen] = None
+        self._stopped = threading.Event()
+
+    def feed(self, line: str):
+        """Record one line of output and update the state from it."""
+        line = line.rstrip("\r\n")
+        self.ring.append(line)
+        if self.failure.search(line):
+            self._set(FAILED, line)
+        elif self.state == STARTING and self.ready.search(line):
+            self._set(READY, line)
+
+    def _set(self, state: str, reason: Optional[str]):
+        with self._changed:
+            # A failure stays reported when the output ends
+            if self.state == state or (state == EXITED and self.state == FAILED):
+                return
+            self.state, self.reason = state, reason
+            self._changed.notify_all()
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(self)
+
+    def add_listener(self, listener: Callable[["LogStream"], None]):
+        """Call ``listener(stream)`` on every state change (now, if already decided)."""
+        with self._changed:
+            self._listeners.append(listener)
+            decided = self.state != STARTING
+        if decided:
+            listener(self)
+
+    def wait(self, timeout: Optional[float] = None) -> str:
+        """Wait until the stream leaves ``STARTING``; returns the state."""
+        with self._changed:
+            self._changed.wait_for(lambda: self.state != STARTING, timeout)
+            return self.state
+
+    # -- sources ----------------------------------------------------------------
+    def follow_process(self, start: Callable[[], Optional[subprocess.Popen]],
+                       after: Optional[subprocess.Popen] = None):
+        """Read the output of the process returned by ``start`` on a thread.
+
+        Args:
+            start: Starts e.g. ``docker logs -f NAME`` with stdout piped
+            after: Process to wait for first (e.g. the ``docker run -d``
+                creating the container)
+        """
+        def read():
+            try:
+                self._read_process(start, after)
+            except Exception as e:
+                self._set(EXITED, f"log streaming stopped: {e}")
+
+        threading.Thread(target=read, name=f"logs-{self.name}", daemon=True).start()
+
+    def _read_process(self, start: Callable[[], Optional[subprocess.Popen]],
+                      after: Optional[subprocess.Popen]):
+        if after is not None:
+            after.wait()
+            if after.returncode:
+                self._set(FAILED, f"docker run exited with status {after.returncode}")
+                return
+        if self._stopped.is_set():
+            return
+        self._proc = proc = start()
+        if proc is None or proc.stdout is None:
+            self._set(EXITED, "could not attach to the container output")
+            return
+        with proc.stdout:
+            for raw in proc.stdout:
+                self.feed(raw.decode("utf-8", "replace") if isinstance(raw, bytes) else raw)
+        proc.wait()
+        self._set(EXITED, None)
+
+    def follow_file(self, path: Path, poll_interval: float = 0.05, tail: Optional[int] = None,
+                    max_file_bytes: Optional[int] = None):
+        """Follow a log file appended to by a running process, like ``tail -f``,
+        until ``stop`` is called.
+
+        Args:
+            path: Log file (opened in append mode by the process)
+            poll_interval: Seconds between checks for new output
+            tail: Start with this many last lines (from the start if None)
+            max_file_bytes: Once everything is read, a larger file is
+                truncated (the writer's appends then restart at 0)
+        """
+        def read():
+            try:
+                position = tail_offset(path, tail) if tail is not None else 0
+            except OSError:
+                position = 0
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            partial = ""
+            while not self._stopped.is_set():
+                try:
+                    with open(path, "rb") as f:
+                        if f.seek(0, os.SEEK_END) < position:
+                            # Truncated (or replaced) since: start over
+                            position = 0
+                        f.seek(position)
+                        data = f.read(READ_CHUNK)
+                        position = f.tell()
+                except OSError:
+                    data = b""
+                if data:
+                    lines = (partial + decoder.decode(data)).split("\n")
+                    partial = lines.pop()
+                    for line in lines:
+                        self.feed(line)
+                    # A line without an end is not held without bound
+                    if len(partial) > self.ring.max_line_bytes:
+                        self.feed(partial)
+                        partial = ""
+                    continue
+                if max_file_bytes is not None and position > max_file_bytes:
+                    try:
+                        os.truncate(path, 0)
+                        position = 0
+                    except OSError:
+                        pass
+                self._stopped.wait(poll_interval)
+
+        threading.Thread(target=read, name=f"logs-{self.name}", daemon=True).start()
+
+    def stop(self):
+        """Stop following (the lines read so far are kept)."""
+        self._stopped.set()
+        proc = self._proc
+        if proc is not None and proc.poll() is None:
+            proc.terminate()
+
+
+class LogStreams:
+    """The log streams of one manager, by container name."""
+
+    # Lines replayed when attaching to a container started elsewhere
+    ATTACH_TAIL = 500
+    # Size at which a followed native log file is truncated
+    MAX_FILE_BYTES = 8 * 1024 * 1024
+
+    def __init__(self, max_streams: int = 64):
+        """Initialize the registry.
+
+        Args:
+            max_streams: Streams kept at most; the oldest are stopped and
+                forgotten first
+        """
+        self.max_streams = max_streams
+        self._streams: Dict[str, LogStream] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, stream: LogStream) -> LogStream:
+        with self._lock:
+            old = self._streams.pop(stream.name, None)
+            self._streams[stream.name] = stream
+            while len(self._streams) > self.max_streams:
+                oldest = next(iter(self._streams))
+                self._streams.pop(oldest).stop()
+        if old is not None:
+            old.stop()
+        return stream
+
+    def get(self, name: str) -> Optional[LogStream]:
+        with self._lock:
+            return self._streams.get(name)
+
+    def follow_container(self, name: str, popen: Callable[..., Optional[subprocess.Popen]],
+                         after: Optional[subprocess.Popen] = None,
+                         tail: Optional[int] = None, since: Optional[str] = None) -> LogStream:
+        """Start streaming ``docker logs -f`` of a container.
+
+        Args:
+            name: Container name
+            popen: ``DockerExecutor.popen`` of the engine running it
+            after: ``docker run`` process creating the container, if still running
+            tail: Only replay this many earlier lines (all if None)
+            since: Only replay lines from this time on (e.g. a Unix
+                timestamp, to skip the output before a restart)
+        """
+        stream = self._register(LogStream(name))
+        args = ["logs", "-f", *(["--tail", str(tail)] if tail is not None else []),
+                *(["--since", since] if since is not None else []), name]
+        stream.follow_process(
+            lambda: popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                          stdin=subprocess.DEVNULL),
+            after,
+        )
+        return stream
+
+    def follow_file(self, name: str, path: Path, tail: Optional[int] = None) -> LogStream:
+        """Start streaming the log file of a native instance.
+
+        Args:
+            name: Instance name
+            path: Its log file, kept below ``MAX_FILE_BYTES``
+            tail: Only replay this many earlier lines (all if None)
+        """
+        stream = self._register(LogStream(name))
+        stream.follow_file(Path(path), tail=tail, max_file_bytes=self.MAX_FILE_BYTES)
+        return stream
+
+    def wait(self, name: str, timeout: float) -> Optional[str]:
+        """Wait for the readiness of ``name``; None if it has no stream."""
+        stream = self.get(name)
+        return stream.wait(timeout) if stream is not None else None
+
+    def stop(self, name: str):
+        with self._lock:
+            stream = self._streams.pop(name, None)
+        if stream is not None:
+            stream.stop()
+
+    def stop_all(self):
+        with self._lock:
+            streams, self._streams = list(self._streams.values()), {}
+        for stream in streams:
+            stream.stop()
@@ -0,0 +1,465 @@
+"""Local read mirror of a remote Sacred database.
+
+Omniboard issues dozens of queries per page; against a remote cluster each
+one pays WAN latency. ``MirrorSync`` copies a database's Sacred collections
+(``runs``, ``metrics``, ``omniboard.*`` and optionally GridFS) into a local
+mongod with batched bulk inserts, then keeps it current incrementally: from
+a change stream where the deployment supports one, otherwise by polling on
+``_id`` and run heartbeats. ``MirrorServer`` provides the local mongod (a
+Docker container, or an existing server given by URI).
+"""
+import json
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from pymongo import MongoClient
+from pymongo.errors import BulkWriteError, PyMongoError
+
+# Collections always mirrored; ``omniboard.*`` ones are added when present
+SACRED_COLLECTIONS = ("runs", "metrics")
+OMNIBOARD_PREFIX = "omniboard."
+GRIDFS_COLLECTIONS = ("fs.files", "fs.chunks")
+# Collection in the mirror holding the sync position per collection
+STATE_COLLECTION = "_altarviewer_mirror"
+
+
+class MirrorSync:
+    """Copies one database into a mirror and keeps it in sync."""
+
+    def __init__(
+        self,
+        source_db,
+        target_db,
+        include_gridfs: bool = False,
+        batch_size: int = 1000,
+        poll_interval: float = 5.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        """Initialize the sync.
+
+        Args:
+            source_db: pymongo Database to mirror (remote)
+            target_db: pymongo Database receiving the copy (local)
+            include_gridfs: Also mirror ``fs.files``/``fs.chunks`` (artifacts)
+            batch_size: Documents per bulk insert
+            poll_interval: Seconds between polls when change streams are
+                not available
+            clock: Time source, overridable for tests
+        """
+        self.source_db = source_db
+        self.target_db = target_db
+        self.include_gridfs = include_gridfs
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self.mode: Optional[str] = None  # "change_stream" or "polling"
+        self.error: Optional[str] = None
+        self.copied = 0
+        # Source time up to which the mirror is known to be complete
+        self.synced_at: Optional[float] = None
+        # Set once the initial copy of ``start`` finished (or failed)
+        self.initial_done = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # -- state ----------------------------------------------------------------
+    def _state(self, collection: str) -> dict:
+        return self.target_db[STATE_COLLECTION].find_one({"_id": collection}) or {}
+
+    def _save_state(self, collection: str, **fields):
+        self.target_db[STATE_COLLECTION].replace_one(
+            {"_id": collection}, {"_id": collection, **self._state(collection), **fields}, upsert=True
+        )
+
+    def collections(self) -> List[str]:
+        """Return the source collections this mirror copies."""
+        names = self.source_db.list_collection_names()
+        wanted = [c for c in SACRED_COLLECTIONS if c in names]
+        wanted += sorted(c for c in names if c.startswith(OMNIBOARD_PREFIX))
+        if self.include_gridfs:
+            wanted += [c for c in GRIDFS_COLLECTIONS if c in names]
+        return wanted
+
+    # -- copying --------------------------------------------------------------
+    def _insert_batch(self, collection: str, docs: List[dict]):
+        try:
+            self.target_db[collection].insert_many(docs, ordered=False)
+        except BulkWriteError as exc:
+            # Documents already present (e.g. a resumed copy) are fine
+            if any(e.get("code") != 11000 for e in exc.details.get("writeErrors", [])):
+                raise
+        self.copied += len(docs)
+
+    def _copy_new(self, collection: str) -> int:
+        """Bulk-copy documents with ``_id`` above the saved position."""
+        last_id = self._state(collection).get("last_id")
+        total = 0
+        while not self._stop.is_set():
+            query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+            docs = list(self.source_db[collection].find(query).sort("_id", 1).limit(self.batch_size))
+            if not docs:
+                break
+            self._insert_batch(collection, docs)
+            last_id = docs[-1]["_id"]
+            self._save_state(collection, last_id=last_id)
+            total += len(docs)
+        return total
+
+    def _replace(self, collection: str, docs: List[dict]):
+        target = self.target_db[collection]
+        for doc in docs:
+            target.replace_one({"_id": doc["_id"]}, doc, upsert=True)
+        self.copied += len(docs)
+
+    def _refresh_updated_runs(self) -> List:
+        """Replace the runs whose heartbeat is past the saved one; returns their IDs."""
+        last_hb = self._state("runs").get("last_heartbeat")
+        if last_hb is None:
+            return []
+        updated = list(self.source_db["runs"].find({"heartbeat": {"$gt": last_hb}}))
+        self._replace("runs", updated)
+        return [d["_id"] for d in updated]
+
+    def _refresh_metrics(self, run_ids: List) -> int:
+        """Copy the metrics of ``run_ids`` again (the observer appends to them in place)."""
+        if not run_ids:
+            return 0
+        docs = list(self.source_db["metrics"].find({"run_id": {"$in": run_ids}}))
+        self._replace("metrics", docs)
+        return len(docs)
+
+    def _refresh_all(self, collection: str) -> int:
+        """Replace a (small) collection entirely, dropping deleted documents."""
+        docs = list(self.source_db[collection].find())
+        self._replace(collection, docs)
+        self.target_db[collection].delete_many({"_id": {"$nin": [d["_id"] for d in docs]}})
+        return len(docs)
+
+    def initial_sync(self, progress: Optional[Callable[[str, int], None]] = None) -> int:
+        """Copy every mirrored collection (resuming an interrupted copy).
+
+        A mirror kept from an earlier session also catches up on what
+        changed meanwhile, as ``sync_once`` does: runs whose heartbeat moved
+        and their metrics are copied again, ``omniboard.*`` refreshed.
+
+        Args:
+            progress: Called with (collection, documents copied) after each one
+
+        Returns:
+            Number of documents copied
+        """
+        started = self.clock()
+        total = 0
+        changed_runs: List = []
+        for collection in self.collections():
+            if collection == "runs":
+                # Read first: a run updated during the copy is copied again later
+                heartbeat = self._max_heartbeat()
+                changed_runs = self._refresh_updated_runs()
+                copied = len(changed_runs) + self._copy_new("runs")
+                self._save_state("runs", last_heartbeat=heartbeat)
+            elif collection == "metrics":
+                copied = self._refresh_metrics(changed_runs) + self._copy_new("metrics")
+            elif collection.startswith(OMNIBOARD_PREFIX) and self._state(collection):
+                copied = self._refresh_all(collection)
+            else:
+                copied = self._copy_new(collection)
+            total += copied
+            if progress:
+                progress(collection, copied)
+        self.synced_at = started
+        return total
+
+    def _max_heartbeat(self):
+        docs = list(self.source_db["runs"].find({"heartbeat": {"$ne": None}}, {"heartbeat": 1})
+                    .sort("heartbeat", -1).limit(1))
+        return docs[0]["heartbeat"] if docs else None
+
+    def sync_once(self) -> int:
+        """One polling round; returns the number of documents written.
+
+        New documents are found by ``_id``. Runs updated since the last
+        round are found by their Sacred heartbeat, and their metrics are
+        copied again (the observer appends to them in place). Small
+        ``omniboard.*`` collections are refreshed entirely.
+        """
+        started = self.clock()
+        written = 0
+        changed_runs: List = []
+        names = self.collections()
+        if "runs" in names:
+            changed_runs = self._refresh_updated_runs()
+            written += len(changed_runs)
+            written += self._copy_new("runs")
+            self._save_state("runs", last_heartbeat=self._max_heartbeat())
+        for collection in names:
+            if collection == "runs":
+                continue
+            if collection.startswith(OMNIBOARD_PREFIX):
+                written += self._refresh_all(collection)
+                continue
+            if collection == "metrics":
+                written += self._refresh_metrics(changed_runs)
+            written += self._copy_new(collection)
+        self.synced_at = started
+        return written
+
+    def _apply_change(self, change: dict):
+        collection = change.get("ns", {}).get("coll")
+        if collection not in SACRED_COLLECTIONS and not (collection or "").startswith(OMNIBOARD_PREFIX) \
+                and not (self.include_gridfs and collection in GRIDFS_COLLECTIONS):
+            return
+        op = change.get("operationType")
+        key = change.get("documentKey", {})
+        if op == "delete":
+            self.target_db[collection].delete_one(key)
+        elif change.get("fullDocument") is not None:
+            self._replace(collection, [change["fullDocument"]])
+        cluster_time = change.get("clusterTime")
+        if cluster_time is not None and hasattr(cluster_time, "time"):
+            self.synced_at = float(cluster_time.time)
+
+    # -- background -----------------------------------------------------------
+    def start(self, initial: bool = True, progress: Optional[Callable[[str, int], None]] = None):
+        """Sync in a background thread until ``stop``.
+
+        The change stream is opened before the initial copy, so writes made
+        during the copy are applied afterwards. ``initial_done`` is set
+        when the copy finished (check ``error``).
+
+        Args:
+            initial: Run the initial copy first (on the thread)
+            progress: Passed to ``initial_sync``
+        """
+        self._thread = threading.Thread(target=self._run, args=(initial, progress),
+                                        name="mirror-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, initial: bool, progress: Optional[Callable[[str, int], None]] = None):
+        stream = None
+        try:
+            try:
+                # Opened before the copy so no change in between is missed
+                stream = self.source_db.watch(full_document="updateLookup", max_await_time_ms=1000)
+            except PyMongoError:
+                stream = None
+            if initial:
+                self.initial_sync(progress)
+        except Exception as exc:  # reported through status() and mirror()
+            self.error = str(exc)
+            if stream is not None:
+                stream.close()
+            return
+        finally:
+            self.initial_done.set()
+        try:
+            if stream is not None:
+                self.mode = "change_stream"
+                with stream:
+                    while not self._stop.is_set() and stream.alive:
+                        change = stream.try_next()
+                        if change is None:
+                            self.synced_at = self.clock()
+                        else:
+                            self._apply_change(change)
+                return
+            self.mode = "polling"
+            while not self._stop.wait(self.poll_interval):
+                self.sync_once()
+        except PyMongoError as exc:
+            self.error = str(exc)
+
+    def lag_seconds(self) -> Optional[float]:
+        """Seconds the mirror may be behind the source (None before the first sync)."""
+        if self.synced_at is None:
+            return None
+        return max(0.0, self.clock() - self.synced_at)
+
+    def status(self) -> dict:
+        """Return ``{"mode", "copied", "lag_seconds", "error"}``."""
+        return {"mode": self.mode, "copied": self.copied,
+                "lag_seconds": self.lag_seconds(), "error": self.error}
+
+
+class MirrorServer:
+    """The local mongod holding mirrors.
+
+    By default a ``mongo`` container on a private Docker network (so the
+    Omniboard container reaches it by name) with a named volume (so mirrors
+    survive restarts); an existing local server can be used instead.
+    """
+
+    CONTAINER = "altarviewer_mirror"
+    NETWORK = "altarviewer"
+    VOLUME = "altarviewer-mirror"
+    IMAGE = "mongo:7"
+    # Port lease key and preferred host port of the container
+    PORT_LEASE = "__mirror__"
+    PREFERRED_PORT = 27117
+
+    def __init__(self, run: Callable[..., object], allocate_port: Callable[[], int],
+                 uri: Optional[str] = None):
+        """Initialize the server handle.
+
+        Args:
+            run: ``DockerExecutor.run``-compatible callable
+            allocate_port: Returns the host port to publish the container on
+            uri: Existing mongod to use instead of a container
+        """
+        self.run = run
+        self.allocate_port = allocate_port
+        self.uri = uri
+        self.host_port: Optional[int] = None
+
+    def ensure(self, timeout: float = 60.0) -> Tuple[str, Optional[str]]:
+        """Start the mirror server if needed and wait until it answers.
+
+        Returns:
+            (URI reachable from this host, URI for containers on ``NETWORK``
+            or None when an external server is used)
+
+        Raises:
+            RuntimeError: If the server cannot be started or does not answer
+        """
+        if self.uri:
+            self._wait_ready(self.uri, timeout)
+            return self.uri, None
+        self.run(["network", "create", self.NETWORK])  # fails harmlessly if it exists
+        # Port bindings (unlike published ports) survive a stopped container
+        state = self.run(["inspect", "--format",
+                          "{{.State.Status}}|{{json .HostConfig.PortBindings}}", self.CONTAINER])
+        if state.returncode == 0:
+            status, _, ports = state.stdout.strip().partition("|")
+            self.host_port = self._published_port(ports)
+            if status != "running":
+                result = self.run(["start", self.CONTAINER], timeout=30.0)
+                if result.returncode != 0:
+                    raise RuntimeError(f"Cannot start the mirror MongoDB: {result.stderr.strip()}")
+        else:
+            self.host_port = self.allocate_port()
+            result = self.run([
+                "run", "-d", "--name", self.CONTAINER,
+                "--network", self.NETWORK,
+                "-v", f"{self.VOLUME}:/data/db",
+                "-p", f"127.0.0.1:{self.host_port}:27017",
+                self.IMAGE,
+            ], timeout=120.0)
+            if result.returncode != 0:
+                raise RuntimeError(f"Cannot start the mirror MongoDB: {result.stderr.strip()}")
+        if self.host_port is None:
+            raise RuntimeError("The mirror MongoDB container publishes no port")
+        host_uri = f"mongodb://127.0.0.1:{self.host_port}/"
+        self._wait_ready(host_uri, timeout)
+        return host_uri, f"mongodb://{self.CONTAINER}:27017/"
+
+    @staticmethod
+    def _published_port(ports_json: str) -> Optional[int]:
+        try:
+            bindings = (json.loads(ports_json or "null") or {}).get("27017/tcp") or []
+            return int(bindings[0]["HostPort"]) if bindings else None
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+            return None
+
+    @staticmethod
+    def _wait_ready(uri: str, timeout: float):
+        deadline = time.monotonic() + timeout
+        while True:
+            client = MongoClient(uri, serverSelectionTimeoutMS=1000)
+            try:
+                client.admin.command("ping")
+                return
+            except PyMongoError as exc:
+                if time.monotonic() >= deadline:
+                    raise RuntimeError(f"Mirror MongoDB at {urlparse(uri).netloc} did not answer: {exc}")
+            finally:
+                client.close()
+            time.sleep(0.5)
+
+
+class MirrorManager:
+    """Keeps one ``MirrorSync`` per database on a shared ``MirrorServer``."""
+
+    def __init__(self, server: MirrorServer, client_factory: Callable[[str], MongoClient] = MongoClient):
+        """Initialize the manager.
+
+        Args:
+            server: Local mongod receiving the mirrors
+            client_factory: Creates the client for the mirror server
+        """
+        self.server = server
+        self.client_factory = client_factory
+        self._client: Optional[MongoClient] = None
+        self._host_uri: Optional[str] = None
+        self._container_uri: Optional[str] = None
+        self._syncs: Dict[str, MirrorSync] = {}
+        self._lock = threading.Lock()
+
+    def mirror(self, db_name: str, source_db,
+               progress: Optional[Callable[[str, int], None]] = None,
+               from_host: bool = False) -> Tuple[str, Optional[str]]:
+        """Mirror ``db_name``, returning once the initial copy is done.
+
+        Args:
+            db_name: Database to mirror
+            source_db: pymongo Database on the remote server
+            progress: Passed to ``MirrorSync.initial_sync`` (called on the sync thread)
+            from_host: Return the URI for a process on this host rather
+                than for a container (native runtime)
+
+        Returns:
+            (mirror URI for Omniboard including the database, Docker network
+            to attach Omniboard to or None for an external mirror server)
+
+        Raises:
+            RuntimeError: If the initial copy failed
+        """
+        with self._lock:
+            if self._client is None:
+                self._host_uri, self._container_uri = self.server.ensure()
+                self._client = self.client_factory(self._host_uri)
+            sync = self._syncs.get(db_name)
+        if sync is None or sync.error:
+            sync = MirrorSync(source_db, self._client[db_name])
+            # The sync thread copies after opening its change stream
+            sync.start(initial=True, progress=progress)
+            sync.initial_done.wait()
+            if sync.error:
+                sync.stop()
+                raise RuntimeError(f"Mirroring '{db_name}' failed: {sync.error}")
+            with self._lock:
+                self._syncs[db_name] = sync
+        if from_host or not self._container_uri:
+            return self._host_uri.rstrip("/") + "/" + db_name, None
+        base, network = self._container_uri, self.server.NETWORK
+        return base.rstrip("/") + "/" + db_name, network
+
+    def status(self, db_name: str) -> Optional[dict]:
+        """Return the ``MirrorSync.status`` of ``db_name`` (None if not mirrored)."""
+        sync = self._syncs.get(db_name)
+        return sync.status() if sync else None
+
+    def stop_all(self):
+        """Stop every sync; the mirror server and its data are kept."""
+        with self._lock:
+            for sync in self._syncs.values():
+                sync.stop()
+            self._syncs.clear()
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+
+def lag_text(status: Dict[str, object]) -> str:
+    """Human-readable mirror status for the GUI."""
+    if status.get("error"):
+        return f"sync stopped: {status['error']}"
+    lag = status.get("lag_seconds")
+    if lag is None:
+        return "initial copy in progress…"
+    mode = "live" if status.get("mode") == "change_stream" else "polling"
+    return f"lag {lag:.0f} s ({mode})"
@@ -1,18 +1,51 @@
 """MongoDB client management."""
 from pymongo import MongoClient
-from pymongo.errors import OperationFailure
-from typing import List, Optional
+from pymongo.errors import OperationFailure, PyMongoError
+from typing import Callable, Dict, List, Optional
 from urllib.parse import urlparse, parse_qs
 import importlib.util
+import itertools
+import threading
+import time
+
+try:
+    from .analyzer import OrphanAnalyzer
+    from .artifacts import ArtifactDownload, list_artifacts
+    from .prefs import CONFIG_DIR
+    from .srvcache import SrvCache, srv_target
+    from .tracing import span, traced
+except ImportError:
+    from analyzer import OrphanAnalyzer
+    from artifacts import ArtifactDownload, list_artifacts
+    from prefs import CONFIG_DIR
+    from srvcache import SrvCache, srv_target
+    from tracing import span, traced
+
+# Longest a connect waits for an in-flight speculative attempt before
+# connecting on its own (runs on the UI thread)
+SPECULATION_WAIT_SECONDS = 3.0
 
 
 class MongoDBClient:
     """Handles MongoDB connections and database operations."""
     
-    def __init__(self):
-        """Initialize MongoDB client."""
+    def __init__(self, srv_cache: Optional[SrvCache] = None):
+        """Initialize MongoDB client.
+
+        Args:
+            srv_cache: Resolution cache for mongodb+srv URIs (disk-backed
+                in the config directory by default)
+        """
         self.client: Optional[MongoClient] = None
         self.uri: Optional[str] = None
+        # Direct mongodb:// seed-list equivalent of an SRV URI (if any)
+        self.resolved_uri: Optional[str] = None
+        self.srv_cache = srv_cache if srv_cache is not None else SrvCache(CONFIG_DIR / "srv_cache.json")
+        # Timing of the last connect: {"seconds": float, "srv_cache": "hit"|"miss"|None}
+        self.last_connect_stats: dict = {}
+        self.watcher: Optional["DeploymentWatcher"] = None
+        self._speculation: Optional["_Speculation"] = None
+        self._speculation_lock = threading.Lock()
     
     def connect_by_port(self, port: str = "27017") -> List[str]:
         """Connect to MongoDB using localhost and port.
@@ -26,8 +59,29 @@ class MongoDBClient:
         Raises:
             Exception: If connection fails
         """
-        self.uri = f"mongodb://localhost:{port}/"
+        self.uri = self.port_uri(port)
         return self._connect()
+
+    @staticmethod
+    def port_uri(port: str = "27017") -> str:
+        """Return the localhost URI used in Port mode."""
+        return f"mongodb://localhost:{port}/"
+
+    @staticmethod
+    def normalize_url(url: str) -> str:
+        """Add the mongodb:// scheme to a URL that has none."""
+        if not url.startswith("mongodb://") and not url.startswith("mongodb+srv://"):
+            url = "mongodb://" + url
+        return url
+
+    def set_target(self, uri: str):
+        """Point the client at a URI without connecting.
+
+        Lets callers launch Omniboard for a cached database before the
+        connection is (re)established.
+        """
+        self.uri = self.normalize_url(uri)
+        self.resolved_uri = None
     
     def connect_by_url(self, url: str) -> List[str]:
         """Connect to MongoDB using full URL.
@@ -45,8 +99,7 @@ class MongoDBClient:
             raise ValueError("URL cannot be empty")
         
         # Ensure proper protocol
-        if not url.startswith("mongodb://") and not url.startswith("mongodb+srv://"):
-            url = "mongodb://" + url
+        url = self.normalize_url(url)
 
         # If using SRV, ensure dnspython is available (required by PyMongo)
         parsed = urlparse(url)
@@ -60,6 +113,67 @@ class MongoDBClient:
         self.uri = url
         return self._connect()
     
+    def speculate(self, uri: str):
+        """Start connecting to ``uri`` in the background.
+
+        Server selection and database listing run on a worker thread; a later
+        ``connect_by_port``/``connect_by_url`` for the same URI adopts the warm
+        client (waiting for it if still in flight). Any previous speculative
+        attempt is cancelled and its client closed.
+
+        Args:
+            uri: Connection URI (the scheme is added if missing)
+        """
+        uri = self.normalize_url(uri)
+        with self._speculation_lock:
+            current = self._speculation
+            if current is not None and current.uri == uri and not current.cancelled:
+                return
+            self._speculation = None
+        if current is not None:
+            current.cancel()
+        if urlparse(uri).scheme == "mongodb+srv" and importlib.util.find_spec("dns") is None:
+            return
+        speculation = _Speculation(uri, self._seedlist_for)
+        with self._speculation_lock:
+            self._speculation = speculation
+        speculation.start()
+
+    def cancel_speculation(self):
+        """Cancel the background connect attempt, if any."""
+        with self._speculation_lock:
+            current, self._speculation = self._speculation, None
+        if current is not None:
+            current.cancel()
+
+    def _adopt_speculation(self) -> Optional[List[str]]:
+        """Take over a successful speculative connection to ``self.uri``.
+
+        Returns:
+            The database names it listed, or None if there is nothing to adopt
+            (no attempt for this URI, it failed, or it did not finish within
+            ``SPECULATION_WAIT_SECONDS``)
+        """
+        with self._speculation_lock:
+            speculation, self._speculation = self._speculation, None
+        if speculation is None:
+            return None
+        if speculation.uri != self.uri:
+            speculation.cancel()
+            return None
+        if not speculation.done.wait(SPECULATION_WAIT_SECONDS):
+            # Stuck (e.g. on DNS); connect normally instead
+            speculation.cancel()
+            return None
+        if speculation.error is not None or speculation.client is None:
+            # Retry for real; the failure may have been transient
+            speculation.cancel()
+            return None
+        self.client = speculation.client
+        self.resolved_uri = speculation.resolved_uri
+        return speculation.databases
+
+    @traced("mongo.connect")
     def _connect(self) -> List[str]:
         """Internal method to establish connection and list databases.
         
@@ -69,14 +183,32 @@ class MongoDBClient:
         Raises:
             Exception: If connection fails
         """
+        self.stop_watching()
         if self.client:
             self.client.close()
-        
-        self.client = MongoClient(self.uri, serverSelectionTimeoutMS=3000)
+            self.client = None
+
+        started = time.perf_counter()
+        with span("mongo.adopt_speculation"):
+            dbs = self._adopt_speculation()
+        if dbs is not None:
+            self.last_connect_stats = {
+                "seconds": time.perf_counter() - started,
+                "srv_cache": None,
+                "speculative": True,
+            }
+            return dbs
+        srv_state = self._resolve_srv()
+        with span("mongo.client_init"):
+            self.client = MongoClient(self.resolved_uri or self.uri, serverSelectionTimeoutMS=3000)
         try:
             # Standard behaviour: attempt to list all databases. This
             # requires appropriate permissions (typically admin-level).
-            return self.client.list_database_names()
+            # Server selection happens lazily on this first operation.
+            with span("mongo.server_selection_and_list"):
+                dbs = self.client.list_database_names()
+            self._record_connect(started, srv_state)
+            return dbs
         except OperationFailure as exc:
             # Some deployments (Atlas/VM with non-admin user) forbid
             # listDatabases. Fall back to the database inside the URI
@@ -85,6 +217,7 @@ class MongoDBClient:
             if "listdatabases" in msg or "not authorized" in msg or "command listdatabases" in msg:
                 _, _, database = self.parse_connection_url()
                 if database:
+                    self._record_connect(started, srv_state)
                     return [database]
                 # If no DB path was provided, try to infer from authSource
                 try:
@@ -92,12 +225,47 @@ class MongoDBClient:
                     params = parse_qs(parsed.query)
                     auth_source = params.get("authSource", [None])[0]
                     if auth_source:
+                        self._record_connect(started, srv_state)
                         return [auth_source]
                 except Exception:
                     pass
             # Otherwise, re-raise the original error
             raise
+        except Exception:
+            # A stale cached seed list may point at retired hosts; resolve
+            # afresh on the next attempt.
+            if srv_state == "hit":
+                self.srv_cache.invalidate(*srv_target(self.uri))
+            raise
+
+    def _record_connect(self, started: float, srv_state: Optional[str]):
+        self.last_connect_stats = {
+            "seconds": time.perf_counter() - started,
+            "srv_cache": srv_state,
+        }
+
+    @traced("mongo.srv_resolve")
+    def _resolve_srv(self) -> Optional[str]:
+        """Resolve an SRV URI into a seed-list URI, through the cache.
+
+        Returns:
+            "hit" or "miss" for SRV URIs, None for plain mongodb:// URIs
+        """
+        self.resolved_uri, state = self._seedlist_for(self.uri)
+        return state
+
+    def _seedlist_for(self, uri: Optional[str]) -> tuple[Optional[str], Optional[str]]:
+        """Return (seed-list URI or None, "hit"/"miss"/None) for a URI."""
+        if not uri or urlparse(uri).scheme != "mongodb+srv":
+            return None, None
+        try:
+            resolved, cached = self.srv_cache.to_seedlist_uri(uri)
+        except Exception:
+            # Let PyMongo resolve (and report) the SRV record itself
+            return None, None
+        return resolved, "hit" if cached else "miss"
     
+    @traced("mongo.parse_connection_url")
     def parse_connection_url(self) -> tuple[str, int, Optional[str]]:
         """Parse the current connection URL.
         
@@ -108,8 +276,11 @@ class MongoDBClient:
             return "localhost", 27017, None
         
         parsed = urlparse(self.uri)
-        host = parsed.hostname or "localhost"
-        port = parsed.port or 27017
+        # Multi-host seed lists: report the first host
+        first = parsed.netloc.rpartition("@")[2].split(",")[0]
+        parsed_first = urlparse(f"//{first}")
+        host = parsed_first.hostname or "localhost"
+        port = parsed_first.port or 27017
         database = parsed.path.strip("/") if parsed.path else None
         database = database if database else None  # Convert empty string to None
         
@@ -118,9 +289,312 @@ class MongoDBClient:
     def get_connection_uri(self) -> Optional[str]:
         """Return the current MongoDB connection URI (if any)."""
         return self.uri
+
+    def get_launch_uri(self) -> Optional[str]:
+        """Return the URI to hand to Omniboard.
+
+        For SRV URIs this is the resolved ``mongodb://`` seed list, so the
+        container does not have to repeat the DNS lookups.
+        """
+        return self.resolved_uri or self.uri
     
+    def watch_deployment(
+        self,
+        databases: List[str],
+        on_change: Callable[[dict], None],
+        poll_interval: float = 5.0,
+        selected: Optional[str] = None,
+    ) -> "DeploymentWatcher":
+        """Start watching the connected deployment for new databases and runs.
+
+        Args:
+            databases: Database names already known to the caller
+            on_change: Called from the watcher thread with one event dict per
+                change (see DeploymentWatcher)
+            poll_interval: Seconds between polls when change streams are
+                not available (standalone servers)
+            selected: Database whose runs are counted (see ``DeploymentWatcher.select``)
+
+        Returns:
+            The running watcher
+
+        Raises:
+            RuntimeError: If not connected
+        """
+        if not self.client:
+            raise RuntimeError("Not connected to MongoDB")
+        self.stop_watching()
+        self.watcher = DeploymentWatcher(self.client, databases, on_change, poll_interval, selected)
+        self.watcher.start()
+        return self.watcher
+
+    def list_artifacts(self, db_name: str, run_id=None) -> List[dict]:
+        """List the GridFS artifacts of a run (or of all runs) in ``db_name``.
+
+        Only ``fs.files`` is read, with a projection (see ``artifacts.list_artifacts``).
+
+        Raises:
+            RuntimeError: If not connected
+        """
+        if not self.client:
+            raise RuntimeError("Not connected to MongoDB")
+        return list_artifacts(self.client[db_name], run_id)
+
+    def artifact_download(self, db_name: str, file_id, dest, workers: int = 4,
+                          progress: Optional[Callable[[int, int], None]] = None) -> ArtifactDownload:
+        """Prepare a resumable, parallel download of a GridFS file to ``dest``.
+
+        Call ``run()`` on the result (from a worker thread) to download;
+        ``cancel()`` stops it, and a later download to the same path resumes.
+
+        Raises:
+            RuntimeError: If not connected
+        """
+        if not self.client:
+            raise RuntimeError("Not connected to MongoDB")
+        return ArtifactDownload(self.client[db_name], file_id, dest, workers=workers, progress=progress)
+
+    def orphan_analyzer(self, db_name: str) -> OrphanAnalyzer:
+        """Return an analyzer of the orphaned metrics, chunks and files of ``db_name``.
+
+        Raises:
+            RuntimeError: If not connected
+        """
+        if not self.client:
+            raise RuntimeError("Not connected to MongoDB")
+        return OrphanAnalyzer(self.client[db_name])
+
+    def adopt_connection(self, other: "MongoDBClient"):
+        """Take over the connection ``other`` established, closing our own.
+
+        Lets a connect made on a separate client (e.g. a background refresh)
+        become the current connection once the caller decides to keep it.
+        ``other`` is left disconnected.
+        """
+        self.stop_watching()
+        if self.client and self.client is not other.client:
+            self.client.close()
+        self.client, other.client = other.client, None
+        self.uri = other.uri
+        self.resolved_uri = other.resolved_uri
+        self.last_connect_stats = dict(other.last_connect_stats)
+
+    def stop_watching(self):
+        """Stop the deployment watcher, if any."""
+        if self.watcher:
+            self.watcher.stop()
+            self.watcher = None
+
     def close(self):
         """Close the MongoDB connection."""
+        self.stop_watching()
+        self.cancel_speculation()
         if self.client:
             self.client.close()
-            self.client = None
\ No newline at end of file
+            self.client = None
+
+
+class _Speculation:
+    """One background connect attempt started by ``MongoDBClient.speculate``."""
+
+    def __init__(self, uri: str, seedlist_for: Callable[[str], tuple]):
+        self.uri = uri
+        self.seedlist_for = seedlist_for
+        self.client: Optional[MongoClient] = None
+        self.resolved_uri: Optional[str] = None
+        self.databases: Optional[List[str]] = None
+        self.error: Optional[BaseException] = None
+        self.cancelled = False
+        self.done = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        threading.Thread(target=self._run, name="mongo-speculate", daemon=True).start()
+
+    def _run(self):
+        client = None
+        try:
+            with span("mongo.speculative_connect"):
+                self.resolved_uri, _ = self.seedlist_for(self.uri)
+                client = MongoClient(self.resolved_uri or self.uri, serverSelectionTimeoutMS=3000)
+                if not self.cancelled:
+                    self.databases = client.list_database_names()
+        except Exception as exc:
+            self.error = exc
+        with self._lock:
+            if self.cancelled or self.error is not None:
+                if client is not None:
+                    client.close()
+                client = None
+            self.client = client
+        self.done.set()
+
+    def cancel(self):
+        """Discard the attempt, closing its client once it finishes."""
+        with self._lock:
+            self.cancelled = True
+            client, self.client = self.client, None
+        if client is not None:
+            client.close()
+
+
+class DeploymentWatcher:
+    """Tracks the databases of a deployment, and the runs of one, incrementally.
+
+    Uses a cluster-wide change stream when the deployment supports it
+    (replica sets, sharded clusters) and falls back to polling
+    ``listDatabases`` on standalone servers. The change stream only sees
+    ``runs`` inserts and deletes and dropped databases, so a new database
+    shows up with its first run. Runs are only counted in the
+    selected database, so a poll costs one command whatever the number of
+    databases. The database list given to the constructor is the baseline:
+    nothing is reported for it, only later changes. Each change is reported
+    to ``on_change`` as a dict tagged with the watcher's ``generation``:
+
+    - ``{"type": "added", "database": name, "runs": None}``
+    - ``{"type": "removed", "database": name}``
+    - ``{"type": "runs", "database": name, "runs": count}``
+
+    ``stop`` does not wait for the thread, so a stopped watcher may still
+    report a change or two; callers drop events of other generations.
+    """
+
+    RUNS_COLLECTION = "runs"
+    _generations = itertools.count(1)
+
+    def __init__(
+        self,
+        client: MongoClient,
+        databases: List[str],
+        on_change: Callable[[dict], None],
+        poll_interval: float = 5.0,
+        selected: Optional[str] = None,
+    ):
+        self.client = client
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self.databases = set(databases)
+        self.selected = selected
+        # Selected by ``select``: its count is reported even if unchanged
+        self._announce: Optional[str] = None
+        self.generation = next(self._generations)
+        # Last counts of the databases counted so far
+        self.run_counts: Dict[str, Optional[int]] = {}
+        self.mode: Optional[str] = None  # "change_stream" or "polling"
+        self._stop = threading.Event()
+        # Set to poll (and count the selected database) right away
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start the watcher thread."""
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Ask the watcher thread to exit."""
+        self._stop.set()
+        self._wake.set()
+
+    def select(self, db_name: Optional[str]):
+        """Count the runs of ``db_name`` (reported at once) instead of the previous selection."""
+        self.selected = db_name
+        self._announce = db_name
+        self._wake.set()
+
+    def _count_runs(self, db_name: str) -> Optional[int]:
+        try:
+            return self.client[db_name][self.RUNS_COLLECTION].estimated_document_count()
+        except PyMongoError:
+            return None
+
+    def _emit(self, event: dict):
+        event["generation"] = self.generation
+        try:
+            self.on_change(event)
+        except Exception:
+            pass
+
+    def _set_runs(self, db_name: str, count: Optional[int], report: bool = True):
+        changed = db_name in self.run_counts and self.run_counts[db_name] != count
+        self.run_counts[db_name] = count
+        if report and (changed or self._announce == db_name):
+            if self._announce == db_name:
+                self._announce = None
+            self._emit({"type": "runs", "database": db_name, "runs": count})
+
+    def _count_selected(self, report: bool = True):
+        db_name = self.selected
+        if db_name is not None and db_name in self.databases and not self._stop.is_set():
+            self._set_runs(db_name, self._count_runs(db_name), report)
+
+    def _add(self, db_name: str):
+        self.databases.add(db_name)
+        self._emit({"type": "added", "database": db_name, "runs": None})
+
+    def _remove(self, db_name: str):
+        self.databases.discard(db_name)
+        self.run_counts.pop(db_name, None)
+        self._emit({"type": "removed", "database": db_name})
+
+    def _run(self):
+        # The first pass only records the baseline
+        self._count_selected(report=False)
+        try:
+            self._watch_change_stream()
+        except PyMongoError:
+            # Standalone servers (and users without changeStream privileges)
+            # cannot open a cluster-wide change stream.
+            self._poll()
+
+    def _watch_change_stream(self):
+        # Filtered and trimmed on the server: inserts carry the whole document
+        # (metrics, 255 KB GridFS chunks), and only the namespace is needed
+        pipeline = [
+            {"$match": {"$or": [
+                {"operationType": "dropDatabase"},
+                {"operationType": {"$in": ["insert", "delete"]}, "ns.coll": self.RUNS_COLLECTION},
+            ]}},
+            {"$project": {"operationType": 1, "ns": 1}},
+        ]
+        with self.client.watch(pipeline, max_await_time_ms=1000) as stream:
+            self.mode = "change_stream"
+            while not self._stop.is_set() and stream.alive:
+                if self._wake.is_set():
+                    self._wake.clear()
+                    self._count_selected()
+                change = stream.try_next()
+                if change is None:
+                    continue
+                ns = change.get("ns", {})
+                db_name = ns.get("db")
+                if not db_name:
+                    continue
+                op = change.get("operationType")
+                if op == "dropDatabase":
+                    if db_name in self.databases:
+                        self._remove(db_name)
+                elif db_name not in self.databases:
+                    self._add(db_name)
+                elif ns.get("coll") == self.RUNS_COLLECTION and db_name == self.selected \
+                        and self.run_counts.get(db_name) is not None:
+                    delta = 1 if op == "insert" else -1
+                    self._set_runs(db_name, max(0, self.run_counts[db_name] + delta))
+
+    def _poll(self):
+        self.mode = "polling"
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            try:
+                names = set(self.client.list_database_names())
+            except PyMongoError:
+                # listDatabases may be forbidden; keep the known set
+                names = set(self.databases)
+            for db_name in sorted(self.databases - names):
+                self._remove(db_name)
+            for db_name in sorted(names - self.databases):
+                self._add(db_name)
+            self._count_selected()
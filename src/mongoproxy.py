@@ -0,0 +1,477 @@
+"""Caching MongoDB wire-protocol proxy between Omniboard and a remote server.
+
+Omniboard connects to ``MongoProxy`` instead of the real server. Every
+message is forwarded as is (authentication included), except that
+read-only ``find``/``aggregate`` commands on the Sacred ``runs`` and
+``metrics`` collections are answered from a short-lived, size-bounded LRU
+cache when an identical command was answered recently. Dashboard refreshes,
+including those of several browser tabs or users, then cost a local round
+trip instead of a WAN one. Writes through the proxy drop the cached
+replies of the collection they touch.
+
+Only OP_MSG is inspected; compressed and legacy messages are forwarded
+untouched. Replies are cached only when they hold the complete result
+(cursor id 0), so cursors never outlive the upstream connection.
+
+The cache is only used by connections that authenticated through the proxy
+(a successful SASL exchange, possibly started speculatively in ``hello``,
+or an X.509 ``authenticate``), and is keyed by the authenticated user, so
+a client never gets replies the server would not have given it.
+"""
+import socket
+import ssl
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+import bson
+
+OP_MSG = 2013
+# OP_MSG flag bits
+CHECKSUM_PRESENT = 1
+MORE_TO_COME = 1 << 1
+
+CACHED_COLLECTIONS = frozenset({"runs", "metrics"})
+CACHED_COMMANDS = frozenset({"find", "aggregate"})
+WRITE_COMMANDS = frozenset({"insert", "update", "delete", "findAndModify", "findandmodify"})
+# Per-request fields that do not change the result
+_VOLATILE_FIELDS = ("lsid", "$clusterTime", "signature", "$readPreference")
+# Aggregation stages that write, making the command uncacheable
+_WRITE_STAGES = ("$out", "$merge")
+
+_HEADER = struct.Struct("<iiii")
+_FLAGS = struct.Struct("<I")
+
+
+def read_message(sock: socket.socket) -> Optional[bytes]:
+    """Read one wire-protocol message (header included); None on EOF."""
+    header = _recv_exact(sock, _HEADER.size)
+    if header is None:
+        return None
+    length = _HEADER.unpack(header)[0]
+    body = _recv_exact(sock, length - _HEADER.size)
+    if body is None:
+        return None
+    return header + body
+
+
+def _recv_exact(sock: socket.socket, size: int) -> Optional[bytes]:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 16))
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def encode_op_msg(body: bytes, request_id: int, response_to: int = 0, flags: int = 0) -> bytes:
+    """Build an OP_MSG with a single body section (BSON bytes)."""
+    payload = _FLAGS.pack(flags) + b"\x00" + body
+    return _HEADER.pack(_HEADER.size + len(payload), request_id, response_to, OP_MSG) + payload
+
+
+def parse_op_msg(message: bytes) -> Optional[Tuple[int, bytes, bool]]:
+    """Split an OP_MSG into (flags, body BSON bytes, has document sequences).
+
+    Returns:
+        None if the message is not an OP_MSG
+    """
+    if _HEADER.unpack_from(message)[3] != OP_MSG:
+        return None
+    flags = _FLAGS.unpack_from(message, _HEADER.size)[0]
+    end = len(message) - (4 if flags & CHECKSUM_PRESENT else 0)
+    pos = _HEADER.size + _FLAGS.size
+    body = None
+    sequences = False
+    while pos < end:
+        kind = message[pos]
+        size = struct.unpack_from("<i", message, pos + 1)[0]
+        if kind == 0:
+            body = message[pos + 1:pos + 1 + size]
+        else:
+            sequences = True
+        pos += 1 + size
+    return (flags, body, sequences) if body is not None else None
+
+
+def header_ids(message: bytes) -> Tuple[int, int]:
+    """Return (requestID, responseTo) of a message."""
+    _, request_id, response_to, _ = _HEADER.unpack_from(message)
+    return request_id, response_to
+
+
+class ReplyCache:
+    """LRU cache of command replies bounded by total size, with a TTL."""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl: float = 10.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """Initialize the cache.
+
+        Args:
+            max_bytes: Upper bound of the cached reply bytes
+            ttl: Seconds a reply is served from the cache
+            clock: Time source, overridable for tests
+        """
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[bytes, Tuple[float, str, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: bytes) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self.clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            if entry is not None:
+                self._drop(key)
+            self.misses += 1
+            return None
+
+    def put(self, key: bytes, namespace: str, reply: bytes):
+        if len(reply) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (self.clock() + self.ttl, namespace, reply)
+            self.size += len(reply)
+            while self.size > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate(self, namespace: str):
+        """Drop every reply cached for ``namespace`` ("db.collection")."""
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if e[1] == namespace]:
+                self._drop(key)
+
+    def _drop(self, key: bytes):
+        self.size -= len(self._entries.pop(key)[2])
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self.size,
+                    "hits": self.hits, "misses": self.misses}
+
+
+def classify(body: dict) -> Tuple[Optional[str], Optional[str]]:
+    """Return (kind, namespace) of a command: kind is "read", "write" or None.
+
+    "read" marks a cacheable find/aggregate on a Sacred collection; "write"
+    a write on one.
+    """
+    if not body:
+        return None, None
+    command = next(iter(body))
+    collection = body.get(command)
+    if not isinstance(collection, str) or collection not in CACHED_COLLECTIONS:
+        return None, None
+    namespace = f"{body.get('$db')}.{collection}"
+    if command in WRITE_COMMANDS:
+        return "write", namespace
+    if command not in CACHED_COMMANDS or "txnNumber" in body:
+        return None, namespace
+    if command == "aggregate" and any(
+        stage in step for step in body.get("pipeline", []) for stage in _WRITE_STAGES
+    ):
+        return "write", namespace
+    return "read", namespace
+
+
+def cache_key(body: dict, identity: Tuple[str, str]) -> bytes:
+    """Stable key of a command run as ``identity`` (authentication database,
+    user name): its BSON without per-request fields."""
+    return bson.encode({"$identity": list(identity),
+                        **{k: v for k, v in body.items() if k not in _VOLATILE_FIELDS}})
+
+
+def sasl_user(mechanism: Optional[str], payload) -> Optional[str]:
+    """Return the user name of a SASL client-first payload (SCRAM or PLAIN)."""
+    try:
+        text = bytes(payload).decode("utf-8")
+    except (TypeError, ValueError):
+        return None
+    if mechanism == "PLAIN":
+        parts = text.split("\x00")
+        return (parts[1] or None) if len(parts) == 3 else None
+    if not (mechanism or "").startswith("SCRAM-"):
+        return None
+    # gs2 header, then "n=<user>,r=<nonce>"
+    for field in text.split(",")[2:]:
+        if field.startswith("n="):
+            return field[2:].replace("=2C", ",").replace("=3D", "=") or None
+    return None
+
+
+# Identity of a connection that never tried to log in: all such
+# connections can read the same data, so they share cached replies
+ANONYMOUS = ("", "")
+
+
+class _Session:
+    """Authentication state of one proxied client connection.
+
+    A connection starts out ``ANONYMOUS``. Once it tries to log in its
+    identity is unknown (None, never cached) until the server accepts a
+    login whose user could be read from the request.
+    """
+
+    def __init__(self):
+        # (authentication database, user) once the server accepted the login
+        self.identity: Optional[Tuple[str, str]] = ANONYMOUS
+        # Login in progress, accepted when the server says it is done
+        self.pending: Optional[Tuple[str, str]] = None
+
+    def _attempt(self, database: Optional[str], user: Optional[str]):
+        self.identity = None
+        self.pending = (database, user) if database and user else None
+
+    def request(self, body: dict) -> bool:
+        """Note a login started by ``body``; True if its reply must be checked."""
+        command = next(iter(body), None)
+        if command == "saslStart":
+            self._attempt(body.get("$db"), sasl_user(body.get("mechanism"), body.get("payload")))
+            return True
+        if command == "saslContinue":
+            return self.pending is not None
+        if command == "authenticate":
+            self._attempt("$external", body.get("user"))
+            return True
+        speculative = body.get("speculativeAuthenticate")
+        if command in ("hello", "isMaster", "ismaster") and isinstance(speculative, dict):
+            if "saslStart" in speculative:
+                self._attempt(speculative.get("db"),
+                              sasl_user(speculative.get("mechanism"), speculative.get("payload")))
+            else:
+                self._attempt("$external", speculative.get("user"))
+            return True
+        return False
+
+    def reply(self, body: dict, reply: dict):
+        """Accept the pending login if ``reply`` (to ``body``) completes it."""
+        if self.pending is None:
+            return
+        if reply.get("ok") != 1:
+            self.pending = None
+            return
+        command = next(iter(body), None)
+        if command in ("hello", "isMaster", "ismaster"):
+            speculative = reply.get("speculativeAuthenticate")
+            if not isinstance(speculative, dict):
+                self.pending = None
+                return
+            done = "conversationId" not in speculative or speculative.get("done")
+        else:
+            done = command == "authenticate" or reply.get("done")
+        if done:
+            self.identity, self.pending = self.pending, None
+
+
+class MongoProxy:
+    """Local TCP proxy forwarding to one MongoDB server."""
+
+    def __init__(
+        self,
+        upstream: Tuple[str, int],
+        listen: Iterable[str] = ("127.0.0.1",),
+        port: int = 0,
+        tls: bool = False,
+        cache: Optional[ReplyCache] = None,
+        connect_timeout: float = 10.0,
+    ):
+        """Initialize the proxy.
+
+        Args:
+            upstream: (host, port) of the MongoDB server (the primary)
+            listen: Local addresses to accept connections on
+            port: Port to listen on (0 picks a free one)
+            tls: Connect to the upstream server with TLS
+            cache: Reply cache (a default one if None)
+            connect_timeout: Seconds to wait for the upstream connection
+        """
+        self.upstream = upstream
+        self.listen = list(listen)
+        self.port = port
+        self.tls = tls
+        self.cache = cache if cache is not None else ReplyCache()
+        self.connect_timeout = connect_timeout
+        self.forwarded = 0
+        self._listeners: List[socket.socket] = []
+        self._connections: List[socket.socket] = []
+        self._lock = threading.Lock()
+        self._request_ids = iter(range(1 << 30, 1 << 31))
+        self._closed = threading.Event()
+
+    def start(self) -> int:
+        """Start accepting connections; returns the listening port."""
+        for address in self.listen:
+            listener = socket.create_server((address, self.port))
+            self.port = listener.getsockname()[1]
+            self._listeners.append(listener)
+            threading.Thread(target=self._accept, args=(listener,),
+                             name="mongoproxy-accept", daemon=True).start()
+        return self.port
+
+    def stop(self):
+        """Close the listeners and every proxied connection."""
+        self._closed.set()
+        with self._lock:
+            sockets = self._listeners + self._connections
+            self._listeners, self._connections = [], []
+        for sock in sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+
+    def _accept(self, listener: socket.socket):
+        while not self._closed.is_set():
+            try:
+                client, _ = listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(client,),
+                             name="mongoproxy-conn", daemon=True).start()
+
+    def _connect_upstream(self) -> socket.socket:
+        sock = socket.create_connection(self.upstream, timeout=self.connect_timeout)
+        sock.settimeout(None)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if self.tls:
+            sock = ssl.create_default_context().wrap_socket(sock, server_hostname=self.upstream[0])
+        return sock
+
+    def stop_listening(self, address: str):
+        """Stop accepting new connections on ``address``."""
+        with self._lock:
+            listeners = [l for l in self._listeners if l.getsockname()[0] == address]
+            self._listeners = [l for l in self._listeners if l not in listeners]
+        for listener in listeners:
+            # Wakes the thread blocked in accept()
+            try:
+                listener.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            listener.close()
+        self.listen = [a for a in self.listen if a != address]
+
+    def _serve(self, client: socket.socket):
+        client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            upstream = self._connect_upstream()
+        except OSError:
+            client.close()
+            return
+        with self._lock:
+            self._connections += [client, upstream]
+        session = _Session()
+        try:
+            while True:
+                message = read_message(client)
+                if message is None:
+                    return
+                self._handle(message, client, upstream, session)
+        except OSError:
+            return
+        finally:
+            for sock in (client, upstream):
+                sock.close()
+            with self._lock:
+                self._connections = [s for s in self._connections if s not in (client, upstream)]
+
+    def _handle(self, message: bytes, client: socket.socket, upstream: socket.socket,
+                session: _Session):
+        parsed = parse_op_msg(message)
+        kind, namespace, key, body, login = None, None, None, None, False
+        if parsed is not None and not parsed[2]:
+            body = bson.decode(parsed[1])
+            login = session.request(body)
+            kind, namespace = classify(body)
+            if kind == "read" and session.identity is not None and not parsed[0] & MORE_TO_COME:
+                key = cache_key(body, session.identity)
+                reply = self.cache.get(key)
+                if reply is not None:
+                    request_id, _ = header_ids(message)
+                    client.sendall(encode_op_msg(reply, next(self._request_ids), request_id))
+                    return
+            elif kind == "write":
+                self.cache.invalidate(namespace)
+
+        upstream.sendall(message)
+        self.forwarded += 1
+        if parsed is not None and parsed[0] & MORE_TO_COME:
+            return  # fire-and-forget: no reply
+        while True:
+            reply = read_message(upstream)
+            if reply is None:
+                raise OSError("upstream closed the connection")
+            client.sendall(reply)
+            reply_parsed = parse_op_msg(reply)
+            if login and reply_parsed is not None:
+                session.reply(body, bson.decode(reply_parsed[1]))
+            if key is not None and reply_parsed is not None and self._complete(reply_parsed[1]):
+                self.cache.put(key, namespace, reply_parsed[1])
+            # Exhaust cursors stream further replies
+            if reply_parsed is None or not reply_parsed[0] & MORE_TO_COME:
+                return
+
+    @staticmethod
+    def _complete(reply_body: bytes) -> bool:
+        reply = bson.decode(reply_body)
+        cursor = reply.get("cursor")
+        return reply.get("ok") == 1 and isinstance(cursor, dict) and cursor.get("id") == 0
+
+    def stats(self) -> dict:
+        """Return the cache statistics plus the number of forwarded messages."""
+        return {**self.cache.stats(), "forwarded": self.forwarded}
+
+
+def uri_uses_tls(uri: str) -> bool:
+    """True if a MongoDB URI asks for TLS (SRV URIs imply it)."""
+    parsed = urlparse(uri)
+    query = {k.lower(): v.lower() for k, v in parse_qsl(parsed.query)}
+    if parsed.scheme == "mongodb+srv":
+        return query.get("tls", query.get("ssl", "true")) == "true"
+    return query.get("tls", query.get("ssl", "false")) == "true"
+
+
+def upstream_of(client) -> Optional[Tuple[str, int]]:
+    """Return the server a proxy should forward to: the primary if known."""
+    try:
+        return client.primary or client.address
+    except Exception:
+        nodes = list(getattr(client, "nodes", ()) or ())
+        return nodes[0] if nodes else None
+
+
+# Query options that do not apply to a plain, direct connection to the proxy
+_DROPPED_OPTIONS = {"tls", "ssl", "replicaset", "directconnection", "compressors",
+                    "tlscafile", "tlsallowinvalidcertificates", "tlsinsecure",
+                    "tlscertificatekeyfile", "loadbalanced", "srvservicename"}
+
+
+def proxied_uri(uri: str, host: str, port: int) -> str:
+    """Rewrite ``uri`` to connect directly, in plain TCP, to the proxy.
+
+    Credentials, database and other options are kept; authentication still
+    happens on the real server through the proxy.
+    """
+    parsed = urlparse(uri)
+    userinfo, at, _ = parsed.netloc.rpartition("@")
+    query = [(k, v) for k, v in parse_qsl(parsed.query) if k.lower() not in _DROPPED_OPTIONS]
+    if parsed.scheme == "mongodb+srv" and not any(k.lower() == "authsource" for k, _ in query):
+        query.append(("authSource", "admin"))
+    query.append(("directConnection", "true"))
+    return urlunparse(("mongodb", f"{userinfo}{at}{host}:{port}", parsed.path or "/", "",
+                       urlencode(query), ""))
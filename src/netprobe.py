@@ -0,0 +1,233 @@
+"""Container-to-MongoDB reachability probe for Port mode launches.
+
+A MongoDB on the Docker host has to be reached from inside the Omniboard
+container, and which address works depends on the setup (Docker Desktop vs
+Linux engine, rootless Docker, custom bridges, mongod bound to 127.0.0.1
+only). Instead of guessing, ``NetworkProbe`` runs a throwaway container from
+the Omniboard image that opens TCP connections to every candidate address,
+measures their round-trip times and picks the fastest reachable one. The
+choice is cached on disk per MongoDB host and port.
+"""
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+try:
+    from .filelock import atomic_write_text
+except ImportError:
+    from filelock import atomic_write_text
+
+# Node script run inside the probe container: connects to every
+# [name, host, port] target of argv[1] and prints {name: rtt_ms | null}
+_PROBE_JS = (
+    "const net=require('net');const targets=JSON.parse(process.argv[1]);"
+    "const out={};let left=targets.length;"
+    "for(const [name,host,port] of targets){const t=process.hrtime.bigint();let done=false;"
+    "const finish=(v)=>{if(done)return;done=true;out[name]=v;s.destroy();"
+    "if(--left===0)console.log(JSON.stringify(out));};"
+    "const s=net.connect({host,port,timeout:%d});"
+    "s.on('connect',()=>finish(Number(process.hrtime.bigint()-t)/1e6));"
+    "s.on('timeout',()=>finish(null));s.on('error',()=>finish(null));}"
+)
+
+# Host-side name that --add-host maps to the host gateway
+HOST_GATEWAY_NAME = "host.docker.internal"
+
+
+class NetworkChoice:
+    """How an Omniboard container should reach a MongoDB on the host."""
+
+    def __init__(self, mode: str, host: str, rtt_ms: Optional[float] = None,
+                 reachable: bool = True):
+        """Initialize the choice.
+
+        Args:
+            mode: "bridge", "host-gateway", "host", or "default" (published
+                port only, unprobed)
+            host: Address of MongoDB as seen from the container
+            rtt_ms: Measured TCP connect time (None if not measured)
+            reachable: False if no candidate could reach MongoDB
+        """
+        self.mode = mode
+        self.host = host
+        self.rtt_ms = rtt_ms
+        self.reachable = reachable
+
+    def docker_args(self, host_port: int, bind: str = "127.0.0.1") -> List[str]:
+        """Return the ``docker run`` options for this mode.
+
+        Args:
+            host_port: Host port Omniboard must be served on
+            bind: Host address the port is published on
+        """
+        if self.mode == "host":
+            # No port publishing on the host network: Omniboard listens on
+            # the host port directly
+            return ["--network", "host", "-e", f"PORT={host_port}"]
+        args = ["-p", f"{bind}:{host_port}:9000"]
+        if self.mode == "host-gateway":
+            args += ["--add-host", f"{HOST_GATEWAY_NAME}:host-gateway"]
+        return args
+
+    def as_dict(self) -> dict:
+        return {"mode": self.mode, "host": self.host, "rtt_ms": self.rtt_ms,
+                "reachable": self.reachable}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "NetworkChoice":
+        return cls(data["mode"], data["host"], data.get("rtt_ms"), data.get("reachable", True))
+
+    def describe(self) -> str:
+        if not self.reachable:
+            return "MongoDB not reachable from containers"
+        rtt = f", {self.rtt_ms:.1f} ms" if self.rtt_ms is not None else ""
+        return f"{self.mode} via {self.host}{rtt}"
+
+
+def default_choice(host: Optional[str] = None, reachable: bool = True) -> NetworkChoice:
+    """Return the unprobed choice: the historical guess for the host address.
+
+    Args:
+        host: Address to use instead of the platform guess
+        reachable: False if a probe showed that nothing works
+    """
+    if host is None:
+        host = "172.17.0.1" if sys.platform.startswith("linux") else HOST_GATEWAY_NAME
+    return NetworkChoice("default", host, reachable=reachable)
+
+
+class NetworkProbe:
+    """Chooses and caches the container network mode per MongoDB host."""
+
+    # Cached choices are re-probed after this long
+    CACHE_TTL_SECONDS = 24 * 3600.0
+    # TCP connect timeout inside the probe container (ms)
+    CONNECT_TIMEOUT_MS = 1500
+
+    def __init__(
+        self,
+        run: Callable[..., object],
+        image: str,
+        path: Optional[Path] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        """Initialize the probe.
+
+        Args:
+            run: ``DockerExecutor.run``-compatible callable
+            image: Image providing ``node`` (the Omniboard image)
+            path: JSON file caching the choices (in-memory only if None)
+            clock: Time source, overridable for tests
+        """
+        self.run = run
+        self.image = image
+        self.path = Path(path) if path else None
+        self.clock = clock
+        self._entries: Optional[Dict[str, dict]] = None
+
+    def _load(self) -> Dict[str, dict]:
+        if self._entries is None:
+            self._entries = {}
+            if self.path is not None:
+                try:
+                    data = json.loads(self.path.read_text(encoding="utf-8"))
+                    if isinstance(data, dict):
+                        self._entries = data
+                except (OSError, ValueError):
+                    pass
+        return self._entries
+
+    def _save(self):
+        if self.path is None:
+            return
+        try:
+            atomic_write_text(self.path, json.dumps(self._load(), indent=2))
+        except OSError:
+            pass
+
+    def choose(self, mongo_host: str, mongo_port: int) -> NetworkChoice:
+        """Return how containers should reach ``mongo_host:mongo_port``.
+
+        Uses the cached choice when fresh; otherwise probes. Unreachable
+        results are not cached, so the next launch probes again (e.g. after
+        the user fixed mongod's bind address).
+        """
+        key = f"{mongo_host}:{mongo_port}"
+        entry = self._load().get(key)
+        if entry and self.clock() - entry.get("probed_at", 0) < self.CACHE_TTL_SECONDS:
+            return NetworkChoice.from_dict(entry["choice"])
+        choice = self.probe(mongo_port)
+        if choice.reachable and choice.rtt_ms is not None:
+            self._load()[key] = {"choice": choice.as_dict(), "probed_at": self.clock()}
+            self._save()
+        return choice
+
+    def invalidate(self, mongo_host: str, mongo_port: int):
+        """Forget the cached choice for a MongoDB host."""
+        if self._load().pop(f"{mongo_host}:{mongo_port}", None) is not None:
+            self._save()
+
+    def bridge_gateway(self) -> Optional[str]:
+        """Return the gateway address of Docker's default bridge network."""
+        result = self.run(
+            ["network", "inspect", "bridge", "--format", "{{(index .IPAM.Config 0).Gateway}}"]
+        )
+        gateway = result.stdout.strip() if result.returncode == 0 else ""
+        return gateway or None
+
+    def _probe_targets(self, targets: List[list], network_args: List[str]) -> Dict[str, Optional[float]]:
+        script = _PROBE_JS % self.CONNECT_TIMEOUT_MS
+        result = self.run(
+            ["run", "--rm", *network_args, "--entrypoint", "node", self.image,
+             "-e", script, json.dumps(targets)],
+            timeout=30.0,
+        )
+        if result.returncode != 0:
+            return {}
+        for line in reversed(result.stdout.splitlines()):
+            try:
+                return json.loads(line)
+            except ValueError:
+                continue
+        return {}
+
+    def rtt(self, mongo_host: str, mongo_port: int) -> Optional[float]:
+        """Measure the TCP connect time (ms) from a container to a remote MongoDB.
+
+        Returns:
+            The round-trip time, or None if it is not reachable
+        """
+        return self._probe_targets([["mongo", mongo_host, mongo_port]], []).get("mongo")
+
+    def probe(self, mongo_port: int) -> NetworkChoice:
+        """Measure which host address reaches MongoDB from a container.
+
+        The bridge gateway and the host-gateway alias are tried from one
+        container; the host network (Linux only) is tried only if both fail.
+
+        Returns:
+            The reachable candidate with the lowest round-trip time, or the
+            platform default marked unreachable
+        """
+        candidates: Dict[str, str] = {"host-gateway": HOST_GATEWAY_NAME}
+        gateway = self.bridge_gateway()
+        if gateway:
+            candidates["bridge"] = gateway
+        targets = [[mode, host, mongo_port] for mode, host in candidates.items()]
+        rtts = self._probe_targets(
+            targets, ["--add-host", f"{HOST_GATEWAY_NAME}:host-gateway"]
+        )
+        reachable = {m: rtt for m, rtt in rtts.items() if rtt is not None and m in candidates}
+        if not rtts:
+            # The probe itself failed (e.g. image missing): keep the guess
+            return default_choice(gateway if sys.platform.startswith("linux") else None)
+        if not reachable and sys.platform.startswith("linux"):
+            host_rtts = self._probe_targets([["host", "127.0.0.1", mongo_port]], ["--network", "host"])
+            if host_rtts.get("host") is not None:
+                return NetworkChoice("host", "127.0.0.1", host_rtts["host"])
+        if not reachable:
+            return default_choice(reachable=False)
+        mode = min(reachable, key=reachable.get)
+        return NetworkChoice(mode, candidates[mode], reachable[mode])
@@ -2,17 +2,148 @@
 import subprocess
 import socket
 import hashlib
+import json
+import re
 import uuid
 import sys
 import time
 import os
 import shutil
-from typing import List, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 from urllib.parse import urlparse, urlunparse
 
+try:
+    from .docker_exec import DockerExecutor
+    from .logstream import LogStream, LogStreams
+    from .mongoproxy import proxied_uri
+    from .netprobe import NetworkChoice, NetworkProbe
+    from .ports import PortLeaseRegistry
+    from .prefs import CONFIG_DIR
+    from .runtimes import DockerRuntime
+    from .scheduler import LOCAL, EngineTarget, LaunchScheduler
+    from .shared import SharedOmniboard
+    from .tracing import span, traced
+except ImportError:
+    from docker_exec import DockerExecutor
+    from logstream import LogStream, LogStreams
+    from mongoproxy import proxied_uri
+    from netprobe import NetworkChoice, NetworkProbe
+    from ports import PortLeaseRegistry
+    from prefs import CONFIG_DIR
+    from runtimes import DockerRuntime
+    from scheduler import LOCAL, EngineTarget, LaunchScheduler
+    from shared import SharedOmniboard
+    from tracing import span, traced
+
+# Port leases shared by all AltarViewer instances of the user
+DEFAULT_PORTS_PATH = CONFIG_DIR / "ports.json"
+# Container network choices per MongoDB host
+DEFAULT_NETPROBE_PATH = CONFIG_DIR / "netprobe.json"
+# Generated config of the shared Omniboard instance
+DEFAULT_SHARED_DIR = CONFIG_DIR / "shared"
+
+
+class LaunchResult(tuple):
+    """The Omniboard a launch started or reused.
+
+    Unpacks (and compares) as ``(container_name, host_port)``. The other
+    attributes describe this launch only, so concurrent launches and
+    ``warm`` calls never see each other's outcome:
+
+    - ``kind``: "reused", "warm" or "run" ("restarted" for a shared
+      instance that reloaded its config)
+    - ``host``: Host serving it (its engine's address)
+    - ``network``: How the container reaches MongoDB (None if unknown,
+      e.g. for a reused container)
+    - ``path``: URL path of the database (shared instance), else ""
+    """
+
+    def __new__(cls, name: str, port: int, kind: str, host: str = "localhost",
+                network: Optional[NetworkChoice] = None, path: str = ""):
+        result = super().__new__(cls, (name, port))
+        result.name, result.port, result.kind = name, port, kind
+        result.host, result.network, result.path = host, network, path
+        return result
+
+
+class WarmContainer:
+    """A container created ahead of launch, waiting to be confirmed."""
+
+    def __init__(self, key: tuple, lease_seconds: float):
+        self.key = key
+        # Engine the container is created on, the host serving it, and how
+        # it reaches MongoDB
+        self.executor: Optional[DockerExecutor] = None
+        self.host = "localhost"
+        self.network: Optional[NetworkChoice] = None
+        self.name = f"omniboard_{uuid.uuid4().hex[:8]}"
+        self.port: Optional[int] = None
+        self.ok = False
+        self.ready = threading.Event()
+        self.expires = time.monotonic() + lease_seconds
+        self.timer: Optional[threading.Timer] = None
+
 
 class OmniboardManager:
     """Manages Omniboard Docker containers."""
+
+    # Docker CLI executor shared by all managers; a manager on another
+    # container runtime uses that runtime's executor instead
+    executor: DockerExecutor
+
+    IMAGE = "vivekratnavel/omniboard"
+    # Labels recording what a container serves and when it was launched
+    DB_LABEL = "altarviewer.db"
+    TARGET_LABEL = "altarviewer.target"
+    CREATED_LABEL = "altarviewer.created"
+    PORT_LABEL = "altarviewer.port"
+    # Label marking containers created by warm(); unconfirmed ones are reaped
+    WARM_LABEL = "altarviewer.warm"
+    # Seconds a warm container waits for launch() before being removed
+    WARM_LEASE_SECONDS = 45.0
+
+    def __init__(
+        self,
+        port_registry: Optional[PortLeaseRegistry] = None,
+        network_probe: Optional[NetworkProbe] = None,
+        runtime=None,
+        scheduler: Optional[LaunchScheduler] = None,
+    ):
+        """Initialize the manager.
+
+        Args:
+            port_registry: Host port leases per database (shared through the
+                config directory by default)
+            network_probe: Chooses how containers reach a MongoDB on the host
+                (cached in the config directory by default)
+            runtime: Backend running Omniboard (see ``runtimes``); Docker
+                if None
+            scheduler: Spreads launches over further Docker engines (see
+                ``scheduler``); the runtime's engine is added as ``LOCAL``
+        """
+        self.runtime = runtime if runtime is not None else DockerRuntime(OmniboardManager.executor)
+        if not self.runtime.native:
+            self.executor = self.runtime.executor
+        self.port_registry = port_registry if port_registry is not None \
+            else PortLeaseRegistry(DEFAULT_PORTS_PATH)
+        self.network_probe = network_probe if network_probe is not None else NetworkProbe(
+            lambda *a, **kw: self.executor.run(*a, **kw),
+            self.IMAGE,
+            DEFAULT_NETPROBE_PATH,
+        )
+        self.scheduler = scheduler if scheduler is not None and not self.runtime.native else None
+        if self.scheduler is not None:
+            self.scheduler.add(EngineTarget(LOCAL, self.executor, "127.0.0.1", self.network_probe),
+                               first=True)
+        self._warm: Optional[WarmContainer] = None
+        self._warm_lock = threading.Lock()
+        self._stale_warm_reaped = False
+        # Output and readiness of the containers launched (or viewed) here
+        self.logs = LogStreams()
+        # One container serving every database launched in shared mode
+        self.shared = SharedOmniboard(self, DEFAULT_SHARED_DIR)
     
     @staticmethod
     def _docker_cmd_base() -> List[str]:
@@ -43,33 +174,36 @@ class OmniboardManager:
         return ["docker"]
     
     @staticmethod
+    @traced("docker.is_docker_running")
     def is_docker_running() -> bool:
         """Check if Docker daemon is running.
         
         Returns:
             True if Docker is running, False otherwise
         """
-        try:
-            base = OmniboardManager._docker_cmd_base()
-            # First try a lightweight version check
-            result = subprocess.run(
-                base + ["version", "--format", "{{.Server.Version}}"],
-                capture_output=True,
-                text=True,
-                timeout=8,
-            )
-            if result.returncode == 0 and result.stdout.strip():
-                return True
-            # Fallback to info with formatting
-            result2 = subprocess.run(
-                base + ["info", "--format", "{{.ServerVersion}}"],
-                capture_output=True,
-                text=True,
-                timeout=8,
-            )
-            return result2.returncode == 0 and result2.stdout.strip() != ""
-        except (subprocess.TimeoutExpired, FileNotFoundError):
-            return False
+        executor = OmniboardManager.executor
+        # First try a lightweight version check
+        result = executor.run(["version", "--format", "{{.Server.Version}}"])
+        if result.returncode == 0 and result.stdout.strip():
+            return True
+        # Fallback to info with formatting
+        result2 = executor.run(["info", "--format", "{{.ServerVersion}}"])
+        return result2.returncode == 0 and result2.stdout.strip() != ""
+
+    def runtime_available(self) -> bool:
+        """Check that this manager's runtime can launch Omniboard.
+
+        Docker: the daemon runs, or another scheduled engine answers.
+        Podman: it answers. Native: Omniboard is installed.
+        """
+        if self.runtime.native or self.runtime.name != "docker":
+            return self.runtime.available()
+        if self.is_docker_running():
+            return True
+        # Any other scheduled engine can take the launches
+        return self.scheduler is not None and any(
+            DockerRuntime(t.executor).available() for t in self.scheduler.targets[1:]
+        )
     
     @staticmethod
     def start_docker_desktop():
@@ -117,6 +251,20 @@ class OmniboardManager:
         """
         if not OmniboardManager.is_docker_running():
             OmniboardManager.start_docker_desktop()
+
+    def ensure_runtime_running(self):
+        """Ensure this manager's runtime can launch, starting Docker if needed.
+
+        Raises:
+            Exception: If the runtime is not available (or Docker cannot be started)
+        """
+        if self.runtime.native or self.runtime.name != "docker":
+            if not self.runtime.available():
+                raise Exception(f"The {self.runtime.name} runtime is not available.")
+            return
+        if self.scheduler is not None and self.runtime_available():
+            return
+        self.ensure_docker_running()
     
     @staticmethod
     def generate_port_for_database(db_name: str, base: int = 20000, span: int = 10000) -> int:
@@ -134,6 +282,7 @@ class OmniboardManager:
         return base + (h % span)
     
     @staticmethod
+    @traced("docker.find_available_port")
     def find_available_port(start_port: int) -> int:
         """Find an available port starting from the given port.
         
@@ -145,26 +294,72 @@ class OmniboardManager:
         """
         port = start_port
         while True:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                try:
-                    s.bind(("", port))
-                    # Also check if Docker is using this port
-                    try:
-                        result = subprocess.run(
-                            OmniboardManager._docker_cmd_base()
-                            + ["ps", "--filter", f"publish={port}", "--format", "{{.ID}}"],
-                            capture_output=True,
-                            text=True,
-                            timeout=5
-                        )
-                        if result.stdout.strip() == "":
-                            return port
-                    except (subprocess.TimeoutExpired, FileNotFoundError):
-                        return port
-                except OSError:
-                    port += 1
+            if OmniboardManager.port_is_bindable(port):
+                # Also check if Docker is using this port
+                result = OmniboardManager.executor.run(
+                    ["ps", "--filter", f"publish={port}", "--format", "{{.ID}}"]
+                )
+                if result.returncode != 0 or result.stdout.strip() == "":
+                    return port
+            # In use (or published by a container): try the next port
+            port += 1
+
+    def find_free_port(self, start_port: int) -> int:
+        """``find_available_port`` for this manager's runtime (the native one
+        publishes no container ports, so binding is all that is checked)."""
+        if not self.runtime.native:
+            return self.find_available_port(start_port)
+        port = start_port
+        while not self.port_is_bindable(port):
+            port += 1
+        return port
+
+    @staticmethod
+    def port_is_bindable(port: int) -> bool:
+        """Return True if nothing on this host listens on ``port``."""
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            try:
+                s.bind(("", port))
+                return True
+            except OSError:
+                return False
+
+    @traced("omniboard.allocate_port")
+    def allocate_port(self, db_name: str, fingerprint: Optional[str] = None) -> int:
+        """Return the host port for ``db_name`` from its persistent lease.
+
+        The first launch of a database searches from its hashed port and
+        records the result; later launches (from any instance) only check
+        that the leased port is still bindable.
+
+        Args:
+            db_name: Database (or other lease name)
+            fingerprint: Target the database is served from; the same
+                database name on another target gets a lease of its own
+        """
+        return self.port_registry.lease(
+            PortLeaseRegistry.key(db_name, fingerprint),
+            self.generate_port_for_database(db_name),
+            is_free=self.port_is_bindable,
+            find_free=self.find_free_port,
+        )
+
+    def _free_port_on(self, target: EngineTarget, port: int) -> int:
+        """Return ``port``, or the next one not published on a remote engine.
+
+        Engines on this machine share its ports, which ``allocate_port``
+        already checked.
+        """
+        if target.is_local:
+            return port
+        while True:
+            result = target.executor.run(["ps", "--filter", f"publish={port}", "--format", "{{.ID}}"])
+            if result.returncode != 0 or result.stdout.strip() == "":
+                return port
+            port += 1
     
     
+    @traced("omniboard.launch")
     def launch(
         self,
         db_name: str,
@@ -172,7 +367,9 @@ class OmniboardManager:
         mongo_port: int,
         host_port: Optional[int] = None,
         mongo_uri: Optional[str] = None,
-    ) -> tuple[str, int]:
+        docker_network: Optional[str] = None,
+        proxy_port: Optional[int] = None,
+    ) -> LaunchResult:
         """Launch an Omniboard Docker container.
         
         Args:
@@ -183,108 +380,585 @@ class OmniboardManager:
             mongo_uri: Optional full MongoDB connection URI. When provided,
                 Omniboard will be launched with this URI (using --mu) and the
                 selected database will be injected into the URI path.
+            docker_network: Optional user-defined Docker network to attach
+                the container to (e.g. to reach the local mirror by name)
+            proxy_port: Port of a local ``MongoProxy`` forwarding to the
+                server; Omniboard then connects through it
             
         Returns:
-            Tuple of (container_name, host_port)
+            ``LaunchResult``, which unpacks as (container_name, host_port)
             
         Raises:
             Exception: If Docker launch fails
         """
+        mongo_flag, mongo_arg, network = self._mongo_args(
+            db_name, mongo_host, mongo_port, mongo_uri, proxy_port
+        )
+        fingerprint = self.target_fingerprint(mongo_flag, mongo_arg)
+
+        if host_port is None:
+            # An Omniboard already serving this target (e.g. launched before
+            # a restart) is reused as is
+            existing = self.find_running(fingerprint)
+            if existing is not None:
+                return LaunchResult(existing["name"], existing["port"], "reused",
+                                    existing.get("host") or "localhost")
+            # A container warmed for exactly this target only needs starting
+            warmed = self._confirm_warm((db_name, mongo_flag, mongo_arg))
+            if warmed is not None:
+                return warmed
+        else:
+            self.discard_warm()
+        host = "localhost"
+
         # Ensure Docker is running
-        self.ensure_docker_running()
+        self.ensure_runtime_running()
         
-        # Find an available port if not specified
+        # Use the database's leased port if not specified
         if host_port is None:
-            preferred_port = self.generate_port_for_database(db_name)
-            host_port = self.find_available_port(preferred_port)
+            host_port = self.allocate_port(db_name, fingerprint)
         
         container_name = f"omniboard_{uuid.uuid4().hex[:8]}"
 
+        if self.runtime.native:
+            self.runtime.launch(container_name, db_name, mongo_flag, mongo_arg, host_port, fingerprint)
+            if self.runtime.log_dir is not None:
+                self.logs.follow_file(container_name, self.runtime.log_dir / f"{container_name}.log")
+            return LaunchResult(container_name, host_port, "run", host, network)
+
+        executor, bind = self.executor, "127.0.0.1"
+        # The mirror and the proxy run on this host: keep their clients local
+        if self.scheduler is not None and proxy_port is None and docker_network is None:
+            with span("scheduler.pick", policy=self.scheduler.policy):
+                target = self.scheduler.pick(mongo_host, mongo_port)
+            if target.executor is not self.executor:
+                # The container reaches MongoDB from the other engine; its
+                # target label stays the local fingerprint so reuse finds it
+                mongo_flag, mongo_arg, network = self._mongo_args(
+                    db_name, mongo_host, mongo_port, mongo_uri, probe=target.network_probe
+                )
+                executor, bind = target.executor, target.publish_address
+                host_port = self._free_port_on(target, host_port)
+                host = target.url_host
+            self.scheduler.record(target.name, container_name)
+
+        # Build Docker command (detached)
+        docker_args = [
+            "run", "-d", "--rm",
+            *network.docker_args(host_port, bind),
+            *(["--network", docker_network] if docker_network else []),
+            "--name", container_name,
+            *self._labels(db_name, fingerprint, host_port),
+            self.IMAGE,
+            mongo_flag, mongo_arg,
+        ]
+        
+        # Launch container
+        with span("docker.run_spawn", container=container_name, port=host_port):
+            proc = executor.popen(
+                docker_args,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                stdin=subprocess.DEVNULL,
+            )
+        if proc is None:
+            raise Exception("Docker CLI not found. Please install Docker and ensure it is on PATH.")
+        # Attached once `docker run -d` has created the container
+        self.logs.follow_container(container_name, executor.popen, after=proc)
+        if host == "localhost":
+            self.runtime.startup.watch(container_name, host_port)
+        
+        return LaunchResult(container_name, host_port, "run", host, network)
+
+    def _mongo_args(
+        self,
+        db_name: str,
+        mongo_host: str,
+        mongo_port: int,
+        mongo_uri: Optional[str] = None,
+        proxy_port: Optional[int] = None,
+        probe: Optional[NetworkProbe] = None,
+    ) -> tuple[str, str, NetworkChoice]:
+        """Return the Omniboard flag and value (``--mu URI`` or ``-m host:port:db``)
+        and the container network setup.
+
+        ``probe`` measures the network of the engine the container runs on
+        (``network_probe``, the local engine's, if None).
+        """
+        probe = probe if probe is not None else self.network_probe
+        if proxy_port is not None:
+            # The proxy runs on this host: reach it like a local MongoDB
+            if self.runtime.native:
+                network = NetworkChoice("default", "127.0.0.1")
+            else:
+                with span("docker.network_choice"):
+                    network = probe.choose("127.0.0.1", proxy_port)
+            if mongo_uri:
+                adjusted = self._adjust_mongo_uri_for_docker(mongo_uri, db_name=db_name)
+                return "--mu", proxied_uri(adjusted, network.host, proxy_port), network
+            return "-m", f"{network.host}:{proxy_port}:{db_name}", network
         # Decide whether to use full URI or host:port:db form
         if mongo_uri:
             # Build a Docker-adjusted URI and ensure DB is included in the path
             mongo_arg = self._adjust_mongo_uri_for_docker(mongo_uri, db_name=db_name)
             mongo_flag = "--mu"
+            network = NetworkChoice("default", "")
         else:
             # Port mode: when connecting to a MongoDB running on the host,
-            # containers cannot reach the host via 127.0.0.1.
-            # Use host.docker.internal on Windows/macOS and the default Docker
-            # bridge gateway (172.17.0.1) on Linux.
+            # containers cannot reach the host via 127.0.0.1. Probe (once per
+            # host, then cached) which address and network mode reach it.
             host_for_container = mongo_host
-            if mongo_host in ("localhost", "127.0.0.1"):
-                if sys.platform.startswith("linux"):
-                    host_for_container = "172.17.0.1"
-                else:
-                    host_for_container = "host.docker.internal"
+            network = NetworkChoice("default", mongo_host)
+            if mongo_host in ("localhost", "127.0.0.1") and not self.runtime.native:
+                with span("docker.network_choice"):
+                    network = probe.choose(mongo_host, mongo_port)
+                host_for_container = network.host
             mongo_arg = f"{host_for_container}:{mongo_port}:{db_name}"
             mongo_flag = "-m"
+        return mongo_flag, mongo_arg, network
 
-        # Build Docker command (detached)
-        docker_cmd = OmniboardManager._docker_cmd_base() + [
-            "run", "-d", "--rm",
-            "-p", f"127.0.0.1:{host_port}:9000",
-            "--name", container_name,
-            "vivekratnavel/omniboard",
-            mongo_flag, mongo_arg,
+    @staticmethod
+    def target_fingerprint(mongo_flag: str, mongo_arg: str) -> str:
+        """Stable, credential-free identifier of what a container connects to."""
+        return hashlib.sha256(f"{mongo_flag} {mongo_arg}".encode()).hexdigest()[:16]
+
+    def _labels(self, db_name: str, fingerprint: str, host_port: int) -> List[str]:
+        return [
+            "--label", f"{self.PORT_LABEL}={host_port}",
+            "--label", f"{self.DB_LABEL}={db_name}",
+            "--label", f"{self.TARGET_LABEL}={fingerprint}",
+            "--label", f"{self.CREATED_LABEL}={int(time.time())}",
         ]
-        
-        # Launch container
-        subprocess.Popen(
-            docker_cmd,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-            stdin=subprocess.DEVNULL,
-        )
-        
-        return container_name, host_port
+
+    def find_running(self, fingerprint: str) -> Optional[Dict[str, object]]:
+        """Return the running container serving ``fingerprint``, if any."""
+        if self.runtime.native:
+            return next((i for i in self.runtime.instances() if i["target"] == fingerprint), None)
+        for container in self._query_containers(
+            ["--filter", f"label={self.TARGET_LABEL}={fingerprint}",
+             "--filter", "status=running"]
+        ):
+            if container["port"]:
+                return container
+        return None
+
+    @traced("docker.reconcile")
+    def reconcile(self) -> List[Dict[str, object]]:
+        """List the running Omniboards launched by AltarViewer, in one query.
+
+        Used at startup to restore the dashboards of a previous session.
+
+        Returns:
+            Container dicts (see ``container_status``, plus ``target`` and
+            ``created``), oldest first
+        """
+        if self.runtime.native:
+            return self.runtime.instances()
+        containers = [
+            c for c in self._query_containers(
+                ["--filter", f"label={self.DB_LABEL}", "--filter", "status=running"]
+            )
+            if c["port"]
+        ]
+        return sorted(containers, key=lambda c: c["created"] or 0)
+
+    @traced("omniboard.warm")
+    def warm(
+        self,
+        db_name: str,
+        mongo_host: str,
+        mongo_port: int,
+        mongo_uri: Optional[str] = None,
+        lease_seconds: Optional[float] = None,
+    ) -> bool:
+        """Create (but do not start) the container ``launch`` would run.
+
+        Meant to be called from a worker thread as soon as a database is
+        selected. A following ``launch`` with the same arguments only has to
+        ``docker start`` it. If it is not confirmed within the lease, the
+        container is removed. Warming another target replaces it.
+
+        Args:
+            db_name: Database name to connect to
+            mongo_host: MongoDB host
+            mongo_port: MongoDB port
+            mongo_uri: Optional full MongoDB connection URI (see ``launch``)
+            lease_seconds: Lifetime of the unconfirmed container
+                (``WARM_LEASE_SECONDS`` by default)
+
+        Returns:
+            True if the container was created (always False with the
+            native runtime, which has nothing to prepare)
+        """
+        if self.runtime.native:
+            return False
+        mongo_flag, mongo_arg, network = self._mongo_args(db_name, mongo_host, mongo_port, mongo_uri)
+        key = (db_name, mongo_flag, mongo_arg)
+        lease = self.WARM_LEASE_SECONDS if lease_seconds is None else lease_seconds
+        with self._warm_lock:
+            current = self._warm
+            if current is not None and current.key == key:
+                current.expires = time.monotonic() + lease
+                return current.ready.wait(self.executor.default_timeout) and current.ok
+            self._warm = warm = WarmContainer(key, lease)
+        if current is not None:
+            self._remove_warm(current)
+        if not self._stale_warm_reaped:
+            self._stale_warm_reaped = True
+            self.reap_stale_warm_containers()
+
+        try:
+            fingerprint = self.target_fingerprint(mongo_flag, mongo_arg)
+            warm.port = self.allocate_port(db_name, fingerprint)
+            warm.executor, bind = self.executor, "127.0.0.1"
+            run_flag, run_arg = mongo_flag, mongo_arg
+            if self.scheduler is not None:
+                target = self.scheduler.pick(mongo_host, mongo_port)
+                if target.executor is not self.executor:
+                    run_flag, run_arg, network = self._mongo_args(
+                        db_name, mongo_host, mongo_port, mongo_uri, probe=target.network_probe
+                    )
+                    warm.executor, bind = target.executor, target.publish_address
+                    warm.port = self._free_port_on(target, warm.port)
+                    warm.host = target.url_host
+                self.scheduler.record(target.name, warm.name)
+            warm.network = network
+            result = warm.executor.run([
+                "create", "--rm",
+                *network.docker_args(warm.port, bind),
+                "--name", warm.name,
+                "--label", f"{self.WARM_LABEL}=1",
+                *self._labels(db_name, fingerprint, warm.port),
+                self.IMAGE,
+                run_flag, run_arg,
+            ])
+            warm.ok = result.returncode == 0
+        finally:
+            warm.ready.set()
+        if not warm.ok:
+            with self._warm_lock:
+                if self._warm is warm:
+                    self._warm = None
+            return False
+        self._arm_reaper(warm)
+        return True
+
+    def _arm_reaper(self, warm: WarmContainer):
+        delay = max(0.0, warm.expires - time.monotonic())
+        warm.timer = threading.Timer(delay, self._reap_if_expired, args=(warm,))
+        warm.timer.daemon = True
+        warm.timer.start()
+
+    def _reap_if_expired(self, warm: WarmContainer):
+        with self._warm_lock:
+            if self._warm is not warm:
+                return
+            if time.monotonic() < warm.expires:
+                # The lease was renewed by another warm() call
+                self._arm_reaper(warm)
+                return
+            self._warm = None
+        self._remove_warm(warm)
+
+    def _remove_warm(self, warm: WarmContainer):
+        if warm.timer is not None:
+            warm.timer.cancel()
+        warm.ready.wait(self.executor.default_timeout)
+        if warm.ok:
+            warm.executor.run(["rm", "-f", warm.name])
+
+    def _confirm_warm(self, key: tuple) -> Optional[LaunchResult]:
+        """Start the warm container for ``key``; discard any other.
+
+        Returns:
+            The started container, or None if nothing usable was warm
+        """
+        with self._warm_lock:
+            warm, self._warm = self._warm, None
+        if warm is None:
+            return None
+        if warm.key != key:
+            self._remove_warm(warm)
+            return None
+        if warm.timer is not None:
+            warm.timer.cancel()
+        if not warm.ready.wait(self.executor.default_timeout) or not warm.ok:
+            return None
+        with span("docker.start_warm", container=warm.name, port=warm.port):
+            result = warm.executor.run(["start", warm.name])
+        if result.returncode != 0:
+            # e.g. the port was taken meanwhile; fall back to a fresh run
+            warm.executor.run(["rm", "-f", warm.name])
+            return None
+        self.logs.follow_container(warm.name, warm.executor.popen)
+        if warm.host == "localhost":
+            self.runtime.startup.watch(warm.name, warm.port)
+        return LaunchResult(warm.name, warm.port, "warm", warm.host, warm.network)
+
+    def discard_warm(self):
+        """Remove the unconfirmed warm container, if any."""
+        with self._warm_lock:
+            warm, self._warm = self._warm, None
+        if warm is not None:
+            self._remove_warm(warm)
+
+    def reap_stale_warm_containers(self) -> int:
+        """Remove warm containers never started (e.g. left by a crashed session).
+
+        Returns:
+            Number of containers removed
+        """
+        if self.runtime.native:
+            return 0
+        removed = 0
+        for _, executor in self._engines():
+            result = executor.run([
+                "ps", "-a", "-q",
+                "--filter", f"label={self.WARM_LABEL}",
+                "--filter", "status=created",
+            ])
+            if result.returncode != 0:
+                continue
+            ids = result.stdout.split()
+            for cid in ids:
+                executor.run(["rm", "-f", cid])
+            removed += len(ids)
+        return removed
+
+    def _engines(self) -> List[tuple]:
+        """Return ``(engine name, executor)`` of every engine containers run on."""
+        if self.scheduler is None:
+            return [(LOCAL, self.executor)]
+        return [(t.name, t.executor) for t in self.scheduler.targets]
+
+    def _on_engines(self, func) -> List[tuple]:
+        """Call ``func(executor)`` on every engine, in parallel if there are several.
+
+        Returns:
+            ``(engine name, result)`` pairs
+        """
+        engines = self._engines()
+        if len(engines) == 1:
+            return [(engines[0][0], func(engines[0][1]))]
+        with ThreadPoolExecutor(max_workers=len(engines)) as pool:
+            results = list(pool.map(lambda engine: func(engine[1]), engines))
+        return [(name, result) for (name, _), result in zip(engines, results)]
+
+    def _executor_for(self, container: str) -> DockerExecutor:
+        """Return the executor of the engine running ``container``."""
+        if self.scheduler is not None:
+            target = self.scheduler.placement(container)
+            if target is not None:
+                return target.executor
+        return self.executor
     
     @staticmethod
+    @traced("docker.list_containers")
     def list_containers() -> List[str]:
         """List all Omniboard container IDs.
         
         Returns:
             List of container IDs
         """
-        try:
-            result = subprocess.run(
-                OmniboardManager._docker_cmd_base()
-                + [
-                    "ps",
-                    "-a",
-                    "--filter",
-                    "name=omniboard_",
-                    "--format",
-                    "{{.ID}}",
-                ],
-                capture_output=True,
-                text=True,
-                timeout=10,
-            )
-            return result.stdout.strip().splitlines()
-        except (subprocess.TimeoutExpired, FileNotFoundError):
+        return OmniboardManager._list_ids(OmniboardManager.executor)
+
+    def container_ids(self) -> List[str]:
+        """List the Omniboard containers (or processes) of this manager's runtime,
+        on every scheduled engine."""
+        if self.runtime.native:
+            return [i["id"] for i in self.runtime.instances()]
+        return [cid for _, ids in self._on_engines(self._list_ids) for cid in ids]
+
+    @staticmethod
+    def _list_ids(executor: DockerExecutor) -> List[str]:
+        result = executor.run(
+            ["ps", "-a", "--filter", "name=omniboard_", "--format", "{{.ID}}"]
+        )
+        if result.returncode != 0:
             return []
+        return result.stdout.strip().splitlines()
     
+    @traced("docker.container_status")
+    def container_status(self) -> List[Dict[str, object]]:
+        """Describe every Omniboard container with two batched Docker calls.
+
+        One ``docker ps`` lists all containers and one ``docker stats
+        --no-stream`` samples all running ones, whatever their number.
+
+        Returns:
+            One dict per container with ``id``, ``name``, ``database``,
+            ``port`` (host port or None), ``state``, ``status`` (e.g.
+            "Up 5 minutes"), ``cpu``, ``memory`` (None when not running)
+            and ``startup`` (seconds until it served, if launched here)
+        """
+        if self.runtime.native:
+            return self._with_startup(self.runtime.instances())
+        containers = self._query_containers(["-a", "--filter", "name=omniboard_"])
+        # One stats call per engine
+        for engine, executor in self._engines():
+            self._add_stats(executor, [c for c in containers
+                                       if c["state"] == "running" and c["engine"] == engine])
+        return self._with_startup(containers)
+
+    def _add_stats(self, executor: DockerExecutor, running: List[Dict[str, object]]):
+        """Fill in ``cpu`` and ``memory`` of ``running`` with one ``docker stats``."""
+        if running:
+            stats = executor.run(
+                ["stats", "--no-stream", "--format", "{{json .}}"] + [c["id"] for c in running]
+            )
+            by_key: Dict[str, dict] = {}
+            for line in stats.stdout.splitlines() if stats.returncode == 0 else []:
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    continue
+                by_key[row.get("Name", "")] = row
+                by_key[row.get("ID", "")] = row
+            for c in running:
+                row = by_key.get(c["name"]) or by_key.get(c["id"][:12]) or by_key.get(c["id"])
+                if row:
+                    c["cpu"] = row.get("CPUPerc")
+                    c["memory"] = (row.get("MemUsage") or "").split("/")[0].strip() or None
+
+    def _with_startup(self, containers: List[Dict[str, object]]) -> List[Dict[str, object]]:
+        for c in containers:
+            c["startup"] = self.runtime.startup.get(c["name"])
+        return containers
+
+    def _query_containers(self, filters: List[str]) -> List[Dict[str, object]]:
+        """Run one ``docker ps`` with ``filters`` per engine and merge the results.
+
+        Each container records its ``engine`` and the ``host`` serving it.
+        """
+        containers = []
+        for engine, found in self._on_engines(lambda executor: self._query_engine(executor, filters)):
+            target = self.scheduler.target(engine) if self.scheduler is not None else None
+            for c in found:
+                c["engine"] = engine
+                c["host"] = target.url_host if target is not None else "localhost"
+                if self.scheduler is not None:
+                    self.scheduler.record(engine, c["name"], c["id"])
+            containers.extend(found)
+        return containers
+
+    def _query_engine(self, executor: DockerExecutor, filters: List[str]) -> List[Dict[str, object]]:
+        """Run one ``docker ps`` with ``filters`` and parse its JSON lines."""
+        result = executor.run(
+            ["ps", "--no-trunc"] + filters + ["--format", "{{json .}}"]
+        )
+        if result.returncode != 0:
+            return []
+        containers = []
+        for line in result.stdout.splitlines():
+            try:
+                row = json.loads(line)
+            except ValueError:
+                continue
+            # Podman prints structured fields where Docker prints strings
+            labels = row.get("Labels")
+            if not isinstance(labels, dict):
+                labels = self._parse_labels(labels or "")
+            names = row.get("Names", "")
+            ports = row.get("Ports") or ""
+            if isinstance(ports, list):
+                host_port = next((p.get("host_port") for p in ports
+                                  if isinstance(p, dict) and p.get("container_port") == 9000), None)
+            else:
+                host_port = self._parse_host_port(ports)
+            containers.append({
+                "id": row.get("ID") or row.get("Id", ""),
+                "name": names[0] if isinstance(names, list) and names else names,
+                "database": labels.get(self.DB_LABEL),
+                "target": labels.get(self.TARGET_LABEL),
+                "created": self._label_int(labels, self.CREATED_LABEL),
+                # Host-network containers publish nothing; use their label
+                "port": host_port or self._label_int(labels, self.PORT_LABEL),
+                "state": row.get("State", ""),
+                "status": row.get("Status", ""),
+                "cpu": None,
+                "memory": None,
+            })
+        return containers
+
+    @staticmethod
+    def _label_int(labels: Dict[str, str], key: str) -> Optional[int]:
+        value = labels.get(key, "")
+        return int(value) if value.isdigit() else None
+
+    @staticmethod
+    def _parse_labels(labels: str) -> Dict[str, str]:
+        """Parse the ``k=v,k2=v2`` label string printed by ``docker ps``."""
+        out = {}
+        for item in labels.split(",") if labels else []:
+            key, _, value = item.partition("=")
+            if key:
+                out[key.strip()] = value
+        return out
+
+    @staticmethod
+    def _parse_host_port(ports: str) -> Optional[int]:
+        """Return the host port mapped to Omniboard's port 9000, if any."""
+        match = re.search(r":(\d+)->9000/tcp", ports or "")
+        return int(match.group(1)) if match else None
+
+    def log_stream(self, container: Dict[str, object]) -> LogStream:
+        """Return the log stream of a container (a dict from ``container_status``).
+
+        Containers not launched by this manager (e.g. before a restart) are
+        attached to with their last ``LogStreams.ATTACH_TAIL`` lines.
+        """
+        name = str(container["name"])
+        stream = self.logs.get(name)
+        if stream is not None:
+            return stream
+        if self.runtime.native:
+            log_dir = self.runtime.log_dir
+            if log_dir is None:
+                return self.logs.follow_container(name, lambda *a, **kw: None)
+            return self.logs.follow_file(name, log_dir / f"{name}.log", tail=LogStreams.ATTACH_TAIL)
+        return self.logs.follow_container(name, self._executor_for(name).popen,
+                                          tail=LogStreams.ATTACH_TAIL)
+
+    def stop_container(self, container: str) -> bool:
+        """Stop (and thereby remove, as they run with --rm) one container."""
+        if self.runtime.native:
+            self.logs.stop(container)
+            return self.runtime.stop(container)
+        executor = self._executor_for(container)
+        result = executor.run(["stop", "--time", "3", container], timeout=20.0)
+        if result.returncode != 0:
+            result = executor.run(["rm", "-f", container])
+        return result.returncode == 0
+
+    @traced("docker.clear_all_containers")
     def clear_all_containers(self) -> int:
         """Remove all Omniboard Docker containers.
         
         Returns:
             Number of containers removed
         """
-        container_ids = self.list_containers()
-        
-        if not container_ids:
-            return 0
-        
-        for cid in container_ids:
-            try:
-                subprocess.run(
-                    OmniboardManager._docker_cmd_base() + ["rm", "-f", cid],
-                    timeout=10,
-                )
-            except (subprocess.TimeoutExpired, FileNotFoundError):
-                pass
-        
-        return len(container_ids)
+        # A warm container is among those removed below
+        with self._warm_lock:
+            warm, self._warm = self._warm, None
+        if warm is not None and warm.timer is not None:
+            warm.timer.cancel()
+
+        if self.runtime.native:
+            container_ids = self.container_ids()
+            for name in container_ids:
+                self.runtime.stop(name)
+            self.logs.stop_all()
+            return len(container_ids)
+
+        def clear(executor: DockerExecutor) -> int:
+            container_ids = self._list_ids(executor)
+            for cid in container_ids:
+                executor.run(["rm", "-f", cid])
+            return len(container_ids)
+
+        # The shared container is among those removed
+        self.shared.clear()
+        return sum(count for _, count in self._on_engines(clear))
 
     def _adjust_mongo_uri_for_docker(self, mongo_uri: str, db_name: Optional[str] = None) -> str:
         """Inject DB name into a full MongoDB URI and preserve credentials and query.
@@ -297,15 +971,10 @@ class OmniboardManager:
             # If parsing fails, return original URI
             return mongo_uri
 
-        # Reconstruct netloc with potential creds and port (no host rewriting)
-        userinfo = ""
-        if parsed.username:
-            userinfo += parsed.username
-            if parsed.password:
-                userinfo += f":{parsed.password}"
-            userinfo += "@"
-        port_part = f":{parsed.port}" if parsed.port else ""
-        netloc = f"{userinfo}{parsed.hostname or ''}{port_part}"
+        # Keep the netloc verbatim (credentials, seed list and ports); no host
+        # rewriting. Only normalise the host case as urlparse does.
+        userinfo, at, hosts = parsed.netloc.rpartition("@")
+        netloc = f"{userinfo}{at}{hosts.lower()}"
 
         # Always set the path to the selected DB if provided
         path = parsed.path or ""
@@ -320,4 +989,7 @@ class OmniboardManager:
             parsed.query,
             "",
         ))
-        return adjusted
\ No newline at end of file
+        return adjusted
+
+
+OmniboardManager.executor = DockerExecutor(OmniboardManager._docker_cmd_base)
@@ -0,0 +1,140 @@
+"""Persistent host-port leases for Omniboard containers."""
+import json
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+try:
+    from .filelock import FileLock, atomic_write_text
+except ImportError:
+    from filelock import FileLock, atomic_write_text
+
+
+class PortLeaseRegistry:
+    """Remembers which host port each database's Omniboard uses.
+
+    The registry is a JSON file shared by every AltarViewer instance of the
+    user and guarded by a file lock, so two instances never hand the same
+    port to different databases. A database keeps its port across sessions
+    (Omniboard settings live in browser cookies bound to the port); hash
+    collisions are resolved once and the result remembered.
+
+    Omniboard leases are keyed by database and target (see ``key``), so
+    databases of the same name on different servers get ports of their own.
+    """
+
+    # Leases not used for this long are forgotten
+    LEASE_TTL_SECONDS = 180 * 24 * 3600.0
+
+    def __init__(self, path: Path, clock: Callable[[], float] = time.time):
+        """Initialize the registry.
+
+        Args:
+            path: JSON file holding the leases
+            clock: Time source (injectable for tests)
+        """
+        self.path = Path(path)
+        self.clock = clock
+        self._lock = FileLock(self.path.with_name(self.path.name + ".lock"))
+
+    @staticmethod
+    def key(db_name: str, fingerprint: Optional[str] = None) -> str:
+        """Return the lease key of ``db_name`` served from the target ``fingerprint``.
+
+        Args:
+            db_name: Database (or other lease name)
+            fingerprint: ``OmniboardManager.target_fingerprint`` of the
+                MongoDB target; None for leases not tied to one
+        """
+        return db_name if fingerprint is None else f"{fingerprint}/{db_name}"
+
+    def _read(self) -> Dict[str, dict]:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        leases = data.get("leases") if isinstance(data, dict) else None
+        return leases if isinstance(leases, dict) else {}
+
+    def _write(self, leases: Dict[str, dict]):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_text(self.path, json.dumps({"leases": leases}, indent=2, sort_keys=True))
+
+    def get(self, db_name: str) -> Optional[int]:
+        """Return the port leased to ``db_name``, if any."""
+        lease = self._read().get(db_name)
+        return lease.get("port") if isinstance(lease, dict) else None
+
+    def leases(self) -> Dict[str, int]:
+        """Return all leases as ``{database: port}``."""
+        return {db: lease["port"] for db, lease in self._read().items()
+                if isinstance(lease, dict) and "port" in lease}
+
+    def _live_leases(self, now: float) -> Dict[str, dict]:
+        return {
+            db: lease for db, lease in self._read().items()
+            if isinstance(lease, dict) and now - lease.get("used", now) < self.LEASE_TTL_SECONDS
+        }
+
+    @staticmethod
+    def _port_of(lease: Optional[dict]) -> Optional[int]:
+        return lease.get("port") if lease else None
+
+    def lease(
+        self,
+        db_name: str,
+        preferred: int,
+        is_free: Callable[[int], bool],
+        find_free: Callable[[int], int],
+    ) -> int:
+        """Return the host port for ``db_name``, allocating it if needed.
+
+        An existing lease is returned after the cheap ``is_free`` check only.
+        Otherwise (or if the leased port has been taken by something else)
+        ``find_free`` searches from ``preferred``, skipping ports leased to
+        other databases, and the result is recorded.
+
+        The checks and the search run without the file lock (``find_free``
+        may query Docker); the choice is then confirmed against the leases
+        re-read under the lock, and made again if another instance leased
+        the port (or this database) in the meantime.
+
+        Args:
+            db_name: Database the port is for
+            preferred: First port to try for a new lease
+            is_free: Fast local check that a port can be bound
+            find_free: Thorough search returning a free port >= its argument
+
+        Returns:
+            The leased port
+        """
+        while True:
+            leases = self._live_leases(self.clock())
+            current = leases.get(db_name)
+            if current and is_free(current["port"]):
+                port = current["port"]
+            else:
+                port = self._search(leases, db_name, preferred, find_free)
+            with self._lock:
+                now = self.clock()
+                confirmed = self._live_leases(now)
+                taken = {lease.get("port") for db, lease in confirmed.items() if db != db_name}
+                if port in taken or self._port_of(confirmed.get(db_name)) != self._port_of(current):
+                    continue
+                confirmed[db_name] = {"port": port, "used": now}
+                self._write(confirmed)
+                return port
+
+    @staticmethod
+    def _search(leases: Dict[str, dict], db_name: str, preferred: int,
+                find_free: Callable[[int], int]) -> int:
+        """Return the first port from ``preferred`` that is free and leased to no other database."""
+        taken = {lease.get("port") for db, lease in leases.items() if db != db_name}
+        port = preferred
+        while True:
+            while port in taken:
+                port += 1
+            found = find_free(port)
+            if found not in taken:
+                return found
+            port = found + 1
@@ -1,7 +1,17 @@
+import atexit
+import copy
 import json
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Dict, Optional, Tuple
+
+try:
+    from .filelock import FileLock, atomic_write_text
+except ImportError:
+    from filelock import FileLock, atomic_write_text
 
 try:
     from platformdirs import user_config_dir  # type: ignore
@@ -25,55 +35,214 @@ else:
     _config_dir = base / "AltarViewer"
 
 _config_dir.mkdir(parents=True, exist_ok=True)
+CONFIG_DIR = _config_dir
 CONFIG_PATH = _config_dir / "config.json"
 
 # Legacy location used by older versions; read-only fallback
 LEGACY_CONFIG_PATH = Path.home() / ".altarviewer_config.json"
 
 class Preferences:
+    """Preferences store cached in memory.
+
+    ``load`` only re-reads the file when its mtime changed (e.g. another
+    instance saved). A save records the keys whose values it changes; they
+    are visible to ``load`` immediately and coalesced into one debounced
+    write, which re-reads the file and merges them in under a cross-process
+    lock, then replaces it atomically (temp file + rename). Two instances
+    therefore never drop each other's keys, and keys a save does not
+    mention are left as they are.
+
+    Keyring access can block for seconds (Secret Service, KWallet unlock
+    prompts), so the ``*_async`` methods run it on a single worker thread and
+    keep secrets in a short-lived in-memory cache. UI code must use those.
+    """
+
+    # Seconds a secret stays in the in-memory cache
+    SECRET_TTL = 300.0
+    # Connection profiles whose database list is remembered
+    MAX_CACHED_PROFILES = 10
+
+    def __init__(self, path: Optional[Path] = None, debounce_seconds: float = 0.5):
+        self.path = Path(path) if path else CONFIG_PATH
+        self.debounce_seconds = debounce_seconds
+        self._lock = threading.RLock()
+        self._file_lock = FileLock(self.path.with_name(self.path.name + ".lock"))
+        self._cache: Optional[dict] = None
+        self._cache_mtime: Optional[int] = None
+        # Keys changed by this instance and not written yet
+        self._pending: Dict[str, object] = {}
+        self._timer: Optional[threading.Timer] = None
+        self._secrets: Dict[str, Tuple[Optional[str], float]] = {}
+        self._keyring_worker: Optional[ThreadPoolExecutor] = None
+        atexit.register(self.flush)
+
     def is_keyring_available(self) -> bool:
         return keyring is not None
 
-    def load(self) -> dict:
+    def _mtime(self) -> Optional[int]:
         try:
-            if CONFIG_PATH.exists():
-                return json.loads(CONFIG_PATH.read_text(encoding="utf-8"))
+            return self.path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def _read_file(self, mtime: Optional[int]) -> dict:
+        data = {}
+        try:
+            if mtime is not None:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
             # Backward compatibility: read legacy config if present
-            if LEGACY_CONFIG_PATH.exists():
-                return json.loads(LEGACY_CONFIG_PATH.read_text(encoding="utf-8"))
+            elif self.path == CONFIG_PATH and LEGACY_CONFIG_PATH.exists():
+                data = json.loads(LEGACY_CONFIG_PATH.read_text(encoding="utf-8"))
         except Exception:
-            pass
-        return {}
+            data = {}
+        return data if isinstance(data, dict) else {}
+
+    def load(self) -> dict:
+        """Return the preferences, including changes not written yet."""
+        with self._lock:
+            mtime = self._mtime()
+            if self._cache is None or mtime != self._cache_mtime:
+                self._cache = self._read_file(mtime)
+                self._cache_mtime = mtime
+            return copy.deepcopy({**self._cache, **self._pending})
 
     def save_without_password(self, data: dict):
+        """Save the keys of ``data`` whose values changed (keys it lacks are kept)."""
         # Ensure password is never written to disk
         clean = dict(data)
         for k in ("password", "pwd"):
             if k in clean:
                 clean.pop(k)
-        try:
-            CONFIG_PATH.write_text(json.dumps(clean, ensure_ascii=False, indent=2), encoding="utf-8")
-        except Exception:
-            pass
+        with self._lock:
+            current = self.load()
+            changes = {k: v for k, v in clean.items() if k not in current or current[k] != v}
+            if not changes:
+                return
+            self._pending.update(copy.deepcopy(changes))
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.debounce_seconds, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def load_database_cache(self, profile: str) -> Optional[dict]:
+        """Return ``{"databases": [{"name", "runs"}, ...], "timestamp"}`` for a profile."""
+        entry = (self.load().get("db_cache") or {}).get(profile)
+        if not isinstance(entry, dict) or not isinstance(entry.get("databases"), list):
+            return None
+        return entry
+
+    def save_database_cache(self, profile: str, databases: list):
+        """Remember the database list (with per-database metadata) of a profile."""
+        with self._lock:
+            data = self.load()
+            cache = dict(data.get("db_cache") or {})
+            cache[profile] = {"databases": databases, "timestamp": time.time()}
+            # Keep only the most recently refreshed profiles
+            newest = sorted(cache, key=lambda k: cache[k].get("timestamp", 0), reverse=True)
+            data["db_cache"] = {k: cache[k] for k in newest[: self.MAX_CACHED_PROFILES]}
+            self.save_without_password(data)
+
+    def flush(self):
+        """Write any pending preferences to disk now."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            changes, self._pending = self._pending, {}
+            if not changes:
+                return
+            try:
+                self._cache = self._write_atomic(changes)
+                self._cache_mtime = self._mtime()
+            except Exception:
+                pass
+
+    def _write_atomic(self, changes: dict) -> dict:
+        """Merge ``changes`` into the file as it is now; returns the result."""
+        with self._file_lock:
+            # Another instance may have saved since this one last read
+            data = self._read_file(self._mtime())
+            data.update(changes)
+            atomic_write_text(self.path, json.dumps(data, ensure_ascii=False, indent=2))
+        return data
 
     def save_password_if_allowed(self, remember: bool, user: str, password: str):
+        self._save_password(remember, user, password)
+
+    def _save_password(self, remember: bool, user: str, password: str) -> bool:
         if not keyring:
-            return
+            return False
         try:
             if remember and password:
                 keyring.set_password(KEYRING_SERVICE, user, password)
+                self._cache_secret(user, password)
             else:
+                self._cache_secret(user, None)
                 try:
                     keyring.delete_password(KEYRING_SERVICE, user)
                 except Exception:
                     pass
+            return True
         except Exception:
-            pass
+            return False
 
     def load_password_if_any(self, user: str) -> Optional[str]:
         if not keyring:
             return None
         try:
-            return keyring.get_password(KEYRING_SERVICE, user)
+            password = keyring.get_password(KEYRING_SERVICE, user)
         except Exception:
             return None
+        self._cache_secret(user, password)
+        return password
+
+    def _cache_secret(self, user: str, password: Optional[str]):
+        with self._lock:
+            self._secrets[user] = (password, time.monotonic() + self.SECRET_TTL)
+
+    def get_cached_password(self, user: str) -> Tuple[bool, Optional[str]]:
+        """Return (found, password) from the in-memory cache, never touching the keyring."""
+        with self._lock:
+            entry = self._secrets.get(user)
+            if entry is None:
+                return False, None
+            if entry[1] < time.monotonic():
+                del self._secrets[user]
+                return False, None
+            return True, entry[0]
+
+    def _submit(self, func: Callable, callback: Optional[Callable]):
+        with self._lock:
+            if self._keyring_worker is None:
+                self._keyring_worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="keyring")
+            future = self._keyring_worker.submit(func)
+        if callback is not None:
+            future.add_done_callback(lambda f: callback(f.result()))
+        return future
+
+    def prefetch_password(self, user: str):
+        """Load the user's secret into the cache in the background."""
+        if keyring and not self.get_cached_password(user)[0]:
+            self._submit(lambda: self.load_password_if_any(user), None)
+
+    def load_password_async(self, user: str, callback: Callable[[Optional[str]], None]):
+        """Fetch a password off the calling thread.
+
+        The callback runs on the keyring worker thread (or immediately on a
+        cache hit); GUI code must marshal it back with ``after``.
+        """
+        found, password = self.get_cached_password(user)
+        if found or not keyring:
+            callback(password)
+            return
+        self._submit(lambda: self.load_password_if_any(user), callback)
+
+    def save_password_async(self, remember: bool, user: str, password: str,
+                            callback: Optional[Callable[[bool], None]] = None):
+        """Store or delete a password off the calling thread.
+
+        The cache is updated at once; the callback receives True on success.
+        """
+        self._cache_secret(user, password if remember and password else None)
+        self._submit(lambda: self._save_password(remember, user, password), callback)
@@ -0,0 +1,396 @@
+"""Runtime backends that run Omniboard instances.
+
+``OmniboardManager`` drives one of these:
+
+- ``DockerRuntime``: the ``vivekratnavel/omniboard`` image on Docker
+- ``PodmanRuntime``: the same image on (rootless) Podman, whose CLI is
+  Docker-compatible
+- ``NativeRuntime``: a locally installed Omniboard (``npm install -g
+  omniboard``) run as a plain Node process, with no image, container or
+  port publishing in between
+
+Every backend records the startup latency of the instances it launches
+(until their HTTP port accepts connections); memory per instance is
+reported by ``OmniboardManager.container_status``.
+"""
+import contextlib
+import json
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+try:
+    from .docker_exec import DockerExecutor
+    from .filelock import FileLock, atomic_write_text
+except ImportError:
+    from docker_exec import DockerExecutor
+    from filelock import FileLock, atomic_write_text
+
+
+class StartupTracker:
+    """Measures how long launched instances take to accept connections."""
+
+    def __init__(self, timeout: float = 120.0, poll_interval: float = 0.1,
+                 clock: Callable[[], float] = time.monotonic):
+        """Initialize the tracker.
+
+        Args:
+            timeout: Seconds after which an instance is considered failed
+            poll_interval: Seconds between connection attempts
+            clock: Time source, overridable for tests
+        """
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self._seconds: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def watch(self, name: str, port: int, started: Optional[float] = None):
+        """Probe ``127.0.0.1:port`` in the background and record the latency.
+
+        Args:
+            name: Instance name
+            port: Host port the instance serves on
+            started: Launch time on ``clock`` (now if None)
+        """
+        started = self.clock() if started is None else started
+        threading.Thread(target=self._wait, args=(name, port, started),
+                         name="startup-tracker", daemon=True).start()
+
+    def _wait(self, name: str, port: int, started: float):
+        while self.clock() - started < self.timeout:
+            try:
+                with socket.create_connection(("127.0.0.1", port), timeout=self.poll_interval):
+                    with self._lock:
+                        self._seconds[name] = self.clock() - started
+                    return
+            except OSError:
+                time.sleep(self.poll_interval)
+
+    def get(self, name: str) -> Optional[float]:
+        """Return the startup latency of ``name`` in seconds (None if unknown)."""
+        with self._lock:
+            return self._seconds.get(name)
+
+    def summary(self) -> Dict[str, float]:
+        """Return ``{"count", "mean_seconds", "max_seconds"}`` over all instances."""
+        with self._lock:
+            values = list(self._seconds.values())
+        return {
+            "count": len(values),
+            "mean_seconds": sum(values) / len(values) if values else 0.0,
+            "max_seconds": max(values, default=0.0),
+        }
+
+
+class ContainerRuntime:
+    """A Docker-compatible container CLI."""
+
+    name = "container"
+    native = False
+
+    def __init__(self, executor: DockerExecutor):
+        """Initialize the runtime.
+
+        Args:
+            executor: Executor running this runtime's CLI
+        """
+        self.executor = executor
+        self.startup = StartupTracker()
+
+    def available(self) -> bool:
+        """Return True if the CLI is installed and its engine answers."""
+        result = self.executor.run(["version", "--format", "{{.Server.Version}}"])
+        return result.returncode == 0 and bool(result.stdout.strip())
+
+
+class DockerRuntime(ContainerRuntime):
+    name = "docker"
+
+
+class PodmanRuntime(ContainerRuntime):
+    """Podman, typically rootless: no daemon to start, same CLI as Docker."""
+
+    name = "podman"
+
+    def __init__(self, executor: Optional[DockerExecutor] = None):
+        super().__init__(executor if executor is not None else DockerExecutor(self._podman_cmd_base))
+
+    @staticmethod
+    def _podman_cmd_base() -> List[str]:
+        return [shutil.which("podman") or "podman"]
+
+    def available(self) -> bool:
+        # Rootless Podman reports no server version; the client one suffices
+        result = self.executor.run(["version", "--format", "{{.Client.Version}}"])
+        return result.returncode == 0 and bool(result.stdout.strip())
+
+
+class NativeRuntime:
+    """Runs a locally installed Omniboard as a Node process.
+
+    Processes are recorded in a JSON registry (shared by all AltarViewer
+    instances of the user) so they can be listed, reused and stopped after
+    a restart, like containers.
+    """
+
+    name = "native"
+    native = True
+
+    def __init__(self, command: Optional[List[str]] = None, registry_path: Optional[Path] = None,
+                 log_dir: Optional[Path] = None):
+        """Initialize the runtime.
+
+        Args:
+            command: Command starting Omniboard (``omniboard`` from PATH if None)
+            registry_path: JSON file recording the running processes
+            log_dir: Directory receiving one log file per process
+        """
+        self.command = command
+        self.registry_path = Path(registry_path) if registry_path else None
+        self.log_dir = Path(log_dir) if log_dir else None
+        self.startup = StartupTracker()
+        self._lock = FileLock(self.registry_path.with_name(self.registry_path.name + ".lock")) \
+            if self.registry_path else None
+        self._memory_registry: Dict[str, dict] = {}
+        # Processes started by this runtime, reaped when stopped
+        self._procs: Dict[str, subprocess.Popen] = {}
+
+    def _command(self) -> Optional[List[str]]:
+        if self.command:
+            return list(self.command)
+        path = shutil.which("omniboard")
+        return [path] if path else None
+
+    def available(self) -> bool:
+        return self._command() is not None
+
+    # -- registry -------------------------------------------------------------
+    def _read(self) -> Dict[str, dict]:
+        if self.registry_path is None:
+            return dict(self._memory_registry)
+        try:
+            data = json.loads(self.registry_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _write(self, entries: Dict[str, dict]):
+        if self.registry_path is None:
+            self._memory_registry = dict(entries)
+            return
+        self.registry_path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_text(self.registry_path, json.dumps(entries, indent=2, sort_keys=True))
+
+    def _update(self, change: Callable[[Dict[str, dict]], None]):
+        with self._lock if self._lock is not None else contextlib.nullcontext():
+            entries = self._read()
+            change(entries)
+            self._write(entries)
+
+    # -- instances ------------------------------------------------------------
+    def launch(self, name: str, db_name: str, mongo_flag: str, mongo_arg: str,
+               host_port: int, fingerprint: str) -> str:
+        """Start Omniboard on ``host_port``; returns the instance name.
+
+        Raises:
+            Exception: If Omniboard is not installed
+        """
+        command = self._command()
+        if command is None:
+            raise Exception("Omniboard is not installed. Install it with 'npm install -g omniboard' "
+                            "or choose a container runtime.")
+        env = dict(os.environ, PORT=str(host_port))
+        log = subprocess.DEVNULL
+        if self.log_dir is not None:
+            self.log_dir.mkdir(parents=True, exist_ok=True)
+            # Truncated: lines of an earlier process of that name must not
+            # mark this one ready. Appending lets the follower truncate it.
+            (self.log_dir / f"{name}.log").write_bytes(b"")
+            log = open(self.log_dir / f"{name}.log", "ab")
+        kwargs = {"start_new_session": True} if os.name == "posix" else {
+            "creationflags": getattr(subprocess, "CREATE_NEW_PROCESS_GROUP", 0)
+            | getattr(subprocess, "CREATE_NO_WINDOW", 0)}
+        try:
+            proc = subprocess.Popen([*command, mongo_flag, mongo_arg], env=env, stdin=subprocess.DEVNULL,
+                                    stdout=log, stderr=subprocess.STDOUT, **kwargs)
+        finally:
+            if log is not subprocess.DEVNULL:
+                log.close()
+        self._procs[name] = proc
+        self.startup.watch(name, host_port)
+        # The start time tells the process apart from a later one reusing its PID
+        entry = {"pid": proc.pid, "started": _process_identity(proc.pid), "port": host_port,
+                 "database": db_name, "target": fingerprint, "created": int(time.time())}
+        self._update(lambda entries: entries.__setitem__(name, entry))
+        return name
+
+    def instances(self) -> List[Dict[str, object]]:
+        """Describe the live processes (dead ones are dropped from the registry)."""
+        entries = self._read()
+        dead = [name for name, e in entries.items() if not self._is_running(name, e)]
+        if dead:
+            self._update(lambda current: [current.pop(name, None) for name in dead])
+        now = time.time()
+        out = []
+        for name, e in sorted(entries.items(), key=lambda item: item[1].get("created", 0)):
+            if name in dead:
+                continue
+            rss = _rss_bytes(e["pid"])
+            out.append({
+                "id": name,
+                "name": name,
+                "database": e.get("database"),
+                "target": e.get("target"),
+                "created": e.get("created"),
+                "port": e.get("port"),
+                "state": "running",
+                "status": f"Up {_format_duration(now - (e.get('created') or now))} (pid {e['pid']})",
+                "cpu": None,
+                "memory": f"{rss / (1024 * 1024):.1f}MiB" if rss is not None else None,
+            })
+        return out
+
+    def _is_running(self, name: str, entry: dict) -> bool:
+        """Whether the recorded process still runs (and is not a reused PID)."""
+        pid = entry.get("pid", 0)
+        if not _pid_alive(pid):
+            return False
+        started = entry.get("started")
+        if started is None:
+            # Unverifiable (old entry or unsupported platform): trust only our own child
+            proc = self._procs.get(name)
+            return proc is not None and proc.pid == pid and proc.poll() is None
+        return _process_identity(pid) == started
+
+    def stop(self, name: str) -> bool:
+        """Terminate one process; returns False if it was not running."""
+        entry = self._read().get(name)
+        self._update(lambda entries: entries.pop(name, None))
+        if entry is None or not self._is_running(name, entry):
+            self._procs.pop(name, None)
+            return False
+        pid = entry["pid"]
+        try:
+            if os.name == "posix" and os.getpgid(pid) == pid:
+                # Its own session (start_new_session): take Node's children with it
+                os.killpg(pid, signal.SIGTERM)
+            else:
+                os.kill(pid, signal.SIGTERM)
+        except OSError:
+            return False
+        proc = self._procs.pop(name, None)
+        if proc is not None:
+            try:
+                proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        return True
+
+
+def _format_duration(seconds: float) -> str:
+    minutes = int(seconds // 60)
+    if minutes < 1:
+        return "less than a minute"
+    if minutes < 60:
+        return f"{minutes} minute{'s' if minutes > 1 else ''}"
+    hours = minutes // 60
+    return f"{hours} hour{'s' if hours > 1 else ''}"
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid <= 0:
+        return False
+    if sys.platform.startswith("win"):
+        import ctypes
+        kernel32 = ctypes.windll.kernel32  # type: ignore[attr-defined]
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        code = ctypes.c_ulong()
+        kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+        kernel32.CloseHandle(handle)
+        return code.value == 259  # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    # A zombie child of ours still answers signals
+    try:
+        status = Path(f"/proc/{pid}/status").read_text()
+        return "\nState:\tZ" not in status
+    except OSError:
+        return True
+
+
+def _process_identity(pid: int) -> Optional[str]:
+    """Start time of a process, which stays fixed for its lifetime.
+
+    Returns None where the platform does not tell it cheaply.
+    """
+    if sys.platform.startswith("win"):
+        import ctypes
+        kernel32 = ctypes.windll.kernel32  # type: ignore[attr-defined]
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return None
+        try:
+            times = [ctypes.c_ulonglong() for _ in range(4)]
+            if not kernel32.GetProcessTimes(handle, *(ctypes.byref(t) for t in times)):
+                return None
+            return str(times[0].value)
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        # Field 22 (after the parenthesised command, which may hold spaces),
+        # in clock ticks since boot; the boot id tells reboots apart
+        fields = Path(f"/proc/{pid}/stat").read_text().rpartition(")")[2].split()
+        boot = Path("/proc/sys/kernel/random/boot_id").read_text().strip()
+        return f"{boot}:{fields[19]}"
+    except (OSError, IndexError):
+        pass
+    if sys.platform == "darwin":
+        try:
+            out = subprocess.run(["ps", "-o", "lstart=", "-p", str(pid)], capture_output=True,
+                                 text=True, timeout=5).stdout.strip()
+            return out or None
+        except (OSError, subprocess.SubprocessError):
+            return None
+    return None
+
+
+def _rss_bytes(pid: int) -> Optional[int]:
+    """Resident memory of a process, where the platform makes it cheap."""
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    if sys.platform == "darwin":
+        try:
+            out = subprocess.run(["ps", "-o", "rss=", "-p", str(pid)], capture_output=True,
+                                 text=True, timeout=5).stdout.strip()
+            return int(out) * 1024 if out else None
+        except (OSError, ValueError, subprocess.SubprocessError):
+            return None
+    return None
+
+
+def runtime_by_name(name: str, docker_executor: DockerExecutor, native_registry: Optional[Path] = None,
+                    native_logs: Optional[Path] = None):
+    """Return the runtime called ``name`` ("docker", "podman" or "native")."""
+    if name == "podman":
+        return PodmanRuntime()
+    if name == "native":
+        return NativeRuntime(registry_path=native_registry, log_dir=native_logs)
+    return DockerRuntime(docker_executor)
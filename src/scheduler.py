@@ -0,0 +1,305 @@
+"""Scheduling of Omniboard launches across several Docker engines.
+
+Besides the local daemon, containers can be launched on other Docker
+contexts (``docker context ls``) or engine endpoints (``unix://``,
+``tcp://``, ``ssh://``). ``LaunchScheduler`` picks, per launch, the engine
+with the most free capacity (sampled live with ``docker info`` and ``docker
+stats``) or the one with the lowest TCP latency to the selected MongoDB
+server (measured from a probe container on each engine). It remembers
+which engine runs each container, so ``OmniboardManager`` can list, reuse
+and remove containers wherever they run.
+"""
+import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+try:
+    from .docker_exec import DockerExecutor
+    from .netprobe import NetworkProbe
+except ImportError:
+    from docker_exec import DockerExecutor
+    from netprobe import NetworkProbe
+
+# Name of the engine found by ``OmniboardManager._docker_cmd_base``
+LOCAL = "local"
+# Spec prefixes naming an engine endpoint (``-H``) rather than a context
+ENDPOINT_SCHEMES = ("unix://", "npipe://", "fd://", "tcp://", "ssh://")
+LOOPBACK_HOSTS = ("", "localhost", "127.0.0.1", "::1")
+
+_SIZE_UNITS = {
+    "b": 1, "kb": 1000, "mb": 1000 ** 2, "gb": 1000 ** 3, "tb": 1000 ** 4,
+    "kib": 1024, "mib": 1024 ** 2, "gib": 1024 ** 3, "tib": 1024 ** 4,
+}
+
+
+def parse_size(text: str) -> Optional[int]:
+    """Parse a size printed by ``docker stats`` (e.g. "48.2MiB") into bytes."""
+    match = re.fullmatch(r"\s*([\d.]+)\s*([kKmMgGtT]?i?[bB])\s*", text or "")
+    if not match:
+        return None
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2).lower()])
+
+
+def endpoint_address(endpoint: str) -> str:
+    """Return the host on which an engine endpoint publishes ports.
+
+    Socket and pipe endpoints are on this machine; ``tcp://`` and ``ssh://``
+    endpoints publish on their host.
+    """
+    if not endpoint.startswith(("tcp://", "ssh://")):
+        return "127.0.0.1"
+    host = urlparse(endpoint).hostname or ""
+    return "127.0.0.1" if host in LOOPBACK_HOSTS else host
+
+
+class EngineTarget:
+    """One Docker engine Omniboard containers can be launched on."""
+
+    def __init__(self, name: str, executor: DockerExecutor, address: Optional[str] = None,
+                 network_probe: Optional[NetworkProbe] = None):
+        """Initialize the target.
+
+        Args:
+            name: Context name, endpoint URL, or ``LOCAL``
+            executor: Executor whose commands reach this engine
+            address: Host on which published ports are reachable
+                (resolved from the context or endpoint if None)
+            network_probe: Measures how containers of this engine reach
+                MongoDB (an in-memory one is made by the scheduler if None)
+        """
+        self.name = name
+        self.executor = executor
+        self._address = address
+        self.network_probe = network_probe
+
+    @classmethod
+    def from_spec(cls, spec: str, resolver: Callable[[], List[str]]) -> "EngineTarget":
+        """Build a target from a context name or an engine endpoint URL.
+
+        Args:
+            spec: e.g. ``"build-server"`` or ``"unix:///run/user/1000/docker.sock"``
+            resolver: Returns the base Docker command (see ``DockerExecutor``)
+        """
+        spec = spec.strip()
+        if spec.startswith(ENDPOINT_SCHEMES):
+            return cls(spec, DockerExecutor(resolver, global_args=["-H", spec]), endpoint_address(spec))
+        return cls(spec, DockerExecutor(resolver, global_args=["--context", spec]))
+
+    @property
+    def address(self) -> str:
+        """Host on which this engine's published ports are reachable."""
+        if self._address is None:
+            result = self.executor.run(
+                ["context", "inspect", self.name, "--format", "{{.Endpoints.docker.Host}}"]
+            )
+            endpoint = result.stdout.strip() if result.returncode == 0 else ""
+            self._address = endpoint_address(endpoint)
+        return self._address
+
+    @property
+    def is_local(self) -> bool:
+        """True if the engine runs on this machine (shares its ports and MongoDB)."""
+        return self.address in LOOPBACK_HOSTS
+
+    @property
+    def publish_address(self) -> str:
+        """Address ports are published on: loopback locally, all interfaces remotely."""
+        return "127.0.0.1" if self.is_local else "0.0.0.0"
+
+    @property
+    def url_host(self) -> str:
+        """Host part of the Omniboard URLs of this engine's containers."""
+        return "localhost" if self.is_local else self.address
+
+
+class EngineCapacity:
+    """Live resource usage of one engine."""
+
+    def __init__(self, mem_total: int, mem_used: int, ncpu: int, cpu_percent: float, running: int):
+        """Initialize the sample.
+
+        Args:
+            mem_total: Memory of the engine host (bytes)
+            mem_used: Memory used by its running containers (bytes)
+            ncpu: CPUs of the engine host
+            cpu_percent: Summed CPU usage of its containers (100 per busy CPU)
+            running: Number of running containers
+        """
+        self.mem_total = mem_total
+        self.mem_used = mem_used
+        self.ncpu = ncpu
+        self.cpu_percent = cpu_percent
+        self.running = running
+
+    @property
+    def free_bytes(self) -> int:
+        return max(0, self.mem_total - self.mem_used)
+
+    @property
+    def score(self) -> float:
+        """Free memory, discounted by the share of CPU already busy."""
+        idle = 1.0 - min(1.0, self.cpu_percent / (100.0 * max(1, self.ncpu)))
+        return self.free_bytes * max(0.05, idle)
+
+    def as_dict(self) -> dict:
+        return {"mem_total": self.mem_total, "mem_used": self.mem_used, "ncpu": self.ncpu,
+                "cpu_percent": self.cpu_percent, "running": self.running}
+
+
+def sample_capacity(executor: DockerExecutor) -> Optional[EngineCapacity]:
+    """Sample an engine with one ``docker info`` and one ``docker stats``.
+
+    Returns:
+        The capacity, or None if the engine does not answer
+    """
+    result = executor.run(["info", "--format", "{{json .}}"])
+    if result.returncode != 0:
+        return None
+    try:
+        info = json.loads(result.stdout.strip().splitlines()[-1])
+    except (ValueError, IndexError):
+        return None
+    if not isinstance(info, dict):
+        return None
+    used = 0
+    cpu = 0.0
+    stats = executor.run(["stats", "--no-stream", "--format", "{{json .}}"])
+    for line in stats.stdout.splitlines() if stats.returncode == 0 else []:
+        try:
+            row = json.loads(line)
+        except ValueError:
+            continue
+        used += parse_size((row.get("MemUsage") or "").split("/")[0]) or 0
+        try:
+            cpu += float((row.get("CPUPerc") or "0").rstrip("%"))
+        except ValueError:
+            pass
+    return EngineCapacity(int(info.get("MemTotal") or 0), used, int(info.get("NCPU") or 1), cpu,
+                          int(info.get("ContainersRunning") or 0))
+
+
+class LaunchScheduler:
+    """Chooses the engine of each launch and tracks where containers run."""
+
+    POLICIES = ("capacity", "latency")
+    # Measured latencies are reused for this long
+    LATENCY_TTL_SECONDS = 300.0
+
+    def __init__(self, targets: List[EngineTarget], policy: str = "capacity", image: str = "",
+                 clock: Callable[[], float] = time.monotonic):
+        """Initialize the scheduler.
+
+        Args:
+            targets: Engines to schedule on; ``OmniboardManager`` adds the
+                local one in front
+            policy: "capacity" (most free memory and CPU) or "latency"
+                (lowest TCP connect time to MongoDB)
+            image: Image providing ``node`` for latency probes
+            clock: Time source, overridable for tests
+
+        Raises:
+            ValueError: If the policy is unknown
+        """
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown scheduling policy: {policy}")
+        self.targets: List[EngineTarget] = []
+        self.policy = policy
+        self.image = image
+        self.clock = clock
+        self._latencies: Dict[tuple, tuple] = {}
+        # Container name and ID -> engine name
+        self._placements: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        for target in targets:
+            self.add(target)
+
+    def add(self, target: EngineTarget, first: bool = False):
+        """Add an engine (in front of the others if ``first``)."""
+        if target.network_probe is None:
+            target.network_probe = NetworkProbe(target.executor.run, self.image)
+        if first:
+            self.targets.insert(0, target)
+        else:
+            self.targets.append(target)
+
+    def target(self, name: str) -> Optional[EngineTarget]:
+        return next((t for t in self.targets if t.name == name), None)
+
+    def _each(self, func: Callable[[EngineTarget], object], targets: List[EngineTarget]) -> list:
+        if len(targets) < 2:
+            return [func(t) for t in targets]
+        with ThreadPoolExecutor(max_workers=len(targets)) as pool:
+            return list(pool.map(func, targets))
+
+    def capacities(self) -> Dict[str, Optional[EngineCapacity]]:
+        """Sample every engine in parallel (None for engines that do not answer)."""
+        samples = self._each(lambda t: sample_capacity(t.executor), self.targets)
+        return {t.name: s for t, s in zip(self.targets, samples)}
+
+    def latency(self, target: EngineTarget, mongo_host: str, mongo_port: int) -> Optional[float]:
+        """TCP connect time (ms) from a container of ``target`` to MongoDB.
+
+        Returns:
+            The round-trip time, or None if MongoDB is not reachable
+        """
+        key = (target.name, mongo_host, mongo_port)
+        with self._lock:
+            cached = self._latencies.get(key)
+        if cached is not None and self.clock() - cached[1] < self.LATENCY_TTL_SECONDS:
+            return cached[0]
+        if mongo_host in LOOPBACK_HOSTS:
+            choice = target.network_probe.choose(mongo_host, mongo_port)
+            rtt = choice.rtt_ms if choice.reachable else None
+        else:
+            rtt = target.network_probe.rtt(mongo_host, mongo_port)
+        with self._lock:
+            self._latencies[key] = (rtt, self.clock())
+        return rtt
+
+    def pick(self, mongo_host: str, mongo_port: int) -> EngineTarget:
+        """Choose the engine for a launch serving ``mongo_host:mongo_port``.
+
+        A MongoDB on this machine is only offered to engines on this
+        machine. Engines that do not answer (or cannot reach MongoDB, for
+        the latency policy) are skipped; if none is left, the first engine
+        is used.
+        """
+        candidates = self.targets
+        if mongo_host in LOOPBACK_HOSTS:
+            candidates = [t for t in candidates if t.is_local] or candidates[:1]
+        if len(candidates) == 1:
+            return candidates[0]
+        if self.policy == "latency":
+            rtts = self._each(lambda t: self.latency(t, mongo_host, mongo_port), candidates)
+            reachable = [(rtt, i) for i, rtt in enumerate(rtts) if rtt is not None]
+            return candidates[min(reachable)[1]] if reachable else candidates[0]
+        samples = self._each(lambda t: sample_capacity(t.executor), candidates)
+        answering = [i for i, s in enumerate(samples) if s is not None]
+        if not answering:
+            return candidates[0]
+        return candidates[max(answering, key=lambda i: (samples[i].score, -i))]
+
+    def record(self, engine: str, *containers: str):
+        """Remember that ``containers`` (names or IDs) run on ``engine``."""
+        with self._lock:
+            for container in containers:
+                if container:
+                    self._placements[container] = engine
+
+    def placement(self, container: str) -> Optional[EngineTarget]:
+        """Return the engine running ``container`` (a name or a full or short ID)."""
+        with self._lock:
+            engine = self._placements.get(container)
+            if engine is None:
+                engine = next((e for c, e in self._placements.items()
+                               if len(container) >= 12 and c.startswith(container)), None)
+        return self.target(engine) if engine is not None else None
+
+    def forget(self, *containers: str):
+        with self._lock:
+            for container in containers:
+                self._placements.pop(container, None)
@@ -0,0 +1,211 @@
+"""One Omniboard container serving many databases.
+
+Omniboard serves several databases from one process when ``OMNIBOARD_CONFIG``
+points to a JSON file mapping names to MongoDB URIs and URL paths.
+``SharedOmniboard`` keeps such a file with every database launched in
+shared mode, mounts its directory into a single container and restarts the
+container whenever the file changes, so ten databases cost one Node process
+instead of ten.
+"""
+import hashlib
+import json
+import os
+import re
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    from .filelock import atomic_write_text
+    from .netprobe import NetworkChoice
+except ImportError:
+    from filelock import atomic_write_text
+    from netprobe import NetworkChoice
+
+CONTAINER = "omniboard_shared"
+CONFIG_NAME = "db_config.json"
+# Where the config directory is mounted in the container
+CONFIG_MOUNT = "/config"
+# Port lease of the shared container in ``ports.json``
+PORT_LEASE = "__shared__"
+# Target label prefix; the rest identifies the container's run options
+TARGET_PREFIX = "shared-"
+
+
+def db_path(db_name: str) -> str:
+    """Return the URL path serving ``db_name`` (made URL-safe and unique)."""
+    slug = re.sub(r"[^A-Za-z0-9_.-]", "-", db_name)
+    if slug != db_name:
+        slug += "-" + hashlib.sha1(db_name.encode()).hexdigest()[:6]
+    return f"/{slug}"
+
+
+def mongo_uri_for(mongo_flag: str, mongo_arg: str) -> str:
+    """Turn Omniboard's ``-m host:port:db`` or ``--mu URI`` argument into a URI."""
+    if mongo_flag == "--mu":
+        return mongo_arg
+    host, port, db = mongo_arg.rsplit(":", 2)
+    return f"mongodb://{host}:{port}/{db}"
+
+
+class SharedOmniboard:
+    """Maintains the shared container and its generated config."""
+
+    def __init__(self, manager, directory: Path):
+        """Initialize the shared instance.
+
+        Args:
+            manager: ``OmniboardManager`` whose executor, port leases and
+                network probe are used
+            directory: Directory of the generated config (mounted read-only)
+        """
+        self.manager = manager
+        self.directory = Path(directory)
+        self.config_path = self.directory / CONFIG_NAME
+        # Sticky across added databases: the first database needing a
+        # special network setup (or the mirror's network) keeps it
+        self._network: Optional[NetworkChoice] = None
+        self._docker_network: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def _read(self) -> Dict[str, dict]:
+        try:
+            data = json.loads(self.config_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _write(self, config: Dict[str, dict]):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # The file holds credentials; the container reads it as root
+        atomic_write_text(self.config_path, json.dumps(config, indent=2, sort_keys=True))
+        try:
+            os.chmod(self.config_path, 0o600)
+        except OSError:
+            pass
+
+    def databases(self) -> Dict[str, str]:
+        """Return ``{database: URL path}`` of the databases in the config."""
+        return {name: entry.get("path", db_path(name)) for name, entry in self._read().items()}
+
+    def _container(self) -> Optional[Dict[str, object]]:
+        for container in self.manager._query_containers(["-a", "--filter", f"name={CONTAINER}"]):
+            if container["name"] == CONTAINER:
+                return container
+        return None
+
+    def _run_options(self, port: int) -> List[str]:
+        network = self._network or NetworkChoice("default", "")
+        return [
+            *network.docker_args(port),
+            *(["--network", self._docker_network] if self._docker_network else []),
+            "-v", f"{self.directory.resolve()}:{CONFIG_MOUNT}:ro",
+            "-e", f"OMNIBOARD_CONFIG={CONFIG_MOUNT}/{CONFIG_NAME}",
+        ]
+
+    def add(
+        self,
+        db_name: str,
+        mongo_host: str,
+        mongo_port: int,
+        mongo_uri: Optional[str] = None,
+        docker_network: Optional[str] = None,
+        proxy_port: Optional[int] = None,
+    ):
+        """Serve ``db_name`` from the shared container (arguments as for ``launch``).
+
+        Starts the container on first use; adding a database to a running
+        one regenerates the config and restarts it.
+
+        Returns:
+            ``omniboard.LaunchResult`` of the shared container, with the URL
+            path of the database as ``path``
+
+        Raises:
+            Exception: If the runtime has no containers or Docker fails
+        """
+        manager = self.manager
+        if manager.runtime.native:
+            raise Exception("The shared instance needs a container runtime (Docker or Podman).")
+        mongo_flag, mongo_arg, network = manager._mongo_args(
+            db_name, mongo_host, mongo_port, mongo_uri, proxy_port
+        )
+        with self._lock:
+            if network.mode != "default" and (self._network is None or self._network.mode == "default"):
+                self._network = network
+            self._docker_network = docker_network or self._docker_network
+            config = self._read()
+            entry = {"mongodbURI": mongo_uri_for(mongo_flag, mongo_arg), "path": db_path(db_name)}
+            changed = config.get(db_name) != entry
+            config[db_name] = entry
+            if changed:
+                self._write(config)
+            return self._apply(changed, entry["path"])
+
+    def remove(self, db_name: str) -> bool:
+        """Stop serving ``db_name``; the container stops with its last database.
+
+        Returns:
+            False if the database was not shared
+        """
+        with self._lock:
+            config = self._read()
+            if config.pop(db_name, None) is None:
+                return False
+            if not config:
+                self.manager.logs.stop(CONTAINER)
+                self.manager.stop_container(CONTAINER)
+                self.clear()
+                return True
+            self._write(config)
+            self._apply(True)
+            return True
+
+    def clear(self):
+        """Forget all databases (the container itself is left alone)."""
+        try:
+            self.config_path.unlink()
+        except OSError:
+            pass
+        self._network = self._docker_network = None
+
+    def _apply(self, changed: bool, path: str = ""):
+        """Start, restart or recreate the container to serve the current config."""
+        # omniboard imports this module
+        try:
+            from .omniboard import LaunchResult
+        except ImportError:
+            from omniboard import LaunchResult
+        manager = self.manager
+        executor = manager.executor
+        current = self._container()
+        port = current["port"] if current and current["port"] else manager.allocate_port(PORT_LEASE)
+        options = self._run_options(port)
+        target = TARGET_PREFIX + hashlib.sha256(" ".join(options).encode()).hexdigest()[:12]
+        network = self._network
+        if current is not None and current["state"] == "running" and current["target"] == target:
+            if not changed:
+                return LaunchResult(CONTAINER, port, "reused", network=network, path=path)
+            # Omniboard reads its config at startup
+            since = str(int(time.time()))
+            result = executor.run(["restart", "--time", "3", CONTAINER], timeout=30.0)
+            if result.returncode == 0:
+                manager.logs.follow_container(CONTAINER, executor.popen, since=since)
+                return LaunchResult(CONTAINER, port, "restarted", network=network, path=path)
+        if current is not None:
+            # Other run options (network setup) need a new container
+            manager.logs.stop(CONTAINER)
+            executor.run(["rm", "-f", CONTAINER])
+        manager.ensure_runtime_running()
+        proc = executor.popen(
+            ["run", "-d", "--rm", *options, "--name", CONTAINER,
+             *manager._labels("(shared)", target, port), manager.IMAGE],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, stdin=subprocess.DEVNULL,
+        )
+        if proc is None:
+            raise Exception("Docker CLI not found. Please install Docker and ensure it is on PATH.")
+        manager.logs.follow_container(CONTAINER, executor.popen, after=proc)
+        manager.runtime.startup.watch(CONTAINER, port)
+        return LaunchResult(CONTAINER, port, "run", network=network, path=path)
@@ -0,0 +1,197 @@
+"""Disk-backed resolution cache for ``mongodb+srv://`` URIs.
+
+Resolving an SRV URI costs one SRV and one TXT DNS lookup on every connect,
+which is slow on some networks (VPNs in particular). This module stores the
+resolved seed list and TXT options per SRV host on disk, honours the record
+TTLs, and rewrites SRV URIs into equivalent ``mongodb://`` seed-list URIs.
+"""
+import json
+import random
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+
+try:
+    from .filelock import atomic_write_text
+except ImportError:
+    from filelock import atomic_write_text
+
+# TXT records may only carry these options (per the MongoDB SRV spec)
+_ALLOWED_TXT_OPTIONS = ("authSource", "replicaSet", "loadBalanced")
+
+# URI options of the SRV lookup itself; a seed-list URI must not carry them
+_SRV_ONLY_OPTIONS = ("srvservicename", "srvmaxhosts")
+
+# Never trust a cached entry longer than this, whatever the TTL says
+MAX_TTL_SECONDS = 24 * 3600
+
+
+def srv_target(srv_uri: str) -> Tuple[str, str]:
+    """Return the (hostname, SRV service name) a ``mongodb+srv://`` URI resolves."""
+    parsed = urlparse(srv_uri)
+    options = {k.lower(): v for k, v in parse_qsl(parsed.query, keep_blank_values=True)}
+    return parsed.netloc.rpartition("@")[2], options.get("srvservicename") or "mongodb"
+
+
+def resolve_srv_records(hostname: str, service_name: str = "mongodb") -> Tuple[List[str], Dict[str, str], int]:
+    """Resolve the SRV and TXT records for an SRV hostname with dnspython.
+
+    Args:
+        hostname: Host part of a ``mongodb+srv://`` URI
+        service_name: SRV service name (the ``srvServiceName`` URI option)
+
+    Returns:
+        Tuple of (``host:port`` seed list, TXT options, TTL in seconds)
+
+    Raises:
+        Exception: If the SRV lookup fails
+    """
+    import dns.resolver  # type: ignore
+
+    srv = dns.resolver.resolve(f"_{service_name}._tcp.{hostname}", "SRV")
+    hosts = [
+        f"{r.target.to_text(omit_final_dot=True)}:{r.port}"
+        for r in srv
+    ]
+    ttl = srv.rrset.ttl if srv.rrset is not None else 0
+
+    options: Dict[str, str] = {}
+    try:
+        txt = dns.resolver.resolve(hostname, "TXT")
+        ttl = min(ttl, txt.rrset.ttl) if txt.rrset is not None else ttl
+        for record in txt:
+            text = b"".join(record.strings).decode("utf-8")
+            for key, value in parse_qsl(text):
+                options[key] = value
+    except Exception:
+        # A missing TXT record is legal; only the SRV record is mandatory
+        pass
+    return hosts, options, ttl
+
+
+class SrvCache:
+    """Caches SRV/TXT resolutions on disk, keyed by SRV hostname."""
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        resolver: Callable[[str], Tuple[List[str], Dict[str, str], int]] = resolve_srv_records,
+        clock: Callable[[], float] = time.time,
+    ):
+        """Initialize the cache.
+
+        Args:
+            path: JSON file backing the cache (in-memory only if None)
+            resolver: Function resolving a hostname (and a service name other
+                than "mongodb") to (hosts, options, ttl)
+            clock: Time source, overridable for tests
+        """
+        self.path = path
+        self.resolver = resolver
+        self.clock = clock
+        self._entries: Optional[Dict[str, dict]] = None
+
+    def _load(self) -> Dict[str, dict]:
+        if self._entries is None:
+            self._entries = {}
+            try:
+                if self.path and self.path.exists():
+                    data = json.loads(self.path.read_text(encoding="utf-8"))
+                    if isinstance(data, dict):
+                        self._entries = data
+            except Exception:
+                pass
+        return self._entries
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            atomic_write_text(self.path, json.dumps(self._entries, indent=2))
+        except Exception:
+            pass
+
+    @staticmethod
+    def _key(hostname: str, service_name: str) -> str:
+        return hostname.lower() if service_name == "mongodb" else f"_{service_name}.{hostname}".lower()
+
+    def lookup(self, hostname: str, service_name: str = "mongodb") -> Tuple[List[str], Dict[str, str], bool]:
+        """Return the seed list and options for an SRV hostname.
+
+        Args:
+            hostname: Host part of a ``mongodb+srv://`` URI
+            service_name: SRV service name (the ``srvServiceName`` URI option)
+
+        Returns:
+            Tuple of (seed list, TXT options, True if served from cache)
+        """
+        key = self._key(hostname, service_name)
+        entries = self._load()
+        entry = entries.get(key)
+        now = self.clock()
+        if entry and entry.get("expires", 0) > now and entry.get("hosts"):
+            return list(entry["hosts"]), dict(entry.get("options", {})), True
+
+        hosts, options, ttl = self.resolver(hostname) if service_name == "mongodb" \
+            else self.resolver(hostname, service_name)
+        if not hosts:
+            raise ValueError(f"No SRV records found for '{hostname}'")
+        ttl = max(0, min(int(ttl), MAX_TTL_SECONDS))
+        entries[key] = {
+            "hosts": hosts,
+            "options": {k: v for k, v in options.items() if k in _ALLOWED_TXT_OPTIONS},
+            "expires": now + ttl,
+        }
+        self._save()
+        return hosts, dict(entries[key]["options"]), False
+
+    def invalidate(self, hostname: str, service_name: str = "mongodb"):
+        """Drop the cached resolution for a hostname (e.g. after a failed connect).
+
+        Args:
+            hostname: Host part of a ``mongodb+srv://`` URI
+            service_name: SRV service name it was looked up with
+        """
+        if self._load().pop(self._key(hostname, service_name), None) is not None:
+            self._save()
+
+    def to_seedlist_uri(self, srv_uri: str) -> Tuple[str, bool]:
+        """Rewrite a ``mongodb+srv://`` URI into an equivalent ``mongodb://`` URI.
+
+        Credentials, path and query options are preserved. TXT options are
+        added unless the URI overrides them, and TLS is enabled by default as
+        the SRV scheme implies it. ``srvServiceName`` and ``srvMaxHosts`` are
+        applied here (a random subset of hosts, like the drivers) and dropped,
+        as drivers reject them outside SRV URIs.
+
+        Args:
+            srv_uri: URI using the ``mongodb+srv`` scheme
+
+        Returns:
+            Tuple of (seed-list URI, True if the resolution came from cache)
+        """
+        parsed = urlparse(srv_uri)
+        userinfo = parsed.netloc.rpartition("@")[0]
+        query = parse_qsl(parsed.query, keep_blank_values=True)
+        srv_options = {k.lower(): v for k, v in query if k.lower() in _SRV_ONLY_OPTIONS}
+        query = [(k, v) for k, v in query if k.lower() not in _SRV_ONLY_OPTIONS]
+        hosts, options, cached = self.lookup(*srv_target(srv_uri))
+        try:
+            max_hosts = int(srv_options.get("srvmaxhosts") or 0)
+        except ValueError:
+            max_hosts = 0
+        if 0 < max_hosts < len(hosts):
+            hosts = random.sample(hosts, max_hosts)
+
+        present = {k.lower() for k, _ in query}
+        for key, value in options.items():
+            if key.lower() not in present:
+                query.append((key, value))
+        if "tls" not in present and "ssl" not in present:
+            query.append(("tls", "true"))
+
+        netloc = f"{userinfo}@" if userinfo else ""
+        netloc += ",".join(hosts)
+        uri = urlunparse(("mongodb", netloc, parsed.path or "/", "", urlencode(query), ""))
+        return uri, cached
@@ -0,0 +1,185 @@
+"""Lightweight span tracing with Chrome trace / Perfetto JSON export.
+
+Tracing is off by default and costs a single attribute check per span. It
+is enabled either by setting ``ALTARVIEWER_TRACE`` (to an output ``.json``
+path, or to any other value to write into the config directory on exit) or
+from the GUI toggle. Exported files open in ``chrome://tracing`` or
+https://ui.perfetto.dev.
+"""
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import List, Optional
+
+TRACE_ENV = "ALTARVIEWER_TRACE"
+
+_NULL_SPAN = nullcontext()
+
+
+class Tracer:
+    """Collects trace events in memory until exported.
+
+    Only the last ``max_events`` events are kept, so a trace left running
+    (e.g. a whole session from ``ALTARVIEWER_TRACE``) does not grow without
+    bound; how many older events were dropped is exported with the trace.
+    """
+
+    MAX_EVENTS = 200_000
+
+    def __init__(self, max_events: int = MAX_EVENTS):
+        self.enabled = False
+        self.max_events = max_events
+        self.dropped = 0
+        self._events: deque = deque(maxlen=max_events)
+        # Thread names are kept apart so dropping old events never loses them
+        self._thread_events: List[dict] = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._named_threads = set()
+        self._next_async_id = 0
+
+    @staticmethod
+    def _now_us() -> float:
+        return time.perf_counter_ns() / 1000.0
+
+    def _record(self, event: dict):
+        tid = threading.get_ident()
+        event.setdefault("pid", self._pid)
+        event.setdefault("tid", tid)
+        with self._lock:
+            if tid not in self._named_threads:
+                self._named_threads.add(tid)
+                self._thread_events.append({
+                    "ph": "M", "name": "thread_name", "pid": self._pid, "tid": tid,
+                    "args": {"name": threading.current_thread().name},
+                })
+            if len(self._events) == self.max_events:
+                self.dropped += 1
+            self._events.append(event)
+
+    def start(self):
+        """Start recording, discarding any previous events."""
+        with self._lock:
+            self._events = deque(maxlen=self.max_events)
+            self._thread_events = []
+            self._named_threads = set()
+            self.dropped = 0
+        self.enabled = True
+
+    def stop(self):
+        """Stop recording; recorded events are kept until the next start."""
+        self.enabled = False
+
+    def span(self, name: str, **args):
+        """Context manager timing a (possibly nested) synchronous step."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return self._span(name, args)
+
+    @contextmanager
+    def _span(self, name: str, args: dict):
+        start = self._now_us()
+        try:
+            yield
+        finally:
+            self._record({
+                "ph": "X", "name": name, "cat": name.split(".")[0],
+                "ts": start, "dur": self._now_us() - start, "args": args,
+            })
+
+    def begin_async(self, name: str, **args) -> Optional[int]:
+        """Start a span that ends on another thread or callback.
+
+        Returns:
+            Id to pass to ``end_async`` (None when tracing is off)
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            self._next_async_id += 1
+            async_id = self._next_async_id
+        self._record({"ph": "b", "name": name, "cat": name.split(".")[0],
+                      "id": async_id, "ts": self._now_us(), "args": args})
+        return async_id
+
+    def end_async(self, name: str, async_id: Optional[int], **args):
+        """Finish a span started with ``begin_async``."""
+        if async_id is None or not self.enabled:
+            return
+        self._record({"ph": "e", "name": name, "cat": name.split(".")[0],
+                      "id": async_id, "ts": self._now_us(), "args": args})
+
+    def instant(self, name: str, **args):
+        """Record a point-in-time event."""
+        if self.enabled:
+            self._record({"ph": "i", "s": "t", "name": name, "ts": self._now_us(), "args": args})
+
+    def export(self, path: Optional[Path] = None) -> Path:
+        """Write the recorded events as Chrome trace JSON.
+
+        Args:
+            path: Output file (default: ``traces/trace-<timestamp>.json`` in
+                the config directory)
+
+        Returns:
+            The written path
+        """
+        if path is None:
+            path = default_trace_path()
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            events = self._thread_events + list(self._events)
+            dropped = self.dropped
+        payload = {"traceEvents": events, "displayTimeUnit": "ms"}
+        if dropped:
+            payload["otherData"] = {"dropped_events": dropped}
+        path.write_text(json.dumps(payload), encoding="utf-8")
+        return path
+
+
+def default_trace_path() -> Path:
+    try:
+        from .prefs import CONFIG_DIR
+    except ImportError:
+        from prefs import CONFIG_DIR
+    return CONFIG_DIR / "traces" / f"trace-{time.strftime('%Y%m%d-%H%M%S')}.json"
+
+
+tracer = Tracer()
+
+
+def span(name: str, **args):
+    """Shortcut for ``tracer.span``."""
+    return tracer.span(name, **args)
+
+
+def traced(name: str):
+    """Decorator wrapping a function call in a span."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*a, **kw):
+            if not tracer.enabled:
+                return func(*a, **kw)
+            with tracer.span(name):
+                return func(*a, **kw)
+        return wrapper
+    return decorator
+
+
+def _enable_from_environment():
+    target = os.environ.get(TRACE_ENV)
+    if not target:
+        return
+    tracer.start()
+    path = Path(target) if target.lower().endswith(".json") else None
+    atexit.register(lambda: tracer.export(path))
+
+
+_enable_from_environment()
@@ -0,0 +1,518 @@
+"""Reusable CustomTkinter widgets."""
+import tkinter as tk
+from typing import Callable, Iterable, List, Optional
+
+import customtkinter as ctk
+
+
+class NameIndex:
+    """Case-insensitive substring filter over a list of names.
+
+    Filtering is incremental: when the new query extends the previous one
+    (the usual type-ahead case), only the previous matches are scanned.
+    """
+
+    def __init__(self, names: Iterable[str] = ()):
+        self.set_names(names)
+
+    def set_names(self, names: Iterable[str]):
+        self._names: List[str] = list(names)
+        self._lower: List[str] = [n.lower() for n in self._names]
+        # Membership tests stay O(1) on large lists
+        self._members = set(self._names)
+        self._last_query: Optional[str] = None
+        self._last_matches: List[int] = []
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._names)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._members
+
+    def add(self, name: str):
+        self.add_many([name])
+
+    def add_many(self, names: Iterable[str]) -> List[str]:
+        """Append the names not already present; returns those added."""
+        added = []
+        for name in names:
+            if name not in self._members:
+                self._members.add(name)
+                self._names.append(name)
+                self._lower.append(name.lower())
+                added.append(name)
+        if added:
+            self._invalidate()
+        return added
+
+    def remove(self, name: str):
+        self.remove_many([name])
+
+    def remove_many(self, names: Iterable[str]) -> List[str]:
+        """Remove the names present, in one pass; returns those removed."""
+        removed = [n for n in set(names) if n in self._members]
+        if not removed:
+            return []
+        self._members.difference_update(removed)
+        kept = [i for i, n in enumerate(self._names) if n in self._members]
+        self._names = [self._names[i] for i in kept]
+        self._lower = [self._lower[i] for i in kept]
+        self._invalidate()
+        return removed
+
+    def _invalidate(self):
+        self._last_query = None
+
+    def filter(self, query: str) -> List[str]:
+        """Return the names containing ``query`` (case-insensitive), in list order."""
+        q = query.strip().lower()
+        if not q:
+            self._last_query, self._last_matches = q, list(range(len(self._names)))
+            return list(self._names)
+        if self._last_query and q.startswith(self._last_query):
+            candidates = self._last_matches
+        else:
+            candidates = range(len(self._names))
+        lower = self._lower
+        matches = [i for i in candidates if q in lower[i]]
+        self._last_query, self._last_matches = q, matches
+        return [self._names[i] for i in matches]
+
+
+class VirtualList(ctk.CTkFrame):
+    """Scrollable, filterable list that only draws the visible rows.
+
+    Rows are a fixed pool of canvas items re-used while scrolling, so the
+    cost of the widget does not depend on the number of items.
+    """
+
+    ROW_HEIGHT = 22
+
+    def __init__(
+        self,
+        master,
+        on_select: Callable[[str], None],
+        label_func: Callable[[str], str] = str,
+        empty_text: str = "No items",
+        filter_placeholder: str = "Filter…",
+        height: int = 300,
+        **kwargs,
+    ):
+        super().__init__(master, **kwargs)
+        self.on_select = on_select
+        self.label_func = label_func
+        self.empty_text = empty_text
+        self.index = NameIndex()
+        self.visible: List[str] = []
+        self.selected: Optional[str] = None
+        self._hover: Optional[int] = None
+        self._rows: List[tuple] = []  # (rect_id, text_id) pool
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(1, weight=1)
+
+        self.filter_var = ctk.StringVar()
+        self.filter_entry = ctk.CTkEntry(self, textvariable=self.filter_var,
+                                         placeholder_text=filter_placeholder, height=24)
+        self.filter_entry.grid(row=0, column=0, columnspan=2, padx=2, pady=(2, 4), sticky="ew")
+        self.filter_var.trace_add("write", lambda *a: self._on_filter_change())
+
+        self.canvas = tk.Canvas(self, height=height, highlightthickness=0, bd=0,
+                                yscrollincrement=self.ROW_HEIGHT,
+                                bg=self._color(("gray95", "gray20")))
+        self.canvas.grid(row=1, column=0, sticky="nsew")
+        self.scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.grid(row=1, column=1, sticky="ns")
+        self.canvas.configure(yscrollcommand=self.scrollbar.set)
+
+        self.canvas.bind("<Configure>", lambda e: self._rebuild_pool())
+        self.canvas.bind("<Button-1>", self._on_click)
+        self.canvas.bind("<Motion>", self._on_motion)
+        self.canvas.bind("<Leave>", lambda e: self._set_hover(None))
+        for seq in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.canvas.bind(seq, self._on_wheel)
+
+    @staticmethod
+    def _color(pair):
+        return pair[1] if ctk.get_appearance_mode() == "Dark" else pair[0]
+
+    # -- data -------------------------------------------------------------
+    def set_items(self, names: Iterable[str]):
+        """Replace all items."""
+        self.index.set_names(names)
+        if self.selected not in self.index:
+            self.selected = None
+        self._apply_filter()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.index
+
+    def add_item(self, name: str):
+        self.add_items([name])
+
+    def add_items(self, names: Iterable[str]):
+        """Append items, re-filtering once for the whole batch."""
+        if self.index.add_many(names):
+            self._apply_filter()
+
+    def remove_item(self, name: str):
+        self.remove_items([name])
+
+    def remove_items(self, names: Iterable[str]):
+        """Remove items, re-filtering once for the whole batch."""
+        removed = self.index.remove_many(names)
+        if removed:
+            if self.selected in removed:
+                self.selected = None
+            self._apply_filter()
+
+    def refresh_item(self, name: str):
+        """Redraw an item whose label changed."""
+        self.refresh_items([name])
+
+    def refresh_items(self, names: Iterable[str]):
+        """Redraw once if any of the items whose labels changed is visible."""
+        visible = set(self.visible)
+        if any(name in visible for name in names):
+            self._render()
+
+    def set_selected(self, name: Optional[str]):
+        self.selected = name
+        self._render()
+
+    @property
+    def items(self) -> List[str]:
+        return self.index.names
+
+    # -- rendering ----------------------------------------------------------
+    def _on_filter_change(self):
+        self.canvas.yview_moveto(0)
+        self._apply_filter()
+
+    def _apply_filter(self):
+        self.visible = self.index.filter(self.filter_var.get())
+        self.canvas.configure(scrollregion=(0, 0, 1, max(1, len(self.visible)) * self.ROW_HEIGHT))
+        self._render()
+
+    def _rebuild_pool(self):
+        self.canvas.delete("row")
+        self._rows = []
+        count = self.canvas.winfo_height() // self.ROW_HEIGHT + 2
+        font = ctk.CTkFont(size=13)
+        for _ in range(count):
+            rect = self.canvas.create_rectangle(0, 0, 0, 0, width=0, tags="row")
+            text = self.canvas.create_text(0, 0, anchor="w", font=font, tags="row")
+            self._rows.append((rect, text))
+        self._render()
+
+    def _first_visible(self) -> int:
+        return int(self.canvas.canvasy(0) // self.ROW_HEIGHT)
+
+    def _render(self):
+        if not self._rows:
+            return
+        width = self.canvas.winfo_width()
+        first = self._first_visible()
+        fg = self._color(("black", "white"))
+        for i, (rect, text) in enumerate(self._rows):
+            idx = first + i
+            top = idx * self.ROW_HEIGHT
+            if not self.visible and i == 0:
+                self.canvas.coords(rect, 0, 0, 0, 0)
+                self.canvas.coords(text, 10, self.ROW_HEIGHT // 2)
+                label = self.empty_text if not self.index else "No match"
+                self.canvas.itemconfigure(text, text=label, fill="gray60", state="normal")
+                continue
+            if idx >= len(self.visible):
+                self.canvas.itemconfigure(rect, state="hidden")
+                self.canvas.itemconfigure(text, state="hidden")
+                continue
+            name = self.visible[idx]
+            if name == self.selected:
+                fill, color = "#1f6aa5", "white"
+            elif idx == self._hover:
+                fill, color = self._color(("gray85", "gray30")), fg
+            else:
+                fill, color = "", fg
+            self.canvas.coords(rect, 5, top, width - 5, top + self.ROW_HEIGHT)
+            self.canvas.itemconfigure(rect, fill=fill, state="normal")
+            self.canvas.coords(text, 15, top + self.ROW_HEIGHT // 2)
+            self.canvas.itemconfigure(text, text=self.label_func(name), fill=color, state="normal")
+
+    # -- events -------------------------------------------------------------
+    def _index_at(self, y: int) -> Optional[int]:
+        idx = int(self.canvas.canvasy(y) // self.ROW_HEIGHT)
+        return idx if 0 <= idx < len(self.visible) else None
+
+    def _on_click(self, event):
+        idx = self._index_at(event.y)
+        if idx is not None:
+            self.on_select(self.visible[idx])
+
+    def _on_motion(self, event):
+        self._set_hover(self._index_at(event.y))
+
+    def _set_hover(self, idx: Optional[int]):
+        if idx != self._hover:
+            self._hover = idx
+            self.canvas.configure(cursor="hand2" if idx is not None else "")
+            self._render()
+
+    def _on_scrollbar(self, *args):
+        self.canvas.yview(*args)
+        self._render()
+
+    def _on_wheel(self, event):
+        if getattr(event, "num", None) == 4:
+            step = -1
+        elif getattr(event, "num", None) == 5:
+            step = 1
+        else:
+            step = -1 if event.delta > 0 else 1
+        self.canvas.yview_scroll(step * 3, "units")
+        self._render()
+
+
+class ContainerPanel(ctk.CTkScrollableFrame):
+    """Table of Omniboard containers with per-row Open and Stop actions.
+
+    Rows are keyed by container ID and reused across refreshes; only cells
+    whose text changed are reconfigured, so refreshing 50+ containers every
+    few seconds stays cheap.
+    """
+
+    COLUMNS = (("database", "Database", 150), ("port", "Port", 50),
+               ("status", "Status", 120), ("cpu", "CPU", 55), ("memory", "Memory", 75),
+               ("startup", "Startup", 55), ("engine", "Engine", 70))
+
+    def __init__(self, master, on_open: Callable[[dict], None],
+                 on_stop: Callable[[dict], None], on_logs: Optional[Callable[[dict], None]] = None,
+                 **kwargs):
+        super().__init__(master, **kwargs)
+        self.on_open = on_open
+        self.on_stop = on_stop
+        self.on_logs = on_logs
+        self._rows: dict = {}  # container id -> (frame, {column: label}, last values, buttons)
+        self._order: List[str] = []
+
+        header = ctk.CTkFrame(self, fg_color="transparent")
+        header.grid(row=0, column=0, sticky="ew")
+        for col, (_, title, width) in enumerate(self.COLUMNS):
+            ctk.CTkLabel(header, text=title, width=width, anchor="w",
+                         font=ctk.CTkFont(size=11, weight="bold")).grid(row=0, column=col, padx=2)
+        self.empty_label = ctk.CTkLabel(self, text="No Omniboard containers", text_color="gray60")
+        self.empty_label.grid(row=1, column=0, pady=10)
+
+    @staticmethod
+    def _cell_text(container: dict, key: str) -> str:
+        value = container.get(key)
+        if key == "database":
+            return value or container.get("name", "?")
+        if key == "startup" and value is not None:
+            return f"{value:.1f} s"
+        return "–" if value in (None, "") else str(value)
+
+    def _create_row(self, container: dict):
+        frame = ctk.CTkFrame(self, fg_color="transparent")
+        cells = {}
+        for col, (key, _, width) in enumerate(self.COLUMNS):
+            label = ctk.CTkLabel(frame, text="", width=width, anchor="w", font=ctk.CTkFont(size=11))
+            label.grid(row=0, column=col, padx=2)
+            cells[key] = label
+        open_btn = ctk.CTkButton(frame, text="Open", width=46, height=20, font=ctk.CTkFont(size=11),
+                                 command=lambda cid=container["id"]: self._action(cid, self.on_open))
+        open_btn.grid(row=0, column=len(self.COLUMNS), padx=2)
+        stop_btn = ctk.CTkButton(frame, text="Stop", width=46, height=20, font=ctk.CTkFont(size=11),
+                                 fg_color="#8B0000", hover_color="#660000",
+                                 command=lambda cid=container["id"]: self._action(cid, self.on_stop))
+        stop_btn.grid(row=0, column=len(self.COLUMNS) + 1, padx=2)
+        if self.on_logs is not None:
+            ctk.CTkButton(frame, text="Logs", width=46, height=20, font=ctk.CTkFont(size=11),
+                          command=lambda cid=container["id"]: self._action(cid, self.on_logs)
+                          ).grid(row=0, column=len(self.COLUMNS) + 2, padx=2)
+        self._rows[container["id"]] = [frame, cells, {}, open_btn, stop_btn, container]
+
+    def _action(self, container_id: str, callback: Callable[[dict], None]):
+        row = self._rows.get(container_id)
+        if row is not None:
+            callback(row[5])
+
+    def mark_stopping(self, container_id: str):
+        """Grey out a row while its container is being stopped."""
+        row = self._rows.get(container_id)
+        if row is not None:
+            row[4].configure(state="disabled", text="…")
+
+    def update_rows(self, containers: List[dict]):
+        """Show ``containers`` (dicts from ``OmniboardManager.container_status``)."""
+        seen = set()
+        for container in containers:
+            cid = container["id"]
+            seen.add(cid)
+            if cid not in self._rows:
+                self._create_row(container)
+            row = self._rows[cid]
+            row[5] = container
+            last = row[2]
+            for key, label in row[1].items():
+                text = self._cell_text(container, key)
+                if last.get(key) != text:
+                    label.configure(text=text)
+                    last[key] = text
+            running = container.get("state") == "running" and container.get("port")
+            row[3].configure(state="normal" if running else "disabled")
+        for cid in [c for c in self._rows if c not in seen]:
+            self._rows.pop(cid)[0].destroy()
+
+        order = sorted(seen, key=lambda c: (self._rows[c][2].get("database", ""), c))
+        if order != self._order:
+            for i, cid in enumerate(order):
+                self._rows[cid][0].grid(row=i + 1, column=0, sticky="ew", pady=1)
+            self._order = order
+        if order:
+            self.empty_label.grid_remove()
+        else:
+            self.empty_label.grid(row=1, column=0, pady=10)
+
+
+class LogView(ctk.CTkTextbox):
+    """Read-only view of a ``LogRing`` that only appends the lines added since
+    the last refresh, keeping at most ``max_lines`` lines in the widget."""
+
+    def __init__(self, master, ring, max_lines: int = 2000, **kwargs):
+        super().__init__(master, wrap="none", font=ctk.CTkFont(family="Courier", size=11), **kwargs)
+        self.ring = ring
+        self.max_lines = max_lines
+        self._seq = 0
+        self._shown = 0
+        self.configure(state="disabled")
+
+    def refresh(self):
+        lines, self._seq = self.ring.since(self._seq)
+        if not lines:
+            return
+        at_bottom = self.yview()[1] >= 0.999
+        self.configure(state="normal")
+        self.insert("end", "\n".join(lines) + "\n")
+        self._shown += len(lines)
+        if self._shown > self.max_lines:
+            self.delete("1.0", f"{self._shown - self.max_lines + 1}.0")
+            self._shown = self.max_lines
+        self.configure(state="disabled")
+        if at_bottom:
+            self.see("end")
+
+
+def format_size(length: int) -> str:
+    """Return a byte count as e.g. ``"12.3 MB"``."""
+    size = float(length)
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+class ArtifactPanel(ctk.CTkScrollableFrame):
+    """Table of GridFS artifacts with a Download action and progress per row.
+
+    Artifacts are shown a page at a time in a pool of at most ``PAGE_SIZE``
+    rows that are reconfigured when paging, so the number of widgets does
+    not depend on the number of artifacts.
+    """
+
+    COLUMNS = (("run_id", "Run", 60), ("name", "Artifact", 300), ("length", "Size", 80),
+               ("progress", "", 110))
+    PAGE_SIZE = 100
+
+    def __init__(self, master, on_download: Callable[[dict], None], **kwargs):
+        super().__init__(master, **kwargs)
+        self.on_download = on_download
+        self.artifacts: List[dict] = []
+        self.page = 0
+        self._rows: List[tuple] = []  # (frame, {column: label}, download button) pool
+        self._progress: dict = {}  # file id -> (text, busy), kept across pages
+
+        pager = ctk.CTkFrame(self, fg_color="transparent")
+        pager.grid(row=0, column=0, sticky="w")
+        self.prev_btn = ctk.CTkButton(pager, text="◀", width=30, height=20,
+                                      command=lambda: self.show_page(self.page - 1))
+        self.prev_btn.grid(row=0, column=0, padx=2)
+        self.page_label = ctk.CTkLabel(pager, text="", font=ctk.CTkFont(size=11))
+        self.page_label.grid(row=0, column=1, padx=6)
+        self.next_btn = ctk.CTkButton(pager, text="▶", width=30, height=20,
+                                      command=lambda: self.show_page(self.page + 1))
+        self.next_btn.grid(row=0, column=2, padx=2)
+
+        header = ctk.CTkFrame(self, fg_color="transparent")
+        header.grid(row=1, column=0, sticky="ew")
+        for col, (_, title, width) in enumerate(self.COLUMNS):
+            ctk.CTkLabel(header, text=title, width=width, anchor="w",
+                         font=ctk.CTkFont(size=11, weight="bold")).grid(row=0, column=col, padx=2)
+        self.empty_label = ctk.CTkLabel(self, text="Loading artifacts…", text_color="gray60")
+        self.show_page(0)
+
+    def set_artifacts(self, artifacts: List[dict], empty_text: str = "No artifacts"):
+        """Show ``artifacts`` (dicts from ``MongoDBClient.list_artifacts``) from the first page."""
+        self.artifacts = artifacts
+        self.empty_label.configure(text=empty_text)
+        self.show_page(0)
+
+    def _page_artifacts(self) -> List[dict]:
+        first = self.page * self.PAGE_SIZE
+        return self.artifacts[first:first + self.PAGE_SIZE]
+
+    def show_page(self, page: int):
+        """Show page ``page`` (clamped to the available pages)."""
+        pages = max(1, -(-len(self.artifacts) // self.PAGE_SIZE))
+        self.page = min(max(page, 0), pages - 1)
+        shown = self._page_artifacts()
+        while len(self._rows) < len(shown):
+            self._rows.append(self._create_row(len(self._rows)))
+        for row, artifact in zip(self._rows, shown):
+            self._fill_row(row, artifact)
+        for frame, _, _ in self._rows[len(shown):]:
+            frame.grid_remove()
+        if shown:
+            first = self.page * self.PAGE_SIZE
+            self.empty_label.grid_remove()
+            self.page_label.configure(text=f"{first + 1}–{first + len(shown)} of {len(self.artifacts)}")
+        else:
+            self.empty_label.grid(row=2, column=0, pady=10)
+            self.page_label.configure(text="")
+        self.prev_btn.configure(state="normal" if self.page > 0 else "disabled")
+        self.next_btn.configure(state="normal" if self.page < pages - 1 else "disabled")
+
+    def _create_row(self, index: int) -> tuple:
+        frame = ctk.CTkFrame(self, fg_color="transparent")
+        labels = {}
+        for col, (key, _, width) in enumerate(self.COLUMNS):
+            labels[key] = ctk.CTkLabel(frame, text="", width=width, anchor="w", font=ctk.CTkFont(size=11))
+            labels[key].grid(row=0, column=col, padx=2)
+        button = ctk.CTkButton(frame, text="Download", width=70, height=20, font=ctk.CTkFont(size=11))
+        button.grid(row=0, column=len(self.COLUMNS), padx=2)
+        frame.grid(row=index + 3, column=0, sticky="ew", pady=1)
+        return frame, labels, button
+
+    def _fill_row(self, row: tuple, artifact: dict):
+        frame, labels, button = row
+        progress, busy = self._progress.get(artifact["file_id"], ("", False))
+        texts = {"run_id": str(artifact["run_id"]), "name": artifact["name"],
+                 "length": format_size(artifact["length"]), "progress": progress}
+        for key, label in labels.items():
+            label.configure(text=texts[key])
+        button.configure(command=lambda a=artifact: self.on_download(a),
+                         state="disabled" if busy else "normal")
+        frame.grid()
+
+    def set_progress(self, file_id, text: str, busy: bool):
+        """Show download progress of an artifact; ``busy`` disables its button."""
+        self._progress[file_id] = (text, busy)
+        for (_, labels, button), artifact in zip(self._rows, self._page_artifacts()):
+            if artifact["file_id"] == file_id:
+                labels["progress"].configure(text=text)
+                button.configure(state="disabled" if busy else "normal")
@@ -0,0 +1,251 @@
+"""Unit tests for the orphan analyzer and its paced cleanup."""
+import datetime
+
+import bson
+from bson import ObjectId
+from pymongo.errors import OperationFailure
+
+from src.analyzer import (
+    CHUNKS, FILES, METRICS, BatchDeleter, OrphanAnalyzer, bson_order, missing_from, report_text, run_file_ids,
+)
+
+NOW = datetime.datetime(2024, 6, 1, tzinfo=datetime.timezone.utc)
+OLD = NOW - datetime.timedelta(days=30)
+
+
+def _get(doc, path):
+    for part in path.split("."):
+        if isinstance(doc, list):
+            doc = [d.get(part) for d in doc if isinstance(d, dict)]
+        elif isinstance(doc, dict):
+            doc = doc.get(part)
+        else:
+            return None
+    return doc
+
+
+def _matches(doc, query):
+    for key, cond in query.items():
+        if key == "$or":
+            if not any(_matches(doc, q) for q in cond):
+                return False
+            continue
+        value = _get(doc, key)
+        if isinstance(cond, dict) and "$in" in cond:
+            values = value if isinstance(value, list) else [value]
+            if not any(v in cond["$in"] for v in values):
+                return False
+        elif isinstance(cond, dict) and "$elemMatch" in cond:
+            # Only the nested-array form used for sources/resources
+            ids = cond["$elemMatch"]["$elemMatch"]["$in"]
+            if not any(i in ids for pair in value or [] for i in pair):
+                return False
+        elif value != cond:
+            return False
+    return True
+
+
+class FakeResult:
+    def __init__(self, deleted_count):
+        self.deleted_count = deleted_count
+
+
+class FakeCursor(list):
+    def sort(self, key, direction=1):
+        keys = key if isinstance(key, list) else [(key, direction)]
+        for field, _ in reversed(keys):
+            super().sort(key=lambda d: bson_order(d.get(field)))
+        return self
+
+    def batch_size(self, n):
+        return self
+
+
+class FakeCollection:
+    def __init__(self, name, bson_size=True):
+        self.name = name
+        self.docs = []
+        self.bson_size = bson_size
+        self.deletes = []
+        self.write_concern = None
+
+    def find(self, query=None, projection=None):
+        fields = [k for k in projection or {} if "." not in k]
+        docs = [d for d in self.docs if _matches(d, query or {})]
+        return FakeCursor({k: d[k] for k in ["_id", *fields] if k in d} if fields else dict(d) for d in docs)
+
+    def aggregate(self, pipeline, **kwargs):
+        if any("$bsonSize" in str(stage) for stage in pipeline):
+            if not self.bson_size:
+                raise OperationFailure("Unrecognized expression '$bsonSize'")
+            sort, project = pipeline[0]["$sort"], pipeline[1]["$project"]
+            docs = self.find({}, {k: 1 for k in project if k != "size"}).sort(list(sort.items()))
+            for doc, full in zip(docs, FakeCursor(self.docs).sort(list(sort.items()))):
+                doc["size"] = len(bson.encode(full))
+            return iter(docs)
+        # The referenced files pipeline of the runs
+        ids = {bson_order(i): i for run in self.docs for i in run_file_ids(run)}
+        return iter([{"_id": ids[k]} for k in sorted(ids)])
+
+    def with_options(self, write_concern=None):
+        self.write_concern = write_concern
+        return self
+
+    def delete_many(self, query):
+        before = len(self.docs)
+        self.deletes.append(len(query["_id"]["$in"]))
+        self.docs = [d for d in self.docs if not _matches(d, query)]
+        return FakeResult(before - len(self.docs))
+
+
+class FakeDB(dict):
+    def __init__(self, bson_size=True):
+        super().__init__({name: FakeCollection(name, bson_size)
+                          for name in ("runs", "metrics", "fs.files", "fs.chunks")})
+        self.listable = True
+
+    def list_collection_names(self):
+        if not self.listable:
+            raise OperationFailure("not authorized to execute command listCollections")
+        return list(self)
+
+    def command(self, name, collection):
+        return {"avgObjSize": 100}
+
+
+def _oid(when):
+    # Unique, with the given generation time
+    return ObjectId(ObjectId.from_datetime(when).binary[:4] + ObjectId().binary[4:])
+
+
+def _db(bson_size=True):
+    db = FakeDB(bson_size)
+    kept, source, dropped, fresh, missing = (_oid(OLD) for _ in range(5))
+    db["runs"].docs = [
+        {"_id": 1, "artifacts": [{"name": "model.pt", "file_id": kept}],
+         "experiment": {"sources": [["train.py", source]]}},
+        {"_id": 3, "artifacts": [], "experiment": {"sources": [["train.py", source]]}},
+    ]
+    db["metrics"].docs = [{"_id": _oid(OLD), "run_id": run_id, "name": "loss", "values": [0.5] * 50}
+                          for run_id in (1, 2, 2, 3, 4)]
+    db["fs.files"].docs = [
+        {"_id": kept, "filename": "artifact://runs/1/model.pt", "length": 20, "uploadDate": OLD},
+        {"_id": source, "filename": "train.py", "length": 10, "uploadDate": OLD},
+        # Its run was deleted; an upload still in progress is left alone
+        {"_id": dropped, "filename": "artifact://runs/2/big.bin", "length": 1000, "uploadDate": OLD},
+        {"_id": fresh, "filename": "artifact://runs/5/new.bin", "length": 30, "uploadDate": NOW},
+    ]
+    chunks = [(kept, 0), (source, 0), (dropped, 0), (dropped, 1), (fresh, 0), (missing, 0), (missing, 1)]
+    db["fs.chunks"].docs = [{"_id": _oid(OLD), "files_id": f, "n": n, "data": b"x" * 10} for f, n in chunks]
+    # Chunks of an upload that has not written its file document yet
+    db["fs.chunks"].docs.append({"_id": _oid(NOW), "files_id": _oid(NOW), "n": 0, "data": b"y"})
+    return db, {"kept": kept, "dropped": dropped, "missing": missing}
+
+
+def _analyzer(db):
+    return OrphanAnalyzer(db, clock=NOW.timestamp)
+
+
+def test_merge_join_finds_missing_keys():
+    items = [{"k": v} for v in (None, 1, 2, 2, 5, "a", ObjectId())]
+    refs = [bson_order(v) for v in (1, 3, 5)]
+    assert [i["k"] for i in missing_from(items, "k", refs)][:4] == [None, 2, 2, "a"]
+
+
+def test_analysis_reports_reclaimable_bytes():
+    db, ids = _db()
+    report = _analyzer(db).analyze()
+    assert report[METRICS]["documents"] == 3 and report[METRICS]["examples"] == [2, 4]
+    metric_size = len(bson.encode(db["metrics"].docs[0]))
+    assert report[METRICS]["bytes"] == 3 * metric_size
+    assert report[CHUNKS]["documents"] == 2 and report[CHUNKS]["examples"] == [ids["missing"]]
+    assert report[FILES]["examples"] == [ids["dropped"]] and report[FILES]["bytes"] > 1000
+    assert report["total_bytes"] == sum(report[k]["bytes"] for k in (METRICS, CHUNKS, FILES))
+    assert "Metrics of 2 deleted run(s): 3 documents" in report_text(report)
+    # Nothing was deleted
+    assert len(db["metrics"].docs) == 5 and _analyzer(db).clean(dry_run=True) == report
+
+
+def test_old_servers_use_average_sizes():
+    db, _ = _db(bson_size=False)
+    report = _analyzer(db).analyze()
+    assert report[METRICS]["bytes"] == 300 and report[CHUNKS]["bytes"] == 200
+
+
+def test_cleanup_deletes_in_paced_batches():
+    db, ids = _db()
+    sleeps = []
+    deleter = BatchDeleter(batch_size=2, max_docs_per_second=10, sleep=sleeps.append, clock=lambda: 0.0)
+    progress = []
+    report = _analyzer(db).clean(dry_run=False, deleter=deleter,
+                                 progress=lambda kind, n, size: progress.append((kind, n)))
+
+    assert sorted({d["run_id"] for d in db["metrics"].docs}) == [1, 3]
+    assert [f["_id"] for f in db["fs.files"].docs if f["_id"] == ids["dropped"]] == []
+    assert len(db["fs.files"].docs) == 3
+    files_ids = {c["files_id"] for c in db["fs.chunks"].docs}
+    assert ids["dropped"] not in files_ids and ids["missing"] not in files_ids
+    assert len(db["fs.chunks"].docs) == 4
+    assert report[METRICS]["documents"] == 3 and report[FILES]["documents"] == 1
+    assert report["cancelled"] is False
+    # At most batch_size per delete, 0.1 s per document
+    assert max(db["metrics"].deletes) == 2 and sleeps == [0.1, 0.2, 0.2, 0.2, 0.1]
+    assert db["metrics"].write_concern.document == {"w": "majority"}
+    assert progress[-1] == (METRICS, 3)
+
+
+def test_cleanup_rechecks_each_batch():
+    db, _ = _db()
+    analyzer = _analyzer(db)
+    orphans = analyzer.orphan_metrics()
+    # A run is re-inserted (e.g. restored) after the scan started
+    db["runs"].docs.append({"_id": 2})
+    summary = analyzer._delete(METRICS, db["metrics"], orphans, "run_id",
+                               lambda ids: analyzer._absent(db["runs"], ids), BatchDeleter(sleep=lambda s: None),
+                               None)
+    assert summary["documents"] == 1 and summary["examples"] == [4]
+    assert sorted(d["run_id"] for d in db["metrics"].docs) == [1, 2, 2, 3]
+
+
+def test_slow_batches_back_off():
+    times = iter([0.0, 2.0])
+    sleeps = []
+    deleter = BatchDeleter(max_docs_per_second=1000, sleep=sleeps.append, clock=lambda: next(times))
+    collection = FakeCollection("metrics")
+    collection.docs = [{"_id": 1}]
+    assert deleter.delete(collection, [1]) == 1
+    assert sleeps == [2.0]
+
+
+def test_cancel_stops_cleanup():
+    db, _ = _db()
+    analyzer = _analyzer(db)
+    deleter = BatchDeleter(batch_size=1, sleep=lambda s: analyzer.cancel())
+    report = analyzer.clean(dry_run=False, deleter=deleter)
+    assert report["cancelled"] is True
+    assert report[METRICS]["documents"] == 0 and len(db["metrics"].docs) == 5
+
+
+def test_files_of_prefixed_runs_collections_are_kept():
+    db, ids = _db()
+    # An observer with collection_prefix="exp" shares the fs bucket
+    db["exp_runs"] = FakeCollection("exp_runs")
+    db["exp_runs"].docs = [{"_id": 1, "artifacts": [{"name": "big.bin", "file_id": ids["dropped"]}]}]
+    analyzer = _analyzer(db)
+    report = analyzer.analyze()
+    assert report["runs_collections"] == ["exp_runs", "runs"]
+    assert report[FILES]["documents"] == 0 and "exp_runs, runs" in report_text(report)
+    analyzer.clean(dry_run=False, deleter=BatchDeleter(sleep=lambda s: None))
+    assert ids["dropped"] in {f["_id"] for f in db["fs.files"].docs}
+    assert ids["dropped"] in {c["files_id"] for c in db["fs.chunks"].docs}
+
+
+def test_files_are_left_alone_without_the_runs_collections():
+    db, ids = _db()
+    db.listable = False
+    report = _analyzer(db).clean(dry_run=False, deleter=BatchDeleter(sleep=lambda s: None))
+    assert report[FILES]["skipped"] and report["runs_collections"] is None
+    assert "Files: not checked" in report_text(report)
+    assert ids["dropped"] in {f["_id"] for f in db["fs.files"].docs}
+    # Metrics and orphaned chunks are still cleaned
+    assert report[METRICS]["documents"] == 3 and ids["missing"] not in {c["files_id"] for c in db["fs.chunks"].docs}
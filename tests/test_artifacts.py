@@ -0,0 +1,180 @@
+"""Unit tests for GridFS artifact listing and resumable parallel downloads."""
+import hashlib
+import json
+import re
+import threading
+from datetime import datetime
+
+import pytest
+
+from src.artifacts import CURSOR_BATCH, ArtifactDownload, artifacts_by_run, list_artifacts, parse_artifact_name
+
+CHUNK = 10
+
+
+class FakeCursor:
+    def __init__(self, docs, on_close=None):
+        self.docs = docs
+        self.batch = None
+        self.on_close = on_close
+
+    def sort(self, key, direction):
+        self.docs.sort(key=lambda d: d[key], reverse=direction < 0)
+        return self
+
+    def batch_size(self, n):
+        self.batch = n
+        return self
+
+    def close(self):
+        if self.on_close:
+            self.on_close(self)
+
+    def __iter__(self):
+        return iter(self.docs)
+
+
+def _project(doc, projection):
+    if not projection:
+        return dict(doc)
+    return {k: v for k, v in doc.items() if projection.get(k, 0) or (k == "_id" and projection.get("_id", 1))}
+
+
+class FakeFiles:
+    def __init__(self):
+        self.docs = []
+        self.projections = []
+
+    def find(self, query, projection=None):
+        self.projections.append(projection)
+        pattern = re.compile(query["filename"]["$regex"])
+        return FakeCursor([_project(d, projection) for d in self.docs if pattern.search(d["filename"])])
+
+    def find_one(self, query, projection=None):
+        return next((_project(d, projection) for d in self.docs if d["_id"] == query["_id"]), None)
+
+
+class FakeChunks:
+    def __init__(self):
+        self.docs = []
+        self.cursors = []
+        self.fail_at = set()
+        self.lock = threading.Lock()
+
+    def find(self, query, projection=None):
+        n = query["n"]
+        docs = [_project(d, projection) for d in self.docs
+                if d["files_id"] == query["files_id"] and n["$gte"] <= d["n"] < n["$lt"]]
+        if n["$gte"] in self.fail_at:
+            self.fail_at.discard(n["$gte"])
+            raise ConnectionError("connection reset")
+        cursor = FakeCursor(docs)
+        with self.lock:
+            self.cursors.append(cursor)
+        return cursor
+
+
+class FakeDB(dict):
+    def __init__(self):
+        super().__init__({"fs.files": FakeFiles(), "fs.chunks": FakeChunks()})
+
+    def put(self, file_id, filename, data, md5=False):
+        self["fs.files"].docs.append({
+            "_id": file_id, "filename": filename, "length": len(data), "chunkSize": CHUNK,
+            "uploadDate": datetime(2024, 5, 1), **({"md5": hashlib.md5(data).hexdigest()} if md5 else {}),
+        })
+        for n in range(0, len(data), CHUNK):
+            self["fs.chunks"].docs.append({"_id": f"{file_id}-{n}", "files_id": file_id, "n": n // CHUNK,
+                                           "data": data[n:n + CHUNK]})
+
+
+DATA = bytes(range(256)) * 4 + b"tail"
+
+
+def _db():
+    db = FakeDB()
+    db.put("a1", "artifact://runs/1/model.pt", DATA, md5=True)
+    db.put("a2", "artifact://runs/12/plots/loss.png", b"png")
+    db.put("a3", "artifact://runs/2/log.txt", b"")
+    db.put("s1", "/home/me/train.py", b"print()")
+    return db
+
+
+def test_listing_reads_file_metadata_only():
+    db = _db()
+    artifacts = list_artifacts(db)
+    assert [(a["run_id"], a["name"]) for a in artifacts] == [(1, "model.pt"), (2, "log.txt"),
+                                                             (12, "plots/loss.png")]
+    assert artifacts[0]["length"] == len(DATA) and artifacts[0]["file_id"] == "a1"
+    assert db["fs.chunks"].cursors == [] and "data" not in db["fs.files"].projections[0]
+    assert [a["name"] for a in list_artifacts(db, run_id=1)] == ["model.pt"]
+    assert list(artifacts_by_run(artifacts)) == [1, 2, 12]
+    assert parse_artifact_name("artifact://runs/abc/x/y") == ("runs", "abc", "x/y")
+    assert parse_artifact_name("/home/me/train.py") is None
+
+
+def test_parallel_download_streams_chunks_to_disk(tmp_path):
+    db = _db()
+    progress = []
+    dest = tmp_path / "out" / "model.pt"
+    download = ArtifactDownload(db, "a1", dest, workers=4, range_chunks=7,
+                                progress=lambda done, total: progress.append((done, total)))
+    assert download.run() == dest
+    assert dest.read_bytes() == DATA
+    chunks = db["fs.chunks"]
+    # One cursor per range, each reading a few chunks at a time
+    assert len(chunks.cursors) == download.fetched_ranges == 15
+    assert {c.batch for c in chunks.cursors} == {CURSOR_BATCH}
+    assert progress[0] == (0, len(DATA)) and progress[-1] == (len(DATA), len(DATA))
+    assert sorted(p.name for p in dest.parent.iterdir()) == ["model.pt"]
+
+
+def test_interrupted_download_resumes(tmp_path):
+    db = _db()
+    dest = tmp_path / "model.pt"
+    db["fs.chunks"].fail_at = {70}
+    with pytest.raises(ConnectionError):
+        ArtifactDownload(db, "a1", dest, workers=1, range_chunks=7).run()
+    state = json.loads((tmp_path / "model.pt.part.json").read_text())
+    assert 10 not in state["done"] and state["done"]
+    assert not dest.exists()
+
+    download = ArtifactDownload(db, "a1", dest, workers=3, range_chunks=7)
+    download.run()
+    assert dest.read_bytes() == DATA
+    assert download.fetched_ranges == 15 - len(state["done"])
+    assert not (tmp_path / "model.pt.part.json").exists()
+
+
+def test_changed_file_restarts_download(tmp_path):
+    db = _db()
+    dest = tmp_path / "model.pt"
+    db["fs.chunks"].fail_at = {14}
+    with pytest.raises(ConnectionError):
+        ArtifactDownload(db, "a1", dest, workers=1, range_chunks=7).run()
+    # Re-uploaded under the same id
+    db["fs.files"].docs[0]["uploadDate"] = datetime(2024, 6, 1)
+    download = ArtifactDownload(db, "a1", dest, workers=2, range_chunks=7)
+    download.run()
+    assert download.fetched_ranges == 15 and dest.read_bytes() == DATA
+
+
+def test_corrupt_files_are_rejected(tmp_path):
+    db = _db()
+    db["fs.chunks"].docs = [d for d in db["fs.chunks"].docs if not (d["files_id"] == "a1" and d["n"] == 40)]
+    with pytest.raises(RuntimeError, match="chunk 40"):
+        ArtifactDownload(db, "a1", tmp_path / "model.pt", range_chunks=7).run()
+
+    db = _db()
+    db["fs.files"].docs[0]["md5"] = "0" * 32
+    with pytest.raises(RuntimeError, match="MD5"):
+        ArtifactDownload(db, "a1", tmp_path / "other.pt").run()
+    assert list(tmp_path.glob("other.pt*")) == []
+    with pytest.raises(FileNotFoundError):
+        ArtifactDownload(db, "missing", tmp_path / "x").run()
+
+
+def test_empty_artifact(tmp_path):
+    dest = tmp_path / "log.txt"
+    ArtifactDownload(_db(), "a3", dest).run()
+    assert dest.read_bytes() == b""
@@ -0,0 +1,33 @@
+"""Tests for the benchmark helpers (no MongoDB or Docker required)."""
+import json
+
+from benchmarks.common import Timings, write_results
+from benchmarks.compare import compare
+from benchmarks.sacred_data import Scale, iter_runs
+
+
+def test_synthetic_runs_have_sacred_shape():
+    """Generated runs reference their metrics like Sacred's MongoObserver."""
+    scale = Scale(runs=3, metrics_per_run=2, metric_length=5, artifacts_per_run=1, artifact_bytes=16)
+    items = list(iter_runs(scale, seed=1))
+    assert len(items) == 3
+    run, metrics, payloads = items[0]
+    assert run["_id"] == 1
+    assert [m["id"] for m in run["info"]["metrics"]] == [str(m["_id"]) for m in metrics]
+    assert all(m["run_id"] == 1 and len(m["values"]) == 5 for m in metrics)
+    assert payloads[0][0] == "artifact_0.bin" and len(payloads[0][1]) == 16
+
+
+def test_results_round_trip_and_compare(tmp_path):
+    """Result files are JSON and regressions are flagged past the threshold."""
+    t = Timings()
+    t.add("op", 0.010)
+    t.add("op", 0.012)
+    path = write_results("unit", {"x": 1}, t, str(tmp_path / "r.json"))
+    old = json.loads(path.read_text())
+    assert old["results"]["op"]["n"] == 2
+
+    new = json.loads(path.read_text())
+    new["results"]["op"]["median_s"] *= 1.5
+    [(name, _, _, change, slower)] = compare(old, new, threshold=0.1)
+    assert name == "op" and slower and abs(change - 0.5) < 1e-9
@@ -0,0 +1,87 @@
+"""Unit tests for the Docker command executor."""
+import subprocess
+import threading
+
+from src.docker_exec import DockerExecutor, subcommand_of
+
+
+class TestDockerExecutor:
+    """Test binary caching, retries and metrics."""
+
+    def test_binary_resolved_once(self, monkeypatch):
+        """The resolver runs once until reset."""
+        resolved = []
+
+        def resolver():
+            resolved.append(1)
+            return ["docker"]
+
+        monkeypatch.setattr(subprocess, "run",
+                            lambda args, capture_output=False, text=False, timeout=None:
+                            subprocess.CompletedProcess(args, 0, "ok", ""))
+        ex = DockerExecutor(resolver, global_args=["--context", "remote"])
+        ex.run(["ps"])
+        result = ex.run(["ps"])
+        assert result.args == ["docker", "--context", "remote", "ps"]
+        assert len(resolved) == 1
+        ex.reset()
+        ex.run(["ps"])
+        assert len(resolved) == 2
+
+    def test_timeouts_are_retried_for_read_only_commands(self, monkeypatch):
+        """A timed-out `ps` is retried; `run` is not; failures never raise."""
+        calls = []
+
+        def fake_run(args, capture_output=False, text=False, timeout=None):
+            calls.append(args[-1])
+            raise subprocess.TimeoutExpired(args, timeout)
+
+        monkeypatch.setattr(subprocess, "run", fake_run)
+        ex = DockerExecutor(lambda: ["docker"], retries=2, retry_delay=0)
+        result = ex.run(["ps"])
+        assert result.returncode == -1 and "timed out" in result.stderr
+        assert len(calls) == 3
+        ex.run(["run", "image"])
+        assert len(calls) == 4
+
+        metrics = ex.metrics()
+        assert metrics["ps"]["calls"] == 3
+        assert metrics["ps"]["timeouts"] == 3
+        assert metrics["ps"]["retries"] == 2
+        assert metrics["ps"]["failures"] == 1
+        assert sum(metrics["ps"]["histogram"].values()) == 3
+        assert "ps" in ex.format_metrics()
+
+    def test_missing_binary_is_reported(self, monkeypatch):
+        """A missing CLI yields returncode -1 and forces re-resolution."""
+        def fake_run(args, capture_output=False, text=False, timeout=None):
+            raise FileNotFoundError(args[0])
+
+        monkeypatch.setattr(subprocess, "run", fake_run)
+        ex = DockerExecutor(lambda: ["docker"])
+        assert ex.run(["version"]).returncode == -1
+        assert ex._base is None
+
+    def test_subcommand_skips_global_options(self):
+        assert subcommand_of(["--context", "x", "ps", "-a"]) == "ps"
+        assert subcommand_of(["-H", "unix:///s", "run", "-d"]) == "run"
+
+    def test_metrics_are_exact_under_concurrency(self, monkeypatch):
+        """Counters updated from many threads lose no increments."""
+        monkeypatch.setattr(subprocess, "run",
+                            lambda args, capture_output=False, text=False, timeout=None:
+                            subprocess.CompletedProcess(args, 1, "", "no"))
+        ex = DockerExecutor(lambda: ["docker"])
+
+        def worker():
+            for _ in range(500):
+                ex.run(["ps"], retries=0)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        metrics = ex.metrics()["ps"]
+        assert metrics["calls"] == metrics["failures"] == 4000
+        assert sum(metrics["histogram"].values()) == 4000
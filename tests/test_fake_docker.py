@@ -0,0 +1,186 @@
+"""Orchestration tests against the fake docker CLI used by the benchmarks."""
+import json
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+from benchmarks import fake_docker
+from src import omniboard
+from src.omniboard import OmniboardManager
+
+pytestmark = pytest.mark.skipif(sys.platform.startswith("win"), reason="shim is a POSIX shell script")
+
+
+@pytest.fixture
+def shim(tmp_path, monkeypatch):
+    def install(config):
+        env = fake_docker.install_shim(tmp_path, config)
+        for key, value in env.items():
+            monkeypatch.setenv(key, value)
+        # Resolve the binary again so the shim on PATH is picked up
+        OmniboardManager.executor.reset()
+        # Keep port leases out of the user's config directory
+        monkeypatch.setattr(omniboard, "DEFAULT_PORTS_PATH", tmp_path / "ports.json")
+        monkeypatch.setattr(omniboard, "DEFAULT_NETPROBE_PATH", tmp_path / "netprobe.json")
+        return env[fake_docker.LOG_ENV]
+    yield install
+    # Let `docker logs` followers of launched containers finish with the shim
+    for thread in threading.enumerate():
+        if thread.name.startswith("logs-"):
+            thread.join(timeout=5)
+
+
+def test_docker_detection_with_shim(shim):
+    """The shim answers version checks like a daemon that is up or down."""
+    log = shim({"daemon_running": True})
+    assert OmniboardManager.is_docker_running() is True
+    assert [c["sub"] for c in fake_docker.read_calls(log)] == ["version"]
+
+
+def test_crowded_port_range_costs_one_call_per_port(shim):
+    """Each port published by a container costs exactly one `docker ps`."""
+    start = 27500
+    log = shim({"occupied_ports": [start, start + 1, start + 2]})
+    assert OmniboardManager.find_available_port(start) == start + 3
+    assert len(fake_docker.read_calls(log)) == 4
+
+
+def test_clear_all_containers_with_shim(shim):
+    """clear_all_containers removes every listed omniboard_* container."""
+    log = shim({"containers": ["omniboard_a", "omniboard_b", "other"]})
+    assert OmniboardManager().clear_all_containers() == 2
+    subs = [c["sub"] for c in fake_docker.read_calls(log)]
+    assert subs == ["ps", "rm", "rm"]
+
+
+def test_executor_metrics_match_shim_calls(shim):
+    """The executor counts exactly the docker calls the shim received."""
+    log = shim({"containers": ["omniboard_a"]})
+    OmniboardManager.executor.reset_metrics()
+    OmniboardManager.list_containers()
+    OmniboardManager.is_docker_running()
+    metrics = OmniboardManager.executor.metrics()
+    assert metrics["ps"]["calls"] == 1
+    assert metrics["version"]["calls"] == 1
+    assert OmniboardManager.executor.total_calls() == len(fake_docker.read_calls(log))
+
+
+def _state(log):
+    return json.loads((Path(log).parent / "fake_docker.json").read_text(encoding="utf-8"))
+
+
+def test_warm_container_is_started_on_launch(shim):
+    """launch() of the warmed target only checks for reuse and runs `docker start`."""
+    log = shim({"containers": []})
+    manager = OmniboardManager()
+    assert manager.warm("db", "localhost", 27017) is True
+    before = len(fake_docker.read_calls(log))
+    launch = manager.launch("db", "localhost", 27017)
+    name, port = launch
+    subs = [c["sub"] for c in fake_docker.read_calls(log)[before:]]
+    assert subs == ["ps", "start"]
+    assert launch.kind == "warm" and launch.network.mode != "default"
+    state = _state(log)
+    assert name in state["containers"] and state["created"] == []
+    assert port >= 20000
+
+
+def test_warm_for_other_target_is_replaced(shim):
+    """Selecting another database removes the previous warm container."""
+    log = shim({"containers": []})
+    manager = OmniboardManager()
+    manager.warm("db1", "localhost", 27017)
+    first = _state(log)["created"][0]
+    manager.warm("db2", "localhost", 27017)
+    state = _state(log)
+    assert first not in state["containers"]
+    assert len(state["created"]) == 1
+    manager.discard_warm()
+    assert _state(log)["containers"] == []
+
+
+def test_unconfirmed_warm_container_is_reaped(shim):
+    """The lease expires and the created container is removed."""
+    import time
+    log = shim({"containers": []})
+    manager = OmniboardManager()
+    manager.warm("db", "localhost", 27017, lease_seconds=0.05)
+    deadline = time.time() + 10
+    while _state(log)["containers"] and time.time() < deadline:
+        time.sleep(0.05)
+    assert _state(log)["containers"] == []
+    assert manager._warm is None
+
+
+def test_failed_start_falls_back_to_run(shim):
+    """If the warm container cannot start, launch runs a fresh one."""
+    log = shim({"containers": [], "fail": ["start"]})
+    manager = OmniboardManager()
+    manager.warm("db", "localhost", 27017)
+    before = len(fake_docker.read_calls(log))
+    manager.launch("db", "localhost", 27017)
+    subs = [c["sub"] for c in fake_docker.read_calls(log)[before:]]
+    assert subs[:3] == ["ps", "start", "rm"]
+    assert "version" in subs
+
+
+def test_container_status_is_two_batched_calls(shim):
+    """Status of many containers costs one `ps` and one `stats`."""
+    names = [f"omniboard_{i:08x}" for i in range(60)]
+    log = shim({
+        "containers": names,
+        "meta": {n: {"port": 21000 + i, "labels": {OmniboardManager.DB_LABEL: f"db{i}"}}
+                 for i, n in enumerate(names)},
+    })
+    status = OmniboardManager().container_status()
+    assert [c["sub"] for c in fake_docker.read_calls(log)] == ["ps", "stats"]
+    assert len(status) == 60
+    row = next(c for c in status if c["database"] == "db7")
+    assert row["port"] == 21007
+    assert row["state"] == "running"
+    assert row["cpu"] == "0.50%" and row["memory"] == "48.2MiB"
+    assert OmniboardManager().stop_container(row["id"])
+    assert row["name"] not in _state(log)["containers"]
+
+
+def test_launch_reuses_running_container_for_same_target(shim):
+    """After a restart, launching the same target reuses its container."""
+    log = shim({"containers": []})
+    first = OmniboardManager()
+    name, port = first.launch("db", "localhost", 27017, host_port=21500)
+    import time
+    deadline = time.time() + 10
+    while not _state(log)["containers"] and time.time() < deadline:
+        time.sleep(0.02)
+    restarted = OmniboardManager()
+    restored = restarted.reconcile()
+    assert [(c["name"], c["database"], c["port"]) for c in restored] == [(name, "db", 21500)]
+    assert restored[0]["target"] and restored[0]["created"]
+    before = len(fake_docker.read_calls(log))
+    reused = restarted.launch("db", "localhost", 27017)
+    assert reused == (name, 21500) and reused.kind == "reused"
+    assert [c["sub"] for c in fake_docker.read_calls(log)[before:]] == ["ps"]
+    # Another target (here: another database) is not reused
+    assert restarted.launch("other", "localhost", 27017)[0] != name
+
+
+def test_launch_streams_container_logs(shim):
+    """A launched container's output is followed and its failure detected."""
+    log = shim({"containers": [], "logs": {}})
+    manager = OmniboardManager()
+    name, _ = manager.launch("db", "localhost", 27017)
+    assert manager.logs.wait(name, 10) == "exited"  # the fake printed nothing
+    subs = [c["sub"] for c in fake_docker.read_calls(log)]
+    assert subs.index("logs") > subs.index("run")
+
+    state = _state(log)
+    state["logs"] = {name: ["MongoNetworkError: failed to connect to server"]}
+    (Path(log).parent / "fake_docker.json").write_text(json.dumps(state), encoding="utf-8")
+    stream = manager.log_stream({"name": name})
+    assert stream is manager.logs.get(name)
+    manager.logs.stop(name)
+    stream = manager.log_stream({"name": name})
+    assert stream.wait(10) == "failed"
+    assert stream.ring.tail(1) == ["MongoNetworkError: failed to connect to server"]
@@ -0,0 +1,213 @@
+"""Unit tests for the caching HTTP front end."""
+import gzip
+import http.client
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.httpcache import STATS_PATH, CachedResponse, CachingFrontEnd, ResponseCache, cache_directory
+
+
+class FakeOmniboard:
+    """Serves JSON under /api/v1/ with a weak ETag, like Express."""
+
+    def __init__(self):
+        self.requests = []
+        self.payload = {"runs": [{"_id": i, "status": "COMPLETED"} for i in range(200)]}
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                fake.requests.append(("GET", self.path, self.headers.get("If-None-Match")))
+                body = json.dumps(fake.payload).encode()
+                etag = f'W/"{len(body)}-{hash(body) & 0xffff}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_PUT(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                fake.requests.append(("PUT", self.path, self.rfile.read(length)))
+                self.send_response(204)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def omniboard():
+    server = FakeOmniboard()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def clock():
+    return [1000.0]
+
+
+@pytest.fixture
+def front(omniboard, tmp_path, clock):
+    front = CachingFrontEnd(omniboard.port, ResponseCache(tmp_path / "cache"), clock=lambda: clock[0])
+    front.start()
+    yield front
+    front.stop()
+
+
+def _get(port, path, **headers):
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    conn.request("GET", path, headers=headers)
+    response = conn.getresponse()
+    body = response.read()
+    conn.close()
+    return response, body
+
+
+def test_repeated_requests_are_served_from_cache(front, omniboard):
+    first, body = _get(front.port, "/api/v1/Runs")
+    second, again = _get(front.port, "/api/v1/Runs")
+    assert first.status == second.status == 200
+    assert body == again
+    assert len(omniboard.requests) == 1
+    assert front.snapshot()["hits"] == 1
+
+
+def test_stale_entries_are_revalidated_with_the_container(front, omniboard, clock):
+    _get(front.port, "/api/v1/Runs")
+    clock[0] += CachingFrontEnd.FRESH_SECONDS + 1
+    response, body = _get(front.port, "/api/v1/Runs")
+    assert response.status == 200 and body
+    # The second upstream request was conditional and answered with 304
+    assert omniboard.requests[1][2] is not None
+    assert front.snapshot()["revalidated"] == 1
+    # A changed payload is picked up
+    omniboard.payload = {"runs": []}
+    clock[0] += CachingFrontEnd.FRESH_SECONDS + 1
+    _, body = _get(front.port, "/api/v1/Runs")
+    assert json.loads(body) == {"runs": []}
+
+
+def test_browser_revalidation_gets_304(front):
+    response, _ = _get(front.port, "/api/v1/Runs")
+    etag = response.getheader("ETag")
+    assert etag.startswith('"') and response.getheader("Last-Modified")
+    again, body = _get(front.port, "/api/v1/Runs", **{"If-None-Match": etag})
+    assert again.status == 304 and body == b""
+    since, _ = _get(front.port, "/api/v1/Runs",
+                    **{"If-Modified-Since": response.getheader("Last-Modified")})
+    assert since.status == 304
+
+
+def test_large_json_is_gzip_compressed(front):
+    plain, body = _get(front.port, "/api/v1/Runs")
+    compressed, data = _get(front.port, "/api/v1/Runs", **{"Accept-Encoding": "gzip, deflate"})
+    assert plain.getheader("Content-Encoding") is None
+    assert compressed.getheader("Content-Encoding") == "gzip"
+    assert gzip.decompress(data) == body
+    assert len(data) < len(body)
+    assert compressed.getheader("Vary") == "Accept-Encoding"
+
+
+def test_writes_clear_the_cache(front, omniboard):
+    _get(front.port, "/api/v1/Runs")
+    conn = http.client.HTTPConnection("127.0.0.1", front.port)
+    conn.request("PUT", "/api/v1/Runs/1", body=b'{"notes": "x"}',
+                 headers={"Content-Type": "application/json"})
+    assert conn.getresponse().status == 204
+    conn.close()
+    _get(front.port, "/api/v1/Runs")
+    assert [r[0] for r in omniboard.requests] == ["GET", "PUT", "GET"]
+    assert omniboard.requests[1][2] == b'{"notes": "x"}'
+
+
+def test_other_paths_pass_through(front, omniboard):
+    _get(front.port, "/index.html")
+    _get(front.port, "/index.html")
+    assert len(omniboard.requests) == 2
+
+
+def test_disk_cache_survives_restart(omniboard, tmp_path, clock):
+    for _ in range(2):
+        front = CachingFrontEnd(omniboard.port, ResponseCache(tmp_path / "cache"),
+                                clock=lambda: clock[0])
+        front.start()
+        try:
+            _get(front.port, "/api/v1/Runs")
+        finally:
+            front.stop()
+    assert len(omniboard.requests) == 1
+
+
+def test_stats_page(front):
+    _get(front.port, "/api/v1/Runs")
+    response, body = _get(front.port, STATS_PATH, Accept="application/json")
+    stats = json.loads(body)
+    assert stats["misses"] == 1 and stats["entries"] == 1
+    html, page = _get(front.port, STATS_PATH)
+    assert html.getheader("Content-Type").startswith("text/html")
+    assert b"hit_ratio" in page
+
+
+def test_memory_and_disk_bounds(tmp_path):
+    cache = ResponseCache(tmp_path / "c", max_memory_bytes=2500, max_disk_bytes=2500)
+    for i in range(5):
+        cache.put(f"/api/v1/{i}", CachedResponse(200, [], b"x" * 1000, None, None, 0.0, 0.0))
+    entries, size = cache.sizes()
+    assert size <= 2500 and entries == 2
+    on_disk = sum(p.stat().st_size for p in (tmp_path / "c").glob("*.entry"))
+    assert on_disk <= 2500
+
+
+def test_cache_directory_is_per_database(tmp_path):
+    a = cache_directory(tmp_path, "exp/1")
+    assert a.parent == tmp_path and "/" not in a.name
+    assert a != cache_directory(tmp_path, "exp_1")
+
+
+class DroppedConnection:
+    """A keep-alive connection the container has closed in the meantime."""
+
+    sent = []
+
+    def __init__(self, host, port, timeout=None):
+        pass
+
+    def request(self, method, path, body=None, headers=None):
+        DroppedConnection.sent.append(method)
+        raise ConnectionResetError("connection reset")
+
+    def close(self):
+        pass
+
+
+@pytest.mark.parametrize("method, sent", [("GET", 2), ("HEAD", 2), ("PUT", 1), ("POST", 1), ("DELETE", 1)])
+def test_only_reads_are_retried(monkeypatch, tmp_path, method, sent):
+    monkeypatch.setattr(http.client, "HTTPConnection", DroppedConnection)
+    monkeypatch.setattr(DroppedConnection, "sent", [])
+    front = CachingFrontEnd(1, ResponseCache(tmp_path / "cache"))
+    with pytest.raises(ConnectionResetError):
+        front._request(method, "/api/v1/Runs", {}, None)
+    assert DroppedConnection.sent == [method] * sent
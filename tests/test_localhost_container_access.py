@@ -2,6 +2,7 @@
 import sys
 import subprocess
 
+from src.netprobe import NetworkProbe, default_choice
 from src.omniboard import OmniboardManager
 
 
@@ -16,6 +17,8 @@ def _capture_popen(monkeypatch):
             return ("", "")
 
     monkeypatch.setattr(subprocess, "Popen", DummyPopen)
+    # Use the unprobed platform guess for the host address
+    monkeypatch.setattr(NetworkProbe, "choose", lambda self, host, port: default_choice())
     return recorded
 
 
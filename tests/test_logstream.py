@@ -0,0 +1,133 @@
+"""Unit tests for container log streaming and log-based readiness."""
+import subprocess
+import sys
+import time
+
+from src.logstream import EXITED, FAILED, READY, STARTING, LogRing, LogStream, LogStreams, tail_offset
+
+# Stands in for `docker logs -f`: prints its arguments as lines, with pauses
+PRINTER = """
+import sys, time
+for line in sys.argv[1:]:
+    if line.startswith("sleep "):
+        time.sleep(float(line.split()[1]))
+    else:
+        print(line, flush=True)
+"""
+
+
+def _printer(*lines):
+    return lambda *args, **kwargs: subprocess.Popen(
+        [sys.executable, "-c", PRINTER, *lines], stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+    )
+
+
+def test_ring_is_bounded_in_lines_and_bytes():
+    ring = LogRing(max_lines=5, max_bytes=100, max_line_bytes=30)
+    for i in range(1000):
+        ring.append(f"line {i}")
+    assert ring.tail(2) == ["line 998", "line 999"]
+    assert ring.stats()["lines"] == 5 and ring.stats()["dropped"] == 995
+    ring.append("x" * 1000)
+    assert len(ring.tail(1)[0]) == 31
+    assert ring.stats()["bytes"] <= 100
+
+
+def test_since_returns_only_new_lines():
+    ring = LogRing(max_lines=3)
+    ring.append("a")
+    lines, seq = ring.since(0)
+    assert (lines, seq) == (["a"], 1)
+    for line in "bcde":
+        ring.append(line)
+    # "b" was dropped meanwhile; the reader resumes at the oldest kept line
+    assert ring.since(seq) == (["c", "d", "e"], 5)
+    assert ring.since(5) == ([], 5)
+
+
+def test_listening_line_makes_stream_ready():
+    stream = LogStream("c")
+    changes = []
+    stream.add_listener(lambda s: changes.append(s.state))
+    stream.follow_process(_printer("Starting", "Omniboard is listening on port 9000!", "sleep 0.2"))
+    assert stream.wait(10) == READY
+    assert "listening" in stream.reason
+    assert _wait_for(lambda: stream.state == EXITED)
+    assert changes == [READY, EXITED]
+
+
+def test_mongo_error_is_reported_as_soon_as_it_is_logged():
+    stream = LogStream("c")
+    stream.follow_process(_printer("MongoServerSelectionError: connect ECONNREFUSED 172.17.0.1:27017",
+                                   "sleep 30"))
+    started = time.monotonic()
+    assert stream.wait(10) == FAILED
+    # Well before the process ends
+    assert time.monotonic() - started < 5
+    assert "ECONNREFUSED" in stream.reason
+    stream.stop()
+
+
+def test_failed_run_is_a_failure():
+    run = subprocess.Popen([sys.executable, "-c", "raise SystemExit(125)"])
+    stream = LogStream("c")
+    stream.follow_process(_printer("never read"), after=run)
+    assert stream.wait(10) == FAILED
+    assert "125" in stream.reason and stream.ring.tail(1) == []
+
+
+def test_follow_file(tmp_path):
+    log = tmp_path / "omniboard.log"
+    log.write_text("booting\n")
+    streams = LogStreams()
+    stream = streams.follow_file("native", log)
+    assert stream.wait(0.2) == STARTING
+    with open(log, "a") as f:
+        f.write("Omniboard is listening on port 21001!\n")
+    assert streams.wait("native", 10) == READY
+    assert stream.ring.tail(2) == ["booting", "Omniboard is listening on port 21001!"]
+    streams.stop_all()
+
+
+def test_streams_are_bounded_in_number():
+    streams = LogStreams(max_streams=2)
+    for name in "abc":
+        streams.follow_container(name, lambda *a, **kw: None)
+    assert streams.get("a") is None and streams.get("c") is not None
+
+
+def _wait_for(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_attaching_to_a_file_reads_only_its_tail(tmp_path):
+    log = tmp_path / "omniboard.log"
+    log.write_text("".join(f"line {i}\n" for i in range(100_000)))
+    assert log.read_bytes()[tail_offset(log, 3):] == b"line 99997\nline 99998\nline 99999\n"
+    assert tail_offset(log, 200_000) == 0
+    streams = LogStreams()
+    stream = streams.follow_file("native", log, tail=5)
+    assert _wait_for(lambda: stream.ring.tail(1) == ["line 99999"])
+    assert stream.ring.tail(10) == [f"line {i}" for i in range(99_995, 100_000)]
+    streams.stop_all()
+
+
+def test_followed_file_is_kept_small(tmp_path, monkeypatch):
+    monkeypatch.setattr(LogStreams, "MAX_FILE_BYTES", 1000)
+    log = tmp_path / "omniboard.log"
+    log.write_text("")
+    streams = LogStreams()
+    stream = streams.follow_file("native", log)
+    with open(log, "a") as f:
+        f.write("x" * 2000 + "\n")
+    assert _wait_for(lambda: log.stat().st_size == 0)
+    with open(log, "a") as f:
+        f.write("Omniboard is listening on port 21001!\n")
+    assert stream.wait(10) == READY
+    assert stream.ring.tail(1) == ["Omniboard is listening on port 21001!"]
+    streams.stop_all()
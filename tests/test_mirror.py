@@ -0,0 +1,330 @@
+"""Unit tests for the local read mirror."""
+import copy
+import time
+from types import SimpleNamespace
+
+import pytest
+from pymongo.errors import BulkWriteError, OperationFailure
+
+from src.mirror import MirrorManager, MirrorServer, MirrorSync, STATE_COLLECTION, lag_text
+
+
+def _matches(doc, query):
+    for key, cond in query.items():
+        value = doc.get(key)
+        if not isinstance(cond, dict):
+            if value != cond:
+                return False
+            continue
+        for op, arg in cond.items():
+            if op == "$gt" and not (value is not None and value > arg):
+                return False
+            if op == "$ne" and value == arg:
+                return False
+            if op == "$in" and value not in arg:
+                return False
+            if op == "$nin" and value in arg:
+                return False
+    return True
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, direction):
+        self.docs.sort(key=lambda d: d.get(key), reverse=direction < 0)
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    def __iter__(self):
+        return iter(self.docs)
+
+
+class FakeCollection:
+    def __init__(self):
+        self.docs = {}
+        self.insert_batches = 0
+
+    def find(self, query=None, projection=None):
+        return FakeCursor([copy.deepcopy(d) for d in self.docs.values() if _matches(d, query or {})])
+
+    def find_one(self, query):
+        return next(iter(self.find(query)), None)
+
+    def insert_many(self, docs, ordered=True):
+        self.insert_batches += 1
+        errors = []
+        for doc in docs:
+            if doc["_id"] in self.docs:
+                errors.append({"code": 11000})
+            else:
+                self.docs[doc["_id"]] = copy.deepcopy(doc)
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+
+    def replace_one(self, query, doc, upsert=False):
+        self.docs[query["_id"]] = copy.deepcopy(doc)
+
+    def delete_one(self, query):
+        self.docs.pop(query["_id"], None)
+
+    def delete_many(self, query):
+        for key in [k for k, d in self.docs.items() if _matches(d, query)]:
+            del self.docs[key]
+
+
+class FakeStream:
+    def __init__(self):
+        self.changes = []
+        self.alive = True
+
+    def try_next(self):
+        if self.changes:
+            return self.changes.pop(0)
+        time.sleep(0.01)
+        return None
+
+    def close(self):
+        self.alive = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FakeDatabase:
+    def __init__(self, change_streams=False):
+        self.collections = {}
+        self.change_streams = change_streams
+        self.stream = None
+
+    def __getitem__(self, name):
+        return self.collections.setdefault(name, FakeCollection())
+
+    def list_collection_names(self):
+        return [n for n, c in self.collections.items() if c.docs]
+
+    def watch(self, **kwargs):
+        if not self.change_streams:
+            raise OperationFailure("The $changeStream stage is only supported on replica sets")
+        self.stream = FakeStream()
+        return self.stream
+
+    def insert(self, collection, doc):
+        """Insert as another client would, notifying open change streams."""
+        self[collection].docs[doc["_id"]] = doc
+        if self.stream is not None:
+            self.stream.changes.append({"operationType": "insert", "ns": {"coll": collection},
+                                        "documentKey": {"_id": doc["_id"]}, "fullDocument": doc})
+
+
+def _source(runs=5, metrics_per_run=2, change_streams=False):
+    db = FakeDatabase(change_streams)
+    for i in range(runs):
+        db["runs"].docs[i] = {"_id": i, "heartbeat": 100 + i, "status": "COMPLETED"}
+        for j in range(metrics_per_run):
+            db["metrics"].docs[f"{i}-{j}"] = {"_id": f"{i}-{j}", "run_id": i, "values": [1]}
+    db["omniboard.settings"].docs["s"] = {"_id": "s", "name": "timezone"}
+    return db
+
+
+def test_initial_sync_copies_sacred_collections_in_batches():
+    """Every Sacred collection is copied with bulk inserts of batch_size."""
+    source, target = _source(runs=5), FakeDatabase()
+    sync = MirrorSync(source, target, batch_size=2, clock=lambda: 50.0)
+    progress = []
+    copied = sync.initial_sync(lambda c, n: progress.append((c, n)))
+
+    assert copied == 5 + 10 + 1
+    assert target["runs"].docs == source["runs"].docs
+    assert target["metrics"].docs == source["metrics"].docs
+    assert target["omniboard.settings"].docs == source["omniboard.settings"].docs
+    assert target["runs"].insert_batches == 3
+    assert progress == [("runs", 5), ("metrics", 10), ("omniboard.settings", 1)]
+    assert sync.lag_seconds() == 0.0
+
+
+
+def test_resumed_mirror_catches_up_on_changes_made_while_closed():
+    """Runs updated while the app was closed, and their metrics, are copied again."""
+    source, target = _source(runs=3), FakeDatabase()
+    MirrorSync(source, target).initial_sync()
+    # The app is closed; run 1 finishes and logs more, settings change
+    source["runs"].docs[1].update(heartbeat=500, status="COMPLETED", result=0.9)
+    source["metrics"].docs["1-0"]["values"] = [1, 2, 3]
+    source["omniboard.settings"].docs["s"]["name"] = "columns"
+    source["runs"].docs[3] = {"_id": 3, "heartbeat": 400, "status": "RUNNING"}
+
+    sync = MirrorSync(source, target)
+    sync.initial_sync()
+    assert target["runs"].docs == source["runs"].docs
+    assert target["metrics"].docs["1-0"]["values"] == [1, 2, 3]
+    assert target["omniboard.settings"].docs == source["omniboard.settings"].docs
+    assert target[STATE_COLLECTION].docs["runs"]["last_heartbeat"] == 500
+
+def test_initial_sync_resumes_and_tolerates_duplicates():
+    """An interrupted copy continues after the last saved _id."""
+    source, target = _source(runs=4, metrics_per_run=0), FakeDatabase()
+    target["runs"].docs[0] = dict(source["runs"].docs[0])
+    target["runs"].docs[1] = dict(source["runs"].docs[1])
+    target[STATE_COLLECTION].docs["runs"] = {"_id": "runs", "last_id": 0}
+
+    copied = MirrorSync(source, target).initial_sync()
+
+    # Runs 1-3 are sent (run 1 is skipped as a duplicate), plus the settings
+    assert copied == 3 + 1
+    assert sorted(target["runs"].docs) == [0, 1, 2, 3]
+
+
+def test_gridfs_is_opt_in():
+    source = _source(runs=1, metrics_per_run=0)
+    source["fs.files"].docs["f"] = {"_id": "f", "length": 3}
+    target = FakeDatabase()
+    MirrorSync(source, target).initial_sync()
+    assert not target["fs.files"].docs
+    MirrorSync(source, target, include_gridfs=True).initial_sync()
+    assert "f" in target["fs.files"].docs
+
+
+def test_polling_picks_up_new_and_updated_runs():
+    """New runs come by _id; heartbeat updates refresh the run and its metrics."""
+    now = [10.0]
+    source, target = _source(runs=3), FakeDatabase()
+    sync = MirrorSync(source, target, clock=lambda: now[0])
+    sync.initial_sync()
+
+    source["runs"].docs[1].update(heartbeat=500, status="RUNNING")
+    source["metrics"].docs["1-0"]["values"] = [1, 2, 3]
+    source["runs"].docs[7] = {"_id": 7, "heartbeat": 400}
+    source["omniboard.settings"].docs.clear()
+    source["omniboard.settings"].docs["t"] = {"_id": "t"}
+    now[0] = 20.0
+    sync.sync_once()
+
+    assert target["runs"].docs[1]["status"] == "RUNNING"
+    assert target["metrics"].docs["1-0"]["values"] == [1, 2, 3]
+    assert 7 in target["runs"].docs
+    assert list(target["omniboard.settings"].docs) == ["t"]
+    now[0] = 23.0
+    assert sync.lag_seconds() == 3.0
+
+
+def test_change_events_are_applied():
+    source, target = _source(runs=1, metrics_per_run=0), FakeDatabase()
+    sync = MirrorSync(source, target)
+    sync.initial_sync()
+    sync._apply_change({"operationType": "insert", "ns": {"coll": "runs"},
+                        "documentKey": {"_id": 9}, "fullDocument": {"_id": 9, "heartbeat": 1}})
+    sync._apply_change({"operationType": "delete", "ns": {"coll": "runs"}, "documentKey": {"_id": 0}})
+    sync._apply_change({"operationType": "insert", "ns": {"coll": "unrelated"},
+                        "documentKey": {"_id": 1}, "fullDocument": {"_id": 1}})
+    assert list(target["runs"].docs) == [9]
+    assert not target["unrelated"].docs
+
+
+class FakeRun:
+    def __init__(self, existing=None):
+        self.calls = []
+        self.existing = existing
+
+    def __call__(self, args, timeout=None):
+        self.calls.append(args)
+        if args[0] == "inspect":
+            if self.existing is None:
+                return SimpleNamespace(returncode=1, stdout="", stderr="No such object")
+            return SimpleNamespace(returncode=0, stdout=self.existing, stderr="")
+        return SimpleNamespace(returncode=0, stdout="", stderr="")
+
+
+def test_server_creates_container_on_private_network(monkeypatch):
+    monkeypatch.setattr(MirrorServer, "_wait_ready", staticmethod(lambda uri, timeout: None))
+    run = FakeRun()
+    server = MirrorServer(run, allocate_port=lambda: 27117)
+    assert server.ensure() == ("mongodb://127.0.0.1:27117/", "mongodb://altarviewer_mirror:27017/")
+    docker_run = next(c for c in run.calls if c[0] == "run")
+    assert "--network" in docker_run and "altarviewer" in docker_run
+    assert "127.0.0.1:27117:27017" in docker_run
+    assert "altarviewer-mirror:/data/db" in docker_run
+
+
+def test_server_restarts_stopped_container_on_its_port(monkeypatch):
+    monkeypatch.setattr(MirrorServer, "_wait_ready", staticmethod(lambda uri, timeout: None))
+    run = FakeRun('exited|{"27017/tcp":[{"HostIp":"127.0.0.1","HostPort":"27200"}]}')
+    server = MirrorServer(run, allocate_port=lambda: 1 / 0)
+    host_uri, _ = server.ensure()
+    assert host_uri == "mongodb://127.0.0.1:27200/"
+    assert ["start", "altarviewer_mirror"] in run.calls
+
+
+class _FakeClient:
+    def __init__(self, databases):
+        self.databases = databases
+
+    def __getitem__(self, name):
+        return self.databases.setdefault(name, FakeDatabase())
+
+    def close(self):
+        pass
+
+
+def test_manager_returns_container_uri_and_network(monkeypatch):
+    monkeypatch.setattr(MirrorServer, "_wait_ready", staticmethod(lambda uri, timeout: None))
+    target = {}
+    manager = MirrorManager(
+        MirrorServer(FakeRun(), allocate_port=lambda: 27117),
+        client_factory=lambda uri: _FakeClient(target),
+    )
+    uri, network = manager.mirror("exp", _source(runs=2))
+    assert uri == "mongodb://altarviewer_mirror:27017/exp"
+    assert network == "altarviewer"
+    assert len(target["exp"]["runs"].docs) == 2
+    assert manager.status("exp")["copied"] > 0
+    manager.stop_all()
+    assert manager.status("exp") is None
+
+
+def _manager(target, monkeypatch):
+    monkeypatch.setattr(MirrorServer, "_wait_ready", staticmethod(lambda uri, timeout: None))
+    return MirrorManager(MirrorServer(FakeRun(), allocate_port=lambda: 27117),
+                         client_factory=lambda uri: _FakeClient(target))
+
+
+def test_writes_during_the_initial_copy_are_not_lost(monkeypatch):
+    source, target = _source(runs=2, change_streams=True), {}
+    manager = _manager(target, monkeypatch)
+
+    def progress(collection, copied):
+        if collection == "runs":
+            # Written after the runs were copied, before the copy finished
+            source.insert("runs", {"_id": 7, "heartbeat": 1})
+
+    manager.mirror("exp", source, progress)
+    runs = target["exp"]["runs"].docs
+    deadline = time.time() + 2
+    while 7 not in runs and time.time() < deadline:
+        time.sleep(0.01)
+    manager.stop_all()
+    assert sorted(runs) == [0, 1, 7]
+    assert manager.status("exp") is None
+
+
+def test_failed_initial_copy_is_reported(monkeypatch):
+    source = _source(runs=1)
+    source["runs"].find = lambda *a, **k: (_ for _ in ()).throw(OperationFailure("not authorized"))
+    manager = _manager({}, monkeypatch)
+    with pytest.raises(RuntimeError, match="not authorized"):
+        manager.mirror("exp", source)
+    assert manager.status("exp") is None
+
+
+def test_lag_text():
+    assert lag_text({"lag_seconds": None}) == "initial copy in progress…"
+    assert lag_text({"lag_seconds": 2.4, "mode": "polling"}) == "lag 2 s (polling)"
+    assert lag_text({"lag_seconds": 0, "mode": "change_stream"}) == "lag 0 s (live)"
+    assert lag_text({"error": "boom"}).startswith("sync stopped")
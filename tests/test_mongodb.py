@@ -1,4 +1,7 @@
 """Unit tests for MongoDB client module."""
+import threading
+import time
+
 import pytest
 from src.mongodb import MongoDBClient
 
@@ -62,3 +65,225 @@ class TestMongoDBClient:
         except:
             pass
         assert client.uri.startswith("mongodb://")
+
+
+class FakeCollection:
+    def __init__(self, server, db_name):
+        self.server = server
+        self.db_name = db_name
+
+    def estimated_document_count(self):
+        getattr(self.server, "counted", []).append(self.db_name)
+        return self.server.runs.get(self.db_name, 0)
+
+
+class FakeStandaloneClient:
+    """Minimal MongoClient stand-in for a server without change streams."""
+
+    def __init__(self, runs):
+        self.runs = runs
+
+    def __getitem__(self, db_name):
+        server = self
+
+        class _DB:
+            def __getitem__(self, coll):
+                return FakeCollection(server, db_name)
+        return _DB()
+
+    def watch(self, *args, **kwargs):
+        from pymongo.errors import OperationFailure
+        raise OperationFailure("The $changeStream stage is only supported on replica sets", code=40573)
+
+    def list_database_names(self):
+        return list(self.runs)
+
+
+class TestDeploymentWatcher:
+    """Test incremental database/run-count updates."""
+
+    def test_polling_fallback_reports_incremental_changes(self):
+        """Standalone servers are polled; only differences are reported."""
+        from src.mongodb import DeploymentWatcher
+
+        server = FakeStandaloneClient({"a": 1, "b": 0})
+        server.counted = []
+        events = []
+        seen = threading.Event()
+
+        def on_change(event):
+            events.append(event)
+            if event["type"] == "added":
+                seen.set()
+
+        watcher = DeploymentWatcher(server, ["a", "b"], on_change, poll_interval=0.01, selected="a")
+        server.runs["c"] = 4
+        del server.runs["b"]
+        watcher.start()
+        assert seen.wait(2)
+        watcher.stop()
+
+        assert watcher.mode == "polling"
+        generation = watcher.generation
+        assert {"type": "added", "database": "c", "runs": None, "generation": generation} in events
+        assert {"type": "removed", "database": "b", "generation": generation} in events
+        # The baseline count of the selected database is not reported
+        assert all(e["type"] != "runs" for e in events)
+        # Only the selected database is counted
+        assert set(server.counted) == {"a"}
+
+    def test_selecting_a_database_reports_its_runs(self):
+        from src.mongodb import DeploymentWatcher
+
+        server = FakeStandaloneClient({"a": 1, "b": 3})
+        server.counted = []
+        events = []
+        counted = threading.Event()
+        watcher = DeploymentWatcher(server, ["a", "b"], lambda e: (events.append(e), counted.set()),
+                                    poll_interval=0.01)
+        watcher.start()
+        watcher.select("b")
+        assert counted.wait(2)
+        server.runs["b"] = 4
+        deadline = time.time() + 2
+        while len(events) < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        watcher.stop()
+        runs = [e["runs"] for e in events if e["type"] == "runs"]
+        assert runs[:2] == [3, 4] and set(server.counted) == {"b"}
+        # Each watcher has its own generation
+        assert DeploymentWatcher(server, [], lambda e: None).generation > watcher.generation
+
+    def test_change_stream_is_filtered_and_trimmed_on_the_server(self):
+        from src.mongodb import DeploymentWatcher
+
+        changes = [{"operationType": "insert", "ns": {"db": "c", "coll": "runs"}},
+                   {"operationType": "dropDatabase", "ns": {"db": "b"}}]
+
+        class Stream:
+            alive = True
+
+            def try_next(self):
+                if changes:
+                    return changes.pop(0)
+                time.sleep(0.01)
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                pass
+
+        server = FakeStandaloneClient({"a": 1, "b": 0})
+        server.watch = lambda pipeline, **kwargs: (setattr(server, "pipeline", pipeline), Stream())[1]
+        events = []
+        removed = threading.Event()
+        watcher = DeploymentWatcher(server, ["a", "b"], lambda e: (events.append(e), e["type"] == "removed"
+                                                                    and removed.set()))
+        watcher.start()
+        assert removed.wait(2)
+        watcher.stop()
+        assert watcher.mode == "change_stream"
+        assert [(e["type"], e["database"]) for e in events] == [("added", "c"), ("removed", "b")]
+        match, project = server.pipeline
+        assert {"operationType": {"$in": ["insert", "delete"]}, "ns.coll": "runs"} in match["$match"]["$or"]
+        assert project == {"$project": {"operationType": 1, "ns": 1}}
+
+    def test_watch_requires_connection(self):
+        """Watching before connecting is an error."""
+        client = MongoDBClient()
+        with pytest.raises(RuntimeError):
+            client.watch_deployment([], lambda e: None)
+
+
+class FakeMongoClient:
+    """Stand-in for pymongo.MongoClient that records instances."""
+
+    instances = []
+
+    def __init__(self, uri, **kwargs):
+        self.uri = uri
+        self.closed = False
+        self.list_calls = 0
+        FakeMongoClient.instances.append(self)
+
+    def list_database_names(self):
+        self.list_calls += 1
+        return ["db_a", "db_b"]
+
+    def close(self):
+        self.closed = True
+
+
+class TestSpeculativeConnect:
+    """Background pre-connect adopted by the next connect."""
+
+    @pytest.fixture(autouse=True)
+    def fake_client(self, monkeypatch):
+        import src.mongodb as mongodb
+        FakeMongoClient.instances = []
+        monkeypatch.setattr(mongodb, "MongoClient", FakeMongoClient)
+
+    def test_connect_adopts_matching_speculation(self):
+        client = MongoDBClient()
+        client.speculate(MongoDBClient.port_uri("27018"))
+        dbs = client.connect_by_port("27018")
+        assert dbs == ["db_a", "db_b"]
+        assert len(FakeMongoClient.instances) == 1
+        assert client.client is FakeMongoClient.instances[0]
+        assert client.last_connect_stats["speculative"] is True
+
+    def test_changed_input_cancels_previous_attempt(self):
+        client = MongoDBClient()
+        client.speculate("mongodb://localhost:27018/")
+        first = client._speculation
+        client.speculate("mongodb://localhost:27019/")
+        first.done.wait(5)
+        assert first.cancelled
+        assert FakeMongoClient.instances[0].closed
+        # Connecting elsewhere discards the speculation and connects afresh
+        client.connect_by_port("27020")
+        assert client.client.uri == "mongodb://localhost:27020/"
+        assert all(c.closed for c in FakeMongoClient.instances[:2])
+
+    def test_same_uri_is_not_restarted(self):
+        client = MongoDBClient()
+        client.speculate("mongodb://localhost:27018/")
+        client.speculate("localhost:27018/")
+        client._speculation.done.wait(5)
+        assert len(FakeMongoClient.instances) == 1
+
+    def test_stuck_speculation_falls_back_to_a_normal_connect(self, monkeypatch):
+        import src.mongodb as mongodb
+        monkeypatch.setattr(mongodb, "SPECULATION_WAIT_SECONDS", 0.05)
+        release = threading.Event()
+
+        def seedlist_for(uri):
+            # Only the background attempt hangs (e.g. on DNS)
+            if threading.current_thread().name == "mongo-speculate":
+                release.wait(5)
+            return None, None
+
+        client = MongoDBClient()
+        client._seedlist_for = seedlist_for
+        client.speculate("mongodb://localhost:27018/")
+        stuck = client._speculation
+        assert client.connect_by_port("27018") == ["db_a", "db_b"]
+        assert "speculative" not in client.last_connect_stats and stuck.cancelled
+        release.set()
+        stuck.done.wait(5)
+        assert not client.client.closed and stuck.client is None
+
+    def test_fallback_without_list_databases_records_connect_stats(self, monkeypatch):
+        import src.mongodb as mongodb
+        from pymongo.errors import OperationFailure
+
+        class RestrictedClient(FakeMongoClient):
+            def list_database_names(self):
+                raise OperationFailure("not authorized on admin to execute command listDatabases")
+
+        monkeypatch.setattr(mongodb, "MongoClient", RestrictedClient)
+        client = MongoDBClient()
+        assert client.connect_by_url("mongodb://localhost:27018/exp") == ["exp"]
+        assert client.last_connect_stats["seconds"] >= 0
+        assert "srv_cache" in client.last_connect_stats
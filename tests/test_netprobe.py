@@ -0,0 +1,73 @@
+"""Unit tests for the container-to-MongoDB network probe."""
+import json
+import subprocess
+import sys
+
+import pytest
+
+from src.netprobe import NetworkProbe
+
+
+class FakeRun:
+    """Answers `network inspect` and probe containers from a table."""
+
+    def __init__(self, reachable, gateway="172.18.0.1", fail=False):
+        self.reachable = reachable
+        self.gateway = gateway
+        self.fail = fail
+        self.calls = []
+
+    def __call__(self, args, timeout=None):
+        self.calls.append(args)
+        if args[0] == "network":
+            return subprocess.CompletedProcess(args, 0, self.gateway + "\n", "")
+        if self.fail:
+            return subprocess.CompletedProcess(args, 125, "", "Unable to find image")
+        targets = json.loads(args[-1])
+        out = {name: self.reachable.get(name) for name, _, _ in targets}
+        return subprocess.CompletedProcess(args, 0, json.dumps(out) + "\n", "")
+
+
+def test_fastest_reachable_candidate_is_chosen_and_cached(tmp_path):
+    run = FakeRun({"bridge": 0.9, "host-gateway": 0.4})
+    probe = NetworkProbe(run, "img", tmp_path / "netprobe.json")
+    choice = probe.choose("localhost", 27017)
+    assert (choice.mode, choice.host, choice.rtt_ms) == ("host-gateway", "host.docker.internal", 0.4)
+    assert "--add-host" in choice.docker_args(21000)
+    # Both candidates were tried from a single probe container
+    assert sum(1 for c in run.calls if c[0] == "run") == 1
+
+    # A new instance (next session) uses the disk cache without probing
+    run2 = FakeRun({})
+    again = NetworkProbe(run2, "img", tmp_path / "netprobe.json").choose("localhost", 27017)
+    assert again.mode == "host-gateway" and run2.calls == []
+
+
+def test_bridge_uses_the_inspected_gateway(tmp_path):
+    run = FakeRun({"bridge": 0.2}, gateway="10.99.0.1")
+    choice = NetworkProbe(run, "img").choose("localhost", 27017)
+    assert (choice.mode, choice.host) == ("bridge", "10.99.0.1")
+    assert choice.docker_args(21000) == ["-p", "127.0.0.1:21000:9000"]
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="host network is Linux only")
+def test_host_network_is_the_last_resort(tmp_path):
+    run = FakeRun({"host": 0.1})
+    choice = NetworkProbe(run, "img").choose("localhost", 27017)
+    assert (choice.mode, choice.host) == ("host", "127.0.0.1")
+    assert choice.docker_args(21000) == ["--network", "host", "-e", "PORT=21000"]
+
+
+def test_unreachable_is_reported_and_not_cached(tmp_path):
+    run = FakeRun({})
+    probe = NetworkProbe(run, "img", tmp_path / "netprobe.json")
+    choice = probe.choose("localhost", 27017)
+    assert choice.reachable is False
+    assert not (tmp_path / "netprobe.json").exists()
+
+
+def test_failed_probe_keeps_the_platform_guess(tmp_path):
+    run = FakeRun({}, fail=True)
+    choice = NetworkProbe(run, "img", tmp_path / "netprobe.json").choose("localhost", 27017)
+    assert choice.mode == "default" and choice.reachable
+    assert choice.docker_args(21000) == ["-p", "127.0.0.1:21000:9000"]
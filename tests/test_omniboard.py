@@ -59,3 +59,45 @@ class TestOmniboardManager:
         # Should return a list (empty or with IDs)
         containers = manager.list_containers()
         assert isinstance(containers, list)
+
+    def test_find_available_port_skips_docker_published_ports(self, monkeypatch):
+        """Ports published by containers are skipped even if bindable."""
+        import subprocess
+
+        busy = {26000, 26001}
+
+        def fake_run(args, capture_output=False, text=False, timeout=None):
+            port = int(args[args.index("--filter") + 1].split("=")[1])
+
+            class R:
+                returncode = 0
+                stdout = "abc123\n" if port in busy else ""
+            return R()
+
+        monkeypatch.setattr(subprocess, "run", fake_run)
+        assert OmniboardManager.find_available_port(26000) == 26002
+
+    def test_parse_docker_ps_fields(self):
+        """Host port and labels are read from `docker ps` output."""
+        ports = "0.0.0.0:9001->9001/tcp, 127.0.0.1:21007->9000/tcp"
+        assert OmniboardManager._parse_host_port(ports) == 21007
+        assert OmniboardManager._parse_host_port("") is None
+        labels = OmniboardManager._parse_labels("altarviewer.db=runs_2024,maintainer=x")
+        assert labels == {"altarviewer.db": "runs_2024", "maintainer": "x"}
+
+    def test_mongo_args_through_proxy(self, monkeypatch):
+        """With a proxy, Omniboard connects to it directly instead of the server."""
+        from src.netprobe import NetworkChoice
+        manager = OmniboardManager()
+        monkeypatch.setattr(manager.network_probe, "choose",
+                            lambda host, port: NetworkChoice("bridge", "172.17.0.1", 0.2))
+        flag, arg, network = manager._mongo_args(
+            "exp", "a.example.net", 27017,
+            "mongodb://u:p@a.example.net:27017,b.example.net:27017/?tls=true&replicaSet=rs0",
+            proxy_port=27217,
+        )
+        assert flag == "--mu"
+        assert arg == "mongodb://u:p@172.17.0.1:27217/exp?directConnection=true"
+        assert network.mode == "bridge"
+        flag, arg, _ = manager._mongo_args("exp", "db.example.net", 27017, proxy_port=27217)
+        assert (flag, arg) == ("-m", "172.17.0.1:27217:exp")
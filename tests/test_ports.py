@@ -0,0 +1,92 @@
+"""Unit tests for the persistent port lease registry."""
+import threading
+
+from src.ports import PortLeaseRegistry
+
+
+def _no_probe(port):
+    raise AssertionError("find_free must not be called for a leased port")
+
+
+def test_lease_is_remembered_across_instances(tmp_path):
+    """A database keeps its port; a leased port costs no search."""
+    path = tmp_path / "ports.json"
+    first = PortLeaseRegistry(path).lease("db", 21000, lambda p: True, lambda p: p)
+    assert first == 21000
+    # Another instance (or session) reads the same lease
+    again = PortLeaseRegistry(path).lease("db", 29999, lambda p: True, _no_probe)
+    assert again == 21000
+    assert PortLeaseRegistry(path).leases() == {"db": 21000}
+
+
+def test_hash_collision_is_resolved_once(tmp_path):
+    """Two databases hashing to the same port get distinct, stable ports."""
+    registry = PortLeaseRegistry(tmp_path / "ports.json")
+    assert registry.lease("a", 22000, lambda p: True, lambda p: p) == 22000
+    assert registry.lease("b", 22000, lambda p: True, lambda p: p) == 22001
+    assert registry.lease("b", 22000, lambda p: True, _no_probe) == 22001
+    assert registry.lease("a", 22000, lambda p: True, _no_probe) == 22000
+
+
+def test_taken_leased_port_is_reassigned(tmp_path):
+    """If something else grabbed the leased port, a new one is recorded."""
+    registry = PortLeaseRegistry(tmp_path / "ports.json")
+    registry.lease("db", 23000, lambda p: True, lambda p: p)
+    port = registry.lease("db", 23000, lambda p: p != 23000, lambda p: p + 1 if p == 23000 else p)
+    assert port == 23001
+    assert registry.get("db") == 23001
+
+
+def test_stale_leases_expire(tmp_path):
+    """Leases unused for longer than the TTL are dropped."""
+    now = [1000.0]
+    registry = PortLeaseRegistry(tmp_path / "ports.json", clock=lambda: now[0])
+    registry.lease("old", 24000, lambda p: True, lambda p: p)
+    now[0] += PortLeaseRegistry.LEASE_TTL_SECONDS + 1
+    # The expired lease no longer blocks its port
+    assert registry.lease("new", 24000, lambda p: True, lambda p: p) == 24000
+    assert registry.get("old") is None
+
+
+def test_concurrent_instances_never_share_a_port(tmp_path):
+    """Instances racing on the same file (file lock) allocate distinct ports."""
+    path = tmp_path / "ports.json"
+    results = {}
+
+    def allocate(i):
+        registry = PortLeaseRegistry(path)
+        results[i] = registry.lease(f"db{i}", 25000, lambda p: True, lambda p: p)
+
+    threads = [threading.Thread(target=allocate, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(results.values()) == list(range(25000, 25008))
+
+
+def test_search_runs_outside_the_lock(tmp_path):
+    """Another instance can lease while this one searches; the choice is then redone."""
+    path = tmp_path / "ports.json"
+    searches = []
+
+    def find_free(port):
+        searches.append(port)
+        if len(searches) == 1:
+            # Would time out on the file lock if it were held here
+            assert PortLeaseRegistry(path).lease("other", port, lambda p: True, lambda p: p) == port
+        return port
+
+    assert PortLeaseRegistry(path).lease("db", 26000, lambda p: True, find_free) == 26001
+    assert PortLeaseRegistry(path).leases() == {"other": 26000, "db": 26001}
+    assert searches == [26000, 26001]
+
+
+def test_same_database_on_other_targets_gets_its_own_lease(tmp_path):
+    """Leases are per (target, database): one name on two servers never shares a port."""
+    registry = PortLeaseRegistry(tmp_path / "ports.json")
+    first, second = PortLeaseRegistry.key("exp", "fp1"), PortLeaseRegistry.key("exp", "fp2")
+    assert registry.lease(first, 27000, lambda p: True, lambda p: p) == 27000
+    assert registry.lease(second, 27000, lambda p: True, lambda p: p) == 27001
+    assert registry.lease(first, 27000, lambda p: True, _no_probe) == 27000
+    assert PortLeaseRegistry.key("__mirror__") == "__mirror__"
@@ -0,0 +1,185 @@
+"""Unit tests for the cached preferences store."""
+import json
+import os
+import time
+
+import pytest
+
+from src.filelock import FileLock
+from src.prefs import Preferences
+
+
+class TestPreferences:
+    """Test caching, debounced atomic writes and locking."""
+
+    def test_saves_are_debounced_and_coalesced(self, tmp_path, monkeypatch):
+        """Rapid saves produce a single write of the last value."""
+        path = tmp_path / "config.json"
+        prefs = Preferences(path, debounce_seconds=0.05)
+        writes = []
+        original = prefs._write_atomic
+        monkeypatch.setattr(prefs, "_write_atomic", lambda data: (writes.append(data), original(data)))
+
+        for port in ("1", "2", "3"):
+            prefs.save_without_password({"mode": "Port", "port": port, "password": "secret"})
+        # Visible immediately, before the write happens
+        assert prefs.load()["port"] == "3"
+        assert not path.exists()
+
+        time.sleep(0.3)
+        assert len(writes) == 1
+        on_disk = json.loads(path.read_text(encoding="utf-8"))
+        assert on_disk == {"mode": "Port", "port": "3"}
+        assert [p.name for p in tmp_path.iterdir() if p.suffix == ".tmp"] == []
+
+    def test_load_rereads_only_when_file_changes(self, tmp_path):
+        """The parsed file is cached until its mtime changes."""
+        path = tmp_path / "config.json"
+        path.write_text(json.dumps({"mode": "Port"}), encoding="utf-8")
+        prefs = Preferences(path)
+        assert prefs.load() == {"mode": "Port"}
+
+        prefs._cache["mode"] = "cached"
+        assert prefs.load()["mode"] == "cached"
+
+        # Another instance saves: new mtime, so the file is read again
+        path.write_text(json.dumps({"mode": "Full URI"}), encoding="utf-8")
+        os.utime(path, ns=(time.time_ns(), time.time_ns() + 10_000_000))
+        assert prefs.load() == {"mode": "Full URI"}
+
+    def test_flush_writes_pending_immediately(self, tmp_path):
+        """flush() persists without waiting for the debounce delay."""
+        path = tmp_path / "config.json"
+        prefs = Preferences(path, debounce_seconds=60)
+        prefs.save_without_password({"mode": "Port", "port": "27018"})
+        prefs.flush()
+        assert json.loads(path.read_text(encoding="utf-8"))["port"] == "27018"
+
+    def test_file_lock_excludes_other_holders(self, tmp_path):
+        """A second lock on the same file times out while the first is held."""
+        lock_path = tmp_path / "config.json.lock"
+        with FileLock(lock_path):
+            with pytest.raises(TimeoutError):
+                FileLock(lock_path, timeout=0.1).acquire()
+        with FileLock(lock_path, timeout=0.1):
+            pass
+
+
+class FakeKeyring:
+    """Records the thread of every backend call."""
+
+    def __init__(self):
+        self.store = {}
+        self.threads = []
+
+    def get_password(self, service, user):
+        import threading
+        self.threads.append(threading.current_thread().name)
+        return self.store.get((service, user))
+
+    def set_password(self, service, user, password):
+        import threading
+        self.threads.append(threading.current_thread().name)
+        self.store[(service, user)] = password
+
+    def delete_password(self, service, user):
+        self.store.pop((service, user), None)
+
+
+class TestAsyncKeyring:
+    """Test off-thread keyring access and the secret cache."""
+
+    def test_async_load_runs_off_thread_and_caches(self, tmp_path, monkeypatch):
+        """The backend runs on the worker thread once; later reads hit the cache."""
+        import threading
+        import src.prefs as prefs_module
+
+        fake = FakeKeyring()
+        fake.store[(prefs_module.KEYRING_SERVICE, "alice")] = "s3cret"
+        monkeypatch.setattr(prefs_module, "keyring", fake)
+        prefs = Preferences(tmp_path / "config.json")
+
+        assert prefs.get_cached_password("alice") == (False, None)
+        done = threading.Event()
+        results = []
+        prefs.load_password_async("alice", lambda p: (results.append(p), done.set()))
+        assert done.wait(2)
+        assert results == ["s3cret"]
+        assert fake.threads and all(t.startswith("keyring") for t in fake.threads)
+
+        prefs.load_password_async("alice", results.append)
+        assert results == ["s3cret", "s3cret"]
+        assert len(fake.threads) == 1
+
+    def test_save_async_updates_cache_immediately(self, tmp_path, monkeypatch):
+        """Saved secrets are readable from the cache before the backend finishes."""
+        import threading
+        import src.prefs as prefs_module
+
+        fake = FakeKeyring()
+        monkeypatch.setattr(prefs_module, "keyring", fake)
+        prefs = Preferences(tmp_path / "config.json")
+        done = threading.Event()
+        prefs.save_password_async(True, "bob", "pw", lambda ok: done.set())
+        assert prefs.get_cached_password("bob") == (True, "pw")
+        assert done.wait(2)
+        assert fake.store[(prefs_module.KEYRING_SERVICE, "bob")] == "pw"
+
+    def test_cached_secret_expires(self, tmp_path, monkeypatch):
+        """Secrets are only kept for SECRET_TTL seconds."""
+        prefs = Preferences(tmp_path / "config.json")
+        monkeypatch.setattr(prefs, "SECRET_TTL", -1)
+        prefs._cache_secret("carol", "pw")
+        assert prefs.get_cached_password("carol") == (False, None)
+
+
+class TestDatabaseCache:
+    """Test the per-profile database list cache."""
+
+    def test_cache_survives_other_preference_saves(self, tmp_path):
+        """Saving connection prefs keeps the cached database lists."""
+        prefs = Preferences(tmp_path / "config.json", debounce_seconds=60)
+        prefs.save_database_cache("port:27017", [{"name": "exp", "runs": 3}])
+        prefs.save_without_password({"mode": "Port", "port": "27017"})
+        prefs.flush()
+
+        reloaded = Preferences(tmp_path / "config.json")
+        entry = reloaded.load_database_cache("port:27017")
+        assert entry["databases"] == [{"name": "exp", "runs": 3}]
+        assert entry["timestamp"] > 0
+        assert reloaded.load()["port"] == "27017"
+        assert reloaded.load_database_cache("port:27018") is None
+
+    def test_only_recent_profiles_are_kept(self, tmp_path, monkeypatch):
+        """The oldest profiles are dropped beyond MAX_CACHED_PROFILES."""
+        prefs = Preferences(tmp_path / "config.json", debounce_seconds=60)
+        monkeypatch.setattr(prefs, "MAX_CACHED_PROFILES", 2)
+        for i in range(3):
+            prefs.save_database_cache(f"port:{i}", [{"name": "db", "runs": None}])
+            prefs._pending["db_cache"][f"port:{i}"]["timestamp"] = i
+        assert prefs.load_database_cache("port:0") is None
+        assert prefs.load_database_cache("port:2") is not None
+
+
+class TestConcurrentInstances:
+    """Two app instances saving to the same file."""
+
+    def test_instances_do_not_drop_each_others_keys(self, tmp_path):
+        path = tmp_path / "config.json"
+        first = Preferences(path, debounce_seconds=60)
+        second = Preferences(path, debounce_seconds=60)
+        first.load(), second.load()
+        first.save_without_password({**first.load(), "engines": ["ssh://gpu"]})
+        second.save_without_password({**second.load(), "mode": "Port", "port": "27018"})
+        first.flush()
+        second.flush()
+        on_disk = json.loads(path.read_text(encoding="utf-8"))
+        assert on_disk == {"engines": ["ssh://gpu"], "mode": "Port", "port": "27018"}
+
+    def test_unregistered_keys_survive_partial_saves(self, tmp_path):
+        prefs = Preferences(tmp_path / "config.json", debounce_seconds=60)
+        prefs.save_without_password({"some_new_feature": 1})
+        prefs.flush()
+        prefs.save_without_password({"mode": "Port"})
+        prefs.flush()
+        assert Preferences(tmp_path / "config.json").load() == {"some_new_feature": 1, "mode": "Port"}
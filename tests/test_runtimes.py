@@ -0,0 +1,143 @@
+"""Unit tests for the Omniboard runtime backends."""
+import json
+import socket
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src import omniboard
+from src.omniboard import OmniboardManager
+from src.ports import PortLeaseRegistry
+from src.runtimes import NativeRuntime, PodmanRuntime, StartupTracker
+
+# Stands in for the omniboard CLI: serves on $PORT until killed
+FAKE_OMNIBOARD = """
+import os, socket, sys, time
+server = socket.create_server(("127.0.0.1", int(os.environ["PORT"])))
+print("args", sys.argv[1:], flush=True)
+while True:
+    conn, _ = server.accept()
+    conn.close()
+"""
+
+
+def _wait_for(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def native(tmp_path):
+    script = tmp_path / "omniboard.py"
+    script.write_text(FAKE_OMNIBOARD)
+    runtime = NativeRuntime([sys.executable, str(script)], tmp_path / "native.json", tmp_path / "logs")
+    yield runtime
+    for instance in runtime.instances():
+        runtime.stop(instance["id"])
+
+
+def test_startup_tracker_records_time_to_first_connection():
+    tracker = StartupTracker(timeout=5.0, poll_interval=0.02)
+    port = _free_port()
+    tracker.watch("a", port)
+    time.sleep(0.1)
+    with socket.create_server(("127.0.0.1", port)):
+        assert _wait_for(lambda: tracker.get("a") is not None)
+    assert tracker.get("a") >= 0.1
+    assert tracker.summary()["count"] == 1
+
+
+def test_native_runtime_runs_lists_and_stops_processes(native, tmp_path):
+    port = _free_port()
+    native.launch("omniboard_x", "exp", "-m", "localhost:27017:exp", port, "fp1")
+
+    assert _wait_for(lambda: native.startup.get("omniboard_x") is not None)
+    [instance] = native.instances()
+    assert (instance["database"], instance["port"], instance["target"]) == ("exp", port, "fp1")
+    if sys.platform.startswith("linux"):
+        assert json.loads((tmp_path / "native.json").read_text())["omniboard_x"]["started"]
+    if sys.platform.startswith("linux"):
+        assert instance["memory"].endswith("MiB")
+    # The registry lets another AltarViewer (or a restart) see it
+    again = NativeRuntime(registry_path=tmp_path / "native.json")
+    assert [i["id"] for i in again.instances()] == ["omniboard_x"]
+    assert "localhost:27017:exp" in (tmp_path / "logs" / "omniboard_x.log").read_text()
+
+    assert native.stop("omniboard_x")
+    assert native.instances() == []
+    assert not native.stop("omniboard_x")
+    # A relaunch starts a fresh log, so old "listening" lines can't mark it ready
+    native.launch("omniboard_x", "other", "-m", "localhost:27017:other", _free_port(), "fp2")
+    assert "localhost:27017:exp" not in (tmp_path / "logs" / "omniboard_x.log").read_text()
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="reads /proc")
+def test_native_runtime_never_signals_a_reused_pid(tmp_path):
+    registry = tmp_path / "native.json"
+    bystander = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    try:
+        # Left over from before a reboot: the PID now belongs to another process
+        registry.write_text(json.dumps({
+            "omniboard_old": {"pid": bystander.pid, "started": "other-boot:1", "port": 1, "created": 0},
+            "omniboard_legacy": {"pid": bystander.pid, "port": 2, "created": 0},
+        }))
+        runtime = NativeRuntime(registry_path=registry)
+        assert runtime.instances() == []
+        registry.write_text(json.dumps({"omniboard_old": {"pid": bystander.pid, "started": "x:1"}}))
+        assert not runtime.stop("omniboard_old")
+        assert bystander.poll() is None and json.loads(registry.read_text()) == {}
+    finally:
+        bystander.kill()
+        bystander.wait()
+
+
+def test_manager_on_native_runtime_needs_no_docker(native, tmp_path, monkeypatch):
+    def no_docker(*args, **kwargs):
+        raise AssertionError("the native runtime must not call Docker")
+
+    monkeypatch.setattr(OmniboardManager.executor, "run", no_docker)
+    monkeypatch.setattr(OmniboardManager.executor, "popen", no_docker)
+    monkeypatch.setattr(omniboard, "DEFAULT_NETPROBE_PATH", tmp_path / "netprobe.json")
+    manager = OmniboardManager(port_registry=PortLeaseRegistry(tmp_path / "ports.json"), runtime=native)
+
+    assert manager.runtime_available()
+    launch = manager.launch("exp", "localhost", 27017)
+    name, port = launch
+    assert launch.kind == "run"
+    assert _wait_for(lambda: manager.runtime.startup.get(name) is not None)
+    # Same target: the running process is reused
+    reused = manager.launch("exp", "localhost", 27017)
+    assert reused == (name, port) and reused.kind == "reused"
+    [row] = manager.container_status()
+    assert row["startup"] is not None
+    assert manager.warm("exp", "localhost", 27017) is False
+    assert manager.clear_all_containers() == 1
+    assert manager.reconcile() == []
+
+
+def test_podman_ps_json_is_parsed():
+    row = {
+        "Id": "abc123", "Names": ["omniboard_1"], "State": "running", "Status": "Up 3 minutes",
+        "Labels": {OmniboardManager.DB_LABEL: "exp", OmniboardManager.TARGET_LABEL: "fp"},
+        "Ports": [{"host_ip": "127.0.0.1", "container_port": 9000, "host_port": 21001}],
+    }
+    executor = SimpleNamespace(
+        run=lambda args, **kw: SimpleNamespace(returncode=0, stdout=json.dumps(row) + "\n", stderr=""),
+    )
+    manager = OmniboardManager(runtime=PodmanRuntime(executor))
+    [container] = manager._query_containers([])
+    assert (container["id"], container["name"], container["port"]) == ("abc123", "omniboard_1", 21001)
+    assert container["database"] == "exp"
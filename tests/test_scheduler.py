@@ -0,0 +1,153 @@
+"""Tests for launch scheduling across Docker engines, against the fake docker CLI."""
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from benchmarks import fake_docker
+from src import omniboard
+from src.omniboard import OmniboardManager
+from src.scheduler import EngineTarget, LaunchScheduler, endpoint_address, parse_size
+
+pytestmark = pytest.mark.skipif(sys.platform.startswith("win"), reason="shim is a POSIX shell script")
+
+# A second daemon on this machine, e.g. rootless dockerd
+SECOND = "unix:///run/user/1000/docker.sock"
+GIB = 1024 ** 3
+
+
+@pytest.fixture
+def shim(tmp_path, monkeypatch):
+    def install(config):
+        env = fake_docker.install_shim(tmp_path, config)
+        for key, value in env.items():
+            monkeypatch.setenv(key, value)
+        OmniboardManager.executor.reset()
+        monkeypatch.setattr(omniboard, "DEFAULT_PORTS_PATH", tmp_path / "ports.json")
+        monkeypatch.setattr(omniboard, "DEFAULT_NETPROBE_PATH", tmp_path / "netprobe.json")
+        return env[fake_docker.LOG_ENV]
+    yield install
+    # Let `docker logs` followers of launched containers finish with the shim
+    for thread in threading.enumerate():
+        if thread.name.startswith("logs-"):
+            thread.join(timeout=5)
+
+
+def _state(log):
+    return json.loads((Path(log).parent / "fake_docker.json").read_text(encoding="utf-8"))
+
+
+def _wait_for(predicate, timeout=10.0):
+    # launch() spawns `docker run` without waiting for it
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def _runs_on(log, name, engine=None):
+    def engine_state():
+        state = _state(log)
+        return state["engines"][engine] if engine else state
+    return _wait_for(lambda: name in engine_state()["containers"])
+
+
+def _manager(*specs, policy="capacity"):
+    targets = [EngineTarget.from_spec(s, OmniboardManager._docker_cmd_base) for s in specs]
+    return OmniboardManager(scheduler=LaunchScheduler(targets, policy, OmniboardManager.IMAGE))
+
+
+def _busy(count):
+    return [f"omniboard_busy{i}" for i in range(count)]
+
+
+def test_launch_goes_to_engine_with_most_free_capacity(shim):
+    log = shim({"containers": _busy(10), "mem_total": GIB,
+                "engines": {SECOND: {"containers": [], "mem_total": 16 * GIB}}})
+    manager = _manager(SECOND)
+    launch = manager.launch("exp", "localhost", 27017)
+    name, port = launch
+
+    assert _runs_on(log, name, SECOND)
+    assert name not in _state(log)["containers"]
+    assert launch.host == "localhost" and launch.kind == "run"
+    assert manager.scheduler.placement(name).name == SECOND
+
+    # Listing, reuse and clearing span both engines
+    rows = {c["name"]: c for c in manager.container_status()}
+    assert rows[name]["engine"] == SECOND and rows[name]["memory"] == "48.2MiB"
+    assert rows["omniboard_busy0"]["engine"] == "local"
+    assert len(manager.container_ids()) == 11
+    reused = manager.launch("exp", "localhost", 27017)
+    assert reused == (name, port) and reused.kind == "reused"
+    assert manager.stop_container(rows[name]["id"])
+    assert _state(log)["engines"][SECOND]["containers"] == []
+    assert manager.clear_all_containers() == 10
+    assert _state(log)["containers"] == []
+
+
+def test_latency_policy_picks_the_closest_engine(shim):
+    log = shim({"reachable": {"bridge": 8.0},
+                "engines": {SECOND: {"containers": [], "reachable": {"bridge": 0.5}}}})
+    manager = _manager(SECOND, policy="latency")
+    name, _ = manager.launch("exp", "localhost", 27017)
+    assert _runs_on(log, name, SECOND)
+
+
+def test_remote_engine_serves_remote_mongo_only(shim):
+    remote = "tcp://build-server.example.net:2376"
+    log = shim({"containers": _busy(10), "mem_total": GIB,
+                "engines": {remote: {"containers": [], "mem_total": 64 * GIB}}})
+    manager = _manager(remote)
+
+    # A MongoDB on this machine cannot be reached from the remote engine
+    local_name, _ = manager.launch("exp", "localhost", 27017)
+    assert _runs_on(log, local_name)
+
+    launch = manager.launch("other", "mongo.example.net", 27017)
+    name, port = launch
+    assert _runs_on(log, name, remote)
+    assert launch.host == "build-server.example.net"
+    run = next(c["argv"] for c in fake_docker.read_calls(log) if c["sub"] == "run" and name in c["argv"])
+    assert f"0.0.0.0:{port}:9000" in run
+    [row] = [c for c in manager.reconcile() if c["name"] == name]
+    assert row["host"] == "build-server.example.net"
+
+
+def test_unreachable_engine_is_skipped(shim):
+    log = shim({"containers": []})
+    manager = _manager("unix:///nonexistent.sock")
+    assert manager.runtime_available()
+    name, _ = manager.launch("exp", "localhost", 27017)
+    assert _runs_on(log, name)
+    assert manager.container_ids() == [name]
+
+
+def test_warm_container_is_created_on_the_picked_engine(shim):
+    log = shim({"containers": _busy(10), "mem_total": GIB,
+                "engines": {SECOND: {"containers": [], "mem_total": 16 * GIB}}})
+    manager = _manager(SECOND)
+    assert manager.warm("exp", "localhost", 27017)
+    launch = manager.launch("exp", "localhost", 27017)
+    name = launch.name
+    assert launch.kind == "warm"
+    engine = _state(log)["engines"][SECOND]
+    assert name in engine["containers"] and engine["created"] == []
+
+
+def test_helpers():
+    assert parse_size("48.2MiB") == int(48.2 * 1024 ** 2)
+    assert parse_size("1.5GB") == 1_500_000_000
+    assert parse_size("n/a") is None
+    assert endpoint_address("unix:///var/run/docker.sock") == "127.0.0.1"
+    assert endpoint_address("ssh://me@gpu-box") == "gpu-box"
+    assert endpoint_address("tcp://127.0.0.1:2375") == "127.0.0.1"
+    target = EngineTarget.from_spec("gpu-box", lambda: ["docker"])
+    assert target.executor.base() == ["docker", "--context", "gpu-box"]
+    with pytest.raises(ValueError):
+        LaunchScheduler([], policy="random")
@@ -0,0 +1,114 @@
+"""Tests for the shared Omniboard instance, against the fake docker CLI."""
+import json
+import sys
+import threading
+
+import pytest
+
+from benchmarks import fake_docker
+from src import omniboard
+from src.omniboard import OmniboardManager
+from src.runtimes import NativeRuntime
+from src.shared import CONTAINER, db_path, mongo_uri_for
+
+pytestmark = pytest.mark.skipif(sys.platform.startswith("win"), reason="shim is a POSIX shell script")
+
+
+@pytest.fixture
+def shim(tmp_path, monkeypatch):
+    def install(config):
+        env = fake_docker.install_shim(tmp_path, config)
+        for key, value in env.items():
+            monkeypatch.setenv(key, value)
+        OmniboardManager.executor.reset()
+        monkeypatch.setattr(omniboard, "DEFAULT_PORTS_PATH", tmp_path / "ports.json")
+        monkeypatch.setattr(omniboard, "DEFAULT_NETPROBE_PATH", tmp_path / "netprobe.json")
+        monkeypatch.setattr(omniboard, "DEFAULT_SHARED_DIR", tmp_path / "shared")
+        return env[fake_docker.LOG_ENV]
+    yield install
+    for thread in threading.enumerate():
+        if thread.name.startswith("logs-"):
+            thread.join(timeout=5)
+
+
+def _subs(log, since=0):
+    return [c["sub"] for c in fake_docker.read_calls(log)[since:] if c["sub"] != "logs"]
+
+
+def _wait_started(manager):
+    # `docker run -d` is spawned without waiting; its log stream waits for it
+    manager.logs.wait(CONTAINER, 10)
+
+
+def test_databases_share_one_container(shim, tmp_path):
+    log = shim({"containers": []})
+    manager = OmniboardManager()
+    launch = manager.shared.add("exp_a", "mongo.example.net", 27017)
+    name, port = launch
+    assert (name, launch.path, launch.kind) == (CONTAINER, "/exp_a", "run")
+    _wait_started(manager)
+    run = next(c["argv"] for c in fake_docker.read_calls(log) if c["sub"] == "run")
+    assert f"OMNIBOARD_CONFIG=/config/db_config.json" in run
+    assert f"{(tmp_path / 'shared').resolve()}:/config:ro" in run
+
+    before = len(fake_docker.read_calls(log))
+    launch = manager.shared.add("exp_b", "mongo.example.net", 27017)
+    assert launch == (CONTAINER, port) and launch.path == "/exp_b" and launch.kind == "restarted"
+    assert _subs(log, before) == ["ps", "restart"]
+
+    config = json.loads((tmp_path / "shared" / "db_config.json").read_text())
+    assert config == {
+        "exp_a": {"mongodbURI": "mongodb://mongo.example.net:27017/exp_a", "path": "/exp_a"},
+        "exp_b": {"mongodbURI": "mongodb://mongo.example.net:27017/exp_b", "path": "/exp_b"},
+    }
+    # Adding a database again changes nothing
+    before = len(fake_docker.read_calls(log))
+    assert manager.shared.add("exp_a", "mongo.example.net", 27017).kind == "reused"
+    assert _subs(log, before) == ["ps"]
+    # A new manager (e.g. after a restart) sees the same databases
+    assert OmniboardManager().shared.databases() == {"exp_a": "/exp_a", "exp_b": "/exp_b"}
+
+
+def test_removing_databases_reloads_then_stops(shim, tmp_path):
+    log = shim({"containers": []})
+    manager = OmniboardManager()
+    manager.shared.add("exp_a", "mongo.example.net", 27017)
+    manager.shared.add("exp_b", "mongo.example.net", 27017)
+    _wait_started(manager)
+
+    before = len(fake_docker.read_calls(log))
+    assert manager.shared.remove("exp_a")
+    assert _subs(log, before) == ["ps", "restart"]
+    assert manager.shared.databases() == {"exp_b": "/exp_b"}
+    assert manager.shared.remove("exp_b")
+    assert not (tmp_path / "shared" / "db_config.json").exists()
+    assert CONTAINER not in json.loads((tmp_path / "fake_docker.json").read_text())["containers"]
+    assert not manager.shared.remove("exp_b")
+
+
+def test_new_network_setup_recreates_the_container(shim):
+    log = shim({"containers": [], "reachable": {"host": 0.4}})
+    manager = OmniboardManager()
+    manager.shared.add("remote", "mongo.example.net", 27017)
+    _wait_started(manager)
+    before = len(fake_docker.read_calls(log))
+    # A MongoDB on this host reachable from the host network only
+    manager.shared.add("local", "localhost", 27017)
+    _wait_started(manager)
+    subs = _subs(log, before)
+    assert "restart" not in subs and "rm" in subs and subs[-1] == "run"
+    assert manager.shared.databases()["local"] == "/local"
+
+
+def test_native_runtime_is_rejected(tmp_path, monkeypatch):
+    monkeypatch.setattr(omniboard, "DEFAULT_SHARED_DIR", tmp_path / "shared")
+    manager = OmniboardManager(runtime=NativeRuntime([sys.executable]))
+    with pytest.raises(Exception, match="container runtime"):
+        manager.shared.add("exp", "localhost", 27017)
+
+
+def test_helpers():
+    assert db_path("exp_1.v2") == "/exp_1.v2"
+    assert db_path("my db").startswith("/my-db-") and db_path("my db") != db_path("my-db")
+    assert mongo_uri_for("-m", "172.17.0.1:27017:exp") == "mongodb://172.17.0.1:27017/exp"
+    assert mongo_uri_for("--mu", "mongodb+srv://u:p@c.example.net/exp") == "mongodb+srv://u:p@c.example.net/exp"
@@ -0,0 +1,55 @@
+"""Unit tests for the span tracer."""
+import json
+import threading
+
+from src.tracing import Tracer
+
+
+class TestTracer:
+    """Test span recording and Chrome trace export."""
+
+    def test_disabled_tracer_records_nothing(self, tmp_path):
+        """Spans are no-ops until tracing is started."""
+        tracer = Tracer()
+        with tracer.span("a"):
+            pass
+        assert tracer.begin_async("b") is None
+        data = json.loads(tracer.export(tmp_path / "t.json").read_text())
+        assert data["traceEvents"] == []
+
+    def test_nested_spans_export_as_chrome_trace(self, tmp_path):
+        """Nested spans become complete events contained in their parent."""
+        tracer = Tracer()
+        tracer.start()
+        with tracer.span("action.connect", mode="Port"):
+            with tracer.span("mongo.connect"):
+                pass
+        async_id = tracer.begin_async("action.launch_to_browser")
+        worker = threading.Thread(target=lambda: tracer.end_async("action.launch_to_browser", async_id))
+        worker.start()
+        worker.join()
+
+        data = json.loads(tracer.export(tmp_path / "t.json").read_text())
+        spans = {e["name"]: e for e in data["traceEvents"] if e["ph"] == "X"}
+        outer, inner = spans["action.connect"], spans["mongo.connect"]
+        assert outer["args"] == {"mode": "Port"}
+        assert outer["ts"] <= inner["ts"]
+        assert inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"]
+        phases = [e["ph"] for e in data["traceEvents"] if e["name"] == "action.launch_to_browser"]
+        assert phases == ["b", "e"]
+        assert any(e["ph"] == "M" and e["name"] == "thread_name" for e in data["traceEvents"])
+
+    def test_event_buffer_is_bounded(self, tmp_path):
+        """Only the last events are kept; the drop count is exported."""
+        tracer = Tracer(max_events=10)
+        tracer.start()
+        for i in range(25):
+            tracer.instant("tick", i=i)
+        data = json.loads(tracer.export(tmp_path / "t.json").read_text())
+        ticks = [e["args"]["i"] for e in data["traceEvents"] if e["name"] == "tick"]
+        assert ticks == list(range(15, 25))
+        assert data["otherData"] == {"dropped_events": 15}
+        # The thread name survives its first events being dropped
+        assert any(e["ph"] == "M" for e in data["traceEvents"])
+        tracer.start()
+        assert tracer.dropped == 0
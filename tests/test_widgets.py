@@ -0,0 +1,44 @@
+"""Tests for the database list filtering index."""
+from src.widgets import NameIndex
+
+
+def test_filter_is_case_insensitive_substring():
+    index = NameIndex(["Alpha", "beta", "ALPHABET", "gamma"])
+    assert index.filter("alp") == ["Alpha", "ALPHABET"]
+    assert index.filter("  ") == ["Alpha", "beta", "ALPHABET", "gamma"]
+
+
+def test_incremental_filter_matches_full_scan():
+    names = [f"exp_{i}_{'run' if i % 3 else 'test'}" for i in range(500)]
+    index = NameIndex(names)
+    for query in ("e", "ex", "exp_1", "exp_12", "exp_12_t"):
+        assert index.filter(query) == [n for n in names if query in n.lower()]
+    # Shortening the query falls back to a full scan
+    assert index.filter("run") == [n for n in names if "run" in n]
+
+
+def test_add_and_remove_invalidate_previous_results():
+    index = NameIndex(["a1", "b1"])
+    assert index.filter("1") == ["a1", "b1"]
+    index.add("c1")
+    assert index.filter("1") == ["a1", "b1", "c1"]
+    index.remove("a1")
+    assert index.filter("1") == ["b1", "c1"]
+    assert "a1" not in index and len(index) == 2
+
+
+def test_batch_add_and_remove():
+    index = NameIndex(["a", "b", "c"])
+    assert index.add_many(["d", "a", "e", "d"]) == ["d", "e"]
+    assert sorted(index.remove_many(["b", "x", "d"])) == ["b", "d"]
+    assert index.names == ["a", "c", "e"] and "d" not in index and "e" in index
+    assert index.filter("") == ["a", "c", "e"]
+
+
+def test_filter_10k_names():
+    names = [f"database_{i:05d}" for i in range(10_000)]
+    index = NameIndex(names)
+    for query in ("d", "da", "data", "database_0", "database_01"):
+        assert index.filter(query) == [n for n in names if query in n]
+    index.add_many(f"more_{i}" for i in range(10_000))
+    assert len(index) == 20_000 and "more_9999" in index